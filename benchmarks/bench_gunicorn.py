@@ -0,0 +1,73 @@
+"""Compare Gunicorn configurations under the same load.
+
+Each configuration is a set of environment overrides applied on top of the
+current environment before starting ``gunicorn -c gunicorn.conf.py``:
+
+    python -m benchmarks.bench_gunicorn --concurrency 32 --duration 15
+    python -m benchmarks.bench_gunicorn --config "SERVER_MODE=asgi" --config "GUNICORN_THREADS=8"
+
+The environment must provide the usual settings variables (SECRET_KEY, DB_*...).
+"""
+import argparse
+import os
+import subprocess
+
+from benchmarks.load_http import run_load, wait_until_up
+
+DEFAULT_CONFIGS = [
+    'SERVER_MODE=wsgi GUNICORN_WORKERS=1 GUNICORN_THREADS=1',
+    'SERVER_MODE=wsgi',
+    'SERVER_MODE=wsgi GUNICORN_PRELOAD=False',
+    'SERVER_MODE=asgi',
+]
+
+
+def parse_config(config):
+    return dict(item.split('=', 1) for item in config.split())
+
+
+def bench_config(overrides, port, paths, concurrency, duration):
+    env = {
+        **os.environ,
+        **overrides,
+        'PORT': str(port),
+        'GUNICORN_LOG_LEVEL': 'warning',
+        'GUNICORN_ACCESS_LOG': '',
+    }
+    process = subprocess.Popen(['gunicorn', '-c', 'gunicorn.conf.py'], env=env)
+    try:
+        wait_until_up(f'http://127.0.0.1:{port}')
+        # Warm up workers (imports, DB connections) before measuring.
+        run_load(f'http://127.0.0.1:{port}', paths, concurrency, 1.0)
+        return run_load(f'http://127.0.0.1:{port}', paths, concurrency, duration)
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--config', action='append', help="Space separated VAR=value overrides; repeatable")
+    parser.add_argument('--path', action='append', help="Path to load; repeatable (default: health endpoints)")
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10.0)
+    args = parser.parse_args()
+    paths = args.path or ['/core/health/', '/core/health/db/']
+
+    rows = []
+    for config in args.config or DEFAULT_CONFIGS:
+        report = bench_config(parse_config(config), args.port, paths, args.concurrency, args.duration)
+        for path, stats in report.items():
+            rows.append((config, path, stats))
+
+    print(f"{'config':<56}{'path':<20}{'rps':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for config, path, stats in rows:
+        print(
+            f"{config:<56}{path:<20}{stats['rps']:>10.1f}{stats['p50_ms']:>10.2f}"
+            f"{stats['p99_ms']:>10.2f}{stats['errors']:>8}"
+        )
+
+
+if __name__ == '__main__':
+    main()
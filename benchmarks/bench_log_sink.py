@@ -0,0 +1,79 @@
+"""Per-call latency of loguru with a synchronous S3 sink vs ``S3LogSink``.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_log_sink --records 2000 --s3-latency-ms 20
+
+No AWS access is needed: both sinks talk to a fake client that sleeps for the
+configured latency on every upload, which is what a PUT per record costs on
+the request path.
+"""
+import argparse
+import statistics
+import time
+
+from loguru import logger
+
+from core.log_shipping import S3LogSink
+
+
+class SlowS3Client:
+    def __init__(self, latency):
+        self.latency = latency
+        self.puts = 0
+
+    def put_object(self, **params):
+        time.sleep(self.latency)
+        self.puts += 1
+
+
+def synchronous_sink(client):
+    def sink(message):
+        client.put_object(Bucket='bench', Key='logs/bench.log', Body=str(message).encode())
+    return sink
+
+
+def measure(sink, records):
+    logger.remove()
+    logger.add(sink, format="{time} | {level: <8} | {name}:{function}:{line} - {message}", level="DEBUG")
+    samples = []
+    for i in range(records):
+        start = time.perf_counter()
+        logger.debug("benchmark record {}", i)
+        samples.append(time.perf_counter() - start)
+    logger.remove()
+    samples.sort()
+    return {
+        'p50_us': statistics.median(samples) * 1e6,
+        'p99_us': samples[int(len(samples) * 0.99) - 1] * 1e6,
+        'max_us': samples[-1] * 1e6,
+        'total_s': sum(samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', type=int, default=2000)
+    parser.add_argument('--s3-latency-ms', type=float, default=20.0)
+    args = parser.parse_args()
+    latency = args.s3_latency_ms / 1000
+
+    sync_client = SlowS3Client(latency)
+    before = measure(synchronous_sink(sync_client), args.records)
+
+    async_client = SlowS3Client(latency)
+    sink = S3LogSink(bucket='bench', client=async_client, flush_interval=1.0)
+    after = measure(sink, args.records)
+    sink.stop()
+
+    print(f"{'sink':<14}{'p50 (us)':>12}{'p99 (us)':>12}{'max (us)':>12}{'total (s)':>12}{'PUTs':>8}")
+    for name, result, client in (('synchronous', before, sync_client), ('S3LogSink', after, async_client)):
+        print(
+            f"{name:<14}{result['p50_us']:>12.1f}{result['p99_us']:>12.1f}"
+            f"{result['max_us']:>12.1f}{result['total_s']:>12.3f}{client.puts:>8}"
+        )
+    print(f"S3LogSink stats: {sink.stats()}")
+
+
+if __name__ == '__main__':
+    main()
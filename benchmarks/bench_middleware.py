@@ -0,0 +1,137 @@
+"""Per-request overhead of the full vs lean middleware stack on ``core.urls``.
+
+Requests go through Django's test client in-process, so the numbers are the
+cost of the handler, middleware and view without any network or server:
+
+    DJANGO_SETTINGS_MODULE=project.settings python -m benchmarks.bench_middleware --requests 500
+
+A throwaway test database is created and migrated first, and every request
+carries the session cookie of a logged-in user, which is what makes the full
+stack load the session (and, with ``CSRF_USE_SESSIONS``, read it for CSRF).
+"""
+import argparse
+import contextvars
+import statistics
+import time
+
+import django
+
+DEFAULT_PATHS = [
+    '/core/health/',
+    '/core/health/live/',
+    '/core/health/db/',
+    '/core/hello/',
+    '/core/metrics/',
+    '/core/home/',
+]
+
+FULL_MIDDLEWARE = [
+    'core.middleware.timing.RequestTimingMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+LEAN_MIDDLEWARE = [
+    'core.middleware.timing.RequestTimingMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'core.middleware.stateless.LeanSessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'core.middleware.stateless.LeanCsrfViewMiddleware',
+    'core.middleware.stateless.LeanAuthenticationMiddleware',
+    'core.middleware.stateless.LeanMessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+
+def make_client(middleware, user):
+    from django.test import Client, override_settings
+
+    # The handler builds its middleware chain on the first request, so the
+    # client keeps this stack after the override is gone.
+    with override_settings(MIDDLEWARE=middleware):
+        client = Client()
+        client.force_login(user)
+        client.get('/core/health/live/')
+    return client
+
+
+def get(client, path):
+    # Each request runs in an empty context, as it would under a server. The
+    # test client copies context variables back after async views, so
+    # context-local state (e.g. ``connections`` accessed from async code)
+    # would otherwise pile up and slow down every later request.
+    return contextvars.Context().run(client.get, path)
+
+
+def summarize(samples):
+    samples.sort()
+    return {
+        'p50_us': statistics.median(samples) * 1e6,
+        'p99_us': samples[int(len(samples) * 0.99) - 1] * 1e6,
+    }
+
+
+def measure(clients, paths, requests, rounds=5):
+    """Time ``requests`` GETs per path and client, alternating clients in rounds."""
+    results = {name: {} for name in clients}
+    for path in paths:
+        samples = {name: [] for name in clients}
+        for client in clients.values():
+            for _ in range(min(50, requests)):
+                get(client, path)
+        for _ in range(rounds):
+            for name, client in clients.items():
+                for _ in range(max(1, requests // rounds)):
+                    start = time.perf_counter()
+                    get(client, path)
+                    samples[name].append(time.perf_counter() - start)
+        for name in clients:
+            results[name][path] = summarize(samples[name])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--path', action='append', help="Path to request; repeatable")
+    args = parser.parse_args()
+    paths = args.path or DEFAULT_PATHS
+
+    django.setup()
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.test.utils import setup_databases, setup_test_environment, teardown_databases
+
+    from loguru import logger
+    logger.remove()
+
+    setup_test_environment()
+    databases = setup_databases(verbosity=0, interactive=False)
+    try:
+        user = User.objects.create_user(username='bench-middleware', password='bench')
+        settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+        clients = {
+            'full': make_client(FULL_MIDDLEWARE, user),
+            'lean': make_client(LEAN_MIDDLEWARE, user),
+        }
+        results = measure(clients, paths, args.requests)
+    finally:
+        teardown_databases(databases, verbosity=0)
+
+    print(f"{'path':<22}{'full p50 us':>14}{'lean p50 us':>14}{'saved':>10}{'full p99 us':>14}{'lean p99 us':>14}")
+    for path in paths:
+        before, after = results['full'][path], results['lean'][path]
+        saved = 1 - after['p50_us'] / before['p50_us']
+        print(
+            f"{path:<22}{before['p50_us']:>14.1f}{after['p50_us']:>14.1f}{saved:>10.1%}"
+            f"{before['p99_us']:>14.1f}{after['p99_us']:>14.1f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,22 @@
+import contextvars
+
+import pytest
+from loguru import logger
+
+
+@pytest.fixture(autouse=True, scope='session')
+def quiet_logs():
+    # Request logging would dominate the timings of the cheapest views.
+    logger.remove()
+
+
+@pytest.fixture
+def get(client):
+    """GET through the test client, each request in an empty context.
+
+    The test client copies context variables back after async views, so
+    context-local state would otherwise pile up and slow down later requests.
+    """
+    def get(path, client=client):
+        return contextvars.Context().run(client.get, path)
+    return get
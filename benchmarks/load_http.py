@@ -0,0 +1,150 @@
+"""Closed-loop HTTP load generator for the core endpoints.
+
+Each of ``--concurrency`` clients sends requests back to back for
+``--duration`` seconds and the script reports RPS and latency percentiles per
+path. With ``--serve`` it starts Gunicorn itself, so the WSGI and ASGI modes
+can be compared on the same machine:
+
+    python -m benchmarks.load_http --serve wsgi --concurrency 32 /core/health/db/
+    python -m benchmarks.load_http --serve asgi --concurrency 32 /core/health/db/
+
+Without ``--serve`` it targets an already running server (``--base-url``).
+The environment must provide the usual settings variables (SECRET_KEY, DB_*...).
+"""
+import argparse
+import http.client
+import os
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+SERVER_COMMANDS = {
+    'wsgi': ['gunicorn', 'project.wsgi'],
+    'asgi': ['gunicorn', 'project.asgi', '-k', 'uvicorn_worker.UvicornWorker'],
+}
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    index = min(int(len(samples) * fraction), len(samples) - 1)
+    return samples[index]
+
+
+def run_client(base_url, paths, deadline, results, errors):
+    parts = urlsplit(base_url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+    i = 0
+    while time.monotonic() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            conn.request('GET', path, headers={'Host': parts.netloc})
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 500:
+                errors[path] = errors.get(path, 0) + 1
+        except (OSError, http.client.HTTPException):
+            errors[path] = errors.get(path, 0) + 1
+            conn.close()
+            conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+            continue
+        results.setdefault(path, []).append(time.perf_counter() - start)
+    conn.close()
+
+
+def run_load(base_url, paths, concurrency, duration):
+    """Drive the server and return ``{path: stats}`` with RPS and percentiles in ms."""
+    deadline = time.monotonic() + duration
+    per_thread = [({}, {}) for _ in range(concurrency)]
+    threads = [
+        threading.Thread(target=run_client, args=(base_url, paths, deadline, results, errors))
+        for results, errors in per_thread
+    ]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    report = {}
+    for path in paths:
+        samples = sorted(s for results, _ in per_thread for s in results.get(path, []))
+        failed = sum(errors.get(path, 0) for _, errors in per_thread)
+        report[path] = {
+            'requests': len(samples),
+            'errors': failed,
+            'rps': len(samples) / elapsed if elapsed else 0.0,
+            'p50_ms': percentile(samples, 0.50) * 1000,
+            'p95_ms': percentile(samples, 0.95) * 1000,
+            'p99_ms': percentile(samples, 0.99) * 1000,
+        }
+    return report
+
+
+def wait_until_up(base_url, timeout=30):
+    parts = urlsplit(base_url)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=1)
+            conn.request('GET', '/core/health/')
+            conn.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not start within {timeout}s")
+
+
+def start_server(mode, bind, extra_args=()):
+    command = [*SERVER_COMMANDS[mode], '-b', bind, '--log-level', 'warning', *extra_args]
+    # SERVER_MODE also tells core.urls which kind of views to route to.
+    process = subprocess.Popen(command, env={**os.environ, 'SERVER_MODE': mode})
+    try:
+        wait_until_up(f'http://{bind}')
+    except RuntimeError:
+        process.terminate()
+        raise
+    return process
+
+
+def print_report(report, label=''):
+    if label:
+        print(label)
+    print(f"{'path':<24}{'requests':>10}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for path, stats in report.items():
+        print(
+            f"{path:<24}{stats['requests']:>10}{stats['errors']:>8}{stats['rps']:>10.1f}"
+            f"{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('paths', nargs='*', default=['/core/health/', '/core/health/db/'])
+    parser.add_argument('--base-url', default='http://127.0.0.1:8080')
+    parser.add_argument('--serve', choices=sorted(SERVER_COMMANDS))
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10.0)
+    args = parser.parse_args()
+
+    process = None
+    if args.serve:
+        process = start_server(args.serve, urlsplit(args.base_url).netloc)
+    try:
+        report = run_load(args.base_url, args.paths, args.concurrency, args.duration)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+    print_report(report, label=f"mode={args.serve or 'external'} concurrency={args.concurrency}")
+    if any(stats['errors'] for stats in report.values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
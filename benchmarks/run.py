@@ -0,0 +1,201 @@
+"""Run the benchmark suite and compare it with the baselines in ``benchmarks/baselines``.
+
+    python -m benchmarks.run micro            # pytest-benchmark, in-process
+    python -m benchmarks.run load             # HTTP load against a local Gunicorn
+    python -m benchmarks.run all --save       # record new baselines
+
+Both use ``benchmarks.settings`` (SQLite, no AWS) unless DJANGO_SETTINGS_MODULE
+is set. Without ``--save`` the results are compared with the stored baseline
+and the command exits with status 1 when a metric is worse by more than
+``--tolerance``: RPS, p95 and p99 for the load test; for the micro-benchmarks,
+the fastest round (the least noisy statistic) across ``--repeat`` runs, only
+when it is also ``--min-delta`` ms slower, since a sub-millisecond view can
+move by a quarter on a busy runner without any code change, and only if it
+is still slower when measured again. Baselines only mean something on the
+machine that recorded them, so record and compare on the same runner, and
+record them again in the change that deliberately makes the request path
+slower (new middleware, say).
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+BASE_DIR = BENCH_DIR.parent
+BASELINES = BENCH_DIR / 'baselines'
+LOAD_BASELINE = BASELINES / 'load.json'
+MICRO_BASELINE = BASELINES / 'micro.json'
+
+LOAD_PATHS = ['/core/health/', '/core/health/db/', '/core/hello/', '/core/home/', '/']
+
+
+def machine():
+    return {'system': platform.platform(), 'python': platform.python_version(), 'cpus': os.cpu_count()}
+
+
+def measure_micro(repeat, tests=None, report=None):
+    """Run the micro-benchmarks ``repeat`` times and return the best min and median (ms) of each.
+
+    Each run is a fresh process, so a slow stretch of the host only costs the
+    runs it overlaps. ``tests`` narrows the run to some benchmark ids and
+    ``report`` is merged into; returns None if a benchmark fails.
+    """
+    report = {} if report is None else report
+    targets = [str(BENCH_DIR / test) for test in tests] if tests else [str(BENCH_DIR)]
+    with tempfile.TemporaryDirectory() as tmp:
+        for run in range(repeat):
+            output = Path(tmp) / f'{run}.json'
+            result = subprocess.run([
+                sys.executable, '-m', 'pytest', '-c', str(BENCH_DIR / 'pytest.ini'), '--rootdir', str(BENCH_DIR),
+                *targets, '-q', '--benchmark-warmup=on', '--benchmark-warmup-iterations=50',
+                '--benchmark-min-rounds=50', '--benchmark-max-time=0.5', f'--benchmark-json={output}',
+            ], cwd=BASE_DIR)
+            if result.returncode != 0:
+                return None
+            for bench in json.loads(output.read_text())['benchmarks']:
+                stats = report.setdefault(bench['fullname'], {'min_ms': float('inf'), 'median_ms': float('inf')})
+                stats['min_ms'] = min(stats['min_ms'], bench['stats']['min'] * 1000)
+                stats['median_ms'] = min(stats['median_ms'], bench['stats']['median'] * 1000)
+    return report
+
+
+def compare_micro(report, baseline, tolerance, min_delta):
+    """Return a description, by benchmark, of every one in ``report`` slower than ``baseline`` beyond both limits."""
+    regressions = {}
+    for test, stats in report.items():
+        base = baseline['results'].get(test)
+        if base is None:
+            continue
+        limit = max(base['min_ms'] * (1 + tolerance), base['min_ms'] + min_delta)
+        if stats['min_ms'] > limit:
+            regressions[test] = f"{test}: min {stats['min_ms']:.3f} ms > {base['min_ms']:.3f} ms"
+    return regressions
+
+
+def run_micro(save, tolerance, min_delta, repeat):
+    report = measure_micro(repeat)
+    if report is None:
+        return False
+    baseline = json.loads(MICRO_BASELINE.read_text()) if MICRO_BASELINE.exists() else None
+    regressions = compare_micro(report, baseline, tolerance, min_delta) if baseline and not save else {}
+    if regressions:
+        # The host can stay slow for a whole run; a real regression also shows
+        # when the suspects are measured again.
+        print(f"Measuring {len(regressions)} slower benchmarks again")
+        if measure_micro(repeat, list(regressions), report) is None:
+            return False
+        regressions = compare_micro(report, baseline, tolerance, min_delta)
+
+    print(f"{'benchmark':<48}{'min ms':>10}{'median ms':>11}{'base min':>10}")
+    for test, stats in report.items():
+        base = baseline['results'].get(test, {}).get('min_ms') if baseline else None
+        print(f"{test.split('::')[-1]:<48}{stats['min_ms']:>10.3f}{stats['median_ms']:>11.3f}"
+              f"{'' if base is None else f'{base:.3f}':>10}")
+
+    if save:
+        BASELINES.mkdir(exist_ok=True)
+        MICRO_BASELINE.write_text(json.dumps({
+            'machine': machine(),
+            'recorded': datetime.date.today().isoformat(),
+            'settings': {'repeat': repeat},
+            'results': report,
+        }, indent=2) + '\n')
+        print(f"Saved micro baseline to {MICRO_BASELINE.relative_to(BASE_DIR)}")
+        return True
+    if baseline is None:
+        print("No micro baseline yet; record one with --save")
+        return True
+    for regression in regressions.values():
+        print(f"REGRESSION {regression}")
+    return not regressions
+
+
+def compare_load(report, baseline, tolerance):
+    """Return a description of every metric in ``report`` worse than ``baseline`` beyond ``tolerance``."""
+    regressions = []
+    for path, stats in report.items():
+        if stats['errors']:
+            regressions.append(f"{path}: {stats['errors']} failed requests")
+        base = baseline['results'].get(path)
+        if base is None:
+            continue
+        if stats['rps'] < base['rps'] * (1 - tolerance):
+            regressions.append(f"{path}: rps {stats['rps']:.1f} < {base['rps']:.1f}")
+        for key in ('p95_ms', 'p99_ms'):
+            if stats[key] > base[key] * (1 + tolerance):
+                regressions.append(f"{path}: {key} {stats[key]:.2f} > {base[key]:.2f}")
+    return regressions
+
+
+def run_load(save, tolerance, concurrency, duration, mode):
+    from benchmarks.load_http import print_report, run_load as drive, start_server
+
+    bind = '127.0.0.1:8089'
+    # Gunicorn picks up gunicorn.conf.py: keep its access log out of the report
+    # and do not recycle workers (dropped connections) during the run.
+    os.environ.setdefault('GUNICORN_ACCESS_LOG', '')
+    os.environ.setdefault('GUNICORN_MAX_REQUESTS', '0')
+    subprocess.run([sys.executable, 'manage.py', 'migrate', '--noinput', '-v', '0'], cwd=BASE_DIR, check=True)
+    process = start_server(mode, bind)
+    try:
+        # Warm up the worker (imports, connections, page cache) before measuring.
+        drive(f'http://{bind}', LOAD_PATHS, concurrency, 1.0)
+        report = drive(f'http://{bind}', LOAD_PATHS, concurrency, duration)
+    finally:
+        process.terminate()
+        process.wait()
+    print_report(report, label=f"mode={mode} concurrency={concurrency} duration={duration}s")
+
+    if save:
+        BASELINES.mkdir(exist_ok=True)
+        LOAD_BASELINE.write_text(json.dumps({
+            'machine': machine(),
+            'recorded': datetime.date.today().isoformat(),
+            'settings': {'mode': mode, 'concurrency': concurrency, 'duration': duration},
+            'results': report,
+        }, indent=2) + '\n')
+        print(f"Saved load baseline to {LOAD_BASELINE.relative_to(BASE_DIR)}")
+        return True
+    if not LOAD_BASELINE.exists():
+        print("No load baseline yet; record one with --save")
+        return True
+    baseline = json.loads(LOAD_BASELINE.read_text())
+    if baseline['settings'] != {'mode': mode, 'concurrency': concurrency, 'duration': duration}:
+        print(f"Warning: baseline recorded with {baseline['settings']}")
+    regressions = compare_load(report, baseline, tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return not regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('suite', choices=['micro', 'load', 'all'])
+    parser.add_argument('--save', action='store_true', help="Record the results as the new baseline.")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed slowdown as a fraction (0.25 = 25%%).")
+    parser.add_argument('--min-delta', type=float, default=0.25,
+                        help="Micro-benchmarks: slowdowns under this many ms never fail the run.")
+    parser.add_argument('--repeat', type=int, default=3, help="Micro-benchmarks: runs to take the best of.")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--mode', choices=['wsgi', 'asgi'], default='wsgi')
+    args = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+    os.chdir(BASE_DIR)
+    ok = True
+    if args.suite in ('micro', 'all'):
+        ok = run_micro(args.save, args.tolerance, args.min_delta, args.repeat) and ok
+    if args.suite in ('load', 'all'):
+        ok = run_load(args.save, args.tolerance, args.concurrency, args.duration, args.mode) and ok
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
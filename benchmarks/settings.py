@@ -0,0 +1,55 @@
+"""Project settings for benchmarking on a developer machine or CI runner.
+
+Fills in placeholder values for the required environment variables, uses a
+SQLite database (``BENCH_DATABASE=postgres`` keeps the ``DB_*`` Postgres
+settings, e.g. a local container; with ``DB_REPLICA_HOSTS`` each replica is
+another connection to the same SQLite file) and serves static files locally,
+so neither RDS nor S3 is needed. The log sink is off: it would ship to S3.
+
+    DJANGO_SETTINGS_MODULE=benchmarks.settings python manage.py migrate
+"""
+import os
+import tempfile
+
+for name, value in {
+    'SECRET_KEY': 'benchmark-only',
+    'DEBUG': 'False',
+    'ALLOWED_HOSTS': '127.0.0.1,localhost,testserver',
+    'DB_NAME': 'benchmarks',
+    'DB_USERNAME': 'postgres',
+    'DB_PASSWORD': 'postgres',
+    'DB_HOST': '127.0.0.1',
+    'DB_PORT': '5432',
+    'AWS_STORAGE_BUCKET_NAME': 'benchmarks',
+    'AWS_S3_REGION_NAME': 'us-east-1',
+    'LOG_SHIPPING_ENABLED': 'False',
+}.items():
+    os.environ.setdefault(name, value)
+
+from project.settings import *  # noqa: E402,F401,F403
+from project.settings import DATABASE_REPLICAS, DATABASES, HEALTH_CHECKS, STORAGES  # noqa: E402
+
+if os.environ.get('BENCH_DATABASE', 'sqlite') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('BENCH_SQLITE_PATH', os.path.join(tempfile.gettempdir(), 'apprunnertest2-bench.sqlite3')),
+        }
+    }
+    # DB_REPLICA_HOSTS=... routes reads through separate connections to the same file.
+    for alias in DATABASE_REPLICAS:
+        DATABASES[alias] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+
+STORAGES = {
+    **STORAGES,
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+STATIC_URL = '/static/'
+
+# No bucket to probe.
+HEALTH_CHECKS = {name: check for name, check in HEALTH_CHECKS.items() if name != 's3'}
+
+# Every request comes from one address and the load test keeps all threads
+# busy on purpose: measure the stack, not the limits of core.admission.
+ADMISSION_RATE_LIMITS = []
+ADMISSION_MAX_CONCURRENCY = None
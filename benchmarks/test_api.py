@@ -0,0 +1,30 @@
+"""Latency of API list pages as the table grows.
+
+Keyset pagination seeks to the cursor through the primary key index, so the
+first page and a page 80% of the way through should cost about the same,
+whatever the number of rows.
+"""
+import pytest
+from django.contrib.auth.models import User
+from django.test import Client
+
+from core import api
+from core.models import Job
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('depth', ['first', 'deep'])
+@pytest.mark.parametrize('rows', [1_000, 50_000])
+def test_api_page(benchmark, get, rows, depth):
+    Job.objects.bulk_create((Job(task='core.tasks.example', kwargs={'n': i}) for i in range(rows)), batch_size=5_000)
+    client = Client()
+    client.force_login(User.objects.create_user(username='bench', is_staff=True))
+    path = '/core/api/jobs/?fields=id,task,status,run_at&limit=100'
+    if depth == 'deep':
+        listing = api.Listing(api.RESOURCES['jobs'], Job.objects.all(), {'fields': 'id'})
+        path += f'&after={listing.encode_cursor(listing.queryset.values_list(*listing.columns)[rows * 8 // 10])}'
+    benchmark.group = f'api-page-{depth}'
+    get(path, client)
+    response = benchmark(get, path, client)
+    assert response.status_code == 200
+    assert len(response.json()['results']) == 100
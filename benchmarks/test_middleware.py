@@ -0,0 +1,20 @@
+"""Per-request cost of the full vs lean middleware stack for a logged-in user."""
+import pytest
+from django.contrib.auth.models import User
+from django.test import Client
+
+from benchmarks.bench_middleware import FULL_MIDDLEWARE, LEAN_MIDDLEWARE
+
+STACKS = {'full': FULL_MIDDLEWARE, 'lean': LEAN_MIDDLEWARE}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('stack', sorted(STACKS))
+@pytest.mark.parametrize('path', ['/core/hello/', '/core/health/db/'])
+def test_middleware_stack(benchmark, settings, get, stack, path):
+    settings.MIDDLEWARE = STACKS[stack]
+    client = Client()
+    client.force_login(User.objects.create_user(username='bench', password='bench'))
+    get(path, client)
+    response = benchmark(get, path, client)
+    assert response.status_code == 200
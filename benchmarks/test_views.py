@@ -0,0 +1,19 @@
+"""In-process latency of the core endpoints (handler, middleware and view)."""
+import pytest
+
+ENDPOINTS = [
+    ('/core/health/', 200),
+    ('/core/health/live/', 200),
+    ('/core/health/db/', 200),
+    ('/core/hello/', 200),
+    ('/core/home/', 200),
+    ('/', 302),
+]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('path,status', ENDPOINTS, ids=[path for path, _ in ENDPOINTS])
+def test_endpoint(benchmark, get, path, status):
+    get(path)  # Warm up: URL resolution, template loading, page cache.
+    response = benchmark(get, path)
+    assert response.status_code == status
@@ -1,3 +1,18 @@
 from django.contrib import admin
 
+from .models import Job, Upload
 
+
+@admin.register(Upload)
+class UploadAdmin(admin.ModelAdmin):
+    list_display = ('filename', 'owner', 'size', 'status', 'created_at', 'completed_at')
+    list_filter = ('status',)
+    search_fields = ('filename', 'key')
+    readonly_fields = ('id', 'key', 'upload_id', 'etag', 'created_at', 'completed_at')
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('task', 'queue', 'status', 'attempts', 'run_at', 'duration', 'worker')
+    list_filter = ('status', 'queue', 'task')
+    readonly_fields = ('created_at', 'started_at', 'finished_at', 'duration', 'worker', 'last_error')
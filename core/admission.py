@@ -0,0 +1,263 @@
+"""Admission control: per-route concurrency limits and per-client rate limits.
+
+A burst used to queue behind busy Gunicorn threads without limit, so latency
+grew for every request, health probes included, until App Runner recycled a
+healthy instance. ``AdmissionMiddleware`` now answers what a worker cannot
+serve promptly with a fast ``503`` and ``Retry-After``:
+
+- Each request takes a slot of the process-wide ``ADMISSION_MAX_CONCURRENCY``
+  and, if its path matches one, of its ``ADMISSION_CONCURRENCY_LIMITS`` route.
+  A request that cannot get its slots within ``ADMISSION_QUEUE_TIMEOUT``
+  seconds is shed. In WSGI mode the process limit is one less than the
+  Gunicorn threads, so a thread is always free to answer the probes.
+- With an ``X-Request-Start`` header from the proxy (``t=<epoch>`` in seconds,
+  milliseconds or microseconds), a request that already waited more than
+  ``ADMISSION_MAX_QUEUE_SECONDS`` upstream is shed too: its client has most
+  likely given up.
+
+``RateLimitMiddleware`` applies a token bucket per client and
+``ADMISSION_RATE_LIMITS`` route, answering ``429`` with ``Retry-After`` once
+it is empty. Clients are authenticated users, or their IP address as seen by
+the ``ADMISSION_PROXY_HOPS`` trusted proxies in ``X-Forwarded-For``. Buckets
+live in this process, or in the ``ADMISSION_RATE_CACHE`` cache alias to share
+them across workers and instances.
+
+Paths under ``ADMISSION_PRIORITY_PATHS`` (health checks, metrics) are never
+limited. Shed requests are counted in ``admission_shed_total`` and the time
+admitted requests waited in ``admission_queue_seconds``.
+"""
+import asyncio
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from loguru import logger
+
+from .metrics import registry
+
+SHED = registry.counter(
+    'admission_shed_total',
+    'Requests rejected by admission control, by reason: concurrency, queue_time or rate.',
+    ('reason', 'route'))
+QUEUE_TIME = registry.histogram(
+    'admission_queue_seconds',
+    'Time admitted requests waited upstream (X-Request-Start) and for a concurrency slot.',
+    ('route',), buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0))
+IN_FLIGHT = registry.gauge(
+    'admission_in_flight', 'Requests holding a concurrency slot in this process.', ('route',))
+
+TOTAL = 'total'
+POLL_INTERVAL = 0.005
+
+_slots = {}
+_slots_lock = threading.Lock()
+
+
+class Slots:
+    """A concurrency limit within this process that callers may wait on for a while."""
+
+    def __init__(self, route, limit):
+        self.route = route
+        self.limit = limit
+        self.active = 0
+        self._cond = threading.Condition()
+
+    def _take(self):
+        self.active += 1
+        IN_FLIGHT.inc(route=self.route)
+
+    def try_acquire(self):
+        with self._cond:
+            if self.active >= self.limit:
+                return False
+            self._take()
+            return True
+
+    def acquire(self, timeout):
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.active < self.limit, timeout):
+                return False
+            self._take()
+            return True
+
+    async def aacquire(self, timeout):
+        # Threads release slots too, so poll instead of waiting on the loop.
+        deadline = time.monotonic() + timeout
+        while not self.try_acquire():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(POLL_INTERVAL, remaining))
+        return True
+
+    def release(self):
+        with self._cond:
+            self.active -= 1
+            IN_FLIGHT.inc(-1, route=self.route)
+            self._cond.notify()
+
+
+def _get_slots(route, limit):
+    key = (route, limit)
+    slots = _slots.get(key)
+    if slots is None:
+        with _slots_lock:
+            slots = _slots.setdefault(key, Slots(route, limit))
+    return slots
+
+
+def is_priority(request):
+    """Return True if ``request`` targets a path admission control never limits."""
+    return request.path_info.startswith(tuple(getattr(settings, 'ADMISSION_PRIORITY_PATHS', ())))
+
+
+def slots_for(request):
+    """Return the route name and the slots ``request`` must hold, route first."""
+    slots = []
+    route = TOTAL
+    for name, pattern, limit in getattr(settings, 'ADMISSION_CONCURRENCY_LIMITS', ()):
+        if re.search(pattern, request.path_info):
+            route = name
+            slots.append(_get_slots(name, limit))
+            break
+    limit = getattr(settings, 'ADMISSION_MAX_CONCURRENCY', None)
+    if limit:
+        slots.append(_get_slots(TOTAL, limit))
+    return route, slots
+
+
+def upstream_queue_seconds(request):
+    """Return how long ``request`` waited before reaching Django, or ``None`` if unknown."""
+    header = request.headers.get('X-Request-Start', '')
+    try:
+        start = float(header.removeprefix('t='))
+    except ValueError:
+        return None
+    if start > 1e14:
+        start /= 1e6
+    elif start > 1e11:
+        start /= 1e3
+    return max(0.0, time.time() - start)
+
+
+def client_ip(request):
+    """Return the address of the client, skipping ``ADMISSION_PROXY_HOPS`` trusted proxies."""
+    hops = getattr(settings, 'ADMISSION_PROXY_HOPS', 0)
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    if hops and forwarded:
+        # Each proxy appends the address it received the request from, so
+        # only the last ``hops`` entries can be trusted.
+        addresses = [address.strip() for address in forwarded.split(',')]
+        return addresses[-min(hops, len(addresses))]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def client_key(request):
+    """Return the rate limit key of ``request``: its user if signed in, else its address."""
+    # Only look at the user when there is a session to load it from.
+    if settings.SESSION_COOKIE_NAME in request.COOKIES and hasattr(request, 'user'):
+        if request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+    return f'ip:{client_ip(request)}'
+
+
+class LocalBuckets:
+    """Token buckets held in this process.
+
+    Each bucket is stored as the time it will be full again (the GCRA
+    "theoretical arrival time"), so a bucket costs one float and no timer.
+    """
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._tats = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst):
+        """Take a token; return 0 if there was one, else the seconds until there is."""
+        interval = 1.0 / rate
+        now = time.monotonic()
+        with self._lock:
+            tat = max(self._tats.pop(key, now), now) + interval
+            wait = tat - now - burst * interval
+            if wait > 0:
+                tat -= interval
+            self._tats[key] = tat
+            if len(self._tats) > self.max_keys:
+                self._tats.popitem(last=False)
+        return max(wait, 0.0)
+
+    def clear(self):
+        with self._lock:
+            self._tats.clear()
+
+
+class CacheBuckets:
+    """Token buckets in a shared cache, updated with atomic ``incr``/``decr``.
+
+    Times are whole milliseconds since the epoch. A bucket idle long enough
+    to be full is reset with a plain ``set``; two requests racing on that
+    reset may both get a token.
+    """
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    def take(self, key, rate, burst):
+        cache = caches[self.alias]
+        key = f'admission:{key}'
+        interval = max(1, round(1000 / rate))
+        capacity = burst * interval
+        ttl = math.ceil(capacity / 1000) + 60
+        now = int(time.time() * 1000)
+        try:
+            cache.add(key, now, ttl)
+            try:
+                tat = cache.incr(key, interval)
+            except ValueError:
+                # Expired between add() and incr().
+                tat = now
+            if tat - interval < now:
+                tat = now + interval
+                cache.set(key, tat, ttl)
+            wait = tat - now - capacity
+            if wait > 0:
+                cache.decr(key, interval)
+                cache.touch(key, ttl)
+                return wait / 1000
+        except Exception as exc:
+            # An unreachable cache must not take the site down with it.
+            logger.warning(f"Rate limit cache {self.alias!r} unavailable, admitting request: {exc}")
+        return 0.0
+
+
+_local_buckets = LocalBuckets()
+
+
+def get_buckets():
+    alias = getattr(settings, 'ADMISSION_RATE_CACHE', None)
+    return CacheBuckets(alias) if alias else _local_buckets
+
+
+def rate_limit(request):
+    """Take a token for ``request``; return ``(route, seconds to wait)`` if none is left, else ``None``."""
+    for name, pattern, rate, burst in getattr(settings, 'ADMISSION_RATE_LIMITS', ()):
+        if re.search(pattern, request.path_info):
+            wait = get_buckets().take(f'{name}:{client_key(request)}', rate, burst)
+            return (name, wait) if wait > 0 else None
+    return None
+
+
+def reject(status, reason, route, retry_after):
+    """Count a shed request and return the response telling the client when to retry."""
+    SHED.inc(reason=reason, route=route)
+    message = 'Too many requests' if status == 429 else 'Server busy'
+    response = HttpResponse(f'{message}, retry later.\n', status=status, content_type='text/plain; charset=utf-8')
+    response['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    response['Cache-Control'] = 'no-store'
+    return response
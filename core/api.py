@@ -0,0 +1,275 @@
+"""JSON API: generic list and detail endpoints over registered models.
+
+Each ``Resource`` names a model, the fields clients may read, filter and sort
+on, and the queryset a user may see. ``/core/api/<resource>/`` lists it and
+``/core/api/<resource>/<pk>/`` returns one object; both accept:
+
+- ``fields=a,b``: only these columns are selected (``values_list``), not
+  whole model instances.
+- ``order=-created_at``: one of the resource's sort fields, ties broken by
+  primary key.
+- ``limit=n``: page size, ``API_PAGE_SIZE`` by default and at most
+  ``API_MAX_PAGE_SIZE``.
+- ``after=<cursor>``: keyset pagination. A page ends with the cursor of its
+  last row, and the next page continues with ``WHERE (order, pk) > cursor``,
+  an index range scan; an ``OFFSET`` would read and discard every earlier
+  row, so deep pages get slower as the table grows.
+- ``<filter field>=value``: exact matches on the resource's filter fields.
+
+With ``format=ndjson`` (or ``Accept: application/x-ndjson``) the list
+streams every matching row, one JSON object per line, fetched in keyset
+batches of ``API_STREAM_BATCH_SIZE`` so memory stays flat however many rows
+there are. Bodies are encoded with orjson when installed, the stdlib ``json``
+module otherwise.
+"""
+import base64
+import json
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+from .models import Job, Upload
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+NDJSON = 'application/x-ndjson'
+
+
+class ApiError(Exception):
+    """The request cannot be answered; ``status`` is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(data):
+    """Encode ``data`` as compact JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(data, default=_default)
+    return json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':')).encode()
+
+
+class Resource:
+    """A model exposed through the API.
+
+    ``queryset(user)`` returns the rows ``user`` may read, or ``None`` if the
+    user may not use the resource at all.
+    """
+
+    def __init__(self, name, model, fields, queryset, default_fields=None, filters=(), orderings=('pk',),
+                 default_order=None):
+        self.name = name
+        self.model = model
+        self.fields = tuple(fields)
+        self.default_fields = tuple(default_fields or fields)
+        self.filters = tuple(filters)
+        self.orderings = tuple(orderings)
+        self.default_order = default_order or self.orderings[0]
+        self.queryset = queryset
+
+    def field(self, name):
+        return self.model._meta.pk if name == 'pk' else self.model._meta.get_field(name)
+
+
+RESOURCES = {}
+
+
+def register(resource):
+    RESOURCES[resource.name] = resource
+    return resource
+
+
+def get_resource(name, user):
+    """Return the resource called ``name`` and the queryset ``user`` may read."""
+    resource = RESOURCES.get(name)
+    if resource is None:
+        raise ApiError('Not found', 404)
+    queryset = resource.queryset(user)
+    if queryset is None:
+        raise ApiError('Permission denied', 403)
+    return resource, queryset
+
+
+def wants_ndjson(request):
+    return request.GET.get('format') == 'ndjson' or NDJSON in request.headers.get('Accept', '')
+
+
+def _cursor_value(value):
+    # Cursors must round-trip exactly: DjangoJSONEncoder drops microseconds.
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, (int, float, str, type(None))):
+        return value
+    return str(value)
+
+
+def parse_fields(resource, value):
+    if not value:
+        return resource.default_fields
+    fields = tuple(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    unknown = [name for name in fields if name not in resource.fields]
+    if unknown or not fields:
+        raise ApiError(f"Unknown fields: {', '.join(unknown)}; choose from {', '.join(resource.fields)}")
+    return fields
+
+
+class Listing:
+    """One list request: the projected, filtered and ordered rows after a cursor."""
+
+    def __init__(self, resource, queryset, params):
+        self.resource = resource
+        self.fields = parse_fields(resource, params.get('fields'))
+        self.order = params.get('order') or resource.default_order
+        if self.order.lstrip('-') not in resource.orderings:
+            raise ApiError(f"Cannot order by {self.order}; choose from {', '.join(resource.orderings)}")
+        self.descending = self.order.startswith('-')
+        self.sort_field = self.order.lstrip('-')
+        self.limit = self._limit(params.get('limit'))
+        self.after = self.decode_cursor(params['after']) if params.get('after') else None
+
+        filters = {}
+        for name in resource.filters:
+            if name in params:
+                try:
+                    filters[name] = resource.field(name).to_python(params[name])
+                except ValidationError:
+                    raise ApiError(f"Invalid value for {name}")
+        # The sort key and primary key are fetched after the requested
+        # fields, to build the cursor.
+        pk_name = resource.model._meta.pk.name
+        self.columns = self.fields + tuple(
+            name for name in dict.fromkeys((self.sort_field, pk_name)) if name not in self.fields
+        )
+        sign = '-' if self.descending else ''
+        self.queryset = queryset.filter(**filters).order_by(f'{sign}{self.sort_field}', f'{sign}pk')
+
+    def _limit(self, value):
+        if value is None:
+            return getattr(settings, 'API_PAGE_SIZE', 100)
+        try:
+            limit = int(value)
+        except ValueError:
+            raise ApiError("Invalid limit")
+        if not 0 < limit <= getattr(settings, 'API_MAX_PAGE_SIZE', 1000):
+            raise ApiError(f"limit must be between 1 and {getattr(settings, 'API_MAX_PAGE_SIZE', 1000)}")
+        return limit
+
+    def key(self, row):
+        """Return the ``(sort value, pk)`` position of ``row``."""
+        data = dict(zip(self.columns, row))
+        return data[self.sort_field], data[self.resource.model._meta.pk.name]
+
+    def encode_cursor(self, row):
+        key = [_cursor_value(value) for value in self.key(row)]
+        return base64.urlsafe_b64encode(dumps([self.order, *key])).rstrip(b'=').decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            order, value, pk = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            value = self.resource.field(self.sort_field).to_python(value)
+            pk = self.resource.model._meta.pk.to_python(pk)
+        except (ValueError, TypeError, ValidationError):
+            raise ApiError("Invalid cursor")
+        if order != self.order:
+            raise ApiError("Cursor was issued for another order")
+        return value, pk
+
+    def _after(self, after):
+        if after is None:
+            return Q()
+        value, pk = after
+        op = 'lt' if self.descending else 'gt'
+        if self.resource.field(self.sort_field).primary_key:
+            return Q(**{f'pk__{op}': pk})
+        # (sort, pk) > (value, pk0), with a plain range on the sort column
+        # the index can seek to.
+        return Q(**{f'{self.sort_field}__{op}e': value}) & (
+            Q(**{f'{self.sort_field}__{op}': value}) | Q(**{f'pk__{op}': pk}))
+
+    def fetch(self, after, limit):
+        """Return up to ``limit`` rows after ``after`` as ``values_list`` tuples."""
+        return list(self.queryset.filter(self._after(after)).values_list(*self.columns)[:limit])
+
+    def as_dict(self, row):
+        return dict(zip(self.fields, row))
+
+    def page(self):
+        """Return one page of rows and the cursor of the next one (``None`` on the last page)."""
+        rows = self.fetch(self.after, self.limit + 1)
+        cursor = self.encode_cursor(rows[self.limit - 1]) if len(rows) > self.limit else None
+        return [self.as_dict(row) for row in rows[:self.limit]], cursor
+
+    def _encode(self, rows):
+        return b''.join(dumps(self.as_dict(row)) + b'\n' for row in rows)
+
+    def stream(self):
+        """Yield every row after the cursor as NDJSON, one batch per chunk."""
+        batch = getattr(settings, 'API_STREAM_BATCH_SIZE', 1000)
+        after = self.after
+        while True:
+            rows = self.fetch(after, batch)
+            if rows:
+                yield self._encode(rows)
+            if len(rows) < batch:
+                return
+            after = self.key(rows[-1])
+
+    async def astream(self):
+        batch = getattr(settings, 'API_STREAM_BATCH_SIZE', 1000)
+        after = self.after
+        while True:
+            rows = await sync_to_async(self.fetch)(after, batch)
+            if rows:
+                yield self._encode(rows)
+            if len(rows) < batch:
+                return
+            after = self.key(rows[-1])
+
+
+def get_object(resource, queryset, pk, params):
+    """Return the projected object ``pk``, or raise a 404 ``ApiError``."""
+    fields = parse_fields(resource, params.get('fields'))
+    try:
+        row = queryset.filter(pk=pk).values_list(*fields).first()
+    except (ValueError, ValidationError):
+        row = None
+    if row is None:
+        raise ApiError('Not found', 404)
+    return dict(zip(fields, row))
+
+
+register(Resource(
+    'jobs', Job,
+    fields=('id', 'task', 'kwargs', 'queue', 'priority', 'status', 'attempts', 'max_attempts', 'run_at',
+            'created_at', 'started_at', 'finished_at', 'duration', 'worker', 'last_error'),
+    default_fields=('id', 'task', 'queue', 'priority', 'status', 'attempts', 'run_at', 'finished_at'),
+    filters=('task', 'queue', 'status'),
+    orderings=('id',),
+    default_order='-id',
+    # Job arguments and errors are operational data: staff only.
+    queryset=lambda user: Job.objects.all() if user.is_staff else None,
+))
+
+register(Resource(
+    'uploads', Upload,
+    fields=('id', 'key', 'filename', 'content_type', 'size', 'part_size', 'status', 'etag', 'created_at',
+            'completed_at'),
+    filters=('status',),
+    orderings=('created_at',),
+    default_order='-created_at',
+    queryset=lambda user: Upload.objects.filter(owner=user),
+))
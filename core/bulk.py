@@ -0,0 +1,400 @@
+"""Bulk import and export of model rows as CSV or JSON Lines.
+
+On PostgreSQL rows are streamed with ``COPY``: an export is one
+``COPY (SELECT ...) TO STDOUT`` written out as the server sends it; an import
+parses the file and feeds ``batch_size`` rows to one ``COPY ... FROM STDIN``
+per transaction, so a failure keeps the batches already committed. Other
+databases (SQLite in local tests) go through ``values_list().iterator()`` and
+``bulk_create()`` with the same batching. Memory stays constant either way.
+
+Files are local paths, ``-`` for stdin/stdout, or ``storage:<name>`` for an
+object in the default storage, read with a streamed ``GetObject`` and written
+with a multipart upload. A ``.gz`` suffix adds gzip compression.
+
+Columns are the fields' database columns (``owner_id`` for a foreign key).
+CSV files start with a header row; since CSV cannot tell an empty string from
+a missing value, empty values are imported as NULL in nullable fields.
+"""
+import csv
+import gzip
+import io
+import json
+import mimetypes
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.files.storage import storages
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, models, router, transaction
+
+from .uploads import MIN_PART_SIZE
+
+STORAGE_PREFIX = 'storage:'
+FORMATS = ('csv', 'jsonl')
+READ_BLOCK = 1024 * 1024
+
+
+class BulkError(Exception):
+    """The file or the requested columns do not fit the model."""
+
+
+def detect_format(path, fmt=None):
+    """``fmt``, or the format implied by ``path``'s extension (``.gz`` aside)."""
+    if fmt:
+        return fmt
+    name = path[:-3] if path.endswith('.gz') else path
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    raise BulkError(f"Cannot tell the format of {path!r}; pass --format")
+
+
+def resolve_fields(model, names=None):
+    """Concrete fields of ``model`` matching ``names`` (field names or columns), all by default."""
+    fields = [field for field in model._meta.concrete_fields]
+    if not names:
+        return fields
+    by_name = {}
+    for field in fields:
+        by_name.update({field.name: field, field.attname: field, field.column: field})
+    unknown = [name for name in names if name not in by_name]
+    if unknown:
+        raise BulkError(f"{model._meta.label} has no field {', '.join(unknown)}")
+    return [by_name[name] for name in names]
+
+
+class Progress:
+    """Count rows and report the total and rate every ``interval`` seconds."""
+
+    def __init__(self, report=None, interval=2.0):
+        self.report = report
+        self.interval = interval
+        self.rows = 0
+        self.started = self._reported = time.monotonic()
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @property
+    def rate(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def add(self, rows):
+        self.rows += rows
+        if self.report is not None and time.monotonic() - self._reported >= self.interval:
+            self._reported = time.monotonic()
+            self.report(self)
+
+    def __str__(self):
+        return f"{self.rows} rows in {self.elapsed:.1f}s ({self.rate:.0f} rows/s)"
+
+
+# Streams ------------------------------------------------------------------
+
+class _S3Body(io.RawIOBase):
+    """File-like view of a ``GetObject`` body, read as it downloads."""
+
+    def __init__(self, body):
+        self.body = body
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.body.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            self.body.close()
+        super().close()
+
+
+class S3Writer(io.RawIOBase):
+    """Write an S3 object as a multipart upload, holding one part in memory.
+
+    Objects smaller than a part are sent with a single ``PutObject``. Call
+    ``abort()`` instead of ``close()`` to discard what was uploaded.
+    """
+
+    def __init__(self, client, bucket, key, part_size=None, **params):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = max(part_size or getattr(settings, 'BULK_S3_PART_SIZE', 8 * 1024 * 1024), MIN_PART_SIZE)
+        self.params = params
+        self.upload_id = None
+        self.parts = []
+        self._buffer = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._buffer += data
+        while len(self._buffer) >= self.part_size:
+            self._upload_part(bytes(self._buffer[:self.part_size]))
+            del self._buffer[:self.part_size]
+        return len(data)
+
+    def _upload_part(self, data):
+        if self.upload_id is None:
+            self.upload_id = self.client.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key, **self.params)['UploadId']
+        number = len(self.parts) + 1
+        response = self.client.upload_part(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id, PartNumber=number, Body=data)
+        self.parts.append({'PartNumber': number, 'ETag': response['ETag']})
+
+    def close(self):
+        if self.closed:
+            return
+        if self.upload_id is None:
+            self.client.put_object(Bucket=self.bucket, Key=self.key, Body=bytes(self._buffer), **self.params)
+        else:
+            if self._buffer:
+                self._upload_part(bytes(self._buffer))
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket, Key=self.key, UploadId=self.upload_id, MultipartUpload={'Parts': self.parts})
+        self._buffer = bytearray()
+        super().close()
+
+    def abort(self):
+        if self.upload_id is not None:
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+        self._buffer = bytearray()
+        super().close()
+
+
+def _storage_target(path):
+    storage = storages['default']
+    name = path[len(STORAGE_PREFIX):]
+    return storage, storage.connection.meta.client, storage.object_key(name), name
+
+
+@contextmanager
+def open_source(path):
+    """Yield a binary stream reading ``path``."""
+    if path == '-':
+        raw, close = sys.stdin.buffer, False
+    elif path.startswith(STORAGE_PREFIX):
+        storage, client, key, _ = _storage_target(path)
+        body = client.get_object(Bucket=storage.bucket_name, Key=key)['Body']
+        raw, close = io.BufferedReader(_S3Body(body), READ_BLOCK), True
+    else:
+        raw, close = open(path, 'rb'), True
+    try:
+        if path.endswith('.gz'):
+            with gzip.GzipFile(fileobj=raw, mode='rb') as stream:
+                yield stream
+        else:
+            yield raw
+    finally:
+        if close:
+            raw.close()
+
+
+@contextmanager
+def open_destination(path):
+    """Yield a binary stream writing ``path``; nothing is kept if the block raises."""
+    if path == '-':
+        raw = sys.stdout.buffer
+    elif path.startswith(STORAGE_PREFIX):
+        storage, client, key, name = _storage_target(path)
+        content_type, encoding = mimetypes.guess_type(name)
+        params = {
+            **{k: v for k, v in storage.object_parameters.items() if k != 'ContentType'},
+            'ContentType': 'application/gzip' if encoding == 'gzip' else content_type or 'application/octet-stream',
+        }
+        raw = S3Writer(client, storage.bucket_name, key, **params)
+    else:
+        raw = open(path, 'wb')
+    try:
+        if path.endswith('.gz'):
+            with gzip.GzipFile(fileobj=raw, mode='wb') as stream:
+                yield stream
+        else:
+            yield raw
+        raw.flush()
+    except BaseException:
+        if isinstance(raw, S3Writer):
+            raw.abort()
+        elif raw is not sys.stdout.buffer:
+            raw.close()
+            os.remove(path)
+        raise
+    finally:
+        if raw is not sys.stdout.buffer:
+            raw.close()
+
+
+def _text(stream):
+    # Text view over a binary stream we do not own: detached, never closed.
+    return io.TextIOWrapper(stream, encoding='utf-8', newline='', write_through=True)
+
+
+# Export -------------------------------------------------------------------
+
+def _uses_copy(alias):
+    return connections[alias].vendor == 'postgresql'
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+
+def export_rows(queryset, stream, fmt, fields=None, progress=None):
+    """Write ``queryset``'s rows to the binary ``stream``; returns the number of rows."""
+    fields = resolve_fields(queryset.model, fields)
+    columns = [field.column for field in fields]
+    queryset = queryset.order_by(*(queryset.query.order_by or ['pk'])).values_list(*[f.attname for f in fields])
+    progress = progress or Progress()
+    if _uses_copy(queryset.db):
+        _copy_out(queryset, stream, fmt, progress)
+    else:
+        _orm_out(queryset, stream, fmt, columns, progress)
+    return progress.rows
+
+
+def _copy_out(queryset, stream, fmt, progress):
+    sql, params = queryset.query.sql_with_params()
+    if fmt == 'csv':
+        query = f"COPY ({sql}) TO STDOUT (FORMAT csv, HEADER)"
+    else:
+        # The subquery's output columns are the field columns, hence the keys.
+        # CSV with quote and delimiter characters JSON never contains: lines
+        # come out exactly as row_to_json wrote them.
+        query = (
+            f'COPY (SELECT row_to_json("_r")::text FROM ({sql}) AS "_r") '
+            f"TO STDOUT (FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02')"
+        )
+    header = fmt == 'csv'
+    with connections[queryset.db].cursor() as cursor:
+        with cursor.cursor.copy(query, params) as copy:
+            for data in copy:
+                stream.write(data)
+                # Counts lines: a CSV value with line breaks counts extra.
+                lines = bytes(data).count(b'\n')
+                if header and lines:
+                    lines, header = lines - 1, False
+                progress.add(lines)
+
+
+def _orm_out(queryset, stream, fmt, columns, progress):
+    text = _text(stream)
+    batch = getattr(settings, 'BULK_BATCH_SIZE', 10_000)
+    if fmt == 'csv':
+        writer = csv.writer(text, lineterminator='\n')
+        writer.writerow(columns)
+        for row in queryset.iterator(chunk_size=batch):
+            writer.writerow([_csv_value(value) for value in row])
+            progress.add(1)
+    else:
+        for row in queryset.iterator(chunk_size=batch):
+            text.write(json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder) + '\n')
+            progress.add(1)
+    text.detach()
+
+
+# Import -------------------------------------------------------------------
+
+def _read_rows(stream, fmt, model, fields):
+    """Yield the fields named by the header (or ``fields``), then each row's values in that order."""
+    text = _text(stream)
+    if fmt == 'csv':
+        reader = csv.reader(text)
+        header = next(reader, None)
+        if header is None:
+            return
+        fields = resolve_fields(model, fields or header)
+        if len(fields) != len(header):
+            raise BulkError("--fields must name every column of the CSV header")
+        yield fields
+        for row in reader:
+            yield [None if value == '' and field.null else value for field, value in zip(fields, row)]
+        return
+    first = True
+    for line in text:
+        if not line.strip():
+            continue
+        data = json.loads(line)
+        if first:
+            fields = resolve_fields(model, fields or list(data))
+            keys = [next((k for k in (f.column, f.attname, f.name) if k in data), f.column) for f in fields]
+            yield fields
+            first = False
+        yield [data.get(key) for key in keys]
+
+
+def import_rows(model, stream, fmt, fields=None, batch_size=None, progress=None, using=None):
+    """Insert the rows read from the binary ``stream`` into ``model``; returns the number of rows.
+
+    Every ``batch_size`` rows are committed in their own transaction.
+    """
+    using = using or router.db_for_write(model)
+    batch_size = batch_size or getattr(settings, 'BULK_BATCH_SIZE', 10_000)
+    progress = progress or Progress()
+    rows = _read_rows(stream, fmt, model, fields)
+    fields = next(rows, None)
+    if fields is None:
+        return 0
+    insert = _copy_batch if _uses_copy(using) else _orm_batch
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            insert(model, fields, batch, using)
+            progress.add(len(batch))
+            batch = []
+    if batch:
+        insert(model, fields, batch, using)
+        progress.add(len(batch))
+    if _uses_copy(using) and any(field.primary_key for field in fields):
+        # Rows came with their ids: move the sequence past them.
+        connection = connections[using]
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [model]):
+                cursor.execute(sql)
+    return progress.rows
+
+
+def _copy_value(value):
+    return json.dumps(value) if isinstance(value, (dict, list)) else value
+
+
+def _copy_batch(model, fields, rows, using):
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    query = f"COPY {quote(model._meta.db_table)} ({', '.join(quote(f.column) for f in fields)}) FROM STDIN"
+    with transaction.atomic(using=using):
+        with connection.cursor() as cursor:
+            with cursor.cursor.copy(query) as copy:
+                for row in rows:
+                    copy.write_row([_copy_value(value) for value in row])
+
+
+def _python_value(field, value):
+    if value is None:
+        return None
+    if isinstance(field, models.JSONField):
+        return json.loads(value) if isinstance(value, str) else value
+    return field.to_python(value)
+
+
+def _orm_batch(model, fields, rows, using):
+    objects = [model(**{f.attname: _python_value(f, v) for f, v in zip(fields, row)}) for row in rows]
+    with transaction.atomic(using=using):
+        model._default_manager.db_manager(using).bulk_create(objects, batch_size=len(objects))
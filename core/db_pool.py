@@ -0,0 +1,39 @@
+"""Helpers for the psycopg connection pool configured in ``DATABASES``.
+
+Django (>= 5.1) owns the pool when ``OPTIONS['pool']`` is set and, with
+``CONN_HEALTH_CHECKS``, pings each connection on checkout. This module only
+summarizes the pool statistics for health endpoints and metrics.
+"""
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+def get_pool(alias=DEFAULT_DB_ALIAS):
+    """Return the psycopg pool for ``alias``, or ``None`` if pooling is disabled."""
+    return getattr(connections[alias], 'pool', None)
+
+
+def pool_status(alias=DEFAULT_DB_ALIAS):
+    """Summarize the pool state for ``alias``, or return ``None`` without a pool.
+
+    Counters are cumulative for the current process; ``exhausted`` counts the
+    checkouts that timed out waiting for a free connection.
+    """
+    pool = get_pool(alias)
+    if pool is None:
+        return None
+    stats = pool.get_stats()
+    checkouts = stats.get('requests_num', 0)
+    wait_ms = stats.get('requests_wait_ms', 0)
+    return {
+        'open': not pool.closed,
+        'size': stats.get('pool_size', 0),
+        'available': stats.get('pool_available', 0),
+        'min_size': stats.get('pool_min', pool.min_size),
+        'max_size': stats.get('pool_max', pool.max_size),
+        'waiting': stats.get('requests_waiting', 0),
+        'checkouts': checkouts,
+        'queued_checkouts': stats.get('requests_queued', 0),
+        'avg_wait_ms': round(wait_ms / checkouts, 3) if checkouts else 0.0,
+        'exhausted': stats.get('requests_errors', 0),
+        'connections_lost': stats.get('connections_lost', 0),
+    }
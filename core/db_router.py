@@ -0,0 +1,176 @@
+"""Read-replica routing.
+
+With ``DB_REPLICA_HOSTS`` set, ``project.settings`` adds one ``replica<N>``
+alias per host to ``DATABASES``, lists them in ``DATABASE_REPLICAS`` and
+installs ``ReplicaRouter``. Reads go to the replicas in turn; writes, and every
+query inside ``transaction.atomic()`` on the primary, go to ``default``.
+
+Replication is asynchronous, so a read can miss a write made just before:
+
+- ``ReplicaPinMiddleware`` sends every read of a request to the primary once
+  the request has written (and for the whole of POST, PUT, PATCH and DELETE
+  requests), and sets a short-lived cookie so the same client keeps reading
+  from the primary for ``DB_PIN_SECONDS`` after a write.
+- Models in ``DB_PRIMARY_MODELS`` (sessions: a session created by one
+  request is read by the next) are always read from the primary.
+- Outside requests (workers, commands), wrap read-after-write code in
+  ``with use_primary():``.
+
+Each replica's lag is measured at most every ``DB_REPLICA_CHECK_INTERVAL``
+seconds by the request that finds it out of date. Replica aliases give up on
+connecting (or on waiting for a pooled connection) after
+``DB_REPLICA_CONNECT_TIMEOUT`` seconds, so an unreachable replica holds that
+request only briefly. A replica lagging more than ``DB_REPLICA_MAX_LAG``
+seconds, or failing the check, is skipped until the next check; with no
+usable replica, reads fall back to the primary.
+"""
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from loguru import logger
+
+# Postgres standby: seconds behind the primary, 0 once everything received is
+# replayed (an idle primary would otherwise look like growing lag).
+LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+_pin = ContextVar('db_pin', default=None)
+
+
+class Pin:
+    """Whether the current request or block must read from the primary."""
+
+    def __init__(self, primary=False):
+        self.primary = primary
+        self.wrote = False
+
+
+def measure_lag(alias):
+    """Replication lag of ``alias`` in seconds (0 for backends without replication)."""
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return 0.0
+    with connection.cursor() as cursor:
+        cursor.execute(LAG_SQL)
+        return float(cursor.fetchone()[0])
+
+
+class ReplicaMonitor:
+    """Round-robin over the replicas whose last lag check passed."""
+
+    def __init__(self, measure=measure_lag):
+        self.measure = measure
+        self._states = {}
+        self._lock = threading.Lock()
+        self._counter = itertools.count()
+
+    def _state(self, alias):
+        state = self._states.get(alias)
+        if state is None:
+            state = self._states.setdefault(
+                alias, {'lag': None, 'error': None, 'checked_at': None, 'lock': threading.Lock()})
+        return state
+
+    def usable(self, alias):
+        state = self._state(alias)
+        interval = getattr(settings, 'DB_REPLICA_CHECK_INTERVAL', 5.0)
+        checked_at = state['checked_at']
+        # One thread refreshes an out-of-date state; the others use the last one.
+        if (checked_at is None or time.monotonic() - checked_at >= interval) and state['lock'].acquire(blocking=False):
+            try:
+                self.check(alias)
+            finally:
+                state['lock'].release()
+        return state['error'] is None and state['lag'] is not None and (
+            state['lag'] <= getattr(settings, 'DB_REPLICA_MAX_LAG', 5.0))
+
+    def check(self, alias):
+        state = self._state(alias)
+        try:
+            lag, error = self.measure(alias), None
+        except Exception as e:
+            lag, error = None, f"{type(e).__name__}: {e}"
+            logger.warning(f"Replica {alias} unavailable, reading from the primary: {error}")
+        state.update(lag=lag, error=error, checked_at=time.monotonic())
+
+    def choose(self, replicas):
+        """The next usable replica alias, or None."""
+        if not replicas:
+            return None
+        with self._lock:
+            start = next(self._counter)
+        for offset in range(len(replicas)):
+            alias = replicas[(start + offset) % len(replicas)]
+            if self.usable(alias):
+                return alias
+        return None
+
+    def status(self):
+        """``{alias: {'lag', 'error'}}`` as of the last check of each replica."""
+        return {
+            alias: {'lag': state['lag'], 'error': state['error']}
+            for alias, state in self._states.items()
+        }
+
+
+monitor = ReplicaMonitor()
+
+
+def replicas():
+    return tuple(getattr(settings, 'DATABASE_REPLICAS', ()))
+
+
+def begin(pin):
+    return _pin.set(pin)
+
+
+def end(token):
+    _pin.reset(token)
+
+
+@contextmanager
+def use_primary():
+    """Send every read in the block to the primary."""
+    token = begin(Pin(primary=True))
+    try:
+        yield
+    finally:
+        end(token)
+
+
+class ReplicaRouter:
+    """Reads to ``DATABASE_REPLICAS``, everything else to ``default``."""
+
+    def db_for_read(self, model, **hints):
+        if model._meta.label_lower in getattr(settings, 'DB_PRIMARY_MODELS', ()):
+            return DEFAULT_DB_ALIAS
+        pin = _pin.get()
+        if pin is not None and (pin.primary or pin.wrote):
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            # The transaction may hold writes the replicas cannot see yet.
+            return DEFAULT_DB_ALIAS
+        return monitor.choose(replicas()) or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        pin = _pin.get()
+        if pin is not None:
+            pin.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,165 @@
+"""Background dependency prober backing the readiness endpoint.
+
+App Runner and external monitors poll health endpoints constantly. Instead of
+touching the database, S3 and the cache on every hit, each process runs the
+checks in a daemon thread every ``HEALTH_PROBE_INTERVAL`` seconds and the
+readiness view only serializes the last snapshot.
+"""
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import close_old_connections, connection
+from django.utils.module_loading import import_string
+from loguru import logger
+
+from .db_pool import get_pool
+from .s3 import get_s3_client
+
+DEFAULT_CHECKS = {
+    'database': 'core.health.check_database',
+    's3': 'core.health.check_s3',
+    'cache': 'core.health.check_cache',
+}
+
+
+def check_database():
+    close_old_connections()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+    finally:
+        if get_pool() is not None:
+            # Hand the connection back instead of pinning one per prober thread.
+            connection.close()
+
+
+def check_s3():
+    get_s3_client().head_bucket(Bucket=settings.AWS_STORAGE_BUCKET_NAME)
+
+
+def check_cache():
+    cache = caches['default']
+    cache.set('health:probe', 1, timeout=60)
+    if cache.get('health:probe') != 1:
+        raise RuntimeError("Cache read-back mismatch")
+
+
+def _utc_iso(timestamp):
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+class HealthProber:
+    """Run dependency checks periodically and keep the latest results.
+
+    ``checks`` maps a dependency name to a callable that raises on failure.
+    A snapshot older than ``stale_after`` seconds is reported as failing, so a
+    dead prober thread cannot keep an instance marked as ready.
+    """
+
+    def __init__(self, checks, interval=10.0, stale_after=None):
+        self.checks = checks
+        self.interval = interval
+        self.stale_after = stale_after if stale_after is not None else interval * 3
+        self._results = {name: {'status': 'unknown', 'latency_ms': None, 'last_success': None,
+                                'last_failure': None, 'error': None} for name in checks}
+        self._checked_at = None
+        self._lock = threading.Lock()
+        self._pid = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """Start the probing thread once per process (again after a fork)."""
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='health-prober', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def run_once(self):
+        """Run every check now and store the results."""
+        for name, check in self.checks.items():
+            started = time.perf_counter()
+            try:
+                check()
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            else:
+                error = None
+            latency_ms = round((time.perf_counter() - started) * 1000, 3)
+            now = time.time()
+            with self._lock:
+                result = self._results[name]
+                result['latency_ms'] = latency_ms
+                result['error'] = error
+                if error is None:
+                    result['status'] = 'ok'
+                    result['last_success'] = now
+                else:
+                    result['status'] = 'error'
+                    result['last_failure'] = now
+            if error is not None:
+                logger.warning(f"Health check '{name}' failed: {error}")
+        with self._lock:
+            self._checked_at = time.time()
+
+    def snapshot(self):
+        """Return the cached readiness report; never runs a check."""
+        with self._lock:
+            checked_at = self._checked_at
+            checks = {
+                name: {
+                    **result,
+                    'last_success': _utc_iso(result['last_success']),
+                    'last_failure': _utc_iso(result['last_failure']),
+                }
+                for name, result in self._results.items()
+            }
+        if checked_at is None:
+            status = 'starting'
+        elif time.time() - checked_at > self.stale_after:
+            status = 'stale'
+        elif all(check['status'] == 'ok' for check in checks.values()):
+            status = 'ok'
+        else:
+            status = 'error'
+        return {'status': status, 'checked_at': _utc_iso(checked_at), 'checks': checks}
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.exception(f"Health prober iteration failed: {e}")
+            self._stop.wait(self.interval)
+
+
+_prober = None
+_prober_lock = threading.Lock()
+
+
+def get_prober():
+    """Return the process-wide prober built from ``HEALTH_CHECKS`` settings."""
+    global _prober
+    if _prober is None:
+        with _prober_lock:
+            if _prober is None:
+                checks = getattr(settings, 'HEALTH_CHECKS', DEFAULT_CHECKS)
+                _prober = HealthProber(
+                    {name: import_string(path) for name, path in checks.items()},
+                    interval=getattr(settings, 'HEALTH_PROBE_INTERVAL', 10.0),
+                )
+    return _prober
@@ -0,0 +1,238 @@
+"""Image variants: resized and converted copies of media images.
+
+``/core/images/<name>?w=640&fmt=webp`` answers with a redirect to a copy of
+the media image ``<name>`` at most ``w`` pixels wide, encoded as ``fmt``:
+
+- Widths are rounded up to the next of ``IMAGE_WIDTHS``, so a handful of
+  variants per image covers every layout. ``fmt`` is one of
+  ``IMAGE_FORMATS``; without it the first one the ``Accept`` header allows
+  is used (AVIF, then WebP, then JPEG).
+- Variants are stored in the default storage under ``IMAGE_VARIANT_PREFIX``
+  with a name derived from the source, its ETag and the encoding options,
+  and uploaded with ``Cache-Control: immutable``. CloudFront must serve that
+  prefix without signed URLs, like ``static/``.
+- ``ImageVariant`` rows index the variants. A missing one is generated once:
+  concurrent requests for it, in this and other processes, wait for the first
+  (see ``core.tiered_cache``; ``TIERED_CACHE_OPTIONS['images']`` makes them
+  wait longer than ``IMAGE_RENDER_TIMEOUT``), and lookups are served from the
+  tiered cache.
+- Decoding, resizing and encoding run in a pool of ``IMAGE_PROCESS_WORKERS``
+  processes (``core.imaging``), off the request threads and the GIL.
+
+``precompute()`` (the ``precompute_image_variants`` task) generates the
+``IMAGE_PRECOMPUTE_WIDTHS`` variants of a new image in one pass. When an image
+is replaced, call ``invalidate()``: variants of the old version stay in S3
+under their own names until a lifecycle rule removes them.
+"""
+import hashlib
+import multiprocessing
+import posixpath
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.files.storage import storages
+from loguru import logger
+
+from . import imaging
+from .metrics import registry
+from .models import ImageVariant
+from .storage import IMMUTABLE_CACHE_CONTROL
+from .tiered_cache import get_cache
+
+IMAGE_RENDERS = registry.histogram(
+    'image_render_seconds', 'Time spent generating image variants of one source.', ('outcome',))
+
+# Bumped when rendering changes, so new variants get new names.
+RENDER_VERSION = 1
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class ImageError(Exception):
+    """The source is not an image this pipeline can process."""
+
+
+class SourceNotFound(ImageError):
+    """The source image does not exist."""
+
+
+def get_pool():
+    """The process pool running ``core.imaging``, created on first use in each worker."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawn, not fork: Gunicorn workers run threads, and forking one
+            # can copy a lock another thread holds.
+            _pool = ProcessPoolExecutor(
+                max_workers=getattr(settings, 'IMAGE_PROCESS_WORKERS', 2),
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def choose_width(requested):
+    """Return the smallest of ``IMAGE_WIDTHS`` at least ``requested``, or the largest."""
+    widths = sorted(getattr(settings, 'IMAGE_WIDTHS', (320, 640, 960, 1280, 1920)))
+    if requested is None:
+        return widths[-1]
+    return next((width for width in widths if width >= requested), widths[-1])
+
+
+def choose_format(requested, accept):
+    """Return ``requested`` if allowed, else the first of ``IMAGE_FORMATS`` the ``Accept`` header lists.
+
+    JPEG, or the last allowed format, is the fallback every client decodes.
+    """
+    formats = tuple(getattr(settings, 'IMAGE_FORMATS', ('avif', 'webp', 'jpeg')))
+    if requested:
+        if requested not in formats:
+            raise ImageError(f"Unsupported format {requested}; choose from {', '.join(formats)}")
+        return requested
+    for fmt in formats:
+        if imaging.CONTENT_TYPES[fmt] in (accept or ''):
+            return fmt
+    return 'jpeg' if 'jpeg' in formats else formats[-1]
+
+
+def _quality(fmt):
+    return getattr(settings, 'IMAGE_QUALITY', {}).get(fmt, 80)
+
+
+def variant_name(source, etag, width, fmt):
+    """Return the storage name of a variant; it changes with the source's ETag and the encoding."""
+    digest = hashlib.blake2b(
+        f'{source}\0{etag}\0{width}\0{fmt}\0{_quality(fmt)}\0{RENDER_VERSION}'.encode(), digest_size=10,
+    ).hexdigest()
+    stem = posixpath.splitext(posixpath.basename(source))[0]
+    return f"{getattr(settings, 'IMAGE_VARIANT_PREFIX', 'variants')}/{digest}/{stem}-{width}w.{fmt}"
+
+
+def _fetch_source(storage, source):
+    from botocore.exceptions import ClientError
+    client = storage.connection.meta.client
+    try:
+        obj = client.get_object(Bucket=storage.bucket_name, Key=storage.object_key(source))
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404', 'NotFound'):
+            raise SourceNotFound(f"{source} not found")
+        raise
+    body = obj['Body']
+    try:
+        max_bytes = getattr(settings, 'IMAGE_MAX_SOURCE_BYTES', 25 * 1024 * 1024)
+        if obj['ContentLength'] > max_bytes:
+            raise ImageError(f"{source} is larger than {max_bytes} bytes")
+        return body.read(), obj['ETag']
+    finally:
+        body.close()
+
+
+def _render(data, specs):
+    timeout = getattr(settings, 'IMAGE_RENDER_TIMEOUT', 30)
+    try:
+        future = get_pool().submit(imaging.render, data, specs, getattr(settings, 'IMAGE_MAX_PIXELS', 50_000_000))
+        return future.result(timeout=timeout)
+    except TimeoutError:
+        # Drops it if still queued; a render already running finishes in its worker.
+        future.cancel()
+        raise ImageError(f"Image took longer than {timeout}s to process")
+    except BrokenProcessPool:
+        # A worker died (out of memory on a huge image, usually); start over next time.
+        _reset_pool()
+        raise ImageError("Image worker crashed")
+    except ValueError as e:
+        raise ImageError(str(e))
+
+
+def generate(source, variants):
+    """Generate the ``(width, format)`` variants of ``source`` in one pass and return their ``ImageVariant`` rows."""
+    storage = storages['default']
+    data, etag = _fetch_source(storage, source)
+    started = time.perf_counter()
+    try:
+        rendered = _render(data, [(width, fmt, _quality(fmt)) for width, fmt in variants])
+    except ImageError:
+        IMAGE_RENDERS.observe(time.perf_counter() - started, outcome='error')
+        raise
+    IMAGE_RENDERS.observe(time.perf_counter() - started, outcome='ok')
+
+    client = storage.connection.meta.client
+    parameters = {k: v for k, v in storage.object_parameters.items() if k not in ('CacheControl', 'ContentType')}
+    rows = []
+    for (width, fmt), (body, image_width, image_height) in zip(variants, rendered):
+        name = variant_name(source, etag, width, fmt)
+        client.put_object(
+            Bucket=storage.bucket_name, Key=storage.object_key(name), Body=body,
+            ContentType=imaging.CONTENT_TYPES[fmt], CacheControl=IMMUTABLE_CACHE_CONTROL, **parameters,
+        )
+        row, _ = ImageVariant.objects.update_or_create(
+            source=source, width=width, format=fmt,
+            defaults={'source_etag': etag, 'name': name, 'size': len(body),
+                      'image_width': image_width, 'image_height': image_height},
+        )
+        rows.append(row)
+    logger.info(f"Generated {len(rows)} variants of {source} in {time.perf_counter() - started:.2f}s")
+    return rows
+
+
+def _cache_key(source, width, fmt):
+    digest = hashlib.blake2b(f'{source}\0{width}\0{fmt}'.encode(), digest_size=16).hexdigest()
+    return f'image-variant:{digest}'
+
+
+def get_variant(source, width, fmt):
+    """Return the storage name of a variant of ``source``, generating it on first use."""
+    def lookup():
+        name = ImageVariant.objects.filter(source=source, width=width, format=fmt).values_list('name', flat=True).first()
+        return name or generate(source, [(width, fmt)])[0].name
+
+    return get_cache('images').get_or_set(
+        _cache_key(source, width, fmt), lookup, timeout=getattr(settings, 'IMAGE_INDEX_CACHE_TIMEOUT', 3600))
+
+
+def precompute(source, widths=None, formats=None):
+    """Generate the variants of ``source`` that are missing or made from an older version of it."""
+    widths = widths or getattr(settings, 'IMAGE_PRECOMPUTE_WIDTHS', (320, 960))
+    formats = formats or getattr(settings, 'IMAGE_FORMATS', ('avif', 'webp', 'jpeg'))
+    storage = storages['default']
+    etag = storage.connection.meta.client.head_object(
+        Bucket=storage.bucket_name, Key=storage.object_key(source))['ETag']
+    current = set(ImageVariant.objects.filter(source=source, source_etag=etag).values_list('width', 'format'))
+    missing = [(width, fmt) for width in widths for fmt in formats if (width, fmt) not in current]
+    if missing:
+        generate(source, missing)
+        cache = get_cache('images')
+        for width, fmt in missing:
+            cache.delete(_cache_key(source, width, fmt))
+    return missing
+
+
+def invalidate(source):
+    """Forget the variants of ``source`` after it was replaced; they are generated again on demand."""
+    cache = get_cache('images')
+    for width, fmt in ImageVariant.objects.filter(source=source).values_list('width', 'format'):
+        cache.delete(_cache_key(source, width, fmt))
+    ImageVariant.objects.filter(source=source).delete()
+
+
+def variant_url(name):
+    """Return the URL of variant ``name`` and whether it is permanent.
+
+    With a CloudFront domain and no signing key it is the plain CDN URL, which
+    never changes; otherwise a signed URL valid for ``MEDIA_URL_EXPIRY``.
+    """
+    storage = storages['default']
+    if storage.custom_domain and not storage.cloudfront_signer:
+        return storage.url(name), True
+    return storage.signed_url(name, getattr(settings, 'MEDIA_URL_EXPIRY', 300)), False
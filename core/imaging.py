@@ -0,0 +1,69 @@
+"""Image resizing and encoding, run in the worker processes of ``core.images``.
+
+Imports nothing from Django, so a spawned worker starts without setting up
+the project.
+"""
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+ORIENTATION = 0x0112
+
+CONTENT_TYPES = {
+    'avif': 'image/avif',
+    'webp': 'image/webp',
+    'jpeg': 'image/jpeg',
+    'png': 'image/png',
+}
+
+
+def _encode(image, fmt, quality):
+    if fmt == 'jpeg' and image.mode not in ('RGB', 'L'):
+        # No alpha in JPEG: flatten onto white.
+        flat = Image.new('RGB', image.size, (255, 255, 255))
+        flat.paste(image, mask=image.getchannel('A') if 'A' in image.getbands() else None)
+        image = flat
+    options = {'quality': quality}
+    if fmt == 'jpeg':
+        options.update(optimize=True, progressive=True)
+    elif fmt == 'webp':
+        options['method'] = 4
+    elif fmt == 'avif':
+        options['speed'] = 6
+    out = BytesIO()
+    # Metadata (EXIF, GPS) is left out; orientation was applied above.
+    image.save(out, format=fmt.upper(), **options)
+    return out.getvalue()
+
+
+def render(data, specs, max_pixels):
+    """Decode ``data`` once and return ``(bytes, width, height)`` for each ``(width, format, quality)`` spec.
+
+    Images are never enlarged: widths above the original keep its size.
+    Raises ``ValueError`` if ``data`` is not a readable image or has more than
+    ``max_pixels`` pixels.
+    """
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    try:
+        image = Image.open(BytesIO(data))
+        largest = max(width for width, _, _ in specs)
+        # JPEG can decode at 1/2, 1/4 or 1/8 scale, much faster than full size.
+        width, height = image.size
+        if image.getexif().get(ORIENTATION) in (5, 6, 7, 8):
+            width, height = height, width  # Rotated by exif_transpose below
+        target = (largest, largest * height // max(width, 1))
+        image.draft('RGB', target[::-1] if (width, height) != image.size else target)
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+            image = image.convert('RGBA' if image.has_transparency_data else 'RGB')
+        results = []
+        # Each variant is resized from the decoded original, not from the previous one.
+        for width, fmt, quality in specs:
+            if width < image.width:
+                resized = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+            else:
+                resized = image
+            results.append((_encode(resized, fmt, quality), resized.width, resized.height))
+        return results
+    except (OSError, SyntaxError, Image.DecompressionBombError) as e:
+        raise ValueError(f"Cannot process image: {e}") from None
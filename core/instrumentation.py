@@ -0,0 +1,298 @@
+"""Hot-path instrumentation: DB queries, template rendering, S3 calls and profiling.
+
+Each request gets a ``RequestStats`` stored in a context variable by
+``core.middleware.timing.RequestTimingMiddleware``. Context variables follow
+``sync_to_async``/``async_to_sync`` hops, so work done in the sync thread of an
+async view is still attributed to the right request. The hooks below are
+installed once per process from ``CoreConfig.ready()``.
+"""
+import cProfile
+import importlib.abc
+import marshal
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db.backends.signals import connection_created
+from django.template.backends.django import DjangoTemplates
+from loguru import logger
+
+from .metrics import registry
+
+_current_stats = ContextVar('request_stats', default=None)
+
+
+@dataclass
+class RequestStats:
+    db_queries: int = 0
+    db_seconds: float = 0.0
+    template_seconds: float = 0.0
+    s3_calls: int = 0
+    s3_seconds: float = 0.0
+
+
+def begin_request():
+    """Start collecting stats for the current context; returns ``(stats, token)``."""
+    stats = RequestStats()
+    return stats, _current_stats.set(stats)
+
+
+def end_request(token):
+    _current_stats.reset(token)
+
+
+def current_stats():
+    return _current_stats.get()
+
+
+# -- Database -----------------------------------------------------------------
+
+def _db_execute_wrapper(execute, sql, params, many, context):
+    stats = _current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db_queries += 1
+        stats.db_seconds += time.perf_counter() - started
+
+
+def _install_db_wrapper(sender, connection, **kwargs):
+    if _db_execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_db_execute_wrapper)
+
+
+# -- Templates ----------------------------------------------------------------
+
+class InstrumentedTemplate:
+    """Wrap a backend template so its top-level render time is recorded."""
+
+    def __init__(self, template):
+        self._template = template
+
+    def __getattr__(self, name):
+        return getattr(self._template, name)
+
+    def render(self, context=None, request=None):
+        stats = _current_stats.get()
+        if stats is None:
+            return self._template.render(context, request)
+        started = time.perf_counter()
+        try:
+            return self._template.render(context, request)
+        finally:
+            stats.template_seconds += time.perf_counter() - started
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """Django template backend whose templates report their render time."""
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return InstrumentedTemplate(super().get_template(template_name))
+
+
+# -- S3 -----------------------------------------------------------------------
+
+def _s3_before_call(context=None, **kwargs):
+    if context is not None and _current_stats.get() is not None:
+        context['instrumentation_started'] = time.perf_counter()
+
+
+def _s3_after_call(context=None, **kwargs):
+    stats = _current_stats.get()
+    if stats is None or context is None or 'instrumentation_started' not in context:
+        return
+    stats.s3_calls += 1
+    stats.s3_seconds += time.perf_counter() - context.pop('instrumentation_started')
+
+
+S3_EVENT_HANDLERS = (
+    ('before-call.s3', _s3_before_call),
+    ('after-call.s3', _s3_after_call),
+)
+
+
+def _register_s3_handlers(module):
+    # Every botocore session registers BUILTIN_HANDLERS when it is created, so
+    # this reaches clients made by django-storages as well as our own.
+    for handler in S3_EVENT_HANDLERS:
+        if handler not in module.BUILTIN_HANDLERS:
+            module.BUILTIN_HANDLERS.append(handler)
+
+
+class _NotifyingLoader:
+    """Delegate to ``loader`` and call ``callback`` once the module has run."""
+
+    def __init__(self, loader, callback):
+        self._loader = loader
+        self._callback = callback
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._loader.exec_module(module)
+        self._callback(module)
+
+
+class _PostImportHook(importlib.abc.MetaPathFinder):
+    def __init__(self, fullname, callback):
+        self.fullname = fullname
+        self.callback = callback
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname != self.fullname:
+            return None
+        sys.meta_path.remove(self)
+        for finder in sys.meta_path:
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                spec.loader = _NotifyingLoader(spec.loader, self.callback)
+                return spec
+        return None
+
+
+def when_imported(fullname, callback):
+    """Call ``callback(module)`` now if ``fullname`` is imported, else right after its import."""
+    module = sys.modules.get(fullname)
+    if module is not None:
+        callback(module)
+    elif not any(isinstance(f, _PostImportHook) and f.fullname == fullname for f in sys.meta_path):
+        sys.meta_path.insert(0, _PostImportHook(fullname, callback))
+
+
+def _install_s3_handlers():
+    # botocore takes ~80 ms to import; processes that never talk to S3 (most
+    # manage.py commands) should not pay for it just to be instrumented.
+    when_imported('botocore.handlers', _register_s3_handlers)
+
+
+# -- Sampled profiling --------------------------------------------------------
+
+_profile_uploader = ThreadPoolExecutor(max_workers=1, thread_name_prefix='profile-upload')
+
+
+def start_profiler():
+    """Return a running profiler for a ``PROFILE_SAMPLE_RATE`` fraction of calls.
+
+    cProfile follows the calling thread only; do not use it on an event loop.
+    """
+    rate = getattr(settings, 'PROFILE_SAMPLE_RATE', 0.0)
+    if rate <= 0 or random.random() >= rate:
+        return None
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def store_profile(profiler, view_name):
+    """Stop ``profiler`` and upload its pstats dump without blocking the request."""
+    profiler.disable()
+    profiler.create_stats()
+    data = marshal.dumps(profiler.stats)
+    now = datetime.now(timezone.utc)
+    safe_name = view_name.replace(':', '.').replace('/', '_') or 'unresolved'
+    prefix = getattr(settings, 'PROFILE_STORAGE_PREFIX', 'profiles')
+    name = f"{prefix}/{now:%Y-%m-%d}/{safe_name}-{now:%H%M%S%f}.prof"
+    _profile_uploader.submit(_save_profile, name, data)
+
+
+def _save_profile(name, data):
+    from django.core.files.storage import storages
+    try:
+        storages[getattr(settings, 'PROFILE_STORAGE', 'default')].save(name, ContentFile(data))
+    except Exception as e:
+        logger.warning(f"Could not store profile {name}: {e}")
+
+
+# -- Metrics ------------------------------------------------------------------
+
+REQUEST_DURATION = registry.histogram(
+    'http_request_duration_seconds', 'Time spent serving a request.', ('view', 'method'))
+REQUESTS = registry.counter(
+    'http_requests_total', 'Requests served.', ('view', 'method', 'status'))
+DB_QUERIES = registry.histogram(
+    'http_request_db_queries', 'Database queries per request.', ('view',),
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100))
+DB_TIME = registry.histogram(
+    'http_request_db_seconds', 'Time spent in database queries per request.', ('view',))
+TEMPLATE_TIME = registry.histogram(
+    'http_request_template_seconds', 'Time spent rendering templates per request.', ('view',))
+S3_CALLS = registry.counter(
+    'http_request_s3_calls_total', 'S3 API calls made while serving requests.', ('view',))
+S3_TIME = registry.histogram(
+    'http_request_s3_seconds', 'Time spent in S3 API calls per request.', ('view',))
+
+
+def record_request(view, method, status, duration, stats):
+    REQUEST_DURATION.observe(duration, view=view, method=method)
+    REQUESTS.inc(view=view, method=method, status=str(status))
+    DB_QUERIES.observe(stats.db_queries, view=view)
+    DB_TIME.observe(stats.db_seconds, view=view)
+    if stats.template_seconds:
+        TEMPLATE_TIME.observe(stats.template_seconds, view=view)
+    if stats.s3_calls:
+        S3_CALLS.inc(stats.s3_calls, view=view)
+        S3_TIME.observe(stats.s3_seconds, view=view)
+
+
+# Stats that only ever grow are exported as counters (named ``*_total``); the
+# rest, ``log_shipping_queued`` included (shipped records are taken off it),
+# are gauges.
+LOG_SHIPPING_COUNTERS = ('dropped', 'shipped', 'failed', 'batches', 'bytes_shipped')
+DB_POOL_COUNTERS = ('checkouts', 'queued_checkouts', 'exhausted', 'connections_lost')
+
+
+def _stat_families(prefix, description, stats, counters):
+    families = []
+    for name, value in stats.items():
+        documentation = f'{description} {name.replace("_", " ")}.'
+        if name in counters:
+            families.append((f'{prefix}_{name}_total', 'counter', documentation, [({}, float(value))]))
+        else:
+            families.append((f'{prefix}_{name}', 'gauge', documentation, [({}, float(value))]))
+    return families
+
+
+def collect_log_shipping():
+    sink = getattr(settings, 'LOG_SINK', None)
+    if sink is None:
+        return []
+    return _stat_families('log_shipping', 'S3 log sink', sink.stats(), LOG_SHIPPING_COUNTERS)
+
+
+def collect_db_pool():
+    from .db_pool import pool_status
+    status = pool_status()
+    if status is None:
+        return []
+    return _stat_families('db_pool', 'Connection pool', status, DB_POOL_COUNTERS)
+
+
+def collect_task_queue():
+    if not getattr(settings, 'TASK_QUEUE_METRICS', True):
+        return []
+    from .jobs import collect_queue
+    return collect_queue()
+
+
+def install():
+    connection_created.connect(_install_db_wrapper, dispatch_uid='core.instrumentation.db')
+    _install_s3_handlers()
+    registry.register_collector(collect_log_shipping)
+    registry.register_collector(collect_db_pool)
+    registry.register_collector(collect_task_queue)
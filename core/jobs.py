@@ -0,0 +1,242 @@
+"""Background jobs stored in the ``core.Job`` table.
+
+Register a function with ``@task`` and call ``.enqueue(**kwargs)``: the row
+is inserted at once, in the current transaction if there is one (requests run
+in autocommit, so usually there is not). When the job depends on other writes
+of an ``atomic()`` block, use ``.enqueue_on_commit(**kwargs)``: the row is
+inserted only after the block commits, and never if it rolls back.
+``manage.py worker`` runs the jobs, on as many instances and threads as
+needed::
+
+    @task(max_attempts=5)
+    def resize_image(upload_id):
+        ...
+
+    with transaction.atomic():
+        upload.save()
+        resize_image.enqueue_on_commit(upload_id=str(upload.pk))
+
+Workers claim jobs with ``SELECT ... FOR UPDATE SKIP LOCKED``: concurrent
+claims skip rows another worker has locked instead of waiting on them. A job
+that raises is retried with exponential backoff until ``max_attempts``; a job
+whose worker died is queued again after ``TASK_VISIBILITY_TIMEOUT``. Tasks
+may therefore run more than once and should be idempotent.
+
+Task modules are found by importing ``<app>.tasks`` for each installed app.
+"""
+import random
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+from loguru import logger
+
+from .metrics import registry
+from .models import Job
+
+TASK_DURATION = registry.histogram(
+    'task_duration_seconds', 'Time spent running a background job.', ('task', 'outcome'))
+TASK_WAIT = registry.histogram(
+    'task_wait_seconds', 'Time between a job being due and a worker starting it.', ('task',))
+TASKS = registry.counter(
+    'tasks_total', 'Background jobs run.', ('task', 'outcome'))
+
+_tasks = {}
+
+
+class Task:
+    """A function that can be run later by a worker."""
+
+    def __init__(self, func, name, queue, max_attempts, priority):
+        self.func = func
+        self.name = name
+        self.queue = queue
+        self.max_attempts = max_attempts
+        self.priority = priority
+
+    def __call__(self, **kwargs):
+        return self.func(**kwargs)
+
+    def __repr__(self):
+        return f'<Task {self.name}>'
+
+    def enqueue(self, **kwargs):
+        """Queue a run with ``kwargs``, which must be JSON serializable."""
+        return enqueue(self.name, kwargs)
+
+    def enqueue_on_commit(self, **kwargs):
+        """Queue a run with ``kwargs`` once the current transaction commits."""
+        enqueue_on_commit(self.name, kwargs)
+
+
+def task(func=None, *, name=None, queue='default', max_attempts=3, priority=0):
+    """Register ``func`` as a task, under its dotted path unless ``name`` is given."""
+    def register(func):
+        registered = Task(func, name or f'{func.__module__}.{func.__qualname__}', queue, max_attempts, priority)
+        _tasks[registered.name] = registered
+        return registered
+    return register(func) if func is not None else register
+
+
+def get_task(name):
+    return _tasks.get(name)
+
+
+def autodiscover():
+    autodiscover_modules('tasks')
+
+
+def enqueue(name, kwargs=None, *, delay=0, queue=None, priority=None, max_attempts=None):
+    """Insert a job for task ``name``; options default to the task's own."""
+    registered = _tasks.get(name)
+    return Job.objects.create(
+        task=name,
+        kwargs=kwargs or {},
+        queue=queue or (registered.queue if registered else 'default'),
+        priority=priority if priority is not None else (registered.priority if registered else 0),
+        max_attempts=max_attempts or (registered.max_attempts if registered else 3),
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def enqueue_on_commit(name, kwargs=None, **options):
+    """``enqueue()`` after the current transaction commits; at once outside one."""
+    transaction.on_commit(lambda: enqueue(name, kwargs, **options))
+
+
+def retry_delay(attempts):
+    """Seconds to wait before attempt ``attempts + 1``: exponential, capped, jittered."""
+    base = getattr(settings, 'TASK_RETRY_BASE_DELAY', 5)
+    cap = getattr(settings, 'TASK_RETRY_MAX_DELAY', 3600)
+    delay = min(base * 2 ** (attempts - 1), cap)
+    # Half fixed, half random, so jobs that failed together do not retry together.
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def claim(queues, worker, limit=1):
+    """Lock up to ``limit`` due jobs from ``queues`` and mark them running."""
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.Status.QUEUED, queue__in=queues, run_at__lte=now)
+            .order_by('-priority', 'run_at', 'pk')[:limit]
+        )
+        if not jobs:
+            return []
+        Job.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status=Job.Status.RUNNING, started_at=now, worker=worker, attempts=F('attempts') + 1)
+    for job in jobs:
+        job.status = Job.Status.RUNNING
+        job.started_at = now
+        job.worker = worker
+        job.attempts += 1
+    return jobs
+
+
+def run(job):
+    """Run a claimed job and record its outcome; returns ``'done'``, ``'retry'`` or ``'failed'``."""
+    registered = _tasks.get(job.task)
+    TASK_WAIT.observe(max((job.started_at - job.run_at).total_seconds(), 0.0), task=job.task)
+    started = time.perf_counter()
+    try:
+        if registered is None:
+            raise LookupError(f"Unknown task {job.task!r}")
+        registered.func(**job.kwargs)
+    except Exception:
+        duration = time.perf_counter() - started
+        error = traceback.format_exc()
+        if registered is not None and job.attempts < job.max_attempts:
+            outcome = 'retry'
+            delay = retry_delay(job.attempts)
+            logger.warning(f"Job {job} failed (attempt {job.attempts}/{job.max_attempts}), retrying in {delay:.0f}s")
+            changes = {'status': Job.Status.QUEUED, 'run_at': timezone.now() + timedelta(seconds=delay)}
+        else:
+            outcome = 'failed'
+            logger.error(f"Job {job} failed after {job.attempts} attempt(s):\n{error}")
+            changes = {'status': Job.Status.FAILED, 'finished_at': timezone.now()}
+        changes.update(duration=duration, last_error=error)
+    else:
+        duration = time.perf_counter() - started
+        outcome = 'done'
+        changes = {'status': Job.Status.DONE, 'finished_at': timezone.now(), 'duration': duration}
+
+    # Only if still ours: a job requeued as stale may be running elsewhere.
+    Job.objects.filter(pk=job.pk, status=Job.Status.RUNNING, worker=job.worker).update(**changes)
+    for field, value in changes.items():
+        setattr(job, field, value)
+    TASK_DURATION.observe(duration, task=job.task, outcome=outcome)
+    TASKS.inc(task=job.task, outcome=outcome)
+    return outcome
+
+
+def requeue_stale(timeout=None):
+    """Queue again the jobs running for longer than ``timeout`` seconds.
+
+    Their worker most likely died (instance replaced, OOM kill); jobs out of
+    attempts are marked failed instead. Returns the number of jobs touched.
+    """
+    if timeout is None:
+        timeout = getattr(settings, 'TASK_VISIBILITY_TIMEOUT', 30 * 60)
+    now = timezone.now()
+    stale = Job.objects.filter(status=Job.Status.RUNNING, started_at__lt=now - timedelta(seconds=timeout))
+    error = f"Worker did not finish the job within {timeout}s"
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.Status.FAILED, finished_at=now, last_error=error)
+    requeued = stale.update(status=Job.Status.QUEUED, run_at=now, last_error=error)
+    return failed + requeued
+
+
+def work(queues, worker, stop=None, poll_interval=1.0, burst=False):
+    """Claim and run jobs until ``stop`` is set, or the queues are empty with ``burst``.
+
+    Database errors (a dropped connection, a failover) are logged and retried
+    with backoff rather than ending the loop; a job claimed before the error
+    stays running until ``requeue_stale()`` queues it again.
+    """
+    failures = 0
+    while stop is None or not stop.is_set():
+        close_old_connections()
+        try:
+            jobs = claim(queues, worker)
+            for job in jobs:
+                run(job)
+        except Exception:
+            failures += 1
+            wait = min(poll_interval * 2 ** failures, getattr(settings, 'TASK_WORKER_MAX_BACKOFF', 60))
+            logger.exception(f"Worker {worker} failed to claim or record a job, retrying in {wait:.0f}s")
+        else:
+            failures = 0
+            if jobs:
+                continue
+            if burst:
+                break
+            wait = poll_interval
+        if stop is not None:
+            stop.wait(wait)
+        else:
+            time.sleep(wait)
+
+
+def collect_queue():
+    """Queue depth per queue and status, and the age of the oldest due job."""
+    now = timezone.now()
+    rows = (
+        Job.objects.filter(status__in=[Job.Status.QUEUED, Job.Status.RUNNING])
+        .values('queue', 'status')
+        .annotate(count=Count('pk'), oldest=Min('run_at'))
+    )
+    depth, lag = [], []
+    for row in rows:
+        depth.append(({'queue': row['queue'], 'status': row['status']}, row['count']))
+        if row['status'] == Job.Status.QUEUED:
+            lag.append(({'queue': row['queue']}, max((now - row['oldest']).total_seconds(), 0.0)))
+    return [
+        ('task_queue_jobs', 'gauge', 'Queued and running background jobs.', depth),
+        ('task_queue_oldest_seconds', 'gauge', 'Seconds the oldest due job has been waiting.', lag),
+    ]
@@ -0,0 +1,276 @@
+"""Non-blocking S3 sink for loguru.
+
+Loguru calls its sinks synchronously from the thread that emitted the record,
+so a sink that talks to S3 directly puts network I/O on the request path.
+``S3LogSink`` only formats and enqueues the message; a daemon worker drains the
+bounded queue, groups records into size/time windowed gzip chunks and uploads
+each chunk as a single object (multipart for very large chunks).
+"""
+import atexit
+import gzip
+import os
+import queue
+import socket
+import sys
+import threading
+import time
+import weakref
+from datetime import datetime, timezone
+
+DROP_NEWEST = 'drop_newest'
+DROP_OLDEST = 'drop_oldest'
+BLOCK = 'block'
+DROP_POLICIES = (DROP_NEWEST, DROP_OLDEST, BLOCK)
+
+# S3 rejects multipart parts smaller than 5 MiB (except the last one).
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+_FLUSH = object()
+_STOP = object()
+
+_sinks = weakref.WeakSet()
+
+
+def _reset_after_fork():
+    # The worker thread is not copied into the child, and it may have held a
+    # sink's lock at fork time (Gunicorn preload_app): the child takes a new
+    # lock and starts its own queue and worker on the first record.
+    for sink in list(_sinks):
+        sink._lock = threading.Lock()
+        sink._pid = None
+        sink._queue = None
+        sink._worker = None
+        sink._counters = dict.fromkeys(sink._counters, 0)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class S3LogSink:
+    """Loguru sink that ships formatted records to S3 in compressed batches.
+
+    The instance is a plain callable, so it can be used as the ``sink`` of a
+    loguru handler. ``client`` may be any object exposing the boto3 S3 client
+    methods used here, which keeps the sink testable without AWS.
+    """
+
+    def __init__(
+        self,
+        bucket,
+        prefix='logs',
+        max_queue_size=10000,
+        batch_max_bytes=1024 * 1024,
+        flush_interval=5.0,
+        drop_policy=DROP_NEWEST,
+        block_timeout=0.05,
+        multipart_threshold=16 * 1024 * 1024,
+        part_size=8 * 1024 * 1024,
+        upload_retries=3,
+        region_name=None,
+        client=None,
+    ):
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy '{drop_policy}', expected one of {DROP_POLICIES}")
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.max_queue_size = max_queue_size
+        self.batch_max_bytes = batch_max_bytes
+        self.flush_interval = flush_interval
+        self.drop_policy = drop_policy
+        self.block_timeout = block_timeout
+        self.multipart_threshold = max(multipart_threshold, MIN_PART_SIZE)
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.upload_retries = upload_retries
+        self.region_name = region_name
+        self._client = client
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._worker = None
+        self._sequence = 0
+        self._counters = dict.fromkeys(
+            ('queued', 'dropped', 'shipped', 'failed', 'batches', 'bytes_shipped'), 0
+        )
+        _sinks.add(self)
+        atexit.register(self.stop)
+
+    def __call__(self, message):
+        self._ensure_worker()
+        line = str(message)
+        if self.drop_policy == BLOCK:
+            try:
+                self._queue.put(line, timeout=self.block_timeout)
+            except queue.Full:
+                self._count('dropped')
+                return
+        else:
+            try:
+                self._queue.put_nowait(line)
+            except queue.Full:
+                if self.drop_policy == DROP_NEWEST:
+                    self._count('dropped')
+                    return
+                self._make_room()
+                try:
+                    self._queue.put_nowait(line)
+                except queue.Full:
+                    self._count('dropped')
+                    return
+        self._count('queued')
+
+    def stats(self):
+        """Return a snapshot of the sink counters and current queue depth."""
+        with self._lock:
+            snapshot = dict(self._counters)
+        snapshot['pending'] = self._queue.qsize() if self._queue is not None else 0
+        return snapshot
+
+    def flush(self, timeout=None):
+        """Block until every record enqueued so far has been handed to S3."""
+        if not self._worker_alive():
+            return True
+        done = threading.Event()
+        self._queue.put((_FLUSH, done))
+        return done.wait(timeout)
+
+    def stop(self, timeout=10.0):
+        """Flush pending records and stop the worker thread."""
+        if not self._worker_alive():
+            return
+        self._queue.put((_STOP, None))
+        self._worker.join(timeout)
+
+    def _ensure_worker(self):
+        # After a fork (e.g. Gunicorn preload_app) the worker thread does not
+        # exist in the child, so every process lazily starts its own; the pid
+        # check covers platforms without os.register_at_fork.
+        if self._pid == os.getpid() and self._worker is not None:
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._worker is not None:
+                return
+            self._pid = os.getpid()
+            self._queue = queue.Queue(maxsize=self.max_queue_size)
+            self._worker = threading.Thread(target=self._run, name='s3-log-sink', daemon=True)
+            self._worker.start()
+
+    def _worker_alive(self):
+        return self._pid == os.getpid() and self._worker is not None and self._worker.is_alive()
+
+    def _make_room(self):
+        # Drop the oldest record in place, under the queue's own lock: taking a
+        # control message out to put it back could lose it to a producer that
+        # refills the slot in between, leaving flush()/stop() waiting forever.
+        pending = self._queue
+        with pending.mutex:
+            for index, item in enumerate(pending.queue):
+                if not isinstance(item, tuple):
+                    del pending.queue[index]
+                    pending.not_full.notify()
+                    break
+            else:
+                return
+        self._count('dropped')
+        self._count('queued', -1)
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def _run(self):
+        batch = []
+        batch_bytes = 0
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, tuple):
+                command, done = item
+                self._ship(batch)
+                batch, batch_bytes = [], 0
+                deadline = time.monotonic() + self.flush_interval
+                if done is not None:
+                    done.set()
+                if command is _STOP:
+                    return
+                continue
+
+            if item is not None:
+                batch.append(item)
+                batch_bytes += len(item)
+
+            if batch_bytes >= self.batch_max_bytes or time.monotonic() >= deadline:
+                self._ship(batch)
+                batch, batch_bytes = [], 0
+                deadline = time.monotonic() + self.flush_interval
+
+    def _ship(self, batch):
+        if not batch:
+            return
+        body = gzip.compress(''.join(batch).encode('utf-8'))
+        key = self._next_key()
+        for attempt in range(self.upload_retries + 1):
+            try:
+                self._upload(key, body)
+                break
+            except Exception as e:
+                if attempt == self.upload_retries:
+                    # The logger cannot log its own failures, report on stderr.
+                    print(f"S3LogSink: dropping {len(batch)} records after upload failure: {e}", file=sys.stderr)
+                    self._count('failed', len(batch))
+                    self._count('queued', -len(batch))
+                    return
+                time.sleep(min(0.5 * 2 ** attempt, 5.0))
+        with self._lock:
+            self._counters['shipped'] += len(batch)
+            self._counters['queued'] -= len(batch)
+            self._counters['batches'] += 1
+            self._counters['bytes_shipped'] += len(body)
+
+    def _next_key(self):
+        now = datetime.now(timezone.utc)
+        self._sequence += 1
+        return (
+            f"{self.prefix}/{now:%Y-%m-%d}/"
+            f"{socket.gethostname()}-{os.getpid()}-{now:%H%M%S%f}-{self._sequence:06d}.log.gz"
+        )
+
+    def _get_client(self):
+        if self._client is not None:
+            return self._client
+        # Not cached here: the shared client is replaced after fork.
+        from .s3 import get_s3_client
+        return get_s3_client(region_name=self.region_name)
+
+    def _upload(self, key, body):
+        client = self._get_client()
+        params = {'ContentType': 'text/plain', 'ContentEncoding': 'gzip'}
+        if len(body) < self.multipart_threshold:
+            client.put_object(Bucket=self.bucket, Key=key, Body=body, **params)
+            return
+
+        upload_id = client.create_multipart_upload(Bucket=self.bucket, Key=key, **params)['UploadId']
+        try:
+            parts = []
+            for number, offset in enumerate(range(0, len(body), self.part_size), start=1):
+                response = client.upload_part(
+                    Bucket=self.bucket,
+                    Key=key,
+                    UploadId=upload_id,
+                    PartNumber=number,
+                    Body=body[offset:offset + self.part_size],
+                )
+                parts.append({'ETag': response['ETag'], 'PartNumber': number})
+            client.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={'Parts': parts},
+            )
+        except Exception:
+            client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+            raise
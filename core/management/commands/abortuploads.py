@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from loguru import logger
+
+from core.uploads import abort_upload, stale_uploads
+
+
+class Command(BaseCommand):
+    help = (
+        "Abort pending multipart uploads older than UPLOAD_ABANDON_AFTER, so S3 "
+        "discards (and stops billing) their uploaded parts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, default=None,
+                            help="Age in seconds (default: UPLOAD_ABANDON_AFTER).")
+        parser.add_argument('--dry-run', action='store_true', help="Only list the uploads that would be aborted.")
+
+    def handle(self, *args, **options):
+        aborted = 0
+        for upload in stale_uploads(options['older_than']).iterator():
+            if options['dry_run']:
+                self.stdout.write(f"Would abort {upload.id} {upload.key}")
+                continue
+            try:
+                abort_upload(upload)
+            except Exception as e:
+                logger.error(f"Could not abort upload {upload.id}: {e}")
+                continue
+            aborted += 1
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"Aborted {aborted} upload(s)"))
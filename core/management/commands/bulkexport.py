@@ -0,0 +1,34 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from core import bulk
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream a model's rows to a CSV or JSON Lines file: a local path, - for "
+        "stdout or storage:<name> in the default storage. Uses COPY on PostgreSQL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', help="Model label, e.g. core.Job.")
+        parser.add_argument('path', help="Destination; .csv, .jsonl or .ndjson, optionally .gz.")
+        parser.add_argument('--format', choices=bulk.FORMATS, help="File format (default: from the extension).")
+        parser.add_argument('--fields', help="Comma-separated fields or columns to export (default: all).")
+        parser.add_argument('--database', default=None, help="Database alias to read from (default: routed).")
+
+    def handle(self, *args, **options):
+        try:
+            model = apps.get_model(options['model'])
+            fmt = bulk.detect_format(options['path'], options['format'])
+            fields = options['fields'].split(',') if options['fields'] else None
+            queryset = model._default_manager.all()
+            if options['database']:
+                queryset = queryset.using(options['database'])
+            progress = bulk.Progress(lambda p: self.stderr.write(f"Exported {p}"))
+            with bulk.open_destination(options['path']) as stream:
+                bulk.export_rows(queryset, stream, fmt, fields, progress)
+        except (LookupError, bulk.BulkError) as e:
+            raise CommandError(e)
+        # stdout may be the export itself.
+        self.stderr.write(self.style.SUCCESS(f"Exported {progress} to {options['path']}"))
@@ -0,0 +1,33 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from core import bulk
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream rows from a CSV or JSON Lines file into a model: a local path, - "
+        "for stdin or storage:<name> in the default storage. Uses COPY on "
+        "PostgreSQL and bulk_create elsewhere, committing every --batch-size rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', help="Model label, e.g. core.Job.")
+        parser.add_argument('path', help="Source; .csv, .jsonl or .ndjson, optionally .gz.")
+        parser.add_argument('--format', choices=bulk.FORMATS, help="File format (default: from the extension).")
+        parser.add_argument('--fields', help="Comma-separated fields the columns map to (default: header or keys).")
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help="Rows per transaction (default: BULK_BATCH_SIZE).")
+        parser.add_argument('--database', default=None, help="Database alias to write to (default: routed).")
+
+    def handle(self, *args, **options):
+        try:
+            model = apps.get_model(options['model'])
+            fmt = bulk.detect_format(options['path'], options['format'])
+            fields = options['fields'].split(',') if options['fields'] else None
+            progress = bulk.Progress(lambda p: self.stderr.write(f"Imported {p}"))
+            with bulk.open_source(options['path']) as stream:
+                bulk.import_rows(model, stream, fmt, fields, options['batch_size'], progress, options['database'])
+        except (LookupError, bulk.BulkError) as e:
+            raise CommandError(e)
+        self.stdout.write(self.style.SUCCESS(f"Imported {progress} into {model._meta.label}"))
@@ -0,0 +1,89 @@
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def parse_importtime(output):
+    """Parse ``python -X importtime`` stderr into ``(module, self_us, cumulative_us, depth)``."""
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        entries.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return entries
+
+
+def cost_by_package(entries):
+    """Sum self time per top-level package, e.g. every ``django.*`` module under ``django``."""
+    totals = {}
+    for module, self_us, _, _ in entries:
+        package = module.split('.', 1)[0]
+        totals[package] = totals.get(package, 0) + self_us
+    return totals
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures import cost of starting the project (django.setup() or given modules) "
+        "in a fresh interpreter, reports it per package and fails past the budget."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--module', action='append', default=[], help="Module to import after django.setup(); repeatable (e.g. project.wsgi).")
+        parser.add_argument('--runs', type=int, default=3, help="Measure this many times and keep the fastest.")
+        parser.add_argument('--top', type=int, default=15, help="Packages to list.")
+        parser.add_argument('--budget-ms', type=float, default=None, help="Total import budget (default: IMPORT_TIME_BUDGET_MS).")
+        parser.add_argument('--package-budget', action='append', default=[], metavar='PACKAGE=MS', help="Budget for one package; repeatable.")
+        parser.add_argument('--forbid', action='append', default=None, metavar='MODULE', help="Module that must not be imported at startup (default: IMPORT_TIME_FORBIDDEN).")
+
+    def measure(self, modules):
+        code = 'import django; django.setup()' + ''.join(f'; import {module}' for module in modules)
+        # DJANGO_SETTINGS_MODULE (also set by --settings) is inherited.
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', code],
+            capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(f"Startup failed:\n{result.stderr[-2000:]}")
+        return parse_importtime(result.stderr)
+
+    def handle(self, *args, **options):
+        budget_ms = options['budget_ms']
+        if budget_ms is None:
+            budget_ms = getattr(settings, 'IMPORT_TIME_BUDGET_MS', None)
+        forbidden = options['forbid']
+        if forbidden is None:
+            forbidden = getattr(settings, 'IMPORT_TIME_FORBIDDEN', [])
+        package_budgets = {}
+        for item in options['package_budget']:
+            package, _, ms = item.partition('=')
+            package_budgets[package] = float(ms)
+
+        runs = [self.measure(options['module']) for _ in range(max(1, options['runs']))]
+        entries = min(runs, key=lambda run: sum(self_us for _, self_us, _, _ in run))
+        total_ms = sum(self_us for _, self_us, _, _ in entries) / 1000
+        packages = cost_by_package(entries)
+
+        self.stdout.write(f"{'package':<32}{'self ms':>10}{'share':>8}")
+        for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f"{package:<32}{self_us / 1000:>10.1f}{self_us / 1000 / total_ms:>8.1%}")
+        self.stdout.write(f"{'total':<32}{total_ms:>10.1f}  ({len(entries)} modules, best of {len(runs)})")
+
+        violations = []
+        if budget_ms is not None and total_ms > budget_ms:
+            violations.append(f"total import time {total_ms:.1f} ms exceeds budget {budget_ms:.1f} ms")
+        for package, limit in package_budgets.items():
+            spent = packages.get(package, 0) / 1000
+            if spent > limit:
+                violations.append(f"{package} takes {spent:.1f} ms, budget {limit:.1f} ms")
+        imported = {module for module, _, _, _ in entries}
+        for module in forbidden:
+            if module in imported:
+                violations.append(f"{module} is imported at startup")
+        if violations:
+            raise CommandError("Import time regression: " + "; ".join(violations))
+        self.stdout.write(self.style.SUCCESS("Import time within budget"))
@@ -0,0 +1,119 @@
+import json
+import mimetypes
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.staticfiles.finders import get_finders
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.management.base import BaseCommand, CommandError
+from loguru import logger
+from storages.utils import clean_name
+
+IGNORE_PATTERNS = ['CVS', '.*', '*~']
+COMPRESSED_TYPES = {
+    'gzip': 'application/gzip',
+    'br': 'application/x-brotli',
+    'bzip2': 'application/x-bzip2',
+    'xz': 'application/x-xz',
+    'compress': 'application/x-compress',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Collect static files with content-hashed names and upload only the files "
+        "whose hash changed since the manifest already published on S3."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=16, help="Concurrent uploads.")
+        parser.add_argument('--force', action='store_true', help="Upload every file, ignoring the remote manifest.")
+        parser.add_argument('--dry-run', action='store_true', help="Report what would be uploaded.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        with tempfile.TemporaryDirectory(prefix='static-') as build_dir:
+            local = ManifestStaticFilesStorage(location=build_dir)
+            self.collect(local)
+            local_paths = json.loads(local.read_manifest())['paths']
+            remote_paths, remote_hash = ({}, None) if options['force'] else self.remote_manifest()
+
+            changed = sorted(name for name, hashed in local_paths.items() if remote_paths.get(name) != hashed)
+            # Hashed names are immutable; the originals keep the regular cache policy.
+            uploads = [(hashed_name, True) for hashed_name in (local_paths[name] for name in changed)]
+            uploads += [(name, False) for name in changed]
+
+            logger.info(
+                f"Static files: {len(local_paths)} total, {len(changed)} changed, "
+                f"{len(local_paths) - len(changed)} unchanged"
+            )
+            if options['dry_run']:
+                for name in changed:
+                    logger.info(f"Would upload {name} -> {local_paths[name]}")
+                return
+
+            # boto3 clients are thread-safe, unlike the resource the storage
+            # wraps, so all upload threads share one client and its pool.
+            self.client = staticfiles_storage.connection.meta.client
+            if uploads:
+                self.upload_all(build_dir, uploads, options['workers'])
+            if uploads or local.manifest_hash != remote_hash:
+                # The manifest goes last so it never references missing files.
+                self.upload(build_dir, local.manifest_name, cache_control='no-cache')
+
+        logger.info(f"Published {len(uploads)} static file(s) in {time.perf_counter() - started:.2f}s")
+
+    def collect(self, local):
+        found_files = {}
+        for finder in get_finders():
+            for path, storage in finder.list(IGNORE_PATTERNS):
+                prefixed_path = os.path.join(storage.prefix, path) if getattr(storage, 'prefix', None) else path
+                if prefixed_path in found_files:
+                    continue
+                found_files[prefixed_path] = (storage, path)
+                with storage.open(path) as source:
+                    local.save(prefixed_path, source)
+
+        for original_path, processed_path, processed in local.post_process(found_files):
+            if isinstance(processed, Exception):
+                raise CommandError(f"Post-processing '{original_path}' failed: {processed}") from processed
+
+    def remote_manifest(self):
+        content = staticfiles_storage.read_manifest()
+        if content is None:
+            return {}, None
+        stored = json.loads(content)
+        return stored.get('paths', {}), stored.get('hash')
+
+    def upload_all(self, build_dir, uploads, workers):
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(self.upload, build_dir, name, immutable=immutable)
+                for name, immutable in uploads
+            ]
+            for future in futures:
+                future.result()
+
+    def upload(self, build_dir, name, immutable=False, cache_control=None):
+        if immutable:
+            extra_args = staticfiles_storage.immutable_object_parameters()
+        else:
+            extra_args = dict(staticfiles_storage.object_parameters)
+        if cache_control:
+            extra_args['CacheControl'] = cache_control
+        content_type, encoding = mimetypes.guess_type(name)
+        if encoding:
+            # A compressed asset (a .tar.gz download, say) is served as the
+            # archive it is: with Content-Encoding, browsers and CloudFront
+            # would decompress it on the fly. Nothing here precompresses files.
+            content_type = COMPRESSED_TYPES.get(encoding)
+        extra_args.setdefault('ContentType', content_type or 'application/octet-stream')
+
+        self.client.upload_file(
+            os.path.join(build_dir, name),
+            staticfiles_storage.bucket_name,
+            staticfiles_storage._normalize_name(clean_name(name)),
+            ExtraArgs=extra_args,
+        )
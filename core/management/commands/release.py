@@ -0,0 +1,100 @@
+import os
+import time
+import zlib
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+from loguru import logger
+
+# Every instance uses the same key, so only one of them runs the release steps
+# at a time; the others wait and then find nothing left to do.
+RELEASE_LOCK_KEY = zlib.crc32(b'apprunnertest2:release')
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the idempotent release steps (migrate, publishstatic, superuser) "
+        "under a PostgreSQL advisory lock, reporting the time spent in each step."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--lock-timeout', type=float, default=600.0,
+                            help="Seconds to wait for another instance's release to finish.")
+        parser.add_argument('--skip-static', action='store_true', help="Do not collect static files.")
+        parser.add_argument('--skip-superuser', action='store_true', help="Do not create the superuser.")
+
+    def handle(self, *args, **options):
+        self.database = options['database']
+        self.timings = {}
+        started = time.perf_counter()
+
+        with self.advisory_lock(options['lock_timeout']):
+            with self.phase('migrate'):
+                self.migrate()
+            if not options['skip_static']:
+                with self.phase('publishstatic'):
+                    call_command('publishstatic')
+            if not options['skip_superuser']:
+                with self.phase('superuser'):
+                    self.ensure_superuser()
+
+        self.timings['total'] = time.perf_counter() - started
+        summary = ', '.join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in self.timings.items())
+        logger.info(f"Release finished: {summary}")
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = time.perf_counter() - started
+
+    @contextmanager
+    def advisory_lock(self, timeout):
+        connection = connections[self.database]
+        if connection.vendor != 'postgresql':
+            yield
+            return
+
+        deadline = time.monotonic() + timeout
+        with self.phase('lock_wait'), connection.cursor() as cursor:
+            while True:
+                cursor.execute("SELECT pg_try_advisory_lock(%s)", [RELEASE_LOCK_KEY])
+                if cursor.fetchone()[0]:
+                    break
+                if time.monotonic() >= deadline:
+                    raise CommandError(f"Timed out after {timeout}s waiting for the release lock")
+                logger.info("Another instance is running the release steps, waiting...")
+                time.sleep(2)
+        try:
+            yield
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_unlock(%s)", [RELEASE_LOCK_KEY])
+
+    def migrate(self):
+        executor = MigrationExecutor(connections[self.database])
+        plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+        if not plan:
+            logger.info("Database schema is up to date, skipping migrate")
+            return
+        logger.info(f"Applying {len(plan)} migration(s)")
+        call_command('migrate', database=self.database, interactive=False, verbosity=1)
+
+    def ensure_superuser(self):
+        username = os.environ.get('DJANGO_SUPERUSER_USERNAME')
+        if not username:
+            logger.info("DJANGO_SUPERUSER_USERNAME is not set, skipping superuser creation")
+            return
+        User = get_user_model()
+        if User.objects.using(self.database).filter(is_superuser=True).exists():
+            logger.info("Superuser already exists, skipping creation")
+            return
+        logger.info(f"Creating superuser {username}")
+        call_command('createsuperuser', interactive=False, database=self.database, verbosity=0)
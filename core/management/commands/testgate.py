@@ -0,0 +1,106 @@
+import os
+import queue
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+@dataclass
+class SuiteResult:
+    stage: str
+    suite: str
+    ok: bool
+    seconds: float
+    output: str = ''
+
+
+def run_stages(stages, run_suite, jobs):
+    """Run ``stages`` in order, the suites of each stage on up to ``jobs`` slots.
+
+    ``run_suite(suite, slot)`` returns ``(ok, output)``. A slot is only used by
+    one suite at a time, so each slot can own a test database. Stops after
+    the first stage with a failing suite and returns every result so far.
+    """
+    slots = queue.Queue()
+    for slot in range(1, jobs + 1):
+        slots.put(slot)
+
+    def run(stage, suite):
+        slot = slots.get()
+        started = time.perf_counter()
+        try:
+            ok, output = run_suite(suite, slot)
+        finally:
+            slots.put(slot)
+        return SuiteResult(stage, suite, ok, time.perf_counter() - started, output)
+
+    results = []
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        for stage, suites in stages:
+            stage_results = list(executor.map(lambda suite: run(stage, suite), suites))
+            results.extend(stage_results)
+            if not all(result.ok for result in stage_results):
+                break
+    return results
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the deploy test gate: TEST_GATE_STAGES in order, the suites of each "
+        "stage in parallel processes with reusable per-process test databases."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jobs', type=int, default=None, help="Parallel test processes (default: CPU count, at least 2).")
+        parser.add_argument('--fresh', action='store_true', help="Recreate the test databases instead of keeping them.")
+        parser.add_argument('--stage', action='append', help="Only run this stage; repeatable.")
+
+    def handle(self, *args, **options):
+        stages = settings.TEST_GATE_STAGES
+        if options['stage']:
+            unknown = set(options['stage']) - {name for name, _ in stages}
+            if unknown:
+                raise CommandError(f"Unknown stage(s): {', '.join(sorted(unknown))}")
+            stages = [(name, suites) for name, suites in stages if name in options['stage']]
+        jobs = options['jobs'] or max(2, os.cpu_count() or 1)
+        self.keepdb = not options['fresh']
+        self.verbosity = options['verbosity']
+
+        started = time.perf_counter()
+        results = run_stages(stages, self.run_suite, jobs)
+        total = time.perf_counter() - started
+
+        self.stdout.write(f"{'stage':<14}{'suite':<44}{'seconds':>9}  result")
+        for result in results:
+            self.stdout.write(
+                f"{result.stage:<14}{result.suite:<44}{result.seconds:>9.2f}  {'ok' if result.ok else 'FAILED'}"
+            )
+        self.stdout.write(f"{'total':<58}{total:>9.2f}  ({jobs} processes)")
+
+        failed = [result for result in results if not result.ok]
+        for result in failed:
+            self.stderr.write(f"\n===== {result.suite} =====\n{result.output}")
+        skipped = [name for name, _ in stages[len({result.stage for result in results}):]]
+        if failed:
+            message = f"{len(failed)} suite(s) failed: {', '.join(result.suite for result in failed)}"
+            if skipped:
+                message += f"; skipped stages: {', '.join(skipped)}"
+            raise CommandError(message)
+        self.stdout.write(self.style.SUCCESS("All test gate stages passed"))
+
+    def run_suite(self, suite, slot):
+        command = [sys.executable, 'manage.py', 'test', suite, '--noinput', '--verbosity', str(self.verbosity)]
+        if self.keepdb:
+            command.append('--keepdb')
+        # DJANGO_SETTINGS_MODULE (also set by --settings) is inherited. Requests
+        # over their query budget or with N+1 patterns fail the suite.
+        env = {'QUERY_AUDIT_MODE': 'raise', **os.environ, 'TEST_DB_SLOT': f'gate{slot}'}
+        result = subprocess.run(command, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+        if self.verbosity >= 2:
+            self.stdout.write(result.stdout + result.stderr)
+        return result.returncode == 0, result.stdout + result.stderr
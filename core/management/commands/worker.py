@@ -0,0 +1,108 @@
+import os
+import signal
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from loguru import logger
+
+from core import jobs
+from core.metrics import registry
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = registry.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Run background jobs from the core.Job table. Start one per instance (or "
+        "more); workers share the queue through SELECT ... FOR UPDATE SKIP LOCKED."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queue', action='append', help="Queue to take jobs from; repeatable (default: default).")
+        parser.add_argument('--concurrency', type=int, default=None,
+                            help="Jobs run at the same time, one thread each (default: TASK_WORKER_CONCURRENCY).")
+        parser.add_argument('--poll-interval', type=float, default=None,
+                            help="Seconds to wait when the queue is empty (default: TASK_POLL_INTERVAL).")
+        parser.add_argument('--burst', action='store_true', help="Exit once the queues are empty.")
+        parser.add_argument('--metrics-port', type=int, default=None,
+                            help="Serve the worker's Prometheus metrics on this port.")
+
+    def handle(self, *args, **options):
+        jobs.autodiscover()
+        queues = options['queue'] or ['default']
+        concurrency = options['concurrency'] or getattr(settings, 'TASK_WORKER_CONCURRENCY', 4)
+        poll_interval = options['poll_interval'] or getattr(settings, 'TASK_POLL_INTERVAL', 1.0)
+        name = f"{socket.gethostname()}:{os.getpid()}"
+        stop = threading.Event()
+
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(signum, lambda *_: stop.set())
+        if options['metrics_port']:
+            server = ThreadingHTTPServer(('', options['metrics_port']), MetricsHandler)
+            threading.Thread(target=server.serve_forever, name='worker-metrics', daemon=True).start()
+
+        requeued = jobs.requeue_stale()
+        if requeued:
+            logger.warning(f"Requeued {requeued} stale job(s)")
+        logger.info(f"Worker {name} started: queues={','.join(queues)} concurrency={concurrency}")
+
+        def loop(index):
+            try:
+                jobs.work(queues, f'{name}/{index}', stop, poll_interval, options['burst'])
+            finally:
+                # Each thread owns its database connection.
+                connection.close()
+
+        threads = [
+            threading.Thread(target=loop, args=(index,), name=f'worker-{index}')
+            for index in range(1, concurrency + 1)
+        ]
+        for thread in threads:
+            thread.start()
+        # Meanwhile, look for jobs abandoned by workers that died.
+        timeout = getattr(settings, 'TASK_VISIBILITY_TIMEOUT', 30 * 60)
+        interval = min(timeout, 60)
+        failures = 0
+        checked = time.monotonic()
+        try:
+            while not stop.is_set() and any(thread.is_alive() for thread in threads):
+                stop.wait(1.0)
+                if options['burst'] or time.monotonic() - checked < interval:
+                    continue
+                checked = time.monotonic()
+                close_old_connections()
+                try:
+                    requeued = jobs.requeue_stale(timeout)
+                except Exception:
+                    # As in jobs.work(): ride out a failover, back off meanwhile.
+                    failures += 1
+                    wait = min(interval * 2 ** failures, getattr(settings, 'TASK_WORKER_MAX_BACKOFF', 60))
+                    checked += wait - interval
+                    logger.exception(f"Worker {name} failed to requeue stale jobs, retrying in {wait:.0f}s")
+                    continue
+                failures = 0
+                if requeued:
+                    logger.warning(f"Requeued {requeued} stale job(s)")
+        finally:
+            # On SIGTERM (or an error here), running jobs finish before the process exits.
+            stop.set()
+            for thread in threads:
+                thread.join()
+        logger.info(f"Worker {name} stopped")
@@ -0,0 +1,202 @@
+"""Media delivery from the default S3 storage.
+
+Objects under ``MEDIA_STORAGE_PREFIX`` are either streamed through the app in
+``MEDIA_STREAM_CHUNK_SIZE`` chunks, never holding the whole file in memory, or
+answered with a short-lived signed redirect (CloudFront when a key pair is
+configured, S3 presigned otherwise) so large downloads bypass the instances.
+``MEDIA_DELIVERY`` picks ``stream``, ``redirect`` or ``auto`` (redirect from
+``MEDIA_REDIRECT_MIN_BYTES`` up, after a ``HeadObject`` for the size).
+
+Single byte ranges are passed to S3 as-is, so seeking in video or resuming a
+download only transfers the requested bytes.
+"""
+import re
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import SuspiciousOperation
+from django.core.files.storage import storages
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.utils.http import http_date
+from storages.utils import clean_name
+
+STREAM = 'stream'
+REDIRECT = 'redirect'
+AUTO = 'auto'
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def parse_range(header):
+    """Return the S3 ``Range`` value for a single byte range, or None for the whole object.
+
+    Multiple or malformed ranges are ignored, which RFC 9110 allows: the
+    client then gets a regular 200 with the full body.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if match is None:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if start and end and int(end) < int(start):
+        return None
+    return f'bytes={start}-{end}'
+
+
+def iter_body(body, chunk_size):
+    try:
+        yield from body.iter_chunks(chunk_size)
+    finally:
+        body.close()
+
+
+async def aiter_body(body, chunk_size):
+    # Each read blocks on the socket, so it runs in a worker thread; not the
+    # shared sync thread, which would serialize concurrent downloads.
+    chunks = body.iter_chunks(chunk_size)
+    read = sync_to_async(next, thread_sensitive=False)
+    try:
+        while True:
+            chunk = await read(chunks, None)
+            if chunk is None:
+                break
+            yield chunk
+    finally:
+        await sync_to_async(body.close, thread_sensitive=False)()
+
+
+def media_name(name):
+    """Return the storage name of media ``name``; raises ``Http404`` outside the media prefix."""
+    prefix = getattr(settings, 'MEDIA_STORAGE_PREFIX', 'media')
+    try:
+        cleaned = clean_name(f'{prefix}/{name}')
+    except SuspiciousOperation:
+        raise Http404("Invalid media path")
+    if not cleaned.startswith(f'{prefix}/'):
+        raise Http404("Invalid media path")
+    return cleaned
+
+
+def _media_name(storage, name):
+    """Return the storage name for media ``name`` and its S3 key."""
+    name = media_name(name)
+    try:
+        return name, storage.object_key(name)
+    except SuspiciousOperation:
+        raise Http404("Invalid media path")
+
+
+def _error_code(error):
+    return error.response.get('Error', {}).get('Code')
+
+
+def _object_headers(response, obj):
+    response['Accept-Ranges'] = 'bytes'
+    if obj.get('ETag'):
+        response['ETag'] = obj['ETag']
+    if obj.get('LastModified'):
+        response['Last-Modified'] = http_date(obj['LastModified'].timestamp())
+    if obj.get('CacheControl'):
+        response['Cache-Control'] = obj['CacheControl']
+    return response
+
+
+def _redirect(storage, media_name):
+    expire = getattr(settings, 'MEDIA_URL_EXPIRY', 300)
+    response = HttpResponseRedirect(storage.signed_url(media_name, expire))
+    # The URL expires; caches must not keep the redirect longer than that.
+    response['Cache-Control'] = f'private, max-age={max(expire - 30, 0)}'
+    return response
+
+
+def _get_object(client, params):
+    from botocore.exceptions import ClientError
+    try:
+        return client.get_object(**params), None
+    except ClientError as e:
+        return None, e
+
+
+def _head_object(client, params):
+    from botocore.exceptions import ClientError
+    try:
+        return client.head_object(**params), None
+    except ClientError as e:
+        return None, e
+
+
+def serve_media(request, name):
+    """Stream or redirect to the media object ``name``."""
+    storage = storages['default']
+    media_name, key = _media_name(storage, name)
+    delivery = getattr(settings, 'MEDIA_DELIVERY', AUTO)
+    if delivery == REDIRECT:
+        return _redirect(storage, media_name)
+
+    client = storage.connection.meta.client
+    params = {'Bucket': storage.bucket_name, 'Key': key}
+    if request.headers.get('If-None-Match'):
+        params['IfNoneMatch'] = request.headers['If-None-Match']
+
+    obj, error = None, None
+    if request.method == 'HEAD' or delivery == AUTO:
+        # In auto mode the size decides, so large objects are never opened.
+        obj, error = _head_object(client, params)
+    if error is None and request.method != 'HEAD':
+        if delivery == AUTO and obj['ContentLength'] >= getattr(settings, 'MEDIA_REDIRECT_MIN_BYTES', 8 * 1024 * 1024):
+            return _redirect(storage, media_name)
+        s3_range = parse_range(request.headers.get('Range'))
+        if s3_range:
+            params['Range'] = s3_range
+        obj, error = _get_object(client, params)
+
+    if error is not None:
+        code = _error_code(error)
+        if code in ('NoSuchKey', '404', 'NotFound'):
+            raise Http404("Media not found")
+        if code in ('304', 'NotModified'):
+            response = HttpResponse(status=304)
+            response['ETag'] = params['IfNoneMatch']
+            return response
+        if code == 'InvalidRange':
+            response = HttpResponse(status=416)
+            size = error.response['Error'].get('ActualObjectSize')
+            if size:
+                response['Content-Range'] = f'bytes */{size}'
+            return response
+        raise error
+
+    content_type = obj.get('ContentType') or 'application/octet-stream'
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type)
+        response['Content-Length'] = obj['ContentLength']
+        return _object_headers(response, obj)
+
+    body = obj['Body']
+    chunk_size = getattr(settings, 'MEDIA_STREAM_CHUNK_SIZE', 256 * 1024)
+    # Django buffers a sync iterator under ASGI (and an async one under WSGI),
+    # so hand it the kind the server consumes natively.
+    if isinstance(request, ASGIRequest):
+        content = aiter_body(body, chunk_size)
+    else:
+        content = iter_body(body, chunk_size)
+    response = StreamingHttpResponse(
+        content,
+        status=206 if obj.get('ContentRange') else 200,
+        content_type=content_type,
+    )
+    response['Content-Length'] = obj['ContentLength']
+    if obj.get('ContentRange'):
+        response['Content-Range'] = obj['ContentRange']
+    return _object_headers(response, obj)
+
+
+async def aserve_media(request, name):
+    """``serve_media()`` for async views.
+
+    The S3 request blocks, so it runs in a worker thread; not the shared sync
+    thread, which would serialize concurrent downloads.
+    """
+    return await sync_to_async(serve_media, thread_sensitive=False)(request, name)
@@ -0,0 +1,136 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.deprecation import MiddlewareMixin
+
+from core import admission
+
+
+def release(slots):
+    for slot in slots:
+        slot.release()
+
+
+class AdmissionMiddleware:
+    """Shed requests this process cannot serve promptly with a fast 503.
+
+    Placed right after ``RequestTimingMiddleware`` so a shed request costs
+    almost nothing and still shows up in the request metrics. See
+    ``core.admission`` for the limits it applies.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if admission.is_priority(request):
+            return self.get_response(request)
+        route, slots, upstream, rejected = self.begin(request)
+        if rejected:
+            return rejected
+        started = time.monotonic()
+        held = []
+        for slot in slots:
+            if not slot.acquire(self.remaining(started)):
+                break
+            held.append(slot)
+        response = None
+        try:
+            if len(held) < len(slots):
+                return self.shed(route)
+            self.admitted(route, upstream, started)
+            response = self.get_response(request)
+            return response
+        finally:
+            if not self.release_on_close(response, held):
+                release(held)
+
+    async def __acall__(self, request):
+        if admission.is_priority(request):
+            return await self.get_response(request)
+        route, slots, upstream, rejected = self.begin(request)
+        if rejected:
+            return rejected
+        started = time.monotonic()
+        held = []
+        for slot in slots:
+            if not await slot.aacquire(self.remaining(started)):
+                break
+            held.append(slot)
+        response = None
+        try:
+            if len(held) < len(slots):
+                return self.shed(route)
+            self.admitted(route, upstream, started)
+            response = await self.get_response(request)
+            return response
+        finally:
+            if not self.release_on_close(response, held):
+                release(held)
+
+    def release_on_close(self, response, held):
+        """Keep ``held`` until a streaming ``response`` is closed; returns whether it took them.
+
+        A streaming body is produced after the middleware returns, often the
+        longest part of the request. The server closes the response once the
+        body is sent or the client went away.
+        """
+        if response is None or not response.streaming or not held:
+            return False
+        close = response.close
+        released = []
+
+        def close_and_release():
+            try:
+                close()
+            finally:
+                if not released:
+                    released.append(True)
+                    release(held)
+
+        response.close = close_and_release
+        return True
+
+    def begin(self, request):
+        route, slots = admission.slots_for(request)
+        upstream = admission.upstream_queue_seconds(request)
+        limit = getattr(settings, 'ADMISSION_MAX_QUEUE_SECONDS', None)
+        if upstream is not None and limit and upstream > limit:
+            return route, slots, upstream, admission.reject(
+                503, 'queue_time', route, getattr(settings, 'ADMISSION_RETRY_AFTER', 1))
+        return route, slots, upstream, None
+
+    def remaining(self, started):
+        # One timeout covers waiting for the route and the process slots.
+        return max(0.0, getattr(settings, 'ADMISSION_QUEUE_TIMEOUT', 0.0) - (time.monotonic() - started))
+
+    def admitted(self, route, upstream, started):
+        admission.QUEUE_TIME.observe((upstream or 0.0) + time.monotonic() - started, route=route)
+
+    def shed(self, route):
+        return admission.reject(503, 'concurrency', route, getattr(settings, 'ADMISSION_RETRY_AFTER', 1))
+
+
+class RateLimitMiddleware(MiddlewareMixin):
+    """Answer 429 to clients that exceed their ``ADMISSION_RATE_LIMITS`` token bucket.
+
+    Placed after the authentication middleware so signed-in users are
+    limited per user rather than per address.
+    """
+
+    def process_request(self, request):
+        if admission.is_priority(request):
+            return None
+        limited = admission.rate_limit(request)
+        if limited:
+            route, wait = limited
+            return admission.reject(429, 'rate', route, wait)
+        return None
@@ -0,0 +1,97 @@
+"""Central ``Cache-Control`` policies, strong ETags and conditional GET.
+
+``CACHE_CONTROL_POLICIES`` maps path regular expressions to
+``patch_cache_control`` directives; the first pattern matching the request
+path applies::
+
+    CACHE_CONTROL_POLICIES = [
+        (r'^/core/home/$', {'public': True, 'max_age': 60, 's_maxage': 300, 'stale_while_revalidate': 60}),
+        (r'^/admin/', {'private': True, 'no_store': True}),
+    ]
+
+``s-maxage`` and ``stale-while-revalidate`` are read by CloudFront (browsers
+ignore ``s-maxage``), so a public page can be kept at the edge longer than in
+browsers and refreshed in the background. A public policy is never applied to
+a response that sets cookies, varies on ``Cookie`` or was marked ``private`` or
+``no-store`` by the view: those are sent ``private`` instead, so a page built
+for one user never lands in a shared cache.
+
+Successful GET responses up to ``ETAG_MAX_BYTES`` without an ETag get a strong
+one (a BLAKE2b digest of the body, faster than MD5), and ``If-None-Match`` /
+``If-Modified-Since`` are answered with a 304 as ``ConditionalGetMiddleware``
+does.
+"""
+import hashlib
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, has_vary_header, patch_cache_control
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.http import parse_http_date_safe
+
+PUBLIC_DIRECTIVES = ('public', 's_maxage', 'stale_while_revalidate', 'stale_if_error')
+
+
+@lru_cache(maxsize=None)
+def _compile(pattern):
+    return re.compile(pattern)
+
+
+def policy_for(path):
+    """The directives of the first ``CACHE_CONTROL_POLICIES`` entry matching ``path``, or None."""
+    for pattern, directives in getattr(settings, 'CACHE_CONTROL_POLICIES', ()):
+        if _compile(pattern).search(path):
+            return directives
+    return None
+
+
+def is_shared_cacheable(response):
+    """False for responses that may be specific to one user."""
+    cache_control = response.get('Cache-Control', '')
+    return not (
+        response.cookies
+        or has_vary_header(response, 'Cookie')
+        or 'private' in cache_control
+        or 'no-store' in cache_control
+    )
+
+
+def apply_policy(response, directives):
+    if not directives.get('public') or (response.status_code == 200 and is_shared_cacheable(response)):
+        patch_cache_control(response, **directives)
+        return
+    if response.status_code != 200:
+        # Errors and redirects are not kept at the edge.
+        return
+    private = {k: v for k, v in directives.items() if k not in PUBLIC_DIRECTIVES}
+    patch_cache_control(response, private=True, **private)
+
+
+def etag_for(content):
+    return f'"{hashlib.blake2b(content, digest_size=16).hexdigest()}"'
+
+
+class CacheControlMiddleware(MiddlewareMixin):
+    """Apply ``CACHE_CONTROL_POLICIES``, add strong ETags and answer conditional GETs."""
+
+    def process_response(self, request, response):
+        if request.method not in ('GET', 'HEAD'):
+            return response
+        directives = policy_for(request.path_info)
+        if directives is not None:
+            apply_policy(response, directives)
+
+        if response.status_code != 200 or 'no-store' in response.get('Cache-Control', ''):
+            return response
+        if (
+            not response.has_header('ETag')
+            and not response.streaming
+            and len(response.content) <= getattr(settings, 'ETAG_MAX_BYTES', 1024 * 1024)
+        ):
+            response['ETag'] = etag_for(response.content)
+        etag = response.get('ETag')
+        last_modified = parse_http_date_safe(response.get('Last-Modified', ''))
+        if etag or last_modified:
+            return get_conditional_response(request, etag=etag, last_modified=last_modified, response=response)
+        return response
@@ -0,0 +1,190 @@
+"""Response compression: brotli when the client accepts it, gzip otherwise.
+
+Unlike Django's ``GZipMiddleware``, only text-like content types are
+compressed (``COMPRESSIBLE_CONTENT_TYPES``; images, video and archives are
+compressed already), bodies smaller than ``COMPRESSION_MIN_BYTES`` are left
+alone, and streaming responses are compressed chunk by chunk, flushing after
+each one so streamed output is not held back.
+
+Brotli needs the optional ``brotli`` package; without it only gzip is offered.
+Both use a low level (``COMPRESSION_GZIP_LEVEL``, ``COMPRESSION_BROTLI_QUALITY``)
+because responses are compressed on every request. Compressed responses get
+``Vary: Accept-Encoding`` and, as in Django, a weak ETag: the bytes differ from
+the identity encoding the strong ETag was computed on.
+
+As in Django's ``GZipMiddleware``, gzip output carries up to
+``COMPRESSION_GZIP_MAX_RANDOM_BYTES`` random bytes in its header, which makes
+the compressed length useless to BREACH-style attacks on secrets in the page.
+Brotli has no such field, so ``private`` and ``no-store`` responses, the ones
+that carry secrets, always get gzip.
+"""
+import secrets
+import struct
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.regex_helper import _lazy_re_compile
+
+try:
+    import brotli
+except ImportError:  # Optional dependency
+    brotli = None
+
+_ENCODING_RE = _lazy_re_compile(r'^\s*([^\s;]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*$')
+
+
+def accepted_encodings(header):
+    """Return the codings accepted by an ``Accept-Encoding`` header (``q=0`` excluded)."""
+    accepted = set()
+    for item in header.split(','):
+        match = _ENCODING_RE.match(item)
+        if not match:
+            continue
+        coding, q = match.group(1).lower(), match.group(2)
+        try:
+            if q is not None and float(q) <= 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(coding)
+    return accepted
+
+
+def choose_encoding(header, allow_brotli=True):
+    """The coding to use for a request's ``Accept-Encoding``: ``'br'``, ``'gzip'`` or None."""
+    accepted = accepted_encodings(header or '')
+    if brotli is not None and allow_brotli and ('br' in accepted or '*' in accepted):
+        return 'br'
+    if 'gzip' in accepted or '*' in accepted:
+        return 'gzip'
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding):
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 4))
+            self.compress = self._compressor.process
+            self.flush = self._compressor.flush
+            self.finish = self._compressor.finish
+        else:
+            self._compressor = _GzipCompressor()
+            self.compress = self._compressor.compress
+            self.flush = self._compressor.flush
+            self.finish = self._compressor.finish
+
+
+class _GzipCompressor:
+    """A gzip stream whose header holds a file name of random length (BREACH mitigation)."""
+
+    def __init__(self):
+        # Raw deflate (wbits=-15): the gzip header and trailer are written here.
+        self._deflate = zlib.compressobj(getattr(settings, 'COMPRESSION_GZIP_LEVEL', 6), zlib.DEFLATED, -15)
+        self._crc = 0
+        self._size = 0
+        max_random_bytes = getattr(settings, 'COMPRESSION_GZIP_MAX_RANDOM_BYTES', 100)
+        name = b'a' * secrets.randbelow(max_random_bytes) if max_random_bytes else b''
+        # Magic, deflate, FNAME flag, no mtime, no extra flags, unknown OS.
+        self._header = b'\x1f\x8b\x08' + (b'\x08' if name else b'\x00') + b'\x00\x00\x00\x00\x00\xff'
+        if name:
+            self._header += name + b'\x00'
+
+    def _with_header(self, data):
+        header, self._header = self._header, b''
+        return header + data
+
+    def compress(self, data):
+        self._crc = zlib.crc32(data, self._crc)
+        self._size += len(data)
+        return self._with_header(self._deflate.compress(data))
+
+    def flush(self):
+        return self._with_header(self._deflate.flush(zlib.Z_SYNC_FLUSH))
+
+    def finish(self):
+        trailer = struct.pack('<II', self._crc, self._size & 0xFFFFFFFF)
+        return self._with_header(self._deflate.flush() + trailer)
+
+
+def compress_bytes(data, encoding):
+    compressor = _Compressor(encoding)
+    return compressor.compress(data) + compressor.finish()
+
+
+def compress_stream(chunks, encoding):
+    compressor = _Compressor(encoding)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def acompress_stream(chunks, encoding):
+    compressor = _Compressor(encoding)
+    async for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def is_compressible(response):
+    content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+    types = getattr(settings, 'COMPRESSIBLE_CONTENT_TYPES', ('text/',))
+    return any(content_type.startswith(prefix) for prefix in types)
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Compress text responses with brotli or gzip, streamed ones included.
+
+    Goes above every middleware that reads or changes the response body, and
+    below ``CacheControlMiddleware``'s ETag so validators describe the
+    uncompressed content.
+    """
+
+    def process_response(self, request, response):
+        if (
+            response.has_header('Content-Encoding')
+            # Byte ranges refer to the identity encoding.
+            or response.status_code == 206
+            or response.has_header('Content-Range')
+            or not is_compressible(response)
+        ):
+            return response
+        min_bytes = getattr(settings, 'COMPRESSION_MIN_BYTES', 1024)
+        if not response.streaming and len(response.content) < min_bytes:
+            return response
+        if response.streaming and int(response.get('Content-Length') or min_bytes) < min_bytes:
+            return response
+
+        # From here on the representation depends on Accept-Encoding.
+        patch_vary_headers(response, ('Accept-Encoding',))
+        cache_control = response.get('Cache-Control', '')
+        encoding = choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING'),
+            allow_brotli='private' not in cache_control and 'no-store' not in cache_control,
+        )
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = acompress_stream(response.streaming_content, encoding)
+            else:
+                response.streaming_content = compress_stream(response.streaming_content, encoding)
+            del response['Content-Length']
+        else:
+            compressed = compress_bytes(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
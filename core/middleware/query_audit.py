@@ -0,0 +1,63 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from core import query_audit
+
+
+class QueryAuditMiddleware:
+    """Count each request's queries and check them against the view's budget.
+
+    Reports query budget overruns and N+1 patterns as described in
+    ``core.query_audit``, according to ``QUERY_AUDIT_MODE``. Capturing stacks
+    has a cost, so with ``off`` (the default) requests are not audited at all
+    and production runs it in ``log`` mode only when needed.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if self.mode() == query_audit.OFF:
+            return self.get_response(request)
+        audit, token = self.begin(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            query_audit.end(token)
+        self.finish(request, audit)
+        return response
+
+    async def __acall__(self, request):
+        if self.mode() == query_audit.OFF:
+            return await self.get_response(request)
+        audit, token = self.begin(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            query_audit.end(token)
+        self.finish(request, audit)
+        return response
+
+    def mode(self):
+        return getattr(settings, 'QUERY_AUDIT_MODE', query_audit.LOG)
+
+    def begin(self, request):
+        audit = query_audit.QueryAudit(f'{request.method} {request.path}')
+        return audit, query_audit.begin(audit)
+
+    def finish(self, request, audit):
+        mode = self.mode()
+        match = getattr(request, 'resolver_match', None)
+        if match is not None:
+            audit.label = f'{audit.label} ({match.view_name})'
+            audit.budget = query_audit.budget_for(match.view_name, match.func)
+        else:
+            audit.budget = query_audit.budget_for(None)
+        audit.check(mode)
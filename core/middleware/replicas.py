@@ -0,0 +1,56 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from core import db_router
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+class ReplicaPinMiddleware:
+    """Read from the primary for the rest of a request, and a while after, once it writes.
+
+    Unsafe methods read from the primary throughout, since they usually read
+    what they are about to change. After a write the response sets the
+    ``DB_PIN_COOKIE`` cookie for ``DB_PIN_SECONDS``; requests carrying it read
+    from the primary too, so a redirect after a POST shows the new data.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        pin, token = self.begin(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            db_router.end(token)
+        return self.finish(request, response, pin)
+
+    async def __acall__(self, request):
+        pin, token = self.begin(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            db_router.end(token)
+        return self.finish(request, response, pin)
+
+    def begin(self, request):
+        cookie = getattr(settings, 'DB_PIN_COOKIE', 'db_pin')
+        pin = db_router.Pin(primary=request.method not in SAFE_METHODS or cookie in request.COOKIES)
+        return pin, db_router.begin(pin)
+
+    def finish(self, request, response, pin):
+        seconds = getattr(settings, 'DB_PIN_SECONDS', 5)
+        if pin.wrote and seconds:
+            response.set_cookie(
+                getattr(settings, 'DB_PIN_COOKIE', 'db_pin'), '1', max_age=seconds,
+                secure=request.is_secure(), httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,77 @@
+"""Session, CSRF, auth and messages middleware that skip stateless routes.
+
+Health probes, ``/core/hello/`` and the metrics scrape never use a session or a
+user, yet the stock middleware loads the session (a DB query with the database
+session engine, and ``CSRF_USE_SESSIONS`` needs it on every request). These
+subclasses behave exactly like Django's for every other path; for paths under
+``STATELESS_PATH_PREFIXES`` they pass the request straight through, so
+``request.session``, ``request.user`` and messages are not available there.
+
+Being subclasses, they still satisfy the admin system checks. Django's error
+views read the CSRF token as well, so ``project.urls`` installs the
+variants below as error handlers.
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.messages.middleware import MessageMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.middleware.csrf import CsrfViewMiddleware
+from django.views import defaults
+
+
+def is_stateless_request(request):
+    """Return True if ``request`` targets a route that must not touch state."""
+    stateless = getattr(request, '_stateless', None)
+    if stateless is None:
+        prefixes = tuple(getattr(settings, 'STATELESS_PATH_PREFIXES', ()))
+        stateless = request._stateless = bool(prefixes) and request.path_info.startswith(prefixes)
+    return stateless
+
+
+class StatelessBypassMixin:
+    """Skip the wrapped middleware's hooks for stateless routes."""
+
+    def __call__(self, request):
+        if is_stateless_request(request):
+            # In async mode this returns the coroutine, as MiddlewareMixin does.
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class LeanSessionMiddleware(StatelessBypassMixin, SessionMiddleware):
+    pass
+
+
+class LeanCsrfViewMiddleware(StatelessBypassMixin, CsrfViewMiddleware):
+    def process_view(self, request, callback, callback_args, callback_kwargs):
+        # Called by the handler directly, not through __call__.
+        if is_stateless_request(request):
+            return None
+        return super().process_view(request, callback, callback_args, callback_kwargs)
+
+
+class LeanAuthenticationMiddleware(StatelessBypassMixin, AuthenticationMiddleware):
+    pass
+
+
+class LeanMessageMiddleware(StatelessBypassMixin, MessageMiddleware):
+    pass
+
+
+def _stateless_error_view(view):
+    # The default error views are wrapped in requires_csrf_token, which needs
+    # request.session under CSRF_USE_SESSIONS; call the plain view instead.
+    @wraps(view)
+    def handler(request, *args, **kwargs):
+        if is_stateless_request(request):
+            return view.__wrapped__(request, *args, **kwargs)
+        return view(request, *args, **kwargs)
+    return handler
+
+
+bad_request = _stateless_error_view(defaults.bad_request)
+permission_denied = _stateless_error_view(defaults.permission_denied)
+page_not_found = _stateless_error_view(defaults.page_not_found)
+server_error = _stateless_error_view(defaults.server_error)
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageVariant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=1024)),
+                ('source_etag', models.CharField(max_length=255)),
+                ('width', models.PositiveIntegerField()),
+                ('format', models.CharField(max_length=8)),
+                ('name', models.CharField(max_length=1024)),
+                ('size', models.PositiveIntegerField()),
+                ('image_width', models.PositiveIntegerField()),
+                ('image_height', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('source', 'width', 'format'), name='core_imagevariant_unique')],
+            },
+        ),
+    ]
@@ -1,3 +1,113 @@
+import uuid
+
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
+
+
+class Upload(models.Model):
+    """A direct-to-S3 multipart upload, from creation until completed or aborted.
+
+    The file never passes through the app: clients PUT each part to a
+    presigned URL and the server only creates, completes or aborts the
+    multipart upload (see ``core.uploads``).
+    """
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        COMPLETED = 'completed', 'Completed'
+        ABORTED = 'aborted', 'Aborted'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='uploads')
+    key = models.CharField(max_length=1024)
+    upload_id = models.CharField(max_length=1024)
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    part_size = models.BigIntegerField()
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.PENDING, db_index=True)
+    etag = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.filename} ({self.status})"
+
+    @property
+    def part_count(self):
+        return max(1, -(-self.size // self.part_size))
+
+
+class Job(models.Model):
+    """A background task queued in the database and run by ``manage.py worker``.
+
+    Workers claim ready jobs with ``SELECT ... FOR UPDATE SKIP LOCKED``, so any
+    number of them, on any instance, share the queue without handing out the
+    same job twice (see ``core.jobs``).
+    """
+
+    class Status(models.TextChoices):
+        QUEUED = 'queued', 'Queued'
+        RUNNING = 'running', 'Running'
+        DONE = 'done', 'Done'
+        FAILED = 'failed', 'Failed'
+
+    task = models.CharField(max_length=200)
+    kwargs = models.JSONField(default=dict, blank=True)
+    queue = models.CharField(max_length=64, default='default')
+    priority = models.SmallIntegerField(default=0)
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration = models.FloatField(null=True, blank=True)
+    worker = models.CharField(max_length=255, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            # Only queued rows are scanned when claiming, keep the index small.
+            models.Index(
+                fields=['queue', '-priority', 'run_at'],
+                name='core_job_ready_idx',
+                condition=models.Q(status='queued'),
+            ),
+            models.Index(fields=['status', 'started_at'], name='core_job_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.status})"
+
+
+class ImageVariant(models.Model):
+    """A resized or converted copy of a media image, stored in the default storage.
+
+    The index of derived images: one row per source, width and format, so a
+    variant is generated once and later requests redirect straight to it
+    (see ``core.images``).
+    """
+
+    source = models.CharField(max_length=1024)
+    source_etag = models.CharField(max_length=255)
+    width = models.PositiveIntegerField()
+    format = models.CharField(max_length=8)
+    name = models.CharField(max_length=1024)
+    size = models.PositiveIntegerField()
+    image_width = models.PositiveIntegerField()
+    image_height = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'width', 'format'], name='core_imagevariant_unique'),
+        ]
 
+    def __str__(self):
+        return f"{self.source} ({self.width}w {self.format})"
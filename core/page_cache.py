@@ -0,0 +1,117 @@
+"""Full-page caching with validators for conditional GET.
+
+``cache_page_conditional`` stores the rendered body of a view together with a
+strong ETag and a Last-Modified timestamp. Hits skip the view entirely, and
+clients revalidating with ``If-None-Match`` / ``If-Modified-Since`` get a 304
+without a body. Works for both sync and async views.
+
+Entries are keyed on the path and the query parameters the view declares in
+``query_params``, not on the Host header or the raw query string: otherwise
+every ``?x=<random>`` would store (and serve publicly) another copy and push
+real pages out of the cache.
+"""
+import hashlib
+import time
+from functools import wraps
+from urllib.parse import urlencode
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+CACHEABLE_METHODS = ('GET', 'HEAD')
+
+
+def page_cache_key(request, key_prefix='page', query_params=()):
+    """Return the cache key for ``request``: its path and the ``query_params`` it has, sorted."""
+    query = urlencode(sorted(
+        (name, value) for name in query_params for value in request.GET.getlist(name)
+    ))
+    path_hash = hashlib.md5(f'{request.path}?{query}'.encode(), usedforsecurity=False).hexdigest()
+    return f"{key_prefix}:{path_hash}"
+
+
+def _is_cacheable(response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and 'private' not in response.get('Cache-Control', '')
+    )
+
+
+def _entry_from_response(response):
+    content = response.content
+    return {
+        'content': content,
+        'content_type': response['Content-Type'],
+        'etag': f'"{hashlib.md5(content, usedforsecurity=False).hexdigest()}"',
+        'last_modified': int(time.time()),
+    }
+
+
+def _respond(request, entry, timeout):
+    response = get_conditional_response(
+        request,
+        etag=entry['etag'],
+        last_modified=entry['last_modified'],
+    )
+    if response is None:
+        response = HttpResponse(entry['content'], content_type=entry['content_type'])
+    response['ETag'] = entry['etag']
+    response['Last-Modified'] = http_date(entry['last_modified'])
+    patch_cache_control(response, public=True, max_age=timeout)
+    return response
+
+
+def cache_page_conditional(timeout=None, cache_alias='default', key_prefix='page', query_params=()):
+    """Cache a view's response for ``timeout`` seconds and answer conditional GETs.
+
+    ``timeout`` defaults to ``PAGE_CACHE_TIMEOUT``. Only successful responses
+    without cookies or ``Cache-Control: private`` are stored. ``query_params``
+    lists the query parameters the view's output depends on; others are
+    ignored.
+    """
+    def decorator(view):
+        def resolve_timeout():
+            return timeout if timeout is not None else getattr(settings, 'PAGE_CACHE_TIMEOUT', 60)
+
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def wrapper(request, *args, **kwargs):
+                if request.method not in CACHEABLE_METHODS:
+                    return await view(request, *args, **kwargs)
+                cache = caches[cache_alias]
+                key = page_cache_key(request, key_prefix, query_params)
+                entry = await cache.aget(key)
+                if entry is None:
+                    response = await view(request, *args, **kwargs)
+                    if not _is_cacheable(response):
+                        return response
+                    entry = _entry_from_response(response)
+                    await cache.aset(key, entry, resolve_timeout())
+                return _respond(request, entry, resolve_timeout())
+
+            return wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in CACHEABLE_METHODS:
+                return view(request, *args, **kwargs)
+            cache = caches[cache_alias]
+            key = page_cache_key(request, key_prefix, query_params)
+            entry = cache.get(key)
+            if entry is None:
+                response = view(request, *args, **kwargs)
+                if not _is_cacheable(response):
+                    return response
+                entry = _entry_from_response(response)
+                cache.set(key, entry, resolve_timeout())
+            return _respond(request, entry, resolve_timeout())
+
+        return wrapper
+
+    return decorator
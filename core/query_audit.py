@@ -0,0 +1,182 @@
+"""Query auditing: per-request query counts, N+1 detection and query budgets.
+
+While an audit is active (``QueryAuditMiddleware`` for requests,
+``audit_queries()`` in tests and scripts) every query run in the current
+context is counted and reduced to its *shape*: the SQL with literals and
+``IN`` lists replaced by placeholders. The same shape executed
+``QUERY_AUDIT_REPEAT_THRESHOLD`` times or more is the signature of an N+1
+loop; the first occurrence's stack (project frames only) is kept to point at
+the code that issued it.
+
+Budgets come from ``QUERY_BUDGETS`` (view name or ``fnmatch`` pattern, e.g.
+``'admin:*'``, to a maximum number of queries), from ``@query_budget(n)`` on a
+view, or from ``QUERY_BUDGET_DEFAULT``. ``QUERY_AUDIT_MODE`` decides what a
+violation does: ``log`` writes a warning, ``raise`` raises
+``QueryBudgetExceeded`` (an ``AssertionError``, so it fails tests).
+"""
+import fnmatch
+import os
+import re
+import traceback
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from loguru import logger
+
+OFF = 'off'
+LOG = 'log'
+RAISE = 'raise'
+
+_current_audit = ContextVar('query_audit', default=None)
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_RE = re.compile(r'\bIN \((?:\s*(?:%s|\?|%\(\w+\)s)\s*,?)+\)', re.IGNORECASE)
+_SPACE_RE = re.compile(r'\s+')
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised in ``raise`` mode when a request or block breaks its query budget."""
+
+
+def query_shape(sql):
+    """Return ``sql`` with literal values and ``IN`` lists replaced by ``?``."""
+    shape = _STRING_RE.sub('?', sql)
+    shape = _NUMBER_RE.sub('?', shape)
+    shape = shape.replace('%s', '?')
+    shape = _IN_RE.sub('IN (...)', shape)
+    return _SPACE_RE.sub(' ', shape).strip()
+
+
+def _project_stack():
+    # Frames from this repository only, skipping this module; Django and
+    # site-packages frames are the same for every query.
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(_PROJECT_ROOT)
+        and 'site-packages' not in frame.filename
+        and frame.filename != __file__
+    ]
+    return ''.join(traceback.format_list(frames[-8:]))
+
+
+class QueryAudit:
+    """Queries seen while the audit was active."""
+
+    def __init__(self, label, budget=None, repeat_threshold=None):
+        self.label = label
+        self.budget = budget
+        if repeat_threshold is None:
+            repeat_threshold = getattr(settings, 'QUERY_AUDIT_REPEAT_THRESHOLD', 5)
+        self.repeat_threshold = repeat_threshold
+        self.parent = None
+        self.count = 0
+        self.shapes = Counter()
+        self.stacks = {}
+
+    def record(self, sql):
+        self.count += 1
+        shape = query_shape(sql)
+        self.shapes[shape] += 1
+        if shape not in self.stacks:
+            self.stacks[shape] = _project_stack()
+        if self.parent is not None:
+            self.parent.record(sql)
+
+    def repeated(self):
+        """``[(shape, count)]`` for shapes run at least ``repeat_threshold`` times."""
+        if not self.repeat_threshold:
+            return []
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= self.repeat_threshold]
+
+    def problems(self):
+        """Describe every budget or N+1 violation, with the stack of each repeated query."""
+        problems = []
+        if self.budget is not None and self.count > self.budget:
+            problems.append(f"{self.label}: {self.count} queries, budget is {self.budget}")
+        for shape, n in self.repeated():
+            problems.append(
+                f"{self.label}: possible N+1, {n} queries with the same shape: {shape}\n"
+                f"First issued from:\n{self.stacks[shape] or '  (no project frames)'}"
+            )
+        return problems
+
+    def check(self, mode=RAISE):
+        problems = self.problems()
+        if not problems:
+            return
+        if mode == RAISE:
+            raise QueryBudgetExceeded('\n'.join(problems))
+        for problem in problems:
+            logger.warning(problem)
+
+
+def _audit_execute_wrapper(execute, sql, params, many, context):
+    audit = _current_audit.get()
+    if audit is not None:
+        audit.record(sql)
+    return execute(sql, params, many, context)
+
+
+def _install_audit_wrapper(sender, connection, **kwargs):
+    if _audit_execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_audit_execute_wrapper)
+
+
+def install():
+    connection_created.connect(_install_audit_wrapper, dispatch_uid='core.query_audit')
+
+
+def begin(audit):
+    # Nested audits (a test block around an audited request) both see the queries.
+    audit.parent = _current_audit.get()
+    return _current_audit.set(audit)
+
+
+def end(token):
+    _current_audit.reset(token)
+
+
+def budget_for(view_name, view_func=None):
+    """The query budget for a view: decorator, then ``QUERY_BUDGETS``, then the default."""
+    budget = getattr(view_func, 'query_budget', None)
+    if budget is not None:
+        return budget
+    budgets = getattr(settings, 'QUERY_BUDGETS', {})
+    if view_name in budgets:
+        return budgets[view_name]
+    for pattern, limit in budgets.items():
+        if fnmatch.fnmatchcase(view_name or '', pattern):
+            return limit
+    return getattr(settings, 'QUERY_BUDGET_DEFAULT', None)
+
+
+def query_budget(limit):
+    """Set the maximum number of queries a view may run per request."""
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
+
+
+@contextmanager
+def audit_queries(max_queries=None, repeat_threshold=None, label='block', mode=RAISE):
+    """Audit the queries run inside the block; check the limits on exit.
+
+    ::
+
+        with audit_queries(max_queries=5):
+            self.client.get(reverse('admin:core_job_changelist'))
+    """
+    audit = QueryAudit(label, max_queries, repeat_threshold)
+    token = begin(audit)
+    try:
+        yield audit
+    finally:
+        end(token)
+    audit.check(mode)
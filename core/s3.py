@@ -0,0 +1,144 @@
+"""Process-wide boto3 session and S3 clients.
+
+Creating a boto3 client resolves credentials, loads the service model and
+starts a new urllib3 connection pool, so building one per call (or per storage
+and thread, as django-storages does) repeats that work and throws away warm
+TLS connections. boto3 clients are thread-safe: one client per region and
+endpoint serves every Gunicorn thread, the storages, the log sink and the
+health checks.
+
+Sessions and connection pools must not cross ``fork()``. With ``preload_app``
+the master may have created clients before forking, so the registry is reset
+in the child (``os.register_at_fork``) and keyed by pid as a fallback.
+"""
+import os
+import threading
+
+from django.conf import settings
+
+DEFAULTS = {
+    'AWS_S3_MAX_POOL_CONNECTIONS': 50,
+    'AWS_S3_MAX_ATTEMPTS': 5,
+    'AWS_S3_RETRY_MODE': 'adaptive',
+    'AWS_S3_CONNECT_TIMEOUT': 5,
+    'AWS_S3_READ_TIMEOUT': 60,
+    'AWS_S3_TCP_KEEPALIVE': True,
+    'AWS_S3_SIGNATURE_VERSION': 's3v4',
+    'AWS_S3_ADDRESSING_STYLE': None,
+}
+
+_lock = threading.Lock()
+_pid = None
+_session = None
+_clients = {}
+_resource_class = None
+
+
+def _setting(name):
+    if settings.configured:
+        return getattr(settings, name, DEFAULTS[name])
+    return DEFAULTS[name]
+
+
+def client_config(signed=True):
+    """Return the botocore ``Config`` used for shared S3 clients."""
+    import botocore
+    from botocore.config import Config
+
+    return Config(
+        max_pool_connections=_setting('AWS_S3_MAX_POOL_CONNECTIONS'),
+        retries={'total_max_attempts': _setting('AWS_S3_MAX_ATTEMPTS'), 'mode': _setting('AWS_S3_RETRY_MODE')},
+        connect_timeout=_setting('AWS_S3_CONNECT_TIMEOUT'),
+        read_timeout=_setting('AWS_S3_READ_TIMEOUT'),
+        tcp_keepalive=_setting('AWS_S3_TCP_KEEPALIVE'),
+        signature_version=_setting('AWS_S3_SIGNATURE_VERSION') if signed else botocore.UNSIGNED,
+        s3={'addressing_style': _setting('AWS_S3_ADDRESSING_STYLE')},
+    )
+
+
+def reset():
+    """Forget the session and clients; the next call builds new ones."""
+    global _pid, _session, _resource_class
+    with _lock:
+        _pid = None
+        _session = None
+        _resource_class = None
+        _clients.clear()
+
+
+def _reset_after_fork():
+    # Another thread of the parent may have held _lock at fork time; the
+    # child has only this thread, so it takes a new lock instead of waiting.
+    global _lock, _pid, _session, _resource_class, _clients
+    _lock = threading.Lock()
+    _pid = None
+    _session = None
+    _resource_class = None
+    _clients = {}
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _check_pid():
+    # Caller holds _lock.
+    global _pid, _session, _resource_class
+    if _pid != os.getpid():
+        _pid = os.getpid()
+        _session = None
+        _resource_class = None
+        _clients.clear()
+
+
+def get_session():
+    """Return this process's boto3 session (default credential chain)."""
+    global _session
+    with _lock:
+        _check_pid()
+        if _session is None:
+            import boto3
+            _session = boto3.session.Session()
+        return _session
+
+
+def get_s3_client(region_name=None, endpoint_url=None, signed=True):
+    """Return the shared S3 client for ``region_name`` (default ``AWS_S3_REGION_NAME``).
+
+    ``endpoint_url`` defaults to ``AWS_S3_ENDPOINT_URL``, set to point at a
+    local S3-compatible server.
+    """
+    if settings.configured:
+        region_name = region_name or getattr(settings, 'AWS_S3_REGION_NAME', None)
+        endpoint_url = endpoint_url or getattr(settings, 'AWS_S3_ENDPOINT_URL', None)
+    key = (region_name, endpoint_url, signed)
+    client = _clients.get(key)
+    if client is not None and _pid == os.getpid():
+        return client
+    session = get_session()
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = session.client(
+                's3',
+                region_name=region_name,
+                endpoint_url=endpoint_url,
+                config=client_config(signed),
+            )
+        return client
+
+
+def get_s3_resource(region_name=None, endpoint_url=None, signed=True):
+    """Return a new S3 resource backed by the shared client.
+
+    Resources are not thread-safe, but wrapping an existing client is cheap:
+    no credential resolution, model loading or connection pool.
+    """
+    global _resource_class
+    client = get_s3_client(region_name, endpoint_url, signed)
+    resource_class = _resource_class
+    if resource_class is None:
+        # The class is generated from the resource model; build it once.
+        prototype = get_session().resource('s3', region_name=client.meta.region_name, config=client.meta.config)
+        resource_class = _resource_class = type(prototype)
+    return resource_class(client=client)
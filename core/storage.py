@@ -0,0 +1,83 @@
+"""Storage backends for S3, sharing the process-wide client from ``core.s3``."""
+import os
+
+from storages.backends.s3 import S3ManifestStaticStorage, S3Storage
+from storages.utils import clean_name
+
+from .s3 import get_s3_resource
+
+# Hashed names change whenever the content does, so CloudFront and browsers
+# may keep them forever.
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+class SharedClientMixin:
+    """Build the storage's per-thread S3 resources around the shared client.
+
+    django-storages creates a boto3 session and client per storage and thread.
+    Unless the storage has its own credentials or profile, reuse the
+    registry's client instead, with its pool size, keep-alive and retries.
+    """
+
+    def _uses_default_credentials(self):
+        # django-storages also picks up AWS_ACCESS_KEY_ID & co. from the
+        # environment, which is what boto3's default chain resolves too.
+        if self.session_profile:
+            return False
+        from_env = tuple(os.environ.get(name) for name in (
+            'AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY', 'AWS_SESSION_TOKEN'))
+        return (self.access_key, self.secret_key, self.security_token) in ((None, None, None), from_env)
+
+    @property
+    def connection(self):
+        if not self._uses_default_credentials():
+            return super().connection
+        connection = getattr(self._connections, 'connection', None)
+        if connection is None:
+            connection = self._connections.connection = get_s3_resource(self.region_name, self.endpoint_url)
+        return connection
+
+    @property
+    def unsigned_connection(self):
+        if not self._uses_default_credentials():
+            return super().unsigned_connection
+        connection = getattr(self._unsigned_connections, 'connection', None)
+        if connection is None:
+            connection = self._unsigned_connections.connection = get_s3_resource(
+                self.region_name, self.endpoint_url, signed=False)
+        return connection
+
+
+class SharedS3Storage(SharedClientMixin, S3Storage):
+    """Media storage on S3 using the shared client."""
+
+    def object_key(self, name):
+        """Return the S3 key for ``name``; raises SuspiciousOperation outside the location."""
+        return self._normalize_name(clean_name(name))
+
+    def signed_url(self, name, expire):
+        """Return a URL for ``name`` valid for ``expire`` seconds.
+
+        Signed by CloudFront when a key pair is configured with a custom domain,
+        otherwise an S3 presigned GET (generated locally, no request to S3).
+        """
+        if self.custom_domain and self.cloudfront_signer:
+            return self.url(name, expire=expire)
+        return self.connection.meta.client.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': self.bucket_name, 'Key': self.object_key(name)},
+            ExpiresIn=expire,
+        )
+
+
+class ManifestS3StaticStorage(SharedClientMixin, S3ManifestStaticStorage):
+    """S3 static storage that resolves ``{% static %}`` to content-hashed names.
+
+    The ``staticfiles.json`` manifest is written by ``manage.py publishstatic``,
+    which uploads the hashed copies with ``IMMUTABLE_CACHE_CONTROL`` and the
+    original names (used when ``DEBUG`` is on) with the storage's regular
+    ``object_parameters``.
+    """
+
+    def immutable_object_parameters(self):
+        return {**self.object_parameters, 'CacheControl': IMMUTABLE_CACHE_CONTROL}
@@ -0,0 +1,17 @@
+"""Background tasks of the core app, run by ``manage.py worker`` (see ``core.jobs``)."""
+from . import images
+from .jobs import task
+from .uploads import abort_upload, stale_uploads
+
+
+@task
+def abort_stale_uploads(older_than=None):
+    """Abort multipart uploads left pending, as ``manage.py abortuploads`` does."""
+    for upload in stale_uploads(older_than).iterator():
+        abort_upload(upload)
+
+
+@task
+def precompute_image_variants(name, widths=None, formats=None):
+    """Generate the usual variants of media image ``name`` before anyone asks for them."""
+    images.precompute(name, widths, formats)
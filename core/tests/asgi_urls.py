@@ -0,0 +1,8 @@
+"""The core URLs as routed with ``SERVER_MODE=asgi``, for tests of the async views."""
+from django.urls import include, path
+
+from core.urls import patterns
+
+urlpatterns = [
+    path('core/', include(patterns('asgi'))),
+]
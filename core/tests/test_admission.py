@@ -0,0 +1,192 @@
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.core.cache import cache
+from django.http import HttpResponse, StreamingHttpResponse
+from asgiref.sync import async_to_sync
+from loguru import logger
+import asyncio
+import threading
+import time
+import sys
+
+from core import admission
+from core.middleware.admission import AdmissionMiddleware, RateLimitMiddleware
+
+logger.remove()
+logger.add(
+    sys.stdout,
+    format="[{level: <8}] {name}:{function}:{line} - {message}",
+    level="INFO"
+)
+
+
+@override_settings(
+    ADMISSION_PRIORITY_PATHS=('/core/health/',),
+    ADMISSION_MAX_CONCURRENCY=3,
+    ADMISSION_CONCURRENCY_LIMITS=[('admin', r'^/admin/', 1)],
+    ADMISSION_QUEUE_TIMEOUT=0.05,
+    ADMISSION_MAX_QUEUE_SECONDS=10.0,
+    ADMISSION_RETRY_AFTER=2,
+    ADMISSION_RATE_LIMITS=[('pages', r'^/page/', 10.0, 3)],
+    ADMISSION_RATE_CACHE=None,
+    ADMISSION_PROXY_HOPS=1,
+)
+class AdmissionTests(SimpleTestCase):
+    """Test suite for admission control.
+
+    These tests verify per-route and per-process concurrency limits, shedding
+    on upstream queue time, priority paths, token bucket rate limits in this
+    process and in the shared cache, and the exported counters.
+    """
+
+    def setUp(self):
+        """Set up logging for each test."""
+        super().setUp()
+        admission._local_buckets.clear()
+        cache.clear()
+        self.factory = RequestFactory()
+        self.release = threading.Event()
+        logger.info(f"Starting test: {self._testMethodName}")
+
+    def tearDown(self):
+        """Log test completion."""
+        self.release.set()
+        logger.info(f"Finishing test: {self._testMethodName}")
+        super().tearDown()
+
+    def slow_view(self, request):
+        self.release.wait(5)
+        return HttpResponse('done')
+
+    def hold(self, middleware, path, count):
+        """Start ``count`` requests to ``path`` that block until ``self.release`` is set."""
+        threads = [threading.Thread(target=middleware, args=(self.factory.get(path),)) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        deadline = time.monotonic() + 2
+        route, slots = admission.slots_for(self.factory.get(path))
+        while slots[0].active < count and time.monotonic() < deadline:
+            time.sleep(0.005)
+        return threads
+
+    def finish(self, threads):
+        self.release.set()
+        for thread in threads:
+            thread.join()
+
+    def test_route_limit_sheds_with_retry_after(self):
+        """Verify that requests over a route's limit get a fast 503 while other routes still run."""
+        logger.info("Testing route concurrency limits")
+        middleware = AdmissionMiddleware(self.slow_view)
+        shed = admission.SHED.value(reason='concurrency', route='admin')
+        threads = self.hold(middleware, '/admin/', 1)
+
+        started = time.monotonic()
+        response = middleware(self.factory.get('/admin/'))
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '2')
+        self.assertEqual(response['Cache-Control'], 'no-store')
+        self.assertEqual(admission.SHED.value(reason='concurrency', route='admin'), shed + 1)
+
+        self.assertEqual(AdmissionMiddleware(lambda r: HttpResponse('ok'))(self.factory.get('/page/')).status_code, 200)
+        self.finish(threads)
+        self.assertEqual(middleware(self.factory.get('/admin/')).status_code, 200)
+        logger.info("Route concurrency limits verified")
+
+    def test_process_limit_spares_priority_paths(self):
+        """Verify that a saturated process sheds pages but still answers health checks."""
+        logger.info("Testing priority paths")
+        middleware = AdmissionMiddleware(self.slow_view)
+        threads = self.hold(middleware, '/page/', 3)
+        fast = AdmissionMiddleware(lambda r: HttpResponse('ok'))
+        self.assertEqual(fast(self.factory.get('/page/')).status_code, 503)
+        self.assertEqual(fast(self.factory.get('/core/health/')).status_code, 200)
+        self.finish(threads)
+        self.assertEqual(admission._get_slots(admission.TOTAL, 3).active, 0)
+        logger.info("Priority paths verified")
+
+    def test_waits_for_a_slot(self):
+        """Verify that a request waits up to the queue timeout for a slot and records the wait."""
+        logger.info("Testing queued admission")
+        middleware = AdmissionMiddleware(self.slow_view)
+        threads = self.hold(middleware, '/admin/', 1)
+        threading.Timer(0.02, self.release.set).start()
+        queued = admission.QUEUE_TIME.count(route='admin')
+        self.assertEqual(middleware(self.factory.get('/admin/')).status_code, 200)
+        self.assertEqual(admission.QUEUE_TIME.count(route='admin'), queued + 1)
+        self.finish(threads)
+        logger.info("Queued admission verified")
+
+    def test_streaming_holds_slot_until_closed(self):
+        """Verify that a streaming response keeps its slot while the body is sent, and frees it once closed."""
+        logger.info("Testing streaming responses")
+        middleware = AdmissionMiddleware(lambda r: StreamingHttpResponse(iter([b'a', b'b'])))
+        response = middleware(self.factory.get('/admin/'))
+        self.assertEqual(admission._get_slots('admin', 1).active, 1)
+        self.assertEqual(middleware(self.factory.get('/admin/')).status_code, 503)
+        self.assertEqual(b''.join(response.streaming_content), b'ab')
+        response.close()
+        response.close()
+        self.assertEqual(admission._get_slots('admin', 1).active, 0)
+        self.assertEqual(admission._get_slots(admission.TOTAL, 3).active, 0)
+        logger.info("Streaming responses verified")
+
+    def test_async_limits(self):
+        """Verify that concurrent coroutines beyond the limit are shed."""
+        logger.info("Testing async admission")
+
+        async def view(request):
+            await asyncio.sleep(0.2)
+            return HttpResponse('ok')
+
+        middleware = AdmissionMiddleware(view)
+
+        async def main():
+            return await asyncio.gather(*(middleware(self.factory.get('/admin/')) for _ in range(3)))
+
+        statuses = sorted(response.status_code for response in async_to_sync(main)())
+        self.assertEqual(statuses, [200, 503, 503])
+        logger.info("Async admission verified")
+
+    def test_upstream_queue_time(self):
+        """Verify that requests that waited too long upstream are shed, in any X-Request-Start unit."""
+        logger.info("Testing upstream queue time")
+        middleware = AdmissionMiddleware(lambda r: HttpResponse('ok'))
+        now = time.time()
+        for stale in (f't={now - 30:.3f}', f't={int((now - 30) * 1000)}', f'{int((now - 30) * 1e6)}'):
+            response = middleware(self.factory.get('/page/', HTTP_X_REQUEST_START=stale))
+            self.assertEqual(response.status_code, 503, stale)
+        self.assertEqual(middleware(self.factory.get('/page/', HTTP_X_REQUEST_START=f't={now:.3f}')).status_code, 200)
+        self.assertEqual(middleware(self.factory.get('/page/', HTTP_X_REQUEST_START='bogus')).status_code, 200)
+        logger.info("Upstream queue time verified")
+
+    def test_rate_limit_per_client(self):
+        """Verify that each client gets its own bucket, refilled over time, and 429 once it is empty."""
+        logger.info("Testing rate limits")
+        middleware = RateLimitMiddleware(lambda r: HttpResponse('ok'))
+
+        def get(ip, path='/page/'):
+            return middleware(self.factory.get(path, HTTP_X_FORWARDED_FOR=f'10.0.0.1, {ip}'))
+
+        self.assertEqual([get('1.1.1.1').status_code for _ in range(4)], [200, 200, 200, 429])
+        self.assertEqual(get('1.1.1.1')['Retry-After'], '1')
+        self.assertEqual(get('2.2.2.2').status_code, 200)
+        self.assertEqual(get('1.1.1.1', '/core/health/').status_code, 200)
+        self.assertEqual(get('1.1.1.1', '/other/').status_code, 200)
+        time.sleep(0.11)
+        self.assertEqual(get('1.1.1.1').status_code, 200)
+        self.assertEqual(admission.client_ip(self.factory.get('/', HTTP_X_FORWARDED_FOR='6.6.6.6, 3.3.3.3')), '3.3.3.3')
+        logger.info("Rate limits verified")
+
+    @override_settings(ADMISSION_RATE_CACHE='default')
+    def test_shared_rate_limit(self):
+        """Verify that buckets in the shared cache limit clients the same way."""
+        logger.info("Testing shared rate limits")
+        buckets = admission.get_buckets()
+        self.assertIsInstance(buckets, admission.CacheBuckets)
+        self.assertEqual([buckets.take('k', 10.0, 3) > 0 for _ in range(4)], [False, False, False, True])
+        # Rejected requests do not use up tokens.
+        self.assertAlmostEqual(buckets.take('k', 10.0, 3), buckets.take('k', 10.0, 3), delta=0.02)
+        time.sleep(0.11)
+        self.assertEqual(buckets.take('k', 10.0, 3), 0.0)
+        logger.info("Shared rate limits verified")
@@ -0,0 +1,156 @@
+from django.test import AsyncClient, TestCase, override_settings
+from django.contrib.auth.models import User
+from django.utils import timezone
+from asgiref.sync import async_to_sync
+from loguru import logger
+from datetime import timedelta
+import json
+import sys
+
+from core import api
+from core.models import Job, Upload
+
+logger.remove()
+logger.add(
+    sys.stdout,
+    format="[{level: <8}] {name}:{function}:{line} - {message}",
+    level="INFO"
+)
+
+
+@override_settings(API_PAGE_SIZE=10, API_MAX_PAGE_SIZE=50, API_STREAM_BATCH_SIZE=7, ADMISSION_RATE_LIMITS=[])
+class ApiTests(TestCase):
+    """Test suite for the JSON API.
+
+    These tests verify keyset pagination in both directions and on non-unique
+    sort keys, column projection, filters, NDJSON streaming under WSGI and
+    ASGI, detail lookups and access control.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.user = User.objects.create_user(username='user')
+        Job.objects.bulk_create([
+            Job(task=f'core.tasks.t{i % 3}', kwargs={'n': i}, status='failed' if i % 4 == 0 else 'queued')
+            for i in range(45)
+        ])
+        # Several uploads share a timestamp, so pages must break ties by primary key.
+        now = timezone.now()
+        for i in range(23):
+            upload = Upload.objects.create(owner=cls.user, key=f'k{i}', upload_id='u', filename=f'f{i}.bin',
+                                           content_type='application/octet-stream', size=i, part_size=1)
+            Upload.objects.filter(pk=upload.pk).update(created_at=now - timedelta(seconds=i // 4))
+        Upload.objects.create(owner=cls.staff, key='other', upload_id='u', filename='other.bin',
+                              content_type='application/octet-stream', size=1, part_size=1)
+
+    def setUp(self):
+        """Set up logging for each test."""
+        super().setUp()
+        self.client.force_login(self.staff)
+        logger.info(f"Starting test: {self._testMethodName}")
+
+    def tearDown(self):
+        """Log test completion."""
+        logger.info(f"Finishing test: {self._testMethodName}")
+        super().tearDown()
+
+    def walk(self, url):
+        """Follow ``next`` links from ``url`` and return every row."""
+        rows = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            body = response.json()
+            self.assertLessEqual(len(body['results']), 10)
+            rows += body['results']
+            url = body['next']
+        return rows
+
+    def test_keyset_pages(self):
+        """Verify that following cursors visits every row once, in order, in either direction."""
+        logger.info("Testing keyset pagination")
+        ids = list(Job.objects.order_by('-id').values_list('id', flat=True))
+        self.assertEqual([row['id'] for row in self.walk('/core/api/jobs/')], ids)
+        self.assertEqual([row['id'] for row in self.walk('/core/api/jobs/?order=id&limit=10')], ids[::-1])
+        first = self.client.get('/core/api/jobs/?limit=5').json()
+        self.assertIn('after=', first['next'])
+        self.assertIn('limit=5', first['next'])
+        logger.info("Keyset pagination verified")
+
+    def test_ties_on_sort_key(self):
+        """Verify that rows sharing a sort value are neither skipped nor repeated across pages."""
+        logger.info("Testing pagination ties")
+        self.client.force_login(self.user)
+        expected = list(Upload.objects.filter(owner=self.user).order_by('-created_at', '-pk').values_list('id', flat=True))
+        rows = self.walk('/core/api/uploads/?fields=id,filename')
+        self.assertEqual([row['id'] for row in rows], [str(pk) for pk in expected])
+        self.assertEqual(set(rows[0]), {'id', 'filename'})
+        ascending = self.walk('/core/api/uploads/?order=created_at&fields=id')
+        self.assertEqual([row['id'] for row in ascending], [str(pk) for pk in expected[::-1]])
+        logger.info("Pagination ties verified")
+
+    def test_projection_and_filters(self):
+        """Verify that only requested columns are selected and filters apply."""
+        logger.info("Testing projection and filters")
+        with self.assertNumQueries(1):
+            listing = api.Listing(api.RESOURCES['jobs'], Job.objects.all(), {'fields': 'task', 'status': 'failed'})
+            results, cursor = listing.page()
+        self.assertEqual(len(results), 10)
+        self.assertEqual(set(results[0]), {'task'})
+        self.assertEqual(listing.columns, ('task', 'id'))
+        self.assertNotIn('kwargs', str(listing.queryset.values_list(*listing.columns).query))
+        rows = self.walk('/core/api/jobs/?status=failed&fields=id,status')
+        self.assertEqual(len(rows), 12)
+        self.assertEqual({row['status'] for row in rows}, {'failed'})
+        logger.info("Projection and filters verified")
+
+    def test_ndjson_stream(self):
+        """Verify that NDJSON streams every row in batches, under WSGI and ASGI."""
+        logger.info("Testing NDJSON streaming")
+        ids = list(Job.objects.order_by('-id').values_list('id', flat=True))
+        response = self.client.get('/core/api/jobs/?format=ndjson&fields=id')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        chunks = list(response.streaming_content)
+        self.assertEqual(len(chunks), 7)
+        self.assertEqual([json.loads(line)['id'] for line in b''.join(chunks).splitlines()], ids)
+
+        async def fetch():
+            client = AsyncClient()
+            await client.aforce_login(self.staff)
+            response = await client.get('/core/api/jobs/', headers={'Accept': 'application/x-ndjson'})
+            return [chunk async for chunk in response.streaming_content]
+
+        with self.settings(ROOT_URLCONF='core.tests.asgi_urls'):
+            chunks = async_to_sync(fetch)()
+        self.assertEqual(len(b''.join(chunks).splitlines()), 45)
+        logger.info("NDJSON streaming verified")
+
+    def test_detail(self):
+        """Verify that single objects are returned with projection and missing ones are 404s."""
+        logger.info("Testing detail lookups")
+        job = Job.objects.order_by('id').first()
+        body = self.client.get(f'/core/api/jobs/{job.pk}/?fields=id,kwargs').json()
+        self.assertEqual(body, {'id': job.pk, 'kwargs': job.kwargs})
+        self.assertEqual(self.client.get('/core/api/jobs/0/').status_code, 404)
+        self.assertEqual(self.client.get('/core/api/uploads/not-a-uuid/').status_code, 404)
+        other = Upload.objects.get(key='other')
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(f'/core/api/uploads/{other.pk}/').status_code, 404)
+        logger.info("Detail lookups verified")
+
+    def test_errors_and_access(self):
+        """Verify authentication, permissions and invalid parameters."""
+        logger.info("Testing API errors")
+        for query in ('fields=nope', 'order=task', 'limit=0', 'limit=51', 'after=garbage'):
+            self.assertEqual(self.client.get(f'/core/api/jobs/?{query}').status_code, 400, query)
+        cursor = self.client.get('/core/api/jobs/?order=id').json()['next'].split('after=')[1]
+        self.assertIn('another order', self.client.get(f'/core/api/jobs/?after={cursor}').json()['error'])
+        self.assertEqual(self.client.get('/core/api/nope/').status_code, 404)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get('/core/api/jobs/').status_code, 403)
+        self.client.logout()
+        self.assertEqual(self.client.get('/core/api/uploads/').status_code, 401)
+        self.assertEqual(self.client.post('/core/api/uploads/').status_code, 405)
+        logger.info("API errors verified")
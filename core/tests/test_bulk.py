@@ -0,0 +1,162 @@
+from django.test import TestCase, override_settings
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.exceptions import ValidationError
+from django.db import DataError
+from django.utils import timezone
+from loguru import logger
+from io import BytesIO, StringIO
+import gzip
+import json
+import os
+import sys
+import tempfile
+from moto import mock_aws
+
+from core import bulk, s3
+from core.models import Job
+
+logger.remove()
+logger.add(
+    sys.stdout,
+    format="[{level: <8}] {name}:{function}:{line} - {message}",
+    level="INFO"
+)
+
+# Overriding STORAGES rebuilds the default storage, so it picks up moto's client.
+BULK_STORAGES = {
+    "default": settings.STORAGES["default"],
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+COMPARED = ('id', 'task', 'kwargs', 'queue', 'priority', 'status', 'attempts', 'run_at', 'started_at', 'duration')
+
+
+@override_settings(STORAGES=BULK_STORAGES)
+class BulkTests(TestCase):
+    """Test suite for the bulk import and export commands.
+
+    On PostgreSQL they exercise COPY, on SQLite the ``bulk_create``
+    fallback; files go to a temporary directory or to moto's in-memory S3.
+    """
+
+    def setUp(self):
+        """Create jobs and a scratch directory for each test."""
+        super().setUp()
+        logger.info(f"Starting test: {self._testMethodName}")
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        now = timezone.now().replace(microsecond=0)
+        Job.objects.bulk_create([
+            Job(task='core.tasks.example', kwargs={'n': i, 'tags': ['a', 'b'], 'text': 'comma, "quote"\nline'},
+                priority=i % 3, run_at=now, started_at=now if i % 2 else None, duration=i / 10 or None)
+            for i in range(25)
+        ])
+
+    def tearDown(self):
+        """Log test completion."""
+        logger.info(f"Finishing test: {self._testMethodName}")
+        super().tearDown()
+
+    def snapshot(self):
+        return list(Job.objects.order_by('pk').values_list(*COMPARED))
+
+    def round_trip(self, path, **import_options):
+        before = self.snapshot()
+        err = StringIO()
+        call_command('bulkexport', 'core.Job', path, stderr=err)
+        self.assertIn('Exported 25 rows', err.getvalue())
+        Job.objects.all().delete()
+        out = StringIO()
+        call_command('bulkimport', 'core.Job', path, stdout=out, **import_options)
+        self.assertIn('Imported 25 rows', out.getvalue())
+        self.assertIn('rows/s', out.getvalue())
+        self.assertEqual(self.snapshot(), before)
+
+    def test_csv_round_trip(self):
+        """Verify that rows survive a CSV export and import, JSON, NULLs and quoting included."""
+        logger.info("Testing CSV round trip")
+        path = os.path.join(self.dir.name, 'jobs.csv')
+        self.round_trip(path, batch_size=10)
+        with open(path) as f:
+            self.assertTrue(f.readline().startswith('id,task,kwargs,queue,priority,status'))
+        logger.info("CSV round trip verified")
+
+    def test_jsonl_gzip_round_trip(self):
+        """Verify that rows survive a gzipped JSON Lines export and import."""
+        logger.info("Testing JSON Lines round trip")
+        path = os.path.join(self.dir.name, 'jobs.jsonl.gz')
+        self.round_trip(path)
+        with gzip.open(path, 'rt') as f:
+            first = json.loads(f.readline())
+        self.assertEqual(first['kwargs']['tags'], ['a', 'b'])
+        logger.info("JSON Lines round trip verified")
+
+    def test_storage_round_trip(self):
+        """Verify that exports stream to the default storage and imports stream back from it."""
+        logger.info("Testing storage round trip")
+        with mock_aws():
+            s3.reset()
+            client = s3.get_s3_client()
+            client.create_bucket(Bucket=settings.AWS_STORAGE_BUCKET_NAME)
+            self.round_trip('storage:exports/jobs.csv.gz')
+            keys = [obj['Key'] for obj in client.list_objects_v2(Bucket=settings.AWS_STORAGE_BUCKET_NAME)['Contents']]
+            self.assertTrue(any(key.endswith('exports/jobs.csv.gz') for key in keys))
+        s3.reset()
+        logger.info("Storage round trip verified")
+
+    def test_s3_writer_multipart(self):
+        """Verify that large writes go up as a multipart upload, one part in memory at a time."""
+        logger.info("Testing multipart writes")
+        part = 5 * 1024 * 1024
+        with mock_aws():
+            s3.reset()
+            client = s3.get_s3_client()
+            client.create_bucket(Bucket='bulk')
+            writer = bulk.S3Writer(client, 'bulk', 'big.bin', part_size=part)
+            for _ in range(11):
+                writer.write(b'x' * (1024 * 1024))
+                self.assertLess(len(writer._buffer), part)
+            writer.close()
+            self.assertEqual(len(writer.parts), 3)
+            self.assertEqual(client.head_object(Bucket='bulk', Key='big.bin')['ContentLength'], 11 * 1024 * 1024)
+
+            aborted = bulk.S3Writer(client, 'bulk', 'aborted.bin', part_size=part)
+            aborted.write(b'y' * (part + 1))
+            aborted.abort()
+            self.assertEqual(client.list_multipart_uploads(Bucket='bulk').get('Uploads', []), [])
+        s3.reset()
+        logger.info("Multipart writes verified")
+
+    def test_batches_commit_separately(self):
+        """Verify that each batch commits on its own, so a bad row keeps the earlier batches."""
+        logger.info("Testing batch commits")
+        Job.objects.all().delete()
+        rows = b''.join(b'bulk.task,%d\n' % i for i in range(4)) + b'bulk.task,not-a-number\n'
+        with self.assertRaises((ValidationError, DataError)):
+            bulk.import_rows(Job, BytesIO(b'task,priority\n' + rows), 'csv', batch_size=2)
+        self.assertEqual(sorted(Job.objects.values_list('priority', flat=True)), [0, 1, 2, 3])
+        logger.info("Batch commits verified")
+
+    def test_progress_reports(self):
+        """Verify that progress is reported with the row count and rate."""
+        logger.info("Testing progress reports")
+        reports = []
+        progress = bulk.Progress(lambda p: reports.append(str(p)), interval=0)
+        bulk.export_rows(Job.objects.all(), BytesIO(), 'jsonl', progress=progress)
+        self.assertEqual(progress.rows, 25)
+        self.assertEqual(len(reports), 25)
+        self.assertRegex(reports[-1], r'^25 rows in [\d.]+s \(\d+ rows/s\)$')
+        logger.info("Progress reports verified")
+
+    def test_errors(self):
+        """Verify that unknown models, fields and formats are reported as command errors."""
+        logger.info("Testing command errors")
+        with self.assertRaisesMessage(CommandError, 'has no field nope'):
+            call_command('bulkexport', 'core.Job', os.path.join(self.dir.name, 'x.csv'), fields='task,nope')
+        with self.assertRaisesMessage(CommandError, 'pass --format'):
+            call_command('bulkexport', 'core.Job', os.path.join(self.dir.name, 'x.txt'))
+        with self.assertRaises(CommandError):
+            call_command('bulkimport', 'core.Nope', os.path.join(self.dir.name, 'x.csv'))
+        self.assertFalse(os.path.exists(os.path.join(self.dir.name, 'x.csv')))
+        logger.info("Command errors verified")
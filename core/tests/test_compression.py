@@ -0,0 +1,249 @@
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.core.cache import cache
+from unittest import mock
+from asgiref.sync import async_to_sync
+from loguru import logger
+import brotli
+import gzip
+import zlib
+import sys
+
+from core.middleware import compression
+from core.middleware.cache_control import CacheControlMiddleware, policy_for
+from core.middleware.compression import CompressionMiddleware, choose_encoding
+
+logger.remove()
+logger.add(
+    sys.stdout,
+    format="[{level: <8}] {name}:{function}:{line} - {message}",
+    level="INFO"
+)
+
+BODY = ('<p>' + 'compressible text ' * 200 + '</p>').encode()
+
+
+def run_stack(request, response):
+    # The same order as MIDDLEWARE: compression outside, cache control inside.
+    return CompressionMiddleware(CacheControlMiddleware(lambda r: response))(request)
+
+
+class CompressionTests(SimpleTestCase):
+    """Test suite for response compression.
+
+    These tests verify encoding negotiation, the size and content type
+    thresholds, streamed compression and the headers of compressed responses.
+    """
+
+    def setUp(self):
+        """Set up logging for each test."""
+        super().setUp()
+        self.factory = RequestFactory()
+        logger.info(f"Starting test: {self._testMethodName}")
+
+    def tearDown(self):
+        """Log test completion."""
+        logger.info(f"Finishing test: {self._testMethodName}")
+        super().tearDown()
+
+    def test_choose_encoding(self):
+        """Verify that brotli is preferred, q=0 is honoured and gzip is the fallback."""
+        logger.info("Testing encoding negotiation")
+        self.assertEqual(choose_encoding('gzip, deflate, br'), 'br')
+        self.assertEqual(choose_encoding('gzip, br;q=0'), 'gzip')
+        self.assertEqual(choose_encoding('identity'), None)
+        self.assertEqual(choose_encoding(''), None)
+        with mock.patch.object(compression, 'brotli', None):
+            self.assertEqual(choose_encoding('br, gzip'), 'gzip')
+            self.assertEqual(choose_encoding('br'), None)
+        logger.info("Encoding negotiation verified")
+
+    def test_gzip_response(self):
+        """Verify that a text response is gzipped with Vary, Content-Length and a weak ETag."""
+        logger.info("Testing gzip compression")
+        request = self.factory.get('/page/', HTTP_ACCEPT_ENCODING='gzip')
+        response = run_stack(request, HttpResponse(BODY))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), BODY)
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        self.assertLess(len(response.content), len(BODY))
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertTrue(response['ETag'].startswith('W/"'))
+        logger.info("Gzip compression verified")
+
+    def test_gzip_length_is_randomized(self):
+        """Verify that gzip output length varies between responses, as with Django's BREACH mitigation."""
+        logger.info("Testing randomized gzip header")
+        request = self.factory.get('/page/', HTTP_ACCEPT_ENCODING='gzip')
+        bodies = [run_stack(request, HttpResponse(BODY)).content for _ in range(20)]
+        self.assertGreater(len({len(body) for body in bodies}), 1)
+        self.assertTrue(all(gzip.decompress(body) == BODY for body in bodies))
+        with self.settings(COMPRESSION_GZIP_MAX_RANDOM_BYTES=0):
+            self.assertEqual(len({compression.compress_bytes(BODY, 'gzip') for _ in range(5)}), 1)
+        logger.info("Randomized gzip header verified")
+
+    def test_private_responses_avoid_brotli(self):
+        """Verify that private and no-store responses get the randomized gzip instead of brotli."""
+        logger.info("Testing private responses")
+        request = self.factory.get('/page/', HTTP_ACCEPT_ENCODING='gzip, br')
+        for cache_control in ('private, max-age=60', 'no-store'):
+            response = HttpResponse(BODY)
+            response['Cache-Control'] = cache_control
+            self.assertEqual(CompressionMiddleware(lambda r: response)(request)['Content-Encoding'], 'gzip')
+        logger.info("Private responses verified")
+
+    def test_brotli_response(self):
+        """Verify that clients accepting br get brotli."""
+        logger.info("Testing brotli compression")
+        request = self.factory.get('/page/', HTTP_ACCEPT_ENCODING='gzip, br')
+        response = run_stack(request, HttpResponse(BODY))
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content), BODY)
+        logger.info("Brotli compression verified")
+
+    def test_skips_small_and_binary_responses(self):
+        """Verify that small bodies, images and byte ranges are sent as they are."""
+        logger.info("Testing compression thresholds")
+        request = self.factory.get('/page/', HTTP_ACCEPT_ENCODING='gzip, br')
+        small = run_stack(request, HttpResponse(b'<p>short</p>'))
+        self.assertFalse(small.has_header('Content-Encoding'))
+        self.assertFalse(small.has_header('Vary'))
+        image = run_stack(request, HttpResponse(BODY, content_type='image/png'))
+        self.assertFalse(image.has_header('Content-Encoding'))
+        partial = HttpResponse(BODY, status=206)
+        partial['Content-Range'] = f'bytes 0-{len(BODY) - 1}/{len(BODY) * 2}'
+        self.assertFalse(run_stack(request, partial).has_header('Content-Encoding'))
+        logger.info("Compression thresholds verified")
+
+    def test_identity_still_varies(self):
+        """Verify that an uncompressed answer to a client without gzip still varies on Accept-Encoding."""
+        logger.info("Testing Vary without compression")
+        response = run_stack(self.factory.get('/page/'), HttpResponse(BODY))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, BODY)
+        self.assertIn('Accept-Encoding', response['Vary'])
+        logger.info("Vary without compression verified")
+
+    def test_streaming_response(self):
+        """Verify that streamed responses are compressed chunk by chunk, without Content-Length."""
+        logger.info("Testing streamed compression")
+        request = self.factory.get('/stream/', HTTP_ACCEPT_ENCODING='gzip')
+        chunks = [b'{"row": %d}\n' % i * 20 for i in range(50)]
+        response = run_stack(request, StreamingHttpResponse(iter(chunks), content_type='application/x-ndjson'))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertFalse(response.has_header('Content-Length'))
+        parts = list(response.streaming_content)
+        # Flushed per chunk, not buffered until the end.
+        self.assertGreater(len(parts), 10)
+        self.assertEqual(zlib.decompress(b''.join(parts), 31), b''.join(chunks))
+        logger.info("Streamed compression verified")
+
+    def test_async_streaming_response(self):
+        """Verify that async streamed responses stay async and are compressed."""
+        logger.info("Testing async streamed compression")
+
+        async def rows():
+            for i in range(50):
+                yield b'line %d ' % i * 20
+
+        async def consume(response):
+            return [part async for part in response.streaming_content]
+
+        request = self.factory.get('/stream/', HTTP_ACCEPT_ENCODING='br')
+        response = run_stack(request, StreamingHttpResponse(rows(), content_type='text/plain'))
+        self.assertTrue(response.is_async)
+        self.assertEqual(response['Content-Encoding'], 'br')
+        body = brotli.decompress(b''.join(async_to_sync(consume)(response)))
+        self.assertEqual(body, b''.join(b'line %d ' % i * 20 for i in range(50)))
+        logger.info("Async streamed compression verified")
+
+
+class CacheControlTests(TestCase):
+    """Test suite for Cache-Control policies and conditional GET.
+
+    These tests verify the central policies, the protection of per-user
+    responses, strong ETags with 304 answers, and the headers of the home page.
+    """
+
+    def setUp(self):
+        """Set up logging for each test."""
+        super().setUp()
+        self.factory = RequestFactory()
+        cache.clear()
+        logger.info(f"Starting test: {self._testMethodName}")
+
+    def tearDown(self):
+        """Log test completion."""
+        logger.info(f"Finishing test: {self._testMethodName}")
+        super().tearDown()
+
+    def test_policy_lookup(self):
+        """Verify that the first matching pattern wins and unmatched paths have no policy."""
+        logger.info("Testing policy lookup")
+        self.assertEqual(policy_for('/core/health/ready/'), {'no_store': True})
+        self.assertTrue(policy_for('/core/home/')['public'])
+        self.assertIsNone(policy_for('/core/home/extra/'))
+        self.assertIsNone(policy_for('/elsewhere/'))
+        logger.info("Policy lookup verified")
+
+    @override_settings(CACHE_CONTROL_POLICIES=[(r'^/page/$', {'public': True, 'max_age': 60, 's_maxage': 600})])
+    def test_public_policy_and_user_responses(self):
+        """Verify that public policies apply to shared responses but never to per-user ones."""
+        logger.info("Testing public policies")
+        request = self.factory.get('/page/')
+        response = run_stack(request, HttpResponse(BODY))
+        self.assertEqual(set(response['Cache-Control'].split(', ')), {'public', 'max-age=60', 's-maxage=600'})
+
+        with_cookie = HttpResponse(BODY)
+        with_cookie.set_cookie('sessionid', 'x')
+        response = run_stack(request, with_cookie)
+        self.assertEqual(set(response['Cache-Control'].split(', ')), {'private', 'max-age=60'})
+
+        varies = HttpResponse(BODY)
+        varies['Vary'] = 'Cookie'
+        self.assertNotIn('public', run_stack(request, varies)['Cache-Control'])
+
+        not_found = run_stack(request, HttpResponse(BODY, status=404))
+        self.assertFalse(not_found.has_header('Cache-Control'))
+        logger.info("Public policies verified")
+
+    def test_strong_etag_and_304(self):
+        """Verify that a strong ETag is added and a matching revalidation gets a 304, compressed or not."""
+        logger.info("Testing ETags and conditional GET")
+        response = run_stack(self.factory.get('/page/'), HttpResponse(BODY))
+        etag = response['ETag']
+        self.assertRegex(etag, r'^"[0-9a-f]{32}"$')
+
+        for validator in (etag, f'W/{etag}'):
+            revalidated = run_stack(
+                self.factory.get('/page/', HTTP_IF_NONE_MATCH=validator, HTTP_ACCEPT_ENCODING='gzip'),
+                HttpResponse(BODY),
+            )
+            self.assertEqual(revalidated.status_code, 304)
+            self.assertEqual(revalidated.content, b'')
+
+        changed = run_stack(self.factory.get('/page/', HTTP_IF_NONE_MATCH=etag), HttpResponse(BODY + b'!'))
+        self.assertEqual(changed.status_code, 200)
+        logger.info("ETags and conditional GET verified")
+
+    def test_no_store_policy(self):
+        """Verify that no-store routes get no ETag and are never answered with a 304."""
+        logger.info("Testing no-store routes")
+        response = self.client.get('/core/health/')
+        self.assertIn('no-store', response['Cache-Control'])
+        self.assertFalse(response.has_header('ETag'))
+        logger.info("No-store routes verified")
+
+    @override_settings(COMPRESSION_MIN_BYTES=256)
+    def test_home_headers(self):
+        """Verify that the home page is compressed and cacheable at the edge."""
+        logger.info("Testing home page headers")
+        response = self.client.get('/core/home/', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response.status_code, 200)
+        cache_control = set(response['Cache-Control'].split(', '))
+        self.assertTrue({'public', 's-maxage=300', 'stale-while-revalidate=60'} <= cache_control)
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertNotIn('Cookie', response['Vary'])
+        revalidated = self.client.get('/core/home/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+        logger.info("Home page headers verified")
@@ -0,0 +1,158 @@
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.db import router, transaction
+from django.http import HttpResponse
+from unittest import mock
+from loguru import logger
+from pathlib import Path
+import json
+import os
+import subprocess
+import sys
+
+from core import db_router
+from core.db_router import ReplicaMonitor, use_primary
+from core.middleware.replicas import ReplicaPinMiddleware
+
+logger.remove()
+logger.add(
+    sys.stdout,
+    format="[{level: <8}] {name}:{function}:{line} - {message}",
+    level="INFO"
+)
+
+REPLICAS = ['replica1', 'replica2']
+
+
+@override_settings(
+    DATABASE_ROUTERS=['core.db_router.ReplicaRouter'],
+    DATABASE_REPLICAS=REPLICAS,
+    DB_REPLICA_MAX_LAG=5.0,
+    DB_REPLICA_CHECK_INTERVAL=60.0,
+)
+class ReplicaRouterTests(SimpleTestCase):
+    """Test suite for read-replica routing.
+
+    These tests verify round-robin reads, lag-aware failover to the primary,
+    and pinning to the primary after writes, in transactions and by cookie.
+    Lag checks use a stand-in measure, so no replica database is needed.
+    """
+
+    def setUp(self):
+        """Set up logging for each test."""
+        super().setUp()
+        self.lags = {alias: 0.0 for alias in REPLICAS}
+        patcher = mock.patch.object(db_router, 'monitor', ReplicaMonitor(self.measure))
+        self.monitor = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.factory = RequestFactory()
+        logger.info(f"Starting test: {self._testMethodName}")
+
+    def tearDown(self):
+        """Log test completion."""
+        logger.info(f"Finishing test: {self._testMethodName}")
+        super().tearDown()
+
+    def measure(self, alias):
+        lag = self.lags[alias]
+        if isinstance(lag, Exception):
+            raise lag
+        return lag
+
+    def reads(self, n=4):
+        return [User.objects.all().db for _ in range(n)]
+
+    def test_round_robin_reads(self):
+        """Verify that reads alternate between the replicas and writes go to the primary."""
+        logger.info("Testing round-robin reads")
+        self.assertEqual(self.reads(), ['replica1', 'replica2', 'replica1', 'replica2'])
+        self.assertEqual(router.db_for_write(User), 'default')
+        self.assertTrue(router.allow_migrate('default', 'auth'))
+        self.assertFalse(router.allow_migrate('replica1', 'auth'))
+        logger.info("Round-robin reads verified")
+
+    def test_lagging_replica_is_skipped(self):
+        """Verify that a lagging or failing replica is skipped, and all reads fall back to the primary."""
+        logger.info("Testing lag-aware failover")
+        self.lags['replica1'] = 30.0
+        self.assertEqual(self.reads(), ['replica2'] * 4)
+
+        self.lags['replica2'] = ConnectionError("replica down")
+        self.monitor.check('replica2')
+        self.assertEqual(self.reads(), ['default'] * 4)
+        self.assertEqual(self.monitor.status()['replica1']['lag'], 30.0)
+        self.assertIn('replica down', self.monitor.status()['replica2']['error'])
+        logger.info("Lag-aware failover verified")
+
+    def test_replica_rechecked_after_interval(self):
+        """Verify that a replica is measured once per interval and comes back once it catches up."""
+        logger.info("Testing lag re-checks")
+        calls = []
+        self.monitor.measure = lambda alias: calls.append(alias) or self.measure(alias)
+        self.lags['replica1'] = 30.0
+        self.reads()
+        self.assertEqual(calls.count('replica1'), 1)
+        self.lags['replica1'] = 0.5
+        with override_settings(DB_REPLICA_CHECK_INTERVAL=0):
+            self.assertIn('replica1', self.reads())
+        logger.info("Lag re-checks verified")
+
+    def test_primary_models_and_blocks(self):
+        """Verify that sessions, transactions and use_primary() read from the primary."""
+        logger.info("Testing primary-only reads")
+        with override_settings(DB_PRIMARY_MODELS=('sessions.session',)):
+            self.assertEqual(Session.objects.all().db, 'default')
+        with use_primary():
+            self.assertEqual(self.reads(), ['default'] * 4)
+        with mock.patch.object(transaction.get_connection('default'), 'in_atomic_block', True):
+            self.assertEqual(self.reads(), ['default'] * 4)
+        logger.info("Primary-only reads verified")
+
+    def test_request_pinned_after_write(self):
+        """Verify that reads after a write in the same request use the primary and the client is pinned."""
+        logger.info("Testing pinning after writes")
+        seen = {}
+
+        def view(request):
+            seen['before'] = User.objects.all().db
+            router.db_for_write(User)
+            seen['after'] = User.objects.all().db
+            return HttpResponse()
+
+        response = ReplicaPinMiddleware(view)(self.factory.get('/'))
+        self.assertIn(seen['before'], REPLICAS)
+        self.assertEqual(seen['after'], 'default')
+        self.assertEqual(response.cookies['db_pin']['max-age'], 5)
+        # Outside the request the pin is gone.
+        self.assertIn(User.objects.all().db, REPLICAS)
+
+        def reader(request):
+            seen['read'] = User.objects.all().db
+            return HttpResponse()
+
+        response = ReplicaPinMiddleware(reader)(self.factory.get('/', HTTP_COOKIE='db_pin=1'))
+        self.assertEqual(seen['read'], 'default')
+        self.assertNotIn('db_pin', response.cookies)
+        ReplicaPinMiddleware(reader)(self.factory.post('/'))
+        self.assertEqual(seen['read'], 'default')
+        logger.info("Pinning after writes verified")
+
+    def test_replica_aliases_fail_fast(self):
+        """Verify that replica aliases get a short connect and pool checkout timeout, the primary keeps its own."""
+        logger.info("Testing replica timeouts")
+        environ = {
+            'PATH': os.environ.get('PATH', ''), 'SECRET_KEY': 'test', 'DEBUG': 'False', 'ALLOWED_HOSTS': 'testserver',
+            'DB_NAME': 'db', 'DB_USERNAME': 'user', 'DB_PASSWORD': 'secret', 'DB_HOST': 'primary', 'DB_PORT': '5432',
+            'DB_POOL_ENABLED': 'True', 'DB_POOL_TIMEOUT': '10', 'DB_REPLICA_HOSTS': 'standby',
+            'AWS_STORAGE_BUCKET_NAME': 'bucket', 'AWS_S3_REGION_NAME': 'us-east-1', 'LOG_SHIPPING_ENABLED': 'False',
+            'PYTHONPATH': str(Path(__file__).resolve().parents[2]),
+        }
+        script = "import json; from project import settings; print(json.dumps(settings.DATABASES))"
+        result = subprocess.run([sys.executable, '-c', script], env=environ, capture_output=True, text=True, check=True)
+        databases = json.loads(result.stdout.strip().splitlines()[-1])
+        self.assertEqual(databases['replica1']['OPTIONS']['connect_timeout'], 2)
+        self.assertEqual(databases['replica1']['OPTIONS']['pool']['timeout'], 2)
+        self.assertEqual(databases['default']['OPTIONS']['pool']['timeout'], 10.0)
+        self.assertNotIn('connect_timeout', databases['default']['OPTIONS'])
+        logger.info("Replica timeouts verified")
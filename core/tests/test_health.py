@@ -0,0 +1,136 @@
+from django.test import TestCase, Client
+from django.urls import reverse
+from loguru import logger
+import sys
+import time
+from unittest.mock import patch
+
+from core.health import HealthProber, check_cache, check_database
+
+logger.remove()
+logger.add(
+    sys.stdout,
+    format="[{level: <8}] {name}:{function}:{line} - {message}",
+    level="INFO"
+)
+
+
+def passing_check():
+    pass
+
+
+def failing_check():
+    raise ConnectionError("Simulated dependency outage")
+
+
+class HealthProberTests(TestCase):
+    """Test suite for the background health prober and the liveness/readiness endpoints.
+
+    The readiness view must serve the cached snapshot; these tests drive the
+    prober synchronously with ``run_once`` so no thread is involved.
+    """
+
+    def setUp(self):
+        """Set up test client and logging for each test."""
+        super().setUp()
+        self.client = Client()
+        logger.info(f"Starting test: {self._testMethodName}")
+
+    def test_snapshot_before_first_probe(self):
+        """Verify that readiness reports 'starting' until the first probe completes."""
+        logger.info("Testing initial snapshot")
+        prober = HealthProber({'database': passing_check})
+        snapshot = prober.snapshot()
+        self.assertEqual(snapshot['status'], 'starting')
+        self.assertEqual(snapshot['checks']['database']['status'], 'unknown')
+        logger.info("Initial snapshot verified")
+
+    def test_snapshot_reports_latency_and_last_success(self):
+        """Verify that each dependency reports latency and timestamps."""
+        logger.info("Testing per-dependency results")
+        prober = HealthProber({'database': passing_check, 's3': failing_check})
+        prober.run_once()
+        snapshot = prober.snapshot()
+        self.assertEqual(snapshot['status'], 'error')
+        database = snapshot['checks']['database']
+        self.assertEqual(database['status'], 'ok')
+        self.assertIsNotNone(database['latency_ms'])
+        self.assertIsNotNone(database['last_success'])
+        s3 = snapshot['checks']['s3']
+        self.assertEqual(s3['status'], 'error')
+        self.assertIsNone(s3['last_success'])
+        self.assertIsNotNone(s3['last_failure'])
+        self.assertIn('Simulated dependency outage', s3['error'])
+        logger.info("Per-dependency results verified")
+
+    def test_stale_snapshot_is_not_ready(self):
+        """Verify that a prober that stopped updating is reported as stale."""
+        logger.info("Testing stale snapshot")
+        prober = HealthProber({'database': passing_check}, interval=0.01, stale_after=0.01)
+        prober.run_once()
+        time.sleep(0.05)
+        self.assertEqual(prober.snapshot()['status'], 'stale')
+        logger.info("Stale snapshot verified")
+
+    def test_background_thread_updates_snapshot(self):
+        """Verify that the started prober refreshes results on its own."""
+        logger.info("Testing background probing")
+        prober = HealthProber({'cache': passing_check}, interval=0.01)
+        prober.start()
+        try:
+            deadline = time.monotonic() + 5
+            while prober.snapshot()['status'] != 'ok' and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            prober.stop()
+        self.assertEqual(prober.snapshot()['status'], 'ok')
+        logger.info("Background probing verified")
+
+    def test_builtin_checks(self):
+        """Verify that the database and cache checks pass against the test services."""
+        logger.info("Testing built-in checks")
+        check_database()
+        check_cache()
+        logger.info("Built-in checks verified")
+
+    def test_readiness_serves_cached_snapshot(self):
+        """Verify that readiness returns the cached report without running checks."""
+        logger.info("Testing readiness endpoint")
+        calls = []
+        prober = HealthProber({'database': lambda: calls.append(1)})
+        prober.run_once()
+        with patch('core.views.get_prober', return_value=prober), \
+                patch.object(prober, 'start'):
+            for _ in range(3):
+                response = self.client.get(reverse('readiness'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'ok')
+        self.assertEqual(len(calls), 1)
+        logger.info("Readiness endpoint verified")
+
+    def test_readiness_fails_when_dependency_is_down(self):
+        """Verify that readiness returns 503 when a dependency check fails."""
+        logger.info("Testing readiness failure")
+        prober = HealthProber({'database': failing_check})
+        prober.run_once()
+        with patch('core.views.get_prober', return_value=prober), \
+                patch.object(prober, 'start'):
+            response = self.client.get(reverse('readiness'))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['checks']['database']['status'], 'error')
+        logger.info("Readiness failure verified")
+
+    def test_liveness(self):
+        """Verify that liveness answers without consulting dependencies."""
+        logger.info("Testing liveness endpoint")
+        with patch('core.views.get_prober') as mock_prober:
+            response = self.client.get(reverse('liveness'))
+        mock_prober.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'status': 'ok'})
+        logger.info("Liveness endpoint verified")
+
+    def tearDown(self):
+        """Clean up after each test."""
+        super().tearDown()
+        logger.info(f"Finishing test: {self._testMethodName}")
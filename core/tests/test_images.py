@@ -0,0 +1,182 @@
+from django.test import TestCase, override_settings
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from loguru import logger
+from io import BytesIO
+from concurrent.futures import Future
+from unittest import mock
+import sys
+from moto import mock_aws
+from PIL import Image
+
+from core import images, imaging, s3
+from core.models import ImageVariant
+from core.tiered_cache import get_cache
+
+logger.remove()
+logger.add(
+    sys.stdout,
+    format="[{level: <8}] {name}:{function}:{line} - {message}",
+    level="INFO"
+)
+
+# Overriding STORAGES rebuilds the default storage, so it picks up moto's client.
+IMAGE_STORAGES = {
+    "default": settings.STORAGES["default"],
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+
+def make_image(size=(1200, 800), mode='RGB', fmt='JPEG', **save):
+    out = BytesIO()
+    Image.new(mode, size, (200, 40, 40, 128)[:len(mode)]).save(out, format=fmt, **save)
+    return out.getvalue()
+
+
+@override_settings(
+    STORAGES=IMAGE_STORAGES,
+    IMAGE_WIDTHS=(320, 640, 1600),
+    IMAGE_PRECOMPUTE_WIDTHS=(320, 640),
+    IMAGE_FORMATS=('avif', 'webp', 'jpeg'),
+    ADMISSION_RATE_LIMITS=[],
+)
+class ImageVariantTests(TestCase):
+    """Test suite for the image variant pipeline.
+
+    These tests verify resizing and encoding in the process pool, width and
+    format selection, deterministic immutable variants in S3, the variant
+    index, precomputation and invalidation.
+    """
+
+    def setUp(self):
+        """Start moto and upload a source image for each test."""
+        super().setUp()
+        logger.info(f"Starting test: {self._testMethodName}")
+        self.mock = mock_aws()
+        self.mock.start()
+        self.addCleanup(self.mock.stop)
+        s3.reset()
+        self.client_s3 = s3.get_s3_client()
+        self.client_s3.create_bucket(Bucket=settings.AWS_STORAGE_BUCKET_NAME)
+        storages['default'].save('media/photos/cat.jpg', ContentFile(make_image()))
+        cache.clear()
+        get_cache('images').local.clear()
+
+    def tearDown(self):
+        """Log test completion."""
+        logger.info(f"Finishing test: {self._testMethodName}")
+        super().tearDown()
+
+    def head(self, url):
+        key = url.split('/', 3)[3]
+        return self.client_s3.head_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=key)
+
+    def test_render(self):
+        """Verify that variants are resized without enlarging, rotated upright and encoded as asked."""
+        logger.info("Testing rendering")
+        results = imaging.render(make_image(), [(640, 'webp', 80), (2000, 'avif', 60), (320, 'jpeg', 80)], 10**8)
+        self.assertEqual([(w, h) for _, w, h in results], [(640, 427), (1200, 800), (320, 213)])
+        self.assertEqual([Image.open(BytesIO(data)).format for data, _, _ in results], ['WEBP', 'AVIF', 'JPEG'])
+
+        exif = Image.Exif()
+        exif[imaging.ORIENTATION] = 6
+        rotated = imaging.render(make_image(exif=exif), [(400, 'jpeg', 80)], 10**8)
+        self.assertEqual(rotated[0][1:], (400, 600))
+
+        transparent = imaging.render(make_image((50, 50), 'RGBA', 'PNG'), [(50, 'jpeg', 80), (50, 'webp', 80)], 10**8)
+        self.assertEqual(Image.open(BytesIO(transparent[0][0])).mode, 'RGB')
+        self.assertEqual(Image.open(BytesIO(transparent[1][0])).mode, 'RGBA')
+
+        with self.assertRaises(ValueError):
+            imaging.render(b'not an image', [(100, 'webp', 80)], 10**8)
+        with self.assertRaises(ValueError):
+            imaging.render(make_image(), [(100, 'webp', 80)], 1000)
+        logger.info("Rendering verified")
+
+    def test_redirects_to_immutable_variant(self):
+        """Verify that a variant is generated once, stored immutable and then served from the index."""
+        logger.info("Testing on-demand variants")
+        response = self.client.get('/core/images/photos/cat.jpg?w=500&fmt=webp')
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response['Location'].startswith(f'https://{settings.AWS_S3_CUSTOM_DOMAIN}/variants/'))
+        self.assertTrue(response['Location'].endswith('/cat-640w.webp'))
+        self.assertEqual(response['Cache-Control'], 'public, max-age=86400')
+        obj = self.head(response['Location'])
+        self.assertEqual(obj['ContentType'], 'image/webp')
+        self.assertEqual(obj['CacheControl'], 'public, max-age=31536000, immutable')
+
+        variant = ImageVariant.objects.get()
+        self.assertEqual((variant.width, variant.format, variant.image_width), (640, 'webp', 640))
+        renders = images.IMAGE_RENDERS.count(outcome='ok')
+        with self.assertNumQueries(0):
+            again = self.client.get('/core/images/photos/cat.jpg?w=600&fmt=webp')
+        self.assertEqual(again['Location'], response['Location'])
+        get_cache('images').local.clear()
+        cache.clear()
+        self.assertEqual(self.client.get('/core/images/photos/cat.jpg?w=640&fmt=webp')['Location'], response['Location'])
+        self.assertEqual(images.IMAGE_RENDERS.count(outcome='ok'), renders)
+        logger.info("On-demand variants verified")
+
+    def test_format_and_width_selection(self):
+        """Verify that the format follows the Accept header and widths snap to the configured ones."""
+        logger.info("Testing format negotiation")
+        self.assertEqual(images.choose_format(None, 'image/avif,image/webp,*/*'), 'avif')
+        self.assertEqual(images.choose_format(None, 'image/webp,*/*'), 'webp')
+        self.assertEqual(images.choose_format(None, '*/*'), 'jpeg')
+        self.assertEqual([images.choose_width(w) for w in (None, 1, 320, 321, 5000)], [1600, 320, 320, 640, 1600])
+        response = self.client.get('/core/images/photos/cat.jpg?w=300', HTTP_ACCEPT='image/webp,*/*')
+        self.assertTrue(response['Location'].endswith('/cat-320w.webp'))
+        self.assertEqual(response['Vary'], 'Accept')
+        self.assertEqual(self.client.get('/core/images/photos/cat.jpg?fmt=gif').status_code, 400)
+        self.assertEqual(self.client.get('/core/images/photos/cat.jpg?w=wide').status_code, 400)
+        logger.info("Format negotiation verified")
+
+    def test_missing_and_invalid_sources(self):
+        """Verify that missing sources are 404s, and non-images and paths outside media are rejected."""
+        logger.info("Testing invalid sources")
+        storages['default'].save('media/notes.txt', ContentFile(b'hello'))
+        storages['default'].save('private/secret.jpg', ContentFile(make_image()))
+        self.assertEqual(self.client.get('/core/images/photos/dog.jpg').status_code, 404)
+        self.assertEqual(self.client.get('/core/images/notes.txt').status_code, 400)
+        self.assertEqual(self.client.get('/core/images/../private/secret.jpg').status_code, 404)
+        self.assertGreater(images.IMAGE_RENDERS.count(outcome='error'), 0)
+        self.assertFalse(ImageVariant.objects.exists())
+        logger.info("Invalid sources verified")
+
+    def test_render_timeout(self):
+        """Verify that a render past IMAGE_RENDER_TIMEOUT is an error response, and waiters outlast it."""
+        logger.info("Testing render timeouts")
+        stuck = Future()
+        with mock.patch.object(images, 'get_pool') as get_pool, self.settings(IMAGE_RENDER_TIMEOUT=0.1):
+            get_pool.return_value.submit.return_value = stuck
+            response = self.client.get('/core/images/photos/cat.jpg?w=320&fmt=jpeg')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('longer than', response.json()['error'])
+        self.assertTrue(stuck.cancelled())
+        self.assertFalse(ImageVariant.objects.exists())
+        self.assertGreater(get_cache('images')._lock_timeout(), settings.IMAGE_RENDER_TIMEOUT)
+        logger.info("Render timeouts verified")
+
+    def test_precompute_and_invalidate(self):
+        """Verify that precomputing fills the missing variants once and a new version replaces them."""
+        logger.info("Testing precomputed variants")
+        self.assertEqual(len(images.precompute('media/photos/cat.jpg')), 6)
+        self.assertEqual(images.precompute('media/photos/cat.jpg'), [])
+        names = set(ImageVariant.objects.values_list('name', flat=True))
+        self.assertEqual(len(names), 6)
+        renders = images.IMAGE_RENDERS.count(outcome='ok')
+        with self.assertNumQueries(1):
+            self.assertIn(images.get_variant('media/photos/cat.jpg', 320, 'avif'), names)
+        self.assertEqual(images.IMAGE_RENDERS.count(outcome='ok'), renders)
+
+        self.client_s3.put_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key='media/photos/cat.jpg',
+                                  Body=make_image((900, 900)))
+        self.assertEqual(len(images.precompute('media/photos/cat.jpg')), 6)
+        self.assertTrue(names.isdisjoint(ImageVariant.objects.values_list('name', flat=True)))
+        self.assertEqual(ImageVariant.objects.get(width=640, format='jpeg').image_height, 640)
+
+        images.invalidate('media/photos/cat.jpg')
+        self.assertFalse(ImageVariant.objects.exists())
+        logger.info("Precomputed variants verified")
@@ -0,0 +1,77 @@
+from django.test import SimpleTestCase
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from loguru import logger
+from io import StringIO
+import sys
+
+from core.management.commands.importtime import cost_by_package, parse_importtime
+
+logger.remove()
+logger.add(
+    sys.stdout,
+    format="[{level: <8}] {name}:{function}:{line} - {message}",
+    level="INFO"
+)
+
+SAMPLE_OUTPUT = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 | _io
+import time:       300 |        300 |   django.utils.version
+import time:      1500 |       1800 | django
+import time:       250 |        250 |   loguru._colorizer
+import time:      4000 |       4250 | loguru
+"""
+
+
+class ImportTimeTests(SimpleTestCase):
+    """Test suite for the importtime management command.
+
+    These tests verify that import costs are parsed and grouped per package and
+    that the command fails when startup exceeds its budget or imports a
+    forbidden module.
+    """
+
+    def setUp(self):
+        """Set up logging for each test."""
+        super().setUp()
+        logger.info(f"Starting test: {self._testMethodName}")
+
+    def test_parse_importtime(self):
+        """Verify parsing of -X importtime output."""
+        logger.info("Testing importtime parsing")
+        entries = parse_importtime(SAMPLE_OUTPUT)
+        self.assertEqual(entries[0], ('_io', 120, 120, 0))
+        self.assertEqual(entries[1], ('django.utils.version', 300, 300, 1))
+        self.assertEqual(entries[-1], ('loguru', 4000, 4250, 0))
+        self.assertEqual(cost_by_package(entries), {'_io': 120, 'django': 1800, 'loguru': 4250})
+        logger.info("Importtime parsing verified")
+
+    def test_startup_within_budget(self):
+        """Verify that the project starts without boto3 and within a generous budget."""
+        logger.info("Testing startup import budget")
+        out = StringIO()
+        call_command('importtime', '--runs', '1', '--budget-ms', '10000', stdout=out)
+        output = out.getvalue()
+        self.assertIn('django', output)
+        self.assertIn('Import time within budget', output)
+        logger.info("Startup import budget verified")
+
+    def test_budget_exceeded(self):
+        """Verify that exceeding the total budget fails the command."""
+        logger.info("Testing exceeded budget")
+        with self.assertRaisesMessage(CommandError, 'exceeds budget'):
+            call_command('importtime', '--runs', '1', '--budget-ms', '1', stdout=StringIO())
+        logger.info("Exceeded budget verified")
+
+    def test_forbidden_module(self):
+        """Verify that importing a forbidden module at startup fails the command."""
+        logger.info("Testing forbidden module")
+        with self.assertRaisesMessage(CommandError, 'django.db is imported at startup'):
+            call_command('importtime', '--runs', '1', '--budget-ms', '10000', '--forbid', 'django.db', stdout=StringIO())
+        logger.info("Forbidden module verified")
+
+    def tearDown(self):
+        """Clean up after each test."""
+        super().tearDown()
+        logger.info(f"Finishing test: {self._testMethodName}")
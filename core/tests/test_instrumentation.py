@@ -0,0 +1,185 @@
+from django.test import AsyncClient, TestCase, Client, override_settings
+from django.conf import settings
+from django.core.cache import caches
+from django.urls import reverse
+from asgiref.sync import async_to_sync
+from loguru import logger
+import sys
+import marshal
+import boto3
+from moto import mock_aws
+from unittest.mock import Mock, patch
+
+from core import instrumentation
+from core.instrumentation import begin_request, end_request
+from core.metrics import Registry
+
+logger.remove()
+logger.add(
+    sys.stdout,
+    format="[{level: <8}] {name}:{function}:{line} - {message}",
+    level="INFO"
+)
+
+
+def server_timing(response):
+    return dict(
+        (part.split(';')[0].strip(), part)
+        for part in response['Server-Timing'].split(',')
+    )
+
+
+@override_settings(SERVER_TIMING=True)
+class InstrumentationTests(TestCase):
+    """Test suite for the request timing middleware and the metrics endpoint.
+
+    These tests verify that DB, template and S3 time is attributed to the
+    request being served and exported in the Prometheus text format.
+    """
+
+    def setUp(self):
+        """Set up test client and an empty page cache for each test."""
+        super().setUp()
+        self.client = Client()
+        caches['default'].clear()
+        logger.info(f"Starting test: {self._testMethodName}")
+
+    def test_server_timing_header(self):
+        """Verify that every response carries a Server-Timing breakdown."""
+        logger.info("Testing Server-Timing header")
+        response = self.client.get(reverse('hello_world'))
+        timing = server_timing(response)
+        self.assertEqual(set(timing), {'db', 'tpl', 's3', 'total'})
+        self.assertIn('0 queries', timing['db'])
+        logger.info("Server-Timing header verified")
+
+    @override_settings(SERVER_TIMING=False)
+    def test_server_timing_is_opt_in(self):
+        """Verify that the Server-Timing breakdown is not sent unless enabled."""
+        logger.info("Testing Server-Timing opt-in")
+        self.assertNotIn('Server-Timing', self.client.get(reverse('hello_world')))
+        logger.info("Server-Timing opt-in verified")
+
+    def test_db_queries_are_counted(self):
+        """Verify that queries run in the view's sync thread are attributed to the request."""
+        logger.info("Testing DB query counting")
+        with patch('core.views.pool_status', return_value=None):
+            response = self.client.get(reverse('db_health_check'))
+        self.assertIn('1 queries', server_timing(response)['db'])
+        logger.info("DB query counting verified")
+
+    def test_template_time_is_recorded(self):
+        """Verify that rendering the home page records template time."""
+        logger.info("Testing template timing")
+        response = self.client.get(reverse('home'))
+        duration = float(server_timing(response)['tpl'].split('dur=')[1])
+        self.assertGreater(duration, 0)
+        logger.info("Template timing verified")
+
+    def test_s3_calls_are_recorded(self):
+        """Verify that S3 API calls made during a request are counted and timed."""
+        logger.info("Testing S3 call timing")
+        with mock_aws():
+            client = boto3.client('s3', region_name=settings.AWS_S3_REGION_NAME)
+            client.create_bucket(Bucket='instrumentation-test')
+            stats, token = begin_request()
+            try:
+                client.head_bucket(Bucket='instrumentation-test')
+                client.list_objects_v2(Bucket='instrumentation-test')
+            finally:
+                end_request(token)
+        self.assertEqual(stats.s3_calls, 2)
+        self.assertGreater(stats.s3_seconds, 0)
+        logger.info("S3 call timing verified")
+
+    @override_settings(METRICS_TOKEN='secret-token')
+    def test_metrics_endpoint(self):
+        """Verify that the metrics endpoint exposes per-view latency histograms."""
+        logger.info("Testing metrics endpoint")
+        self.client.get(reverse('hello_world'))
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret-token')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('# TYPE http_request_duration_seconds histogram', body)
+        self.assertIn('http_request_duration_seconds_bucket{view="hello_world",method="GET",le="+Inf"}', body)
+        self.assertIn('http_requests_total{view="hello_world",method="GET",status="200"}', body)
+        logger.info("Metrics endpoint verified")
+
+    @override_settings(METRICS_TOKEN='secret-token')
+    def test_metrics_token(self):
+        """Verify that the metrics endpoint requires the bearer token when configured."""
+        logger.info("Testing metrics token")
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 401)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret-token')
+        self.assertEqual(response.status_code, 200)
+        with self.settings(METRICS_TOKEN=None, DEBUG=False):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        with self.settings(METRICS_TOKEN=None, DEBUG=True):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+        logger.info("Metrics token verified")
+
+    def test_log_shipping_and_pool_metric_types(self):
+        """Verify that cumulative stats are exported as *_total counters and levels as gauges."""
+        logger.info("Testing collected metric types")
+        sink = Mock()
+        sink.stats.return_value = {'queued': 3, 'dropped': 1, 'shipped': 10, 'failed': 0,
+                                   'batches': 2, 'bytes_shipped': 512, 'pending': 3}
+        with self.settings(LOG_SINK=sink):
+            types = {name: kind for name, kind, _, _ in instrumentation.collect_log_shipping()}
+        self.assertEqual(types['log_shipping_queued'], 'gauge')
+        self.assertEqual(types['log_shipping_pending'], 'gauge')
+        self.assertEqual(types['log_shipping_shipped_total'], 'counter')
+        self.assertEqual(types['log_shipping_bytes_shipped_total'], 'counter')
+        self.assertTrue(all(name.endswith('_total') for name, kind in types.items() if kind == 'counter'))
+        status = {'open': True, 'size': 2, 'checkouts': 40, 'exhausted': 1, 'avg_wait_ms': 0.5}
+        with patch('core.db_pool.pool_status', return_value=status):
+            types = {name: kind for name, kind, _, _ in instrumentation.collect_db_pool()}
+        self.assertEqual(types, {'db_pool_open': 'gauge', 'db_pool_size': 'gauge', 'db_pool_checkouts_total': 'counter',
+                                 'db_pool_exhausted_total': 'counter', 'db_pool_avg_wait_ms': 'gauge'})
+        logger.info("Collected metric types verified")
+
+    @override_settings(PROFILE_SAMPLE_RATE=1.0)
+    def test_sampled_requests_are_profiled(self):
+        """Verify that sampled requests produce a pstats dump handed to the uploader."""
+        logger.info("Testing sampled profiling")
+        with patch('core.instrumentation._profile_uploader.submit') as mock_submit:
+            self.client.get(reverse('hello_world'))
+        mock_submit.assert_called_once()
+        _, name, data = mock_submit.call_args.args
+        self.assertTrue(name.startswith('profiles/'))
+        self.assertIn('hello_world', name)
+        self.assertTrue(name.endswith('.prof'))
+        self.assertIsInstance(marshal.loads(data), dict)
+        logger.info("Sampled profiling verified")
+
+    @override_settings(PROFILE_SAMPLE_RATE=1.0, ROOT_URLCONF='core.tests.asgi_urls')
+    def test_async_requests_are_not_profiled(self):
+        """Verify that requests served on the event loop are never profiled."""
+        logger.info("Testing async profiling")
+        with patch('core.instrumentation._profile_uploader.submit') as mock_submit:
+            response = async_to_sync(AsyncClient().get)(reverse('hello_world'))
+        self.assertEqual(response.status_code, 200)
+        mock_submit.assert_not_called()
+        logger.info("Async profiling verified")
+
+    def test_registry_histogram_format(self):
+        """Verify cumulative buckets, sum and count in the exposition format."""
+        logger.info("Testing histogram rendering")
+        registry = Registry()
+        histogram = registry.histogram('latency_seconds', 'Latency.', ('view',), buckets=(0.1, 1.0))
+        histogram.observe(0.05, view='a')
+        histogram.observe(0.5, view='a')
+        histogram.observe(5, view='a')
+        body = registry.render()
+        self.assertIn('latency_seconds_bucket{view="a",le="0.1"} 1', body)
+        self.assertIn('latency_seconds_bucket{view="a",le="1.0"} 2', body)
+        self.assertIn('latency_seconds_bucket{view="a",le="+Inf"} 3', body)
+        self.assertIn('latency_seconds_sum{view="a"} 5.55', body)
+        self.assertIn('latency_seconds_count{view="a"} 3', body)
+        logger.info("Histogram rendering verified")
+
+    def tearDown(self):
+        """Clean up after each test."""
+        super().tearDown()
+        logger.info(f"Finishing test: {self._testMethodName}")
@@ -0,0 +1,233 @@
+from django.test import TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.core.management import call_command
+from django.db import OperationalError, connection, transaction
+from django.utils import timezone
+from loguru import logger
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest import mock
+import sys
+import threading
+
+from core import jobs
+from core.models import Job
+
+logger.remove()
+logger.add(
+    sys.stdout,
+    format="[{level: <8}] {name}:{function}:{line} - {message}",
+    level="INFO"
+)
+
+calls = []
+
+
+@jobs.task(name='tests.record')
+def record(value):
+    calls.append(value)
+
+
+@jobs.task(name='tests.fail', max_attempts=2)
+def fail():
+    raise RuntimeError("boom")
+
+
+class JobQueueTests(TransactionTestCase):
+    """Test suite for the database-backed job queue.
+
+    These tests verify claiming order, retries with backoff, recovery of
+    abandoned jobs, the worker command and the queue metrics.
+    """
+
+    def setUp(self):
+        """Set up logging and clear recorded calls for each test."""
+        super().setUp()
+        logger.info(f"Starting test: {self._testMethodName}")
+        calls.clear()
+
+    def test_enqueue_and_run(self):
+        """Verify that an enqueued job runs once and records its timing."""
+        logger.info("Testing job run")
+        job = record.enqueue(value='a')
+        self.assertEqual(job.status, Job.Status.QUEUED)
+        done = jobs.TASKS.value(task='tests.record', outcome='done')
+        jobs.work(['default'], 'test', burst=True)
+        job.refresh_from_db()
+        self.assertEqual(calls, ['a'])
+        self.assertEqual(job.status, Job.Status.DONE)
+        self.assertEqual(job.attempts, 1)
+        self.assertIsNotNone(job.duration)
+        self.assertEqual(jobs.TASKS.value(task='tests.record', outcome='done'), done + 1)
+        logger.info("Job run verified")
+
+    def test_rolled_back_enqueue(self):
+        """Verify that a job enqueued in a rolled back transaction never exists."""
+        logger.info("Testing transactional enqueue")
+        try:
+            with transaction.atomic():
+                record.enqueue(value='lost')
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertFalse(Job.objects.exists())
+        logger.info("Transactional enqueue verified")
+
+    def test_enqueue_on_commit(self):
+        """Verify that a job enqueued on commit is inserted after the block commits, and never on rollback."""
+        logger.info("Testing enqueue on commit")
+        with transaction.atomic():
+            record.enqueue_on_commit(value='kept')
+            self.assertFalse(Job.objects.exists())
+        try:
+            with transaction.atomic():
+                record.enqueue_on_commit(value='lost')
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertEqual(list(Job.objects.values_list('kwargs', flat=True)), [{'value': 'kept'}])
+        logger.info("Enqueue on commit verified")
+
+    def test_worker_survives_database_errors(self):
+        """Verify that a failing claim is logged and retried instead of ending the worker."""
+        logger.info("Testing worker errors")
+        record.enqueue(value='after error')
+        claim = jobs.claim
+        errors = [OperationalError("connection lost")]
+
+        def flaky_claim(*args, **kwargs):
+            if errors:
+                raise errors.pop()
+            return claim(*args, **kwargs)
+
+        with mock.patch.object(jobs, 'claim', flaky_claim):
+            jobs.work(['default'], 'test', threading.Event(), poll_interval=0.01, burst=True)
+        self.assertEqual(calls, ['after error'])
+        logger.info("Worker errors verified")
+
+    def test_order_and_delay(self):
+        """Verify that higher priority runs first and delayed jobs wait."""
+        logger.info("Testing claim order")
+        jobs.enqueue('tests.record', {'value': 'low'})
+        jobs.enqueue('tests.record', {'value': 'high'}, priority=10)
+        jobs.enqueue('tests.record', {'value': 'later'}, delay=60)
+        jobs.enqueue('tests.record', {'value': 'other queue'}, queue='other')
+        jobs.work(['default'], 'test', burst=True)
+        self.assertEqual(calls, ['high', 'low'])
+        logger.info("Claim order verified")
+
+    @override_settings(TASK_RETRY_BASE_DELAY=10)
+    def test_retry_with_backoff(self):
+        """Verify that a failing job is retried later and fails after max_attempts."""
+        logger.info("Testing retries")
+        job = fail.enqueue()
+        before = timezone.now()
+        jobs.work(['default'], 'test', burst=True)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('RuntimeError: boom', job.last_error)
+        self.assertGreaterEqual(job.run_at, before + timedelta(seconds=5))
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        jobs.work(['default'], 'test', burst=True)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.FAILED)
+        self.assertEqual(job.attempts, 2)
+        logger.info("Retries verified")
+
+    def test_retry_delay_grows(self):
+        """Verify that the backoff doubles per attempt up to the cap."""
+        logger.info("Testing backoff")
+        with self.settings(TASK_RETRY_BASE_DELAY=4, TASK_RETRY_MAX_DELAY=20):
+            self.assertTrue(2 <= jobs.retry_delay(1) <= 4)
+            self.assertTrue(8 <= jobs.retry_delay(3) <= 16)
+            self.assertTrue(10 <= jobs.retry_delay(10) <= 20)
+        logger.info("Backoff verified")
+
+    def test_unknown_task_fails(self):
+        """Verify that a job for an unregistered task fails without retries."""
+        logger.info("Testing unknown task")
+        job = jobs.enqueue('tests.missing')
+        jobs.work(['default'], 'test', burst=True)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.FAILED)
+        self.assertIn('Unknown task', job.last_error)
+        logger.info("Unknown task verified")
+
+    def test_requeue_stale(self):
+        """Verify that jobs abandoned by a dead worker are queued again or failed."""
+        logger.info("Testing stale jobs")
+        started = timezone.now() - timedelta(hours=1)
+        retry = Job.objects.create(task='tests.record', status=Job.Status.RUNNING, attempts=1, started_at=started)
+        spent = Job.objects.create(task='tests.record', status=Job.Status.RUNNING, attempts=3, started_at=started)
+        recent = Job.objects.create(task='tests.record', status=Job.Status.RUNNING, attempts=1, started_at=timezone.now())
+        self.assertEqual(jobs.requeue_stale(timeout=60), 2)
+        statuses = dict(Job.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses[retry.pk], Job.Status.QUEUED)
+        self.assertEqual(statuses[spent.pk], Job.Status.FAILED)
+        self.assertEqual(statuses[recent.pk], Job.Status.RUNNING)
+        logger.info("Stale jobs verified")
+
+    def test_worker_command(self):
+        """Verify that the worker command drains the queue in burst mode."""
+        logger.info("Testing worker command")
+        for value in range(5):
+            record.enqueue(value=value)
+        call_command('worker', '--burst', '--concurrency', '1')
+        self.assertEqual(sorted(calls), list(range(5)))
+        self.assertFalse(Job.objects.exclude(status=Job.Status.DONE).exists())
+        logger.info("Worker command verified")
+
+    @override_settings(TASK_VISIBILITY_TIMEOUT=0)
+    def test_worker_command_survives_sweep_errors(self):
+        """Verify that a failing stale-job sweep is retried and the job threads always stop."""
+        logger.info("Testing worker sweep errors")
+        record.enqueue(value='swept')
+        sweeps = [0, OperationalError("connection lost"), KeyboardInterrupt()]
+        with mock.patch.object(jobs, 'requeue_stale', side_effect=sweeps) as requeue_stale:
+            with self.assertRaises(KeyboardInterrupt):
+                call_command('worker', '--concurrency', '1', '--poll-interval', '0.05')
+        self.assertEqual(requeue_stale.call_count, 3)
+        self.assertEqual(calls, ['swept'])
+        self.assertFalse(any(thread.name == 'worker-1' for thread in threading.enumerate()))
+        logger.info("Worker sweep errors verified")
+
+    @skipUnlessDBFeature('has_select_for_update_skip_locked')
+    def test_concurrent_claims_are_disjoint(self):
+        """Verify that concurrent workers never claim the same job."""
+        logger.info("Testing concurrent claims")
+        for value in range(20):
+            record.enqueue(value=value)
+        barrier = threading.Barrier(4)
+
+        def claim_all(index):
+            barrier.wait()
+            claimed = []
+            try:
+                while batch := jobs.claim(['default'], f'test/{index}', limit=2):
+                    claimed.extend(job.pk for job in batch)
+            finally:
+                connection.close()
+            return claimed
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            claimed = [pk for batch in executor.map(claim_all, range(4)) for pk in batch]
+        self.assertEqual(len(claimed), 20)
+        self.assertEqual(len(set(claimed)), 20)
+        logger.info("Concurrent claims verified")
+
+    def test_queue_metrics(self):
+        """Verify that the collector reports queue depth and lag."""
+        logger.info("Testing queue metrics")
+        record.enqueue(value=1)
+        Job.objects.update(run_at=timezone.now() - timedelta(seconds=30))
+        families = {name: samples for name, _, _, samples in jobs.collect_queue()}
+        self.assertIn(({'queue': 'default', 'status': 'queued'}, 1), families['task_queue_jobs'])
+        lag = dict((labels['queue'], value) for labels, value in families['task_queue_oldest_seconds'])
+        self.assertGreaterEqual(lag['default'], 30)
+        logger.info("Queue metrics verified")
+
+    def tearDown(self):
+        """Clean up after each test."""
+        super().tearDown()
+        logger.info(f"Finishing test: {self._testMethodName}")
@@ -0,0 +1,253 @@
+from django.test import SimpleTestCase
+from loguru import logger
+import gzip
+import os
+import sys
+import threading
+import unittest
+
+from core.log_shipping import S3LogSink, DROP_OLDEST, DROP_NEWEST, MIN_PART_SIZE
+
+logger.remove()
+logger.add(
+    sys.stdout,
+    format="[{level: <8}] {name}:{function}:{line} - {message}",
+    level="INFO"
+)
+
+
+class FakeS3Client:
+    """In-memory stand-in for the subset of the boto3 S3 client used by the sink."""
+
+    def __init__(self, fail_times=0, gate=None):
+        self.objects = {}
+        self.multipart_uploads = {}
+        self.aborted = []
+        self.fail_times = fail_times
+        self.gate = gate
+
+    def put_object(self, Bucket, Key, Body, **params):
+        if self.gate is not None:
+            self.gate.wait()
+        if self.fail_times:
+            self.fail_times -= 1
+            raise ConnectionError("Simulated S3 outage")
+        self.objects[(Bucket, Key)] = Body
+
+    def create_multipart_upload(self, Bucket, Key, **params):
+        upload_id = f"upload-{len(self.multipart_uploads) + 1}"
+        self.multipart_uploads[upload_id] = {}
+        return {'UploadId': upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.multipart_uploads[UploadId][PartNumber] = Body
+        return {'ETag': f'"{PartNumber}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = self.multipart_uploads.pop(UploadId)
+        numbers = [part['PartNumber'] for part in MultipartUpload['Parts']]
+        self.objects[(Bucket, Key)] = b''.join(parts[number] for number in numbers)
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.aborted.append(UploadId)
+
+    def lines(self):
+        shipped = []
+        for body in self.objects.values():
+            shipped.extend(gzip.decompress(body).decode().splitlines())
+        return shipped
+
+
+class S3LogSinkTests(SimpleTestCase):
+    """Test suite for the background S3 log sink.
+
+    These tests verify batching, drop policies and counters against an
+    in-memory S3 stand-in, so no AWS access is required.
+    """
+
+    def setUp(self):
+        """Set up test environment for each test."""
+        super().setUp()
+        logger.info(f"Starting test: {self._testMethodName}")
+
+    def make_sink(self, client, **options):
+        options.setdefault('flush_interval', 60)
+        sink = S3LogSink(bucket='test-bucket', prefix='logs/test', client=client, **options)
+        self.addCleanup(sink.stop)
+        return sink
+
+    def test_records_are_batched_into_one_object(self):
+        """Verify that records enqueued before a flush are shipped as a single gzip object."""
+        logger.info("Testing record batching")
+        client = FakeS3Client()
+        sink = self.make_sink(client)
+        for i in range(100):
+            sink(f"record {i}\n")
+        self.assertTrue(sink.flush(timeout=5))
+
+        self.assertEqual(len(client.objects), 1)
+        bucket, key = next(iter(client.objects))
+        self.assertEqual(bucket, 'test-bucket')
+        self.assertTrue(key.startswith('logs/test/'))
+        self.assertTrue(key.endswith('.log.gz'))
+        self.assertEqual(client.lines(), [f"record {i}" for i in range(100)])
+
+        stats = sink.stats()
+        self.assertEqual(stats['shipped'], 100)
+        self.assertEqual(stats['queued'], 0)
+        self.assertEqual(stats['dropped'], 0)
+        self.assertEqual(stats['batches'], 1)
+        logger.info("Record batching test successful")
+
+    def test_batch_size_triggers_upload(self):
+        """Verify that a batch is shipped as soon as it reaches the size limit."""
+        logger.info("Testing size-triggered batches")
+        client = FakeS3Client()
+        sink = self.make_sink(client, batch_max_bytes=100)
+        for i in range(10):
+            sink(f"{i:049d}\n")
+        sink.flush(timeout=5)
+        self.assertEqual(len(client.objects), 5)
+        self.assertEqual(len(client.lines()), 10)
+        logger.info("Size-triggered batches test successful")
+
+    def test_drop_newest_when_queue_is_full(self):
+        """Verify that the default policy discards new records instead of blocking."""
+        logger.info("Testing drop_newest policy")
+        gate = threading.Event()
+        client = FakeS3Client(gate=gate)
+        sink = self.make_sink(client, max_queue_size=5, batch_max_bytes=1, drop_policy=DROP_NEWEST)
+        sink("first\n")
+        # Wait until the worker is stuck uploading the first record.
+        while sink.stats()['pending']:
+            pass
+        for i in range(10):
+            sink(f"record {i}\n")
+        self.assertEqual(sink.stats()['dropped'], 5)
+        gate.set()
+        sink.flush(timeout=5)
+        self.assertEqual(client.lines()[-5:], [f"record {i}" for i in range(5)])
+        logger.info("drop_newest policy test successful")
+
+    def test_drop_oldest_when_queue_is_full(self):
+        """Verify that drop_oldest keeps the most recent records."""
+        logger.info("Testing drop_oldest policy")
+        gate = threading.Event()
+        client = FakeS3Client(gate=gate)
+        sink = self.make_sink(client, max_queue_size=5, batch_max_bytes=1, drop_policy=DROP_OLDEST)
+        sink("first\n")
+        while sink.stats()['pending']:
+            pass
+        for i in range(10):
+            sink(f"record {i}\n")
+        self.assertEqual(sink.stats()['dropped'], 5)
+        gate.set()
+        sink.flush(timeout=5)
+        self.assertEqual(client.lines()[-5:], [f"record {i}" for i in range(5, 10)])
+        logger.info("drop_oldest policy test successful")
+
+    def test_drop_oldest_keeps_control_messages(self):
+        """Verify that drop_oldest skips over a pending flush instead of moving or losing it."""
+        logger.info("Testing drop_oldest with a pending flush")
+        gate = threading.Event()
+        client = FakeS3Client(gate=gate)
+        sink = self.make_sink(client, max_queue_size=2, batch_max_bytes=1, drop_policy=DROP_OLDEST)
+        sink("first\n")
+        while sink.stats()['pending']:
+            pass
+        sink("a\n")
+        flushed = []
+        flusher = threading.Thread(target=lambda: flushed.append(sink.flush(timeout=5)))
+        flusher.start()
+        while sink.stats()['pending'] < 2:
+            pass
+        sink("b\n")
+        sink("c\n")
+        self.assertEqual(sink.stats()['dropped'], 2)
+        gate.set()
+        flusher.join()
+        self.assertEqual(flushed, [True])
+        sink.flush(timeout=5)
+        self.assertEqual(client.lines()[-1], "c")
+        self.assertNotIn("b", client.lines())
+        logger.info("drop_oldest with a pending flush test successful")
+
+    def test_failed_uploads_are_retried(self):
+        """Verify that transient upload errors are retried before giving up."""
+        logger.info("Testing upload retries")
+        client = FakeS3Client(fail_times=1)
+        sink = self.make_sink(client, upload_retries=2)
+        sink("retried\n")
+        sink.flush(timeout=10)
+        self.assertEqual(client.lines(), ["retried"])
+        self.assertEqual(sink.stats()['failed'], 0)
+        logger.info("Upload retries test successful")
+
+    def test_large_batches_use_multipart_upload(self):
+        """Verify that chunks above the multipart threshold are uploaded in parts."""
+        logger.info("Testing multipart upload")
+        client = FakeS3Client()
+        sink = self.make_sink(
+            client,
+            batch_max_bytes=64 * 1024 * 1024,
+            multipart_threshold=MIN_PART_SIZE,
+            part_size=MIN_PART_SIZE,
+        )
+        # Random-looking payload so gzip cannot shrink it below the threshold.
+        payload = os.urandom(3 * MIN_PART_SIZE).hex()
+        sink(payload + "\n")
+        sink.flush(timeout=30)
+        self.assertEqual(client.lines(), [payload])
+        self.assertFalse(client.multipart_uploads)
+        self.assertFalse(client.aborted)
+        logger.info("Multipart upload test successful")
+
+    def test_works_as_loguru_sink(self):
+        """Verify that the sink can be registered directly as a loguru handler."""
+        logger.info("Testing loguru integration")
+        client = FakeS3Client()
+        sink = self.make_sink(client)
+        handler_id = logger.add(sink, format="{level} {message}", level="DEBUG")
+        try:
+            logger.debug("shipped through loguru")
+        finally:
+            logger.remove(handler_id)
+        sink.flush(timeout=5)
+        self.assertIn("DEBUG shipped through loguru", client.lines())
+        logger.info("Loguru integration test successful")
+
+    @unittest.skipUnless(hasattr(os, 'fork'), "fork is not available")
+    def test_forked_child_gets_its_own_lock_and_worker(self):
+        """Verify that a forked child can log even if the parent's lock was held at fork time."""
+        logger.info("Testing fork safety")
+        client = FakeS3Client()
+        sink = self.make_sink(client)
+        sink("parent\n")
+        read_fd, write_fd = os.pipe()
+        # As if the worker thread were updating the counters at fork time.
+        with sink._lock:
+            pid = os.fork()
+        if pid == 0:
+            ok = sink._lock.acquire(timeout=1)
+            if ok:
+                sink._lock.release()
+                sink("child\n")
+                ok = sink.flush(timeout=5) and sink.stats()['shipped'] == 1
+            os.write(write_fd, b'1' if ok else b'0')
+            os._exit(0)
+        os.waitpid(pid, 0)
+        self.assertEqual(os.read(read_fd, 1), b'1')
+        os.close(read_fd)
+        os.close(write_fd)
+        self.assertEqual(sink.stats()['queued'], 1)
+        logger.info("Fork safety test successful")
+
+    def test_rejects_unknown_drop_policy(self):
+        """Verify that a misconfigured drop policy fails loudly."""
+        with self.assertRaises(ValueError):
+            S3LogSink(bucket='test-bucket', drop_policy='ignore')
+
+    def tearDown(self):
+        """Clean up after each test."""
+        super().tearDown()
+        logger.info(f"Finishing test: {self._testMethodName}")
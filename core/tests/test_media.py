@@ -0,0 +1,176 @@
+from django.test import SimpleTestCase, override_settings
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from loguru import logger
+from unittest import mock
+import sys
+from moto import mock_aws
+
+from core import media, s3
+from core.media import parse_range
+
+logger.remove()
+logger.add(
+    sys.stdout,
+    format="[{level: <8}] {name}:{function}:{line} - {message}",
+    level="INFO"
+)
+
+BODY = bytes(range(256)) * 64  # 16 KiB
+
+# Overriding STORAGES rebuilds the default storage, so it picks up moto's client.
+MEDIA_STORAGES = {
+    "default": settings.STORAGES["default"],
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+
+@override_settings(
+    STORAGES=MEDIA_STORAGES,
+    MEDIA_DELIVERY='stream',
+    MEDIA_STREAM_CHUNK_SIZE=4096,
+)
+class MediaServingTests(SimpleTestCase):
+    """Test suite for media delivery from S3.
+
+    These tests verify chunked streaming, byte ranges, conditional requests,
+    and signed redirects for large objects.
+    """
+
+    def setUp(self):
+        """Start moto and upload a media object for each test."""
+        super().setUp()
+        logger.info(f"Starting test: {self._testMethodName}")
+        self.mock = mock_aws()
+        self.mock.start()
+        s3.reset()
+        s3.get_s3_client().create_bucket(Bucket=settings.AWS_STORAGE_BUCKET_NAME)
+        storages['default'].save('media/videos/clip.bin', ContentFile(BODY))
+
+    def test_parse_range(self):
+        """Verify that only single, well-formed byte ranges are forwarded to S3."""
+        logger.info("Testing range parsing")
+        self.assertEqual(parse_range('bytes=0-99'), 'bytes=0-99')
+        self.assertEqual(parse_range('bytes=100-'), 'bytes=100-')
+        self.assertEqual(parse_range('bytes=-500'), 'bytes=-500')
+        self.assertIsNone(parse_range('bytes=0-1,5-6'))
+        self.assertIsNone(parse_range('bytes=9-3'))
+        self.assertIsNone(parse_range('items=0-1'))
+        self.assertIsNone(parse_range(None))
+        logger.info("Range parsing verified")
+
+    def test_streams_whole_object(self):
+        """Verify that the object is streamed in chunks with its metadata."""
+        logger.info("Testing full download")
+        response = self.client.get('/core/media/videos/clip.bin')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        chunks = list(response.streaming_content)
+        self.assertEqual(len(chunks), len(BODY) // 4096)
+        self.assertEqual(b''.join(chunks), BODY)
+        self.assertEqual(response['Content-Length'], str(len(BODY)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('ETag', response)
+        logger.info("Full download verified")
+
+    def test_byte_range(self):
+        """Verify that a Range request returns 206 with only the requested bytes."""
+        logger.info("Testing byte range")
+        response = self.client.get('/core/media/videos/clip.bin', HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), BODY[100:200])
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(BODY)}')
+        self.assertEqual(response['Content-Length'], '100')
+        logger.info("Byte range verified")
+
+    def test_suffix_range(self):
+        """Verify that a suffix range returns the last bytes of the object."""
+        logger.info("Testing suffix range")
+        response = self.client.get('/core/media/videos/clip.bin', HTTP_RANGE='bytes=-10')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), BODY[-10:])
+        logger.info("Suffix range verified")
+
+    def test_unsatisfiable_range(self):
+        """Verify that a range past the end of the object returns 416."""
+        logger.info("Testing unsatisfiable range")
+        response = self.client.get('/core/media/videos/clip.bin', HTTP_RANGE=f'bytes={len(BODY) + 10}-')
+        self.assertEqual(response.status_code, 416)
+        logger.info("Unsatisfiable range verified")
+
+    def test_missing_and_invalid_paths(self):
+        """Verify that missing objects and paths escaping the prefix return 404."""
+        logger.info("Testing missing media")
+        self.assertEqual(self.client.get('/core/media/videos/missing.bin').status_code, 404)
+        self.assertEqual(self.client.get('/core/media/../static/app.css').status_code, 404)
+        logger.info("Missing media verified")
+
+    def test_if_none_match(self):
+        """Verify that a matching ETag returns 304 without a body."""
+        logger.info("Testing conditional request")
+        etag = self.client.head('/core/media/videos/clip.bin')['ETag']
+        response = self.client.get('/core/media/videos/clip.bin', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        logger.info("Conditional request verified")
+
+    def test_head(self):
+        """Verify that HEAD returns the headers of the object without a body."""
+        logger.info("Testing HEAD")
+        response = self.client.head('/core/media/videos/clip.bin')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Length'], str(len(BODY)))
+        self.assertEqual(response.content, b'')
+        logger.info("HEAD verified")
+
+    def test_post_not_allowed(self):
+        """Verify that only safe methods are accepted."""
+        logger.info("Testing POST")
+        self.assertEqual(self.client.post('/core/media/videos/clip.bin').status_code, 405)
+        logger.info("POST verified")
+
+    @override_settings(MEDIA_DELIVERY='redirect')
+    def test_redirect_mode(self):
+        """Verify that redirect mode answers with a presigned S3 URL."""
+        logger.info("Testing redirect mode")
+        response = self.client.get('/core/media/videos/clip.bin')
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('media/videos/clip.bin', response['Location'])
+        self.assertIn('X-Amz-Signature', response['Location'])
+        self.assertTrue(response['Cache-Control'].startswith('private'))
+        logger.info("Redirect mode verified")
+
+    @override_settings(MEDIA_DELIVERY='auto', MEDIA_REDIRECT_MIN_BYTES=len(BODY))
+    def test_auto_redirects_large_objects(self):
+        """Verify that auto mode redirects from the size threshold and streams below it."""
+        logger.info("Testing auto mode")
+        storages['default'].save('media/small.txt', ContentFile(b'small'))
+        with mock.patch.object(media, '_get_object', wraps=media._get_object) as get_object:
+            self.assertEqual(self.client.get('/core/media/videos/clip.bin').status_code, 302)
+        # The size comes from HeadObject: a large object is never opened.
+        get_object.assert_not_called()
+        # The threshold applies to the object, not to the requested range.
+        self.assertEqual(self.client.get('/core/media/videos/clip.bin', HTTP_RANGE='bytes=0-9').status_code, 302)
+        response = self.client.get('/core/media/small.txt')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'small')
+        logger.info("Auto mode verified")
+
+    @override_settings(ROOT_URLCONF='core.tests.asgi_urls')
+    async def test_async_streaming(self):
+        """Verify that under ASGI the body is streamed by an async iterator."""
+        logger.info("Testing ASGI streaming")
+        response = await self.async_client.get('/core/media/videos/clip.bin', headers={'range': 'bytes=0-8191'})
+        self.assertEqual(response.status_code, 206)
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(body, BODY[:8192])
+        logger.info("ASGI streaming verified")
+
+    def tearDown(self):
+        """Stop moto and drop the clients created under it."""
+        s3.reset()
+        self.mock.stop()
+        super().tearDown()
+        logger.info(f"Finishing test: {self._testMethodName}")
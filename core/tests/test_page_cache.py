@@ -0,0 +1,155 @@
+from django.test import TestCase, Client, RequestFactory, override_settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.urls import reverse
+from loguru import logger
+import sys
+import unittest
+from unittest.mock import patch
+
+from core.page_cache import cache_page_conditional, page_cache_key
+
+logger.remove()
+logger.add(
+    sys.stdout,
+    format="[{level: <8}] {name}:{function}:{line} - {message}",
+    level="INFO"
+)
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+
+class PageCacheTests(TestCase):
+    """Test suite for the full-page cache and conditional GET handling.
+
+    These tests verify that cached pages skip rendering, carry validators
+    and answer revalidation requests with 304 Not Modified.
+    """
+
+    def setUp(self):
+        """Set up test client and an empty cache for each test."""
+        super().setUp()
+        self.client = Client()
+        caches['default'].clear()
+        logger.info(f"Starting test: {self._testMethodName}")
+
+    def test_home_renders_with_validators(self):
+        """Verify that the home page renders and carries ETag and Last-Modified."""
+        logger.info("Testing home page validators")
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Core Home (testing area)')
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', response)
+        self.assertIn('max-age=', response['Cache-Control'])
+        logger.info("Home page validators verified")
+
+    def test_home_is_rendered_once(self):
+        """Verify that repeated requests are served from the cache."""
+        logger.info("Testing home page cache hits")
+        with patch('core.views.render', return_value=HttpResponse('cached body')) as mock_render:
+            first = self.client.get(reverse('home'))
+            second = self.client.get(reverse('home'))
+        self.assertEqual(mock_render.call_count, 1)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first['ETag'], second['ETag'])
+        logger.info("Home page cache hits verified")
+
+    def test_key_ignores_host_and_unknown_parameters(self):
+        """Verify that the host and undeclared query parameters do not create new entries."""
+        logger.info("Testing page cache keys")
+        with patch('core.views.render', return_value=HttpResponse('cached body')) as mock_render:
+            self.client.get(reverse('home'))
+            self.client.get(reverse('home') + '?x=1&utm_source=a')
+            self.client.get(reverse('home'), HTTP_HOST='other.example.com')
+        self.assertEqual(mock_render.call_count, 1)
+
+        factory = RequestFactory()
+        key = lambda url: page_cache_key(factory.get(url), query_params=('page', 'q'))
+        self.assertEqual(key('/list/?q=a&page=2&x=1'), key('/list/?page=2&q=a'))
+        self.assertNotEqual(key('/list/?page=2'), key('/list/?page=3'))
+        self.assertNotEqual(key('/list/'), key('/other/'))
+        logger.info("Page cache keys verified")
+
+    def test_if_none_match_returns_304(self):
+        """Verify that a matching If-None-Match header gets a bodiless 304."""
+        logger.info("Testing If-None-Match revalidation")
+        etag = self.client.get(reverse('home'))['ETag']
+        response = self.client.get(reverse('home'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+        logger.info("If-None-Match revalidation verified")
+
+    def test_if_modified_since_returns_304(self):
+        """Verify that an up-to-date If-Modified-Since header gets a 304."""
+        logger.info("Testing If-Modified-Since revalidation")
+        last_modified = self.client.get(reverse('home'))['Last-Modified']
+        response = self.client.get(reverse('home'), HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+        logger.info("If-Modified-Since revalidation verified")
+
+    def test_uncacheable_responses_are_not_stored(self):
+        """Verify that errors and responses setting cookies bypass the cache."""
+        logger.info("Testing uncacheable responses")
+        calls = []
+
+        @cache_page_conditional(timeout=60)
+        def view(request):
+            calls.append(1)
+            response = HttpResponse('with cookie')
+            response.set_cookie('session', 'abc')
+            return response
+
+        factory = RequestFactory()
+        view(factory.get('/uncacheable/'))
+        view(factory.get('/uncacheable/'))
+        self.assertEqual(len(calls), 2)
+        logger.info("Uncacheable responses verified")
+
+    def test_post_is_never_cached(self):
+        """Verify that unsafe methods always reach the view."""
+        logger.info("Testing POST bypass")
+        calls = []
+
+        @cache_page_conditional(timeout=60)
+        def view(request):
+            calls.append(1)
+            return HttpResponse('ok')
+
+        factory = RequestFactory()
+        view(factory.post('/form/'))
+        view(factory.post('/form/'))
+        self.assertEqual(len(calls), 2)
+        logger.info("POST bypass verified")
+
+    @unittest.skipIf(fakeredis is None, "fakeredis is not installed")
+    def test_redis_backend(self):
+        """Verify the page cache against the Redis backend using an in-process stand-in."""
+        logger.info("Testing Redis cache backend")
+        redis_cache = {
+            'default': {
+                'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                'LOCATION': 'redis://localhost:6379/0',
+                'OPTIONS': {'connection_class': fakeredis.FakeConnection},
+            }
+        }
+        with override_settings(CACHES=redis_cache):
+            caches['default'].clear()
+            with patch('core.views.render', return_value=HttpResponse('redis body')) as mock_render:
+                first = self.client.get(reverse('home'))
+                second = self.client.get(reverse('home'), HTTP_IF_NONE_MATCH=first['ETag'])
+            self.assertEqual(mock_render.call_count, 1)
+            self.assertEqual(first.content, b'redis body')
+            self.assertEqual(second.status_code, 304)
+            caches['default'].clear()
+        logger.info("Redis cache backend verified")
+
+    def tearDown(self):
+        """Clean up after each test."""
+        caches['default'].clear()
+        super().tearDown()
+        logger.info(f"Finishing test: {self._testMethodName}")
@@ -0,0 +1,151 @@
+from django.test import SimpleTestCase
+from django.conf import settings
+from django.contrib.staticfiles import storage as staticfiles
+from django.core.files.storage import storages
+from django.core.management import call_command
+from django.utils.functional import empty
+from loguru import logger
+import sys
+import gzip
+import json
+import os
+import tempfile
+import boto3
+from moto import mock_aws
+
+from core import s3
+from core.management.commands.publishstatic import Command
+from core.storage import IMMUTABLE_CACHE_CONTROL
+
+logger.remove()
+logger.add(
+    sys.stdout,
+    format="[{level: <8}] {name}:{function}:{line} - {message}",
+    level="INFO"
+)
+
+
+class PublishStaticTests(SimpleTestCase):
+    """Test suite for the incremental static files publisher.
+
+    These tests run against moto's in-memory S3, so they verify upload
+    selection and object metadata without touching the real bucket.
+    """
+
+    def setUp(self):
+        """Set up an empty mocked bucket for each test."""
+        super().setUp()
+        logger.info(f"Starting test: {self._testMethodName}")
+        self.mock = mock_aws()
+        self.mock.start()
+        self.client = boto3.client('s3', region_name=settings.AWS_S3_REGION_NAME)
+        self.client.create_bucket(Bucket=settings.AWS_STORAGE_BUCKET_NAME)
+        self.reset_storage()
+
+    def reset_storage(self):
+        """Drop the cached storage and shared client, which hold the manifest and boto3 connections."""
+        storages._storages.pop('staticfiles', None)
+        staticfiles.staticfiles_storage._wrapped = empty
+        s3.reset()
+
+    def static_objects(self):
+        paginator = self.client.get_paginator('list_objects_v2')
+        keys = {}
+        for page in paginator.paginate(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Prefix='static/'):
+            for obj in page.get('Contents', []):
+                keys[obj['Key']] = obj['LastModified']
+        return keys
+
+    def head(self, key):
+        return self.client.head_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=key)
+
+    def test_first_publish_uploads_hashed_and_original_files(self):
+        """Verify that every file is uploaded with its hashed copy and the manifest."""
+        logger.info("Testing initial publish")
+        call_command('publishstatic')
+
+        manifest = json.loads(self.client.get_object(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key='static/staticfiles.json'
+        )['Body'].read())
+        paths = manifest['paths']
+        self.assertIn('admin/css/base.css', paths)
+
+        keys = self.static_objects()
+        hashed_key = f"static/{paths['admin/css/base.css']}"
+        self.assertIn(hashed_key, keys)
+        self.assertIn('static/admin/css/base.css', keys)
+
+        hashed = self.head(hashed_key)
+        self.assertEqual(hashed['CacheControl'], IMMUTABLE_CACHE_CONTROL)
+        self.assertEqual(hashed['ContentType'], 'text/css')
+        original = self.head('static/admin/css/base.css')
+        self.assertEqual(original['CacheControl'], settings.AWS_S3_OBJECT_PARAMETERS['CacheControl'])
+        logger.info("Initial publish verified")
+
+    def test_compressed_assets_are_not_content_encoded(self):
+        """Verify that archives are uploaded as such, without a Content-Encoding that would unpack them."""
+        logger.info("Testing compressed assets")
+        command = Command()
+        command.client = self.client
+        with tempfile.TemporaryDirectory() as build_dir:
+            os.makedirs(os.path.join(build_dir, 'downloads'))
+            with open(os.path.join(build_dir, 'downloads', 'data.tar.gz'), 'wb') as f:
+                f.write(gzip.compress(b'archive'))
+            command.upload(build_dir, 'downloads/data.tar.gz')
+        obj = self.head('static/downloads/data.tar.gz')
+        self.assertEqual(obj['ContentType'], 'application/gzip')
+        self.assertNotIn('ContentEncoding', obj)
+        logger.info("Compressed assets verified")
+
+    def test_second_publish_uploads_nothing(self):
+        """Verify that an unchanged tree does not re-upload any file."""
+        logger.info("Testing incremental publish")
+        call_command('publishstatic')
+        before = self.static_objects()
+        self.reset_storage()
+        call_command('publishstatic')
+        self.assertEqual(self.static_objects(), before)
+        logger.info("Incremental publish verified")
+
+    def test_changed_file_is_reuploaded(self):
+        """Verify that only files whose manifest entry differs are uploaded again."""
+        logger.info("Testing changed file detection")
+        call_command('publishstatic')
+        manifest = json.loads(self.client.get_object(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key='static/staticfiles.json'
+        )['Body'].read())
+        # Pretend the published base.css was built from different content.
+        hashed_key = f"static/{manifest['paths']['admin/css/base.css']}"
+        manifest['paths']['admin/css/base.css'] = 'admin/css/base.000000000000.css'
+        self.client.put_object(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+            Key='static/staticfiles.json',
+            Body=json.dumps(manifest).encode(),
+        )
+        self.client.delete_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key='static/admin/css/base.css')
+        before = self.static_objects()
+
+        self.reset_storage()
+        call_command('publishstatic')
+        after = self.static_objects()
+        self.assertIn('static/admin/css/base.css', after)
+        reuploaded = [key for key in before if key != 'static/staticfiles.json' and before[key] != after[key]]
+        self.assertEqual(reuploaded, [hashed_key])
+        logger.info("Changed file detection verified")
+
+    def test_static_urls_use_hashed_names(self):
+        """Verify that the storage resolves URLs through the published manifest."""
+        logger.info("Testing hashed static URLs")
+        call_command('publishstatic')
+        self.reset_storage()
+        with self.settings(DEBUG=False):
+            url = staticfiles.staticfiles_storage.url('admin/css/base.css')
+        self.assertRegex(url, r'/static/admin/css/base\.[0-9a-f]{12}\.css$')
+        logger.info("Hashed static URLs verified")
+
+    def tearDown(self):
+        """Stop the S3 mock after each test."""
+        self.reset_storage()
+        self.mock.stop()
+        super().tearDown()
+        logger.info(f"Finishing test: {self._testMethodName}")
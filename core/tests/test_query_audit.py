@@ -0,0 +1,141 @@
+from django.test import TestCase, override_settings
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.urls import reverse
+from loguru import logger
+from unittest import mock
+import sys
+
+from core import query_audit
+from core.jobs import enqueue
+from core.models import Upload
+from core.query_audit import QueryBudgetExceeded, audit_queries, budget_for, query_budget, query_shape
+
+logger.remove()
+logger.add(
+    sys.stdout,
+    format="[{level: <8}] {name}:{function}:{line} - {message}",
+    level="INFO"
+)
+
+# Admin pages resolve {% static %} URLs; keep them off the S3 manifest.
+LOCAL_STORAGES = {
+    **settings.STORAGES,
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+AUDIT_MIDDLEWARE = 'core.middleware.query_audit.QueryAuditMiddleware'
+AUDITED_MIDDLEWARE = [
+    settings.MIDDLEWARE[0],
+    AUDIT_MIDDLEWARE,
+    *[path for path in settings.MIDDLEWARE[1:] if path != AUDIT_MIDDLEWARE],
+]
+
+
+@override_settings(STORAGES=LOCAL_STORAGES, MIDDLEWARE=AUDITED_MIDDLEWARE, QUERY_AUDIT_MODE='raise')
+class QueryAuditTests(TestCase):
+    """Test suite for query auditing.
+
+    These tests verify query shape normalization, N+1 detection with the
+    offending stack, per-view budgets, and the query cost of the admin pages.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(username=f'audit{i}', password='secret') for i in range(6)]
+        cls.admin = User.objects.create_superuser(username='audit-admin', password='secret')
+
+    def setUp(self):
+        """Set up logging for each test."""
+        super().setUp()
+        logger.info(f"Starting test: {self._testMethodName}")
+
+    def test_query_shape(self):
+        """Verify that literals and IN lists do not make shapes differ."""
+        logger.info("Testing query shapes")
+        self.assertEqual(
+            query_shape('SELECT * FROM "t" WHERE "id" = %s AND "name" = \'x\'  LIMIT 21'),
+            'SELECT * FROM "t" WHERE "id" = ? AND "name" = ? LIMIT ?',
+        )
+        self.assertEqual(
+            query_shape('SELECT * FROM "t" WHERE "id" IN (%s, %s, %s)'),
+            query_shape('SELECT * FROM "t" WHERE "id" IN (%s)'),
+        )
+        self.assertEqual(query_shape('SELECT "t1"."id" FROM "t1"'), 'SELECT "t1"."id" FROM "t1"')
+        logger.info("Query shapes verified")
+
+    def test_detects_n_plus_one(self):
+        """Verify that a query per row is reported with the line that issued it."""
+        logger.info("Testing N+1 detection")
+        with self.assertRaises(QueryBudgetExceeded) as raised:
+            with audit_queries():
+                [user.groups.count() for user in User.objects.filter(username__startswith='audit')]
+        message = str(raised.exception)
+        self.assertIn('possible N+1, 7 queries with the same shape', message)
+        self.assertIn('test_query_audit.py', message)
+        logger.info("N+1 detection verified")
+
+    def test_prefetch_passes(self):
+        """Verify that the prefetched version of the same loop passes."""
+        logger.info("Testing prefetched loop")
+        with audit_queries(max_queries=2) as audit:
+            [len(user.groups.all()) for user in User.objects.prefetch_related('groups')]
+        self.assertEqual(audit.count, 2)
+        logger.info("Prefetched loop verified")
+
+    def test_budget(self):
+        """Verify that exceeding the budget raises, and log mode only warns."""
+        logger.info("Testing query budget")
+        with self.assertRaisesMessage(QueryBudgetExceeded, '3 queries, budget is 2'):
+            with audit_queries(max_queries=2):
+                for name in ('a', 'b', 'c'):
+                    Group.objects.filter(name=name).exists()
+        messages = []
+        sink = logger.add(messages.append, level='WARNING')
+        try:
+            with audit_queries(max_queries=0, mode='log'):
+                Group.objects.exists()
+        finally:
+            logger.remove(sink)
+        self.assertIn('1 queries, budget is 0', messages[0])
+        logger.info("Query budget verified")
+
+    def test_budget_lookup(self):
+        """Verify the budget precedence: decorator, exact name, pattern, default."""
+        logger.info("Testing budget lookup")
+        view = query_budget(3)(lambda request: None)
+        with self.settings(QUERY_BUDGETS={'home': 4, 'admin:*': 9}, QUERY_BUDGET_DEFAULT=50):
+            self.assertEqual(budget_for('home', view), 3)
+            self.assertEqual(budget_for('home'), 4)
+            self.assertEqual(budget_for('admin:index'), 9)
+            self.assertEqual(budget_for('hello_world'), 50)
+        logger.info("Budget lookup verified")
+
+    @override_settings(QUERY_BUDGETS={'db_health_check': 0})
+    def test_middleware_enforces_view_budget(self):
+        """Verify that a request over its view's budget fails in raise mode, and is not audited when off."""
+        logger.info("Testing middleware budget")
+        with self.assertRaisesMessage(QueryBudgetExceeded, '(db_health_check): 1 queries, budget is 0'):
+            self.client.get(reverse('db_health_check'))
+        with self.settings(QUERY_AUDIT_MODE='off'), mock.patch.object(query_audit, 'begin') as begin:
+            self.assertEqual(self.client.get(reverse('db_health_check')).status_code, 200)
+        begin.assert_not_called()
+        logger.info("Middleware budget verified")
+
+    def test_admin_changelists(self):
+        """Verify that admin lists stay within budget and query once per page, not per row."""
+        logger.info("Testing admin query counts")
+        for i in range(20):
+            Upload.objects.create(owner=self.users[i % 6], key=f'uploads/{i}', upload_id=str(i),
+                                  filename=f'{i}.bin', content_type='application/octet-stream',
+                                  size=1, part_size=1)
+            enqueue('tests.audit', {'i': i})
+        self.client.force_login(self.admin)
+        for name in ('admin:core_upload_changelist', 'admin:core_job_changelist', 'admin:auth_user_changelist'):
+            with audit_queries(max_queries=settings.QUERY_BUDGETS['admin:*'], label=name):
+                self.assertEqual(self.client.get(reverse(name)).status_code, 200)
+        logger.info("Admin query counts verified")
+
+    def tearDown(self):
+        """Clean up after each test."""
+        super().tearDown()
+        logger.info(f"Finishing test: {self._testMethodName}")
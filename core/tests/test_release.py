@@ -0,0 +1,65 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from loguru import logger
+import sys
+import os
+from unittest.mock import patch
+
+logger.remove()
+logger.add(
+    sys.stdout,
+    format="[{level: <8}] {name}:{function}:{line} - {message}",
+    level="INFO"
+)
+
+SUPERUSER_ENV = {
+    'DJANGO_SUPERUSER_USERNAME': 'release-admin',
+    'DJANGO_SUPERUSER_EMAIL': 'release-admin@example.com',
+    'DJANGO_SUPERUSER_PASSWORD': 'release-pass-123',
+}
+
+
+class ReleaseCommandTests(TestCase):
+    """Test suite for the release management command.
+
+    These tests verify that the release steps are idempotent, so concurrent
+    or repeated instance startups do not redo or duplicate work.
+    """
+
+    def setUp(self):
+        """Set up test environment for each test."""
+        super().setUp()
+        logger.info(f"Starting test: {self._testMethodName}")
+
+    def test_release_creates_superuser_once(self):
+        """Verify that running the release twice creates a single superuser."""
+        logger.info("Testing release idempotency")
+        with patch.dict(os.environ, SUPERUSER_ENV):
+            call_command('release', skip_static=True)
+            call_command('release', skip_static=True)
+        User = get_user_model()
+        self.assertEqual(User.objects.filter(is_superuser=True).count(), 1)
+        self.assertTrue(User.objects.get(username='release-admin').is_superuser)
+        logger.info("Release idempotency verified")
+
+    def test_release_skips_applied_migrations(self):
+        """Verify that migrate is not invoked when the schema is up to date."""
+        logger.info("Testing migrate short-circuit")
+        with patch('core.management.commands.release.call_command') as mock_call:
+            call_command('release', skip_static=True, skip_superuser=True)
+        mock_call.assert_not_called()
+        logger.info("Migrate short-circuit verified")
+
+    def test_release_publishes_static_files(self):
+        """Verify that static files are published unless explicitly skipped."""
+        logger.info("Testing publishstatic step")
+        with patch('core.management.commands.release.call_command') as mock_call:
+            call_command('release', skip_superuser=True)
+        mock_call.assert_called_once_with('publishstatic')
+        logger.info("publishstatic step verified")
+
+    def tearDown(self):
+        """Clean up after each test."""
+        super().tearDown()
+        logger.info(f"Finishing test: {self._testMethodName}")
@@ -0,0 +1,109 @@
+from django.test import SimpleTestCase
+from django.conf import settings
+from django.core.files.base import ContentFile
+from loguru import logger
+from concurrent.futures import ThreadPoolExecutor
+import os
+import sys
+import unittest
+from moto import mock_aws
+
+from core import s3
+from core.storage import SharedS3Storage
+
+logger.remove()
+logger.add(
+    sys.stdout,
+    format="[{level: <8}] {name}:{function}:{line} - {message}",
+    level="INFO"
+)
+
+
+class SharedS3ClientTests(SimpleTestCase):
+    """Test suite for the process-wide S3 client registry.
+
+    These tests verify that one tuned client is shared across threads and
+    storages, and that a forked process builds its own.
+    """
+
+    def setUp(self):
+        """Start moto and an empty registry for each test."""
+        super().setUp()
+        logger.info(f"Starting test: {self._testMethodName}")
+        self.mock = mock_aws()
+        self.mock.start()
+        s3.reset()
+        s3.get_s3_client().create_bucket(Bucket=settings.AWS_STORAGE_BUCKET_NAME)
+
+    def test_client_is_shared_across_threads(self):
+        """Verify that every thread gets the same client instance."""
+        logger.info("Testing client reuse across threads")
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            clients = list(executor.map(lambda _: s3.get_s3_client(), range(32)))
+        self.assertEqual({id(client) for client in clients}, {id(s3.get_s3_client())})
+        logger.info("Client reuse verified")
+
+    def test_client_config(self):
+        """Verify pool size, keep-alive and adaptive retries on the shared client."""
+        logger.info("Testing client configuration")
+        config = s3.get_s3_client().meta.config
+        self.assertEqual(config.max_pool_connections, settings.AWS_S3_MAX_POOL_CONNECTIONS)
+        self.assertEqual(config.retries['mode'], 'adaptive')
+        self.assertEqual(config.retries['total_max_attempts'], settings.AWS_S3_MAX_ATTEMPTS)
+        self.assertTrue(config.tcp_keepalive)
+        logger.info("Client configuration verified")
+
+    def test_new_process_gets_new_client(self):
+        """Verify that a registry inherited from another pid is rebuilt."""
+        logger.info("Testing pid change")
+        client = s3.get_s3_client()
+        s3._pid = -1
+        self.assertIsNot(s3.get_s3_client(), client)
+        logger.info("Pid change verified")
+
+    @unittest.skipUnless(hasattr(os, 'fork'), "fork is not available")
+    def test_registry_is_reset_after_fork(self):
+        """Verify that a forked child starts with an empty registry, even if the lock was held."""
+        logger.info("Testing fork reset")
+        s3.get_s3_client()
+        read_fd, write_fd = os.pipe()
+        # As if another thread were building a client at fork time.
+        with s3._lock:
+            pid = os.fork()
+        if pid == 0:
+            ok = not s3._clients and s3._session is None and s3._lock.acquire(timeout=1)
+            os.write(write_fd, b'1' if ok else b'0')
+            os._exit(0)
+        os.waitpid(pid, 0)
+        self.assertEqual(os.read(read_fd, 1), b'1')
+        os.close(read_fd)
+        os.close(write_fd)
+        logger.info("Fork reset verified")
+
+    def test_storage_uses_shared_client(self):
+        """Verify that storages read and write through the shared client."""
+        logger.info("Testing storage client")
+        storage = SharedS3Storage(bucket_name=settings.AWS_STORAGE_BUCKET_NAME)
+        self.assertIs(storage.connection.meta.client, s3.get_s3_client())
+        name = storage.save('shared/test.txt', ContentFile(b'shared client'))
+        with storage.open(name) as f:
+            self.assertEqual(f.read(), b'shared client')
+        logger.info("Storage client verified")
+
+    def test_storage_with_own_credentials(self):
+        """Verify that a storage with explicit credentials keeps its own client."""
+        logger.info("Testing storage with explicit credentials")
+        storage = SharedS3Storage(
+            bucket_name=settings.AWS_STORAGE_BUCKET_NAME,
+            access_key='other-key',
+            secret_key='other-secret',
+        )
+        self.assertIsNot(storage.connection.meta.client, s3.get_s3_client())
+        logger.info("Storage with explicit credentials verified")
+
+    def tearDown(self):
+        """Stop moto and drop the clients created under it."""
+        s3.reset()
+        self.mock.stop()
+        super().tearDown()
+        logger.info(f"Finishing test: {self._testMethodName}")
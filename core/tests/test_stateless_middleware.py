@@ -0,0 +1,112 @@
+from django.test import TestCase, Client, RequestFactory, override_settings
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from loguru import logger
+import sys
+
+from core.middleware.stateless import is_stateless_request
+
+logger.remove()
+logger.add(
+    sys.stdout,
+    format="[{level: <8}] {name}:{function}:{line} - {message}",
+    level="INFO"
+)
+
+FULL_MIDDLEWARE = [
+    'core.middleware.timing.RequestTimingMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+# Admin pages resolve {% static %} URLs; keep them off the S3 manifest.
+LOCAL_STORAGES = {
+    **settings.STORAGES,
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+@override_settings(STORAGES=LOCAL_STORAGES)
+class StatelessMiddlewareTests(TestCase):
+    """Test suite for the lean middleware profile.
+
+    These tests verify that stateless routes skip session, CSRF, auth and
+    messages handling while every other route keeps the full behaviour.
+    """
+
+    def setUp(self):
+        """Set up a logged-in client and logging for each test."""
+        super().setUp()
+        self.user = User.objects.create_user(username='stateless', password='secret', is_staff=True, is_superuser=True)
+        self.client = Client(enforce_csrf_checks=True)
+        self.client.force_login(self.user)
+        logger.info(f"Starting test: {self._testMethodName}")
+
+    def test_stateless_prefixes(self):
+        """Verify which paths are treated as stateless."""
+        logger.info("Testing stateless path matching")
+        factory = RequestFactory()
+        self.assertTrue(is_stateless_request(factory.get('/core/health/')))
+        self.assertTrue(is_stateless_request(factory.get('/core/health/db/')))
+        self.assertTrue(is_stateless_request(factory.get('/core/hello/')))
+        self.assertTrue(is_stateless_request(factory.get('/core/home/')))
+        self.assertFalse(is_stateless_request(factory.get('/core/uploads/')))
+        self.assertFalse(is_stateless_request(factory.get('/admin/')))
+        logger.info("Stateless path matching verified")
+
+    def test_stateless_route_skips_session_load(self):
+        """Verify that a session cookie does not cost a query on stateless routes."""
+        logger.info("Testing session bypass")
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('hello_world'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('sessionid', response.cookies)
+        logger.info("Session bypass verified")
+
+    def test_stateless_route_not_found(self):
+        """Verify that a 404 under a stateless prefix renders without a session."""
+        logger.info("Testing stateless 404")
+        response = self.client.get('/core/health/missing/')
+        self.assertEqual(response.status_code, 404)
+        logger.info("Stateless 404 verified")
+
+    @override_settings(MIDDLEWARE=FULL_MIDDLEWARE)
+    def test_full_stack_loads_session(self):
+        """Verify the baseline: the standard stack reads the session on every request."""
+        logger.info("Testing full middleware stack")
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('hello_world'))
+        self.assertTrue(any('django_session' in query['sql'] for query in queries.captured_queries))
+        logger.info("Full middleware stack verified")
+
+    def test_stateful_routes_keep_csrf_and_auth(self):
+        """Verify that other routes still enforce CSRF and see the logged-in user."""
+        logger.info("Testing stateful routes")
+        self.assertEqual(self.client.get(reverse('admin:index')).status_code, 200)
+        self.assertEqual(self.client.post(reverse('admin:logout')).status_code, 403)
+        logger.info("Stateful routes verified")
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_signed_cookie_sessions(self):
+        """Verify that logins work with the signed-cookie session backend."""
+        logger.info("Testing signed-cookie sessions")
+        client = Client()
+        client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(reverse('admin:index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(any('django_session' in query['sql'] for query in queries.captured_queries))
+        logger.info("Signed-cookie sessions verified")
+
+    def tearDown(self):
+        """Clean up after each test."""
+        super().tearDown()
+        logger.info(f"Finishing test: {self._testMethodName}")
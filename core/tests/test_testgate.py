@@ -0,0 +1,98 @@
+from django.test import SimpleTestCase, override_settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from loguru import logger
+from io import StringIO
+import sys
+import threading
+import time
+
+from core.management.commands.testgate import run_stages
+
+logger.remove()
+logger.add(
+    sys.stdout,
+    format="[{level: <8}] {name}:{function}:{line} - {message}",
+    level="INFO"
+)
+
+
+class TestGateTests(SimpleTestCase):
+    """Test suite for the parallel test gate.
+
+    These tests verify stage ordering, that concurrent suites never share a
+    test database slot, and the command's report and exit status.
+    """
+
+    def setUp(self):
+        """Set up logging for each test."""
+        super().setUp()
+        logger.info(f"Starting test: {self._testMethodName}")
+
+    def test_stages_run_in_order_and_stop_on_failure(self):
+        """Verify that a failing stage prevents later stages from running."""
+        logger.info("Testing stage ordering")
+        calls = []
+
+        def run_suite(suite, slot):
+            calls.append(suite)
+            return suite != 'b2', ''
+
+        stages = [('a', ['a1', 'a2']), ('b', ['b1', 'b2']), ('c', ['c1'])]
+        results = run_stages(stages, run_suite, jobs=2)
+        self.assertLess(max(calls.index('a1'), calls.index('a2')), min(calls.index('b1'), calls.index('b2')))
+        self.assertNotIn('c1', calls)
+        self.assertEqual([result.suite for result in results if not result.ok], ['b2'])
+        logger.info("Stage ordering verified")
+
+    def test_slots_are_exclusive(self):
+        """Verify that suites running at the same time use different slots."""
+        logger.info("Testing slot exclusivity")
+        in_use = set()
+        lock = threading.Lock()
+        overlaps = []
+        peak = []
+
+        def run_suite(suite, slot):
+            with lock:
+                if slot in in_use:
+                    overlaps.append(slot)
+                in_use.add(slot)
+                peak.append(len(in_use))
+            time.sleep(0.05)
+            with lock:
+                in_use.discard(slot)
+            return True, ''
+
+        run_stages([('all', [f's{i}' for i in range(9)])], run_suite, jobs=3)
+        self.assertEqual(overlaps, [])
+        self.assertLessEqual(max(peak), 3)
+        self.assertGreater(max(peak), 1)
+        logger.info("Slot exclusivity verified")
+
+    @override_settings(TEST_GATE_STAGES=[('config', ['tests.test_env_config'])])
+    def test_command_runs_suites(self):
+        """Verify that the command runs a suite in a subprocess and reports its time."""
+        logger.info("Testing test gate command")
+        out = StringIO()
+        call_command('testgate', '--jobs', '1', '--verbosity', '0', stdout=out)
+        output = out.getvalue()
+        self.assertIn('tests.test_env_config', output)
+        self.assertIn('All test gate stages passed', output)
+        logger.info("Test gate command verified")
+
+    @override_settings(TEST_GATE_STAGES=[
+        ('config', ['tests.test_missing_suite']),
+        ('application', ['tests.test_env_config']),
+    ])
+    def test_command_fails_and_skips_later_stages(self):
+        """Verify that a failing suite fails the gate and skips later stages."""
+        logger.info("Testing test gate failure")
+        with self.assertRaisesMessage(CommandError, 'skipped stages: application'):
+            call_command('testgate', '--jobs', '1', '--verbosity', '0', stdout=StringIO(), stderr=StringIO())
+        logger.info("Test gate failure verified")
+
+    def tearDown(self):
+        """Clean up after each test."""
+        super().tearDown()
+        logger.info(f"Finishing test: {self._testMethodName}")
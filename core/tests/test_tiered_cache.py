@@ -0,0 +1,279 @@
+from django.test import RequestFactory, TestCase
+from django.conf import settings
+from django.contrib.auth import login
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.http import HttpResponse
+from asgiref.sync import async_to_sync
+from loguru import logger
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+import asyncio
+import threading
+import time
+import sys
+
+from core.tiered_cache import CACHE_REQUESTS, TieredCache, cached, cached_queryset
+
+logger.remove()
+logger.add(
+    sys.stdout,
+    format="[{level: <8}] {name}:{function}:{line} - {message}",
+    level="INFO"
+)
+
+
+class TieredCacheTests(TestCase):
+    """Test suite for the two-tier cache.
+
+    These tests verify local and shared hits, single-flight computation within
+    and across processes, stale-while-revalidate, early refresh, and the
+    function, view and queryset helpers.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(3):
+            User.objects.create_user(username=f'cached{i}')
+
+    def setUp(self):
+        """Set up logging for each test."""
+        super().setUp()
+        cache.clear()
+        self.cache = TieredCache(name=self._testMethodName)
+        self.calls = 0
+        logger.info(f"Starting test: {self._testMethodName}")
+
+    def tearDown(self):
+        """Log test completion."""
+        logger.info(f"Finishing test: {self._testMethodName}")
+        super().tearDown()
+
+    def count(self, result):
+        return CACHE_REQUESTS.value(cache=self.cache.name, result=result)
+
+    def compute(self, value='value', delay=0.0):
+        def compute():
+            self.calls += 1
+            time.sleep(delay)
+            return value
+        return compute
+
+    def test_local_and_shared_hits(self):
+        """Verify that values are computed once and then served from the local, then the shared tier."""
+        logger.info("Testing cache tiers")
+        for _ in range(3):
+            self.assertEqual(self.cache.get_or_set('k', self.compute()), 'value')
+        self.assertEqual(self.calls, 1)
+        self.assertEqual((self.count('miss'), self.count('local_hit')), (1, 2))
+        self.cache.local.clear()
+        self.assertEqual(self.cache.get_or_set('k', self.compute()), 'value')
+        self.assertEqual(self.count('shared_hit'), 1)
+        self.cache.delete('k')
+        self.cache.get_or_set('k', self.compute())
+        self.assertEqual(self.calls, 2)
+        logger.info("Cache tiers verified")
+
+    def test_hits_return_copies(self):
+        """Verify that changing a returned value does not change the cached one."""
+        logger.info("Testing value isolation")
+        self.cache.get_or_set('k', lambda: ['a'])
+        self.cache.get_or_set('k', lambda: ['a']).append('b')
+        self.assertEqual(self.cache.get_or_set('k', lambda: ['a']), ['a'])
+        logger.info("Value isolation verified")
+
+    def test_single_flight_threads(self):
+        """Verify that concurrent callers in one process wait for a single computation."""
+        logger.info("Testing in-process coalescing")
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.cache.get_or_set('k', self.compute(delay=0.2))))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['value'] * 8)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.count('coalesced'), 7)
+        logger.info("In-process coalescing verified")
+
+    def test_waits_for_other_process(self):
+        """Verify that a caller finding another process's lock waits for its result."""
+        logger.info("Testing cross-process coalescing")
+        other = TieredCache(name='other-process')
+        cache.add('k:lock', 1, 10)
+
+        def other_process():
+            other._store('k', 'theirs', 60, 60, 0.1, None)
+            cache.delete('k:lock')
+
+        threading.Timer(0.2, other_process).start()
+        self.assertEqual(self.cache.get_or_set('k', self.compute('ours')), 'theirs')
+        self.assertEqual(self.calls, 0)
+        logger.info("Cross-process coalescing verified")
+
+    def test_errors_are_not_cached(self):
+        """Verify that a failing computation raises for every waiting caller and is retried next time."""
+        logger.info("Testing failed computations")
+
+        def fail():
+            self.calls += 1
+            raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            self.cache.get_or_set('k', fail)
+        self.assertEqual(self.cache.get_or_set('k', self.compute()), 'value')
+        self.assertEqual(self.calls, 2)
+        logger.info("Failed computations verified")
+
+    def test_stale_while_revalidate(self):
+        """Verify that an expired entry is served at once while one background refresh replaces it."""
+        logger.info("Testing stale-while-revalidate")
+        self.cache.get_or_set('k', self.compute('old'), timeout=0, stale=60)
+        started = time.perf_counter()
+        self.assertEqual(self.cache.get_or_set('k', self.compute('new', delay=0.2), timeout=60), 'old')
+        self.assertEqual(self.cache.get_or_set('k', self.compute('new', delay=0.2), timeout=60), 'old')
+        self.assertLess(time.perf_counter() - started, 0.1)
+        self.cache._executor.shutdown(wait=True)
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(self.cache.get_or_set('k', self.compute('newer')), 'new')
+        self.assertEqual(self.count('stale'), 2)
+        logger.info("Stale-while-revalidate verified")
+
+    def test_miss_does_not_wait_for_skipped_refresh(self):
+        """Verify that a miss during a refresh skipped for another process's lock gets a real value."""
+        logger.info("Testing misses during a skipped refresh")
+        other = TieredCache(name='other-process')
+        self.cache.get_or_set('k', self.compute('old'), timeout=0, stale=60)
+        cache.add('k:lock', 1, 10)
+        # Hold the only refresh thread until the entry is gone.
+        busy, gate = threading.Event(), threading.Event()
+        self.cache._executor = ThreadPoolExecutor(1)
+        self.cache._executor.submit(lambda: (busy.set(), gate.wait()))
+        busy.wait()
+        self.assertEqual(self.cache.get_or_set('k', self.compute('new')), 'old')
+        cache.delete('k')
+        self.cache.local.clear()
+
+        def other_process():
+            # Let the refresh go once the caller below has missed.
+            time.sleep(0.1)
+            gate.set()
+            time.sleep(0.1)
+            other._store('k', 'theirs', 60, 60, 0.1, None)
+            cache.delete('k:lock')
+
+        threading.Thread(target=other_process).start()
+        self.assertEqual(self.cache.get_or_set('k', self.compute('ours')), 'theirs')
+        self.cache._executor.shutdown(wait=True)
+        self.assertEqual(self.calls, 1)
+        logger.info("Misses during a skipped refresh verified")
+
+    def test_early_refresh_probability(self):
+        """Verify that early refresh triggers for slow values close to expiry and never with beta=0."""
+        logger.info("Testing probabilistic early refresh")
+        entry = {'value': 1, 'expires': time.time() + 10, 'stale': 0, 'delta': 1.0}
+        self.assertEqual(self.cache._state(entry, 0), 'fresh')
+        self.assertEqual(self.cache._state(entry, 1e6), 'early')
+        near = [self.cache._state({**entry, 'expires': time.time() + 0.5}, 1.0) for _ in range(200)]
+        far = [self.cache._state({**entry, 'expires': time.time() + 60}, 1.0) for _ in range(200)]
+        self.assertGreater(near.count('early'), far.count('early'))
+        logger.info("Probabilistic early refresh verified")
+
+    def test_async_single_flight(self):
+        """Verify that concurrent coroutines share one computation."""
+        logger.info("Testing async coalescing")
+
+        async def compute():
+            self.calls += 1
+            await asyncio.sleep(0.1)
+            return 'value'
+
+        async def main():
+            return await asyncio.gather(*(self.cache.aget_or_set('k', compute) for _ in range(5)))
+
+        self.assertEqual(async_to_sync(main)(), ['value'] * 5)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.count('coalesced'), 4)
+        logger.info("Async coalescing verified")
+
+    def test_cached_decorator(self):
+        """Verify that decorated functions are keyed by arguments and views by path, for GET only."""
+        logger.info("Testing the cached decorator")
+
+        @cached(timeout=60, cache=self.cache.name)
+        def double(n):
+            self.calls += 1
+            return n * 2
+
+        self.assertEqual([double(2), double(2), double(3)], [4, 4, 6])
+        self.assertEqual(self.calls, 2)
+
+        @cached(timeout=60)
+        async def view(request):
+            self.calls += 1
+            return HttpResponse(f'rendered {self.calls}', status=int(request.GET.get('status', 200)))
+
+        factory = RequestFactory()
+        first = async_to_sync(view)(factory.get('/page/'))
+        self.assertEqual(async_to_sync(view)(factory.get('/page/')).content, first.content)
+        self.assertNotEqual(async_to_sync(view)(factory.get('/page/?v=2')).content, first.content)
+        self.assertNotEqual(async_to_sync(view)(factory.post('/page/')).content, first.content)
+        errors = [async_to_sync(view)(factory.get('/page/?status=500')).content for _ in range(2)]
+        self.assertNotEqual(errors[0], errors[1])
+        logger.info("Cached decorator verified")
+
+    def test_cached_view_is_not_shared_between_users(self):
+        """Verify that views reading the session or varying on headers are not cached for everyone."""
+        logger.info("Testing per-user views")
+
+        @cached(timeout=60, cache=self.cache.name)
+        def profile(request):
+            self.calls += 1
+            return HttpResponse(f'hello {request.user.username or "anonymous"}')
+
+        @cached(timeout=60, cache=self.cache.name)
+        def translated(request):
+            self.calls += 1
+            response = HttpResponse(f'rendered {self.calls}')
+            response['Vary'] = 'Accept-Language'
+            return response
+
+        SessionStore = import_module(settings.SESSION_ENGINE).SessionStore
+
+        def request_as(user):
+            session = SessionStore()
+            if user is not None:
+                signed_in = RequestFactory().get('/login/')
+                signed_in.session = session
+                login(signed_in, user, backend='django.contrib.auth.backends.ModelBackend')
+                session.save()
+            # A new request carrying that session, nothing read from it yet.
+            request = RequestFactory().get('/profile/')
+            request.session = SessionStore(session.session_key)
+            AuthenticationMiddleware(lambda request: None).process_request(request)
+            return request
+
+        first, second = User.objects.filter(username__startswith='cached').order_by('username')[:2]
+        self.assertEqual(profile(request_as(first)).content, b'hello cached0')
+        self.assertEqual(profile(request_as(second)).content, b'hello cached1')
+        self.assertEqual(profile(request_as(None)).content, b'hello anonymous')
+        self.assertEqual(self.calls, 3)
+        self.assertNotEqual(translated(RequestFactory().get('/')).content, translated(RequestFactory().get('/')).content)
+        logger.info("Per-user views verified")
+
+    def test_cached_queryset(self):
+        """Verify that a queryset is run once and its rows are served from the cache."""
+        logger.info("Testing cached querysets")
+        queryset = User.objects.filter(username__startswith='cached').order_by('username')
+        with self.assertNumQueries(1):
+            first = cached_queryset(queryset, timeout=60)
+            second = cached_queryset(queryset.all(), timeout=60)
+        self.assertEqual([user.username for user in second], ['cached0', 'cached1', 'cached2'])
+        self.assertEqual(first, second)
+        with self.assertNumQueries(0):
+            self.assertEqual(cached_queryset(User.objects.filter(pk__in=[])), [])
+        logger.info("Cached querysets verified")
@@ -0,0 +1,189 @@
+from django.test import TestCase, override_settings
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import storages
+from django.core.management import call_command
+from django.utils import timezone
+from loguru import logger
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import StringIO
+import json
+import sys
+import requests
+from moto import mock_aws
+
+from core import s3
+from core.models import Upload
+
+logger.remove()
+logger.add(
+    sys.stdout,
+    format="[{level: <8}] {name}:{function}:{line} - {message}",
+    level="INFO"
+)
+
+PART_SIZE = 5 * 1024 * 1024
+BODY = b'a' * PART_SIZE + b'b' * PART_SIZE + b'c' * 1000
+
+# Overriding STORAGES rebuilds the default storage, so it picks up moto's client.
+UPLOAD_STORAGES = {
+    "default": settings.STORAGES["default"],
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+
+@override_settings(STORAGES=UPLOAD_STORAGES, UPLOAD_PART_SIZE=PART_SIZE)
+class UploadTests(TestCase):
+    """Test suite for direct-to-S3 multipart uploads.
+
+    These tests run against moto's in-memory S3 and PUT the parts to the
+    presigned URLs, as a browser would, without the body reaching Django.
+    """
+
+    def setUp(self):
+        """Start moto and log in a user for each test."""
+        super().setUp()
+        logger.info(f"Starting test: {self._testMethodName}")
+        self.mock = mock_aws()
+        self.mock.start()
+        s3.reset()
+        self.s3 = s3.get_s3_client()
+        self.s3.create_bucket(Bucket=settings.AWS_STORAGE_BUCKET_NAME)
+        self.user = get_user_model().objects.create_user(username='uploader', password='testpass123')
+        self.client.force_login(self.user)
+
+    def post(self, path, data=None, client=None):
+        return (client or self.client).post(path, json.dumps(data or {}), content_type='application/json')
+
+    def start(self, size=len(BODY), filename='video.mp4'):
+        response = self.post('/core/uploads/', {'filename': filename, 'size': size})
+        self.assertEqual(response.status_code, 201)
+        return response.json()
+
+    def put_parts(self, parts, body=BODY):
+        def put(part):
+            offset = (part['part_number'] - 1) * PART_SIZE
+            return requests.put(part['url'], data=body[offset:offset + PART_SIZE]).status_code
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            return list(executor.map(put, parts))
+
+    def test_upload_in_parallel_parts(self):
+        """Verify the full flow: create, PUT parts in parallel to S3, complete."""
+        logger.info("Testing multipart upload")
+        upload = self.start()
+        self.assertEqual(upload['part_count'], 3)
+        self.assertEqual(upload['content_type'], 'video/mp4')
+        self.assertEqual(self.put_parts(upload['parts']), [200, 200, 200])
+
+        response = self.post(f"/core/uploads/{upload['id']}/complete/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'completed')
+        obj = self.s3.get_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=upload['key'])
+        self.assertEqual(obj['Body'].read(), BODY)
+        self.assertEqual(obj['ContentType'], 'video/mp4')
+        self.assertTrue(storages['default'].exists(upload['key']))
+        self.assertEqual(Upload.objects.get(pk=upload['id']).status, Upload.Status.COMPLETED)
+        logger.info("Multipart upload verified")
+
+    def test_complete_requires_every_part(self):
+        """Verify that completing with missing parts fails and keeps the upload pending."""
+        logger.info("Testing incomplete upload")
+        upload = self.start()
+        self.put_parts(upload['parts'][:2])
+        response = self.post(f"/core/uploads/{upload['id']}/complete/")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('missing parts: 3', response.json()['error'])
+        self.assertEqual(Upload.objects.get(pk=upload['id']).status, Upload.Status.PENDING)
+        logger.info("Incomplete upload verified")
+
+    def test_complete_checks_declared_size(self):
+        """Verify that parts adding up to another size are rejected."""
+        logger.info("Testing size check")
+        upload = self.start()
+        self.put_parts(upload['parts'], body=BODY[:-10])
+        response = self.post(f"/core/uploads/{upload['id']}/complete/")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('expected', response.json()['error'])
+        logger.info("Size check verified")
+
+    def test_refresh_part_urls(self):
+        """Verify that new URLs can be requested for some of the parts."""
+        logger.info("Testing part URL refresh")
+        upload = self.start()
+        response = self.post(f"/core/uploads/{upload['id']}/parts/", {'part_numbers': [2, 3]})
+        self.assertEqual([part['part_number'] for part in response.json()['parts']], [2, 3])
+        for part_numbers in ([4], 5, [True], '1'):
+            response = self.post(f"/core/uploads/{upload['id']}/parts/", {'part_numbers': part_numbers})
+            self.assertEqual(response.status_code, 400, part_numbers)
+        logger.info("Part URL refresh verified")
+
+    def test_abort(self):
+        """Verify that aborting discards the multipart upload in S3."""
+        logger.info("Testing abort")
+        upload = self.start()
+        self.put_parts(upload['parts'][:1])
+        response = self.post(f"/core/uploads/{upload['id']}/abort/")
+        self.assertEqual(response.json()['status'], 'aborted')
+        uploads = self.s3.list_multipart_uploads(Bucket=settings.AWS_STORAGE_BUCKET_NAME).get('Uploads', [])
+        self.assertEqual(uploads, [])
+        self.assertEqual(self.post(f"/core/uploads/{upload['id']}/complete/").status_code, 400)
+        logger.info("Abort verified")
+
+    def test_s3_errors(self):
+        """Verify that S3 refusing to complete an upload is a client error and keeps it pending."""
+        logger.info("Testing S3 errors")
+        upload = self.start()
+        self.put_parts(upload['parts'])
+        self.s3.abort_multipart_upload(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=upload['key'],
+                                       UploadId=Upload.objects.get(pk=upload['id']).upload_id)
+        response = self.post(f"/core/uploads/{upload['id']}/complete/")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('NoSuchUpload', response.json()['error'])
+        self.assertEqual(Upload.objects.get(pk=upload['id']).status, Upload.Status.PENDING)
+        logger.info("S3 errors verified")
+
+    def test_validation(self):
+        """Verify that invalid sizes and names are rejected before calling S3."""
+        logger.info("Testing validation")
+        self.assertEqual(self.post('/core/uploads/', {'filename': 'a.bin', 'size': 0}).status_code, 400)
+        self.assertEqual(self.post('/core/uploads/', {'filename': 'a.bin', 'size': '10'}).status_code, 400)
+        self.assertEqual(self.post('/core/uploads/', {'filename': 'a.bin', 'size': True}).status_code, 400)
+        self.assertEqual(self.post('/core/uploads/', {'size': 10}).status_code, 400)
+        self.assertEqual(self.client.post('/core/uploads/', 'not json', content_type='application/json').status_code, 400)
+        upload = self.start(size=10, filename='../../etc/passwd')
+        self.assertTrue(upload['key'].startswith('uploads/'))
+        self.assertTrue(upload['key'].endswith('/passwd'))
+        logger.info("Validation verified")
+
+    def test_access_control(self):
+        """Verify that uploads require a login and belong to their owner."""
+        logger.info("Testing access control")
+        upload = self.start()
+        other = self.client_class()
+        self.assertEqual(self.post('/core/uploads/', {'filename': 'a.bin', 'size': 10}, client=other).status_code, 401)
+        other.force_login(get_user_model().objects.create_user(username='other', password='testpass123'))
+        self.assertEqual(self.post(f"/core/uploads/{upload['id']}/complete/", client=other).status_code, 404)
+        self.assertEqual(self.client.get('/core/uploads/').status_code, 405)
+        logger.info("Access control verified")
+
+    def test_abortuploads_command(self):
+        """Verify that only stale pending uploads are aborted."""
+        logger.info("Testing abortuploads command")
+        stale = self.start()
+        fresh = self.start()
+        Upload.objects.filter(pk=stale['id']).update(created_at=timezone.now() - timedelta(days=2))
+        out = StringIO()
+        call_command('abortuploads', stdout=out)
+        self.assertIn('Aborted 1 upload(s)', out.getvalue())
+        self.assertEqual(Upload.objects.get(pk=stale['id']).status, Upload.Status.ABORTED)
+        self.assertEqual(Upload.objects.get(pk=fresh['id']).status, Upload.Status.PENDING)
+        logger.info("Abortuploads command verified")
+
+    def tearDown(self):
+        """Stop moto and drop the clients created under it."""
+        s3.reset()
+        self.mock.stop()
+        super().tearDown()
+        logger.info(f"Finishing test: {self._testMethodName}")
@@ -1,8 +1,9 @@
-from django.test import TestCase, Client
-from django.urls import reverse
+from django.test import TestCase, Client, AsyncClient, override_settings
+from django.urls import resolve, reverse
 from loguru import logger
 import sys
 import os
+import asyncio
 from unittest.mock import patch
 
 logger.remove()
@@ -45,19 +46,85 @@ class CoreViewsTests(TestCase):
         logger.info("Testing db_health_check endpoint with successful connection")
         response = self.client.get(reverse('db_health_check'))
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.json(), {'status': 'ok', 'message': 'Database connection successful'})
+        data = response.json()
+        self.assertEqual(data['status'], 'ok')
+        self.assertEqual(data['message'], 'Database connection successful')
         logger.info("db_health_check endpoint tested successfully")
 
     def test_db_health_check_failure(self):
         """Verify that the database health check endpoint returns 500 when database is inaccessible."""
         logger.info("Testing db_health_check endpoint with connection failure")
-        with patch('django.db.connection.cursor') as mock_cursor:
+        with patch('core.views.pool_status', return_value=None), \
+                patch('django.db.connection.cursor') as mock_cursor:
             mock_cursor.side_effect = Exception("Simulated DB failure")
             response = self.client.get(reverse('db_health_check'))
             self.assertEqual(response.status_code, 500)
             self.assertEqual(response.json(), {'status': 'error', 'message': 'Database connection failed'})
         logger.info("db_health_check endpoint failure test completed")
 
+    def test_db_health_check_reports_pool_state(self):
+        """Verify that the database health check reports pool state without opening a cursor."""
+        logger.info("Testing db_health_check endpoint with connection pooling")
+        status = {'open': True, 'size': 2, 'available': 1, 'waiting': 0, 'exhausted': 0}
+        with patch('core.views.pool_status', return_value=status), \
+                patch('django.db.connection.cursor') as mock_cursor:
+            response = self.client.get(reverse('db_health_check'))
+            mock_cursor.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['pool'], status)
+        logger.info("db_health_check pool reporting tested successfully")
+
+    def test_db_health_check_empty_pool(self):
+        """Verify that the database health check fails when the pool holds no connections."""
+        logger.info("Testing db_health_check endpoint with an empty pool")
+        status = {'open': True, 'size': 0, 'available': 0, 'waiting': 3, 'exhausted': 5}
+        with patch('core.views.pool_status', return_value=status):
+            response = self.client.get(reverse('db_health_check'))
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.json()['status'], 'error')
+        logger.info("db_health_check empty pool test completed")
+
+    def test_views_follow_server_mode(self):
+        """Verify that URLs route to sync views under WSGI and to their async versions under ASGI."""
+        logger.info("Testing view selection by SERVER_MODE")
+        from core import urls, views
+        sync = {pattern.name: pattern.callback for pattern in urls.patterns('wsgi')}
+        coroutines = {pattern.name: pattern.callback for pattern in urls.patterns('asgi')}
+        self.assertIs(resolve(reverse('health')).func, views.health)
+        for name, view in sync.items():
+            self.assertFalse(asyncio.iscoroutinefunction(view), f"{name} is async under WSGI")
+            if not name.startswith('upload_'):
+                self.assertTrue(asyncio.iscoroutinefunction(coroutines[name]), f"{name} is not async under ASGI")
+        logger.info("View selection verified")
+
+    @override_settings(ROOT_URLCONF='core.tests.asgi_urls')
+    async def test_async_views(self):
+        """Verify that the async views respond like the sync ones through the ASGI handler."""
+        logger.info("Testing async views through AsyncClient")
+        client = AsyncClient()
+        response = await client.get(reverse('health'))
+        self.assertEqual(response.status_code, 200)
+        response = await client.get(reverse('db_health_check'))
+        self.assertEqual(response.json()['status'], 'ok')
+        response = await client.get(reverse('hello_world'))
+        self.assertEqual(response.content, b'Hello World')
+        with self.settings(METRICS_TOKEN='secret-token'):
+            response = await client.get(reverse('metrics'), headers={'Authorization': 'Bearer secret-token'})
+        self.assertEqual(response.status_code, 200)
+        logger.info("Async views verified")
+
+    async def test_async_client_health_endpoints(self):
+        """Verify that the health endpoints respond when served through the ASGI handler."""
+        logger.info("Testing health endpoints through AsyncClient")
+        client = AsyncClient()
+        response = await client.get(reverse('health'))
+        self.assertEqual(response.status_code, 200)
+        response = await client.get(reverse('db_health_check'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'ok')
+        logger.info("AsyncClient health endpoints tested successfully")
+
     def tearDown(self):
         """Clean up after each test."""
-        logger.info(f"Finishing test: {self._testMethodName}") 
\ No newline at end of file
+        logger.info(f"Finishing test: {self._testMethodName}") 
+
@@ -0,0 +1,535 @@
+"""Two-tier cache with single-flight computation and stale-while-revalidate.
+
+``TieredCache`` keeps a small per-process LRU (``TIERED_CACHE_LOCAL_MAX_ENTRIES``
+entries, each trusted for ``TIERED_CACHE_LOCAL_TIMEOUT`` seconds) in front of a
+shared Django cache (``TIERED_CACHE_ALIAS``, Redis in production), and computes
+missing values once:
+
+- Callers in the same process asking for a key being computed wait for that
+  computation instead of starting their own (*coalesced*).
+- Across processes, the computing caller holds a ``<key>:lock`` entry added to
+  the shared cache; the others poll the shared cache for its result.
+- An entry past its ``timeout`` is served for another ``stale`` seconds while
+  one caller refreshes it in the background. Before it expires, callers
+  refresh it early with a probability that grows as expiry approaches and with
+  the time the value took to compute ("XFetch", tuned by ``beta``), so a
+  popular key is usually refreshed before anyone has to wait for it.
+
+::
+
+    @cached(timeout=60)
+    def expensive(user_id):
+        ...
+
+    jobs = cached_queryset(Job.objects.filter(status='failed'), timeout=30)
+
+Values are pickled in both tiers, so a hit never returns an object another
+caller holds (callers coalesced on one computation do share its result).
+``delete()`` clears a key in the shared cache and this process; other
+processes may serve their local copy for up to ``TIERED_CACHE_LOCAL_TIMEOUT``
+seconds. Hits, misses, stale and coalesced requests are counted in
+``tiered_cache_requests_total``.
+"""
+import asyncio
+import hashlib
+import math
+import pickle
+import random
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import EmptyResultSet
+from django.db import close_old_connections, connections
+from django.http import HttpRequest, HttpResponseBase
+from loguru import logger
+
+from .metrics import registry
+
+CACHE_REQUESTS = registry.counter(
+    'tiered_cache_requests_total',
+    'Tiered cache lookups by result: local_hit, shared_hit, stale, early_refresh, miss or coalesced.',
+    ('cache', 'result'))
+CACHE_COMPUTE = registry.histogram(
+    'tiered_cache_compute_seconds', 'Time spent computing missing or refreshed values.', ('cache',))
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class LocalLRU:
+    """Thread-safe LRU of pickled entries, each kept at most ``timeout`` seconds."""
+
+    def __init__(self, max_entries, timeout):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            data, stored_at = item
+            if time.monotonic() - stored_at >= self.timeout:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+        return pickle.loads(data)
+
+    def set(self, key, entry):
+        if not self.max_entries or self.timeout <= 0:
+            return
+        data = pickle.dumps(entry, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._data[key] = (data, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class _Flight:
+    """A computation in progress in this process, awaited by the other callers."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TieredCache:
+    """Per-process LRU over a shared Django cache; see the module docstring."""
+
+    def __init__(self, name='default', alias=None, local_max_entries=None, local_timeout=None, lock_timeout=None):
+        self.name = name
+        self.alias = alias or _setting('TIERED_CACHE_ALIAS', 'default')
+        # How long callers wait for another's computation before computing
+        # themselves; must cover the slowest compute() of this cache.
+        self.lock_timeout = lock_timeout
+        self.local = LocalLRU(
+            local_max_entries if local_max_entries is not None else _setting('TIERED_CACHE_LOCAL_MAX_ENTRIES', 1000),
+            local_timeout if local_timeout is not None else _setting('TIERED_CACHE_LOCAL_TIMEOUT', 5.0),
+        )
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+        self._aflights = weakref.WeakKeyDictionary()  # Event loop -> {key: future}
+        # Background refreshes are tracked apart from the flights: a caller
+        # that misses must not wait on a refresh, which may end without a value.
+        self._refreshing = set()
+        self._arefreshing = weakref.WeakKeyDictionary()  # Event loop -> {key}
+        self._tasks = set()
+        self._executor = None
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    def _count(self, result):
+        CACHE_REQUESTS.inc(cache=self.name, result=result)
+
+    # Entries ----------------------------------------------------------------
+
+    def _entry(self, value, timeout, stale, delta):
+        return {'value': value, 'expires': time.time() + timeout, 'stale': stale, 'delta': delta}
+
+    def _state(self, entry, beta):
+        """``'fresh'``, ``'early'`` (refresh now), ``'stale'`` or ``'expired'``."""
+        now = time.time()
+        if now >= entry['expires'] + entry['stale']:
+            return 'expired'
+        if now >= entry['expires']:
+            return 'stale'
+        # XFetch: -log(U) is exponential, so the chance grows towards expiry.
+        if beta and entry['delta'] and now - entry['delta'] * beta * math.log(1.0 - random.random()) >= entry['expires']:
+            return 'early'
+        return 'fresh'
+
+    def _serve(self, key, entry, beta, refresh):
+        """Return ``(found, value)`` for a cached entry, refreshing it if due."""
+        state = self._state(entry, beta)
+        if state == 'expired':
+            return False, None
+        if state != 'fresh':
+            self._count('stale' if state == 'stale' else 'early_refresh')
+            refresh()
+        return True, entry['value']
+
+    def _options(self, timeout, stale, beta):
+        return (
+            timeout if timeout is not None else _setting('TIERED_CACHE_TIMEOUT', 300),
+            stale if stale is not None else _setting('TIERED_CACHE_STALE', 60),
+            beta if beta is not None else _setting('TIERED_CACHE_BETA', 1.0),
+        )
+
+    def _lock_key(self, key):
+        return f'{key}:lock'
+
+    def _lock_timeout(self):
+        if self.lock_timeout is not None:
+            return self.lock_timeout
+        return _setting('TIERED_CACHE_LOCK_TIMEOUT', 10.0)
+
+    def delete(self, key):
+        self.local.delete(key)
+        self.shared.delete(key)
+
+    async def adelete(self, key):
+        self.local.delete(key)
+        await self.shared.adelete(key)
+
+    # Sync -------------------------------------------------------------------
+
+    def _lookup(self, key):
+        entry = self.local.get(key)
+        if entry is not None:
+            self._count('local_hit')
+            return entry
+        entry = self.shared.get(key)
+        if entry is not None:
+            self._count('shared_hit')
+            self.local.set(key, entry)
+        return entry
+
+    def _store(self, key, value, timeout, stale, delta, should_cache):
+        if should_cache is not None and not should_cache(value):
+            return
+        entry = self._entry(value, timeout, stale, delta)
+        self.shared.set(key, entry, timeout + stale)
+        self.local.set(key, entry)
+
+    def _compute(self, key, compute, timeout, stale, should_cache):
+        started = time.perf_counter()
+        value = compute()
+        delta = time.perf_counter() - started
+        CACHE_COMPUTE.observe(delta, cache=self.name)
+        self._store(key, value, timeout, stale, delta, should_cache)
+        return value
+
+    def get_or_set(self, key, compute, timeout=None, stale=None, beta=None, should_cache=None):
+        """Return the cached value of ``key``, calling ``compute()`` once if it is missing.
+
+        ``should_cache(value)`` returning False hands the value to the waiting
+        callers without storing it.
+        """
+        timeout, stale, beta = self._options(timeout, stale, beta)
+        entry = self._lookup(key)
+        if entry is not None:
+            found, value = self._serve(
+                key, entry, beta, lambda: self._refresh(key, compute, timeout, stale, should_cache))
+            if found:
+                return value
+        return self._single_flight(key, compute, timeout, stale, should_cache)
+
+    def _single_flight(self, key, compute, timeout, stale, should_cache):
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        lock_timeout = self._lock_timeout()
+        if not leader:
+            self._count('coalesced')
+            if flight.event.wait(lock_timeout):
+                if flight.error is not None:
+                    raise flight.error
+                return flight.value
+            # The leader is stuck: compute without it.
+            return self._compute(key, compute, timeout, stale, should_cache)
+
+        self._count('miss')
+        try:
+            flight.value = self._compute_once(key, compute, timeout, stale, should_cache, lock_timeout)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._flights_lock:
+                self._flights.pop(key, None)
+            flight.event.set()
+
+    def _compute_once(self, key, compute, timeout, stale, should_cache, lock_timeout):
+        lock_key = self._lock_key(key)
+        if self.shared.add(lock_key, 1, lock_timeout):
+            try:
+                return self._compute(key, compute, timeout, stale, should_cache)
+            finally:
+                self.shared.delete(lock_key)
+        # Another process is computing it; wait for its result.
+        deadline = time.monotonic() + lock_timeout
+        poll = _setting('TIERED_CACHE_POLL_INTERVAL', 0.05)
+        while time.monotonic() < deadline:
+            time.sleep(poll)
+            entry = self.shared.get(key)
+            if entry is not None and self._state(entry, 0) != 'expired':
+                self._count('coalesced')
+                self.local.set(key, entry)
+                return entry['value']
+            if self.shared.get(lock_key) is None:
+                break
+        return self._compute(key, compute, timeout, stale, should_cache)
+
+    def _refresh(self, key, compute, timeout, stale, should_cache):
+        with self._flights_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    _setting('TIERED_CACHE_REFRESH_THREADS', 2), thread_name_prefix='tiered-cache')
+        self._executor.submit(self._refresh_job, key, compute, timeout, stale, should_cache)
+
+    def _refresh_job(self, key, compute, timeout, stale, should_cache):
+        close_old_connections()
+        lock_key = self._lock_key(key)
+        try:
+            # Another process already refreshing it is as good.
+            if self.shared.add(lock_key, 1, self._lock_timeout()):
+                try:
+                    self._compute(key, compute, timeout, stale, should_cache)
+                finally:
+                    self.shared.delete(lock_key)
+        except Exception as e:
+            logger.warning(f"Background refresh of cache key {key!r} failed: {type(e).__name__}: {e}")
+        finally:
+            with self._flights_lock:
+                self._refreshing.discard(key)
+            # Executor threads outlive the request: give their connections back.
+            connections.close_all()
+
+    # Async ------------------------------------------------------------------
+
+    async def _alookup(self, key):
+        entry = self.local.get(key)
+        if entry is not None:
+            self._count('local_hit')
+            return entry
+        entry = await self.shared.aget(key)
+        if entry is not None:
+            self._count('shared_hit')
+            self.local.set(key, entry)
+        return entry
+
+    async def _astore(self, key, value, timeout, stale, delta, should_cache):
+        if should_cache is not None and not should_cache(value):
+            return
+        entry = self._entry(value, timeout, stale, delta)
+        await self.shared.aset(key, entry, timeout + stale)
+        self.local.set(key, entry)
+
+    async def _acompute(self, key, compute, timeout, stale, should_cache):
+        started = time.perf_counter()
+        value = await compute()
+        delta = time.perf_counter() - started
+        CACHE_COMPUTE.observe(delta, cache=self.name)
+        await self._astore(key, value, timeout, stale, delta, should_cache)
+        return value
+
+    async def aget_or_set(self, key, compute, timeout=None, stale=None, beta=None, should_cache=None):
+        """``get_or_set()`` for async code; ``compute`` is an async callable."""
+        timeout, stale, beta = self._options(timeout, stale, beta)
+        entry = await self._alookup(key)
+        if entry is not None:
+            found, value = self._serve(
+                key, entry, beta, lambda: self._arefresh(key, compute, timeout, stale, should_cache))
+            if found:
+                return value
+        return await self._asingle_flight(key, compute, timeout, stale, should_cache)
+
+    async def _asingle_flight(self, key, compute, timeout, stale, should_cache):
+        loop = asyncio.get_running_loop()
+        flights = self._aflights.setdefault(loop, {})
+        future = flights.get(key)
+        if future is not None:
+            self._count('coalesced')
+            return await asyncio.shield(future)
+
+        self._count('miss')
+        future = flights[key] = loop.create_future()
+        try:
+            value = await self._acompute_once(key, compute, timeout, stale, should_cache)
+        except Exception as e:
+            future.set_exception(e)
+            # Retrieved here so a flight nobody awaited does not log a warning.
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            flights.pop(key, None)
+
+    async def _acompute_once(self, key, compute, timeout, stale, should_cache):
+        lock_key = self._lock_key(key)
+        lock_timeout = self._lock_timeout()
+        if await self.shared.aadd(lock_key, 1, lock_timeout):
+            try:
+                return await self._acompute(key, compute, timeout, stale, should_cache)
+            finally:
+                await self.shared.adelete(lock_key)
+        deadline = time.monotonic() + lock_timeout
+        poll = _setting('TIERED_CACHE_POLL_INTERVAL', 0.05)
+        while time.monotonic() < deadline:
+            await asyncio.sleep(poll)
+            entry = await self.shared.aget(key)
+            if entry is not None and self._state(entry, 0) != 'expired':
+                self._count('coalesced')
+                self.local.set(key, entry)
+                return entry['value']
+            if await self.shared.aget(lock_key) is None:
+                break
+        return await self._acompute(key, compute, timeout, stale, should_cache)
+
+    def _arefresh(self, key, compute, timeout, stale, should_cache):
+        loop = asyncio.get_running_loop()
+        refreshing = self._arefreshing.setdefault(loop, set())
+        if key in refreshing:
+            return
+        refreshing.add(key)
+        task = loop.create_task(self._arefresh_job(key, compute, timeout, stale, should_cache, refreshing))
+        # The loop only keeps weak references to tasks.
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _arefresh_job(self, key, compute, timeout, stale, should_cache, refreshing):
+        lock_key = self._lock_key(key)
+        try:
+            if await self.shared.aadd(lock_key, 1, self._lock_timeout()):
+                try:
+                    await self._acompute(key, compute, timeout, stale, should_cache)
+                finally:
+                    await self.shared.adelete(lock_key)
+        except Exception as e:
+            logger.warning(f"Background refresh of cache key {key!r} failed: {type(e).__name__}: {e}")
+        finally:
+            refreshing.discard(key)
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(name='default'):
+    """The process-wide ``TieredCache`` called ``name``.
+
+    Its constructor options come from ``TIERED_CACHE_OPTIONS[name]``, if set.
+    """
+    cache = _caches.get(name)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(name)
+            if cache is None:
+                options = _setting('TIERED_CACHE_OPTIONS', {}).get(name, {})
+                cache = _caches[name] = TieredCache(name, **options)
+    return cache
+
+
+def _digest(value):
+    return hashlib.md5(repr(value).encode(), usedforsecurity=False).hexdigest()
+
+
+def _cacheable_response(response, request):
+    session = getattr(request, 'session', None)
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and 'private' not in response.get('Cache-Control', '')
+        # The key ignores headers and the user: SessionMiddleware only adds
+        # Vary: Cookie after the response is stored here.
+        and not response.has_header('Vary')
+        and not (session is not None and session.accessed)
+    )
+
+
+def cached(timeout=None, key=None, stale=None, beta=None, cache='default'):
+    """Cache a function's return value in the tiered cache ``cache``.
+
+    The key is the function's dotted path plus a digest of its arguments, or
+    ``key(*args, **kwargs)``. On views (first argument an ``HttpRequest``) the
+    arguments are the method and full path instead of the request object, and
+    only successful responses without cookies, ``Cache-Control: private`` or
+    ``Vary``, rendered without touching the session (``request.user``
+    included), are stored. Works on sync and async functions.
+    """
+    def decorator(func):
+        prefix = f'cached:{func.__module__}.{func.__qualname__}'
+
+        def make_key(args, kwargs):
+            if key is not None:
+                return f'{prefix}:{key(*args, **kwargs)}'
+            if args and isinstance(args[0], HttpRequest):
+                args = (args[0].method, args[0].get_full_path(), *args[1:])
+            return f'{prefix}:{_digest((args, sorted(kwargs.items())))}'
+
+        def should_cache(args):
+            request = args[0] if args and isinstance(args[0], HttpRequest) else None
+            return lambda value: not isinstance(value, HttpResponseBase) or _cacheable_response(value, request)
+
+        if iscoroutinefunction(func):
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                if args and isinstance(args[0], HttpRequest) and args[0].method not in ('GET', 'HEAD'):
+                    return await func(*args, **kwargs)
+                return await get_cache(cache).aget_or_set(
+                    make_key(args, kwargs), lambda: func(*args, **kwargs),
+                    timeout, stale, beta, should_cache(args))
+
+            return wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if args and isinstance(args[0], HttpRequest) and args[0].method not in ('GET', 'HEAD'):
+                return func(*args, **kwargs)
+            return get_cache(cache).get_or_set(
+                make_key(args, kwargs), lambda: func(*args, **kwargs),
+                timeout, stale, beta, should_cache(args))
+
+        return wrapper
+
+    return decorator
+
+
+def queryset_key(queryset):
+    """A cache key for ``queryset``'s SQL, or None if it cannot match any row."""
+    try:
+        sql = str(queryset.query)
+    except EmptyResultSet:
+        return None
+    return f'qs:{queryset.model._meta.label_lower}:{_digest(sql)}'
+
+
+def cached_queryset(queryset, timeout=None, key=None, stale=None, beta=None, cache='default'):
+    """Evaluate ``queryset`` through the tiered cache and return its rows as a list."""
+    key = key or queryset_key(queryset)
+    if key is None:
+        return []
+    return get_cache(cache).get_or_set(key, lambda: list(queryset), timeout, stale, beta)
+
+
+async def acached_queryset(queryset, timeout=None, key=None, stale=None, beta=None, cache='default'):
+    """``cached_queryset()`` for async code."""
+    key = key or queryset_key(queryset)
+    if key is None:
+        return []
+
+    async def compute():
+        return [obj async for obj in queryset]
+
+    return await get_cache(cache).aget_or_set(key, compute, timeout, stale, beta)
@@ -0,0 +1,193 @@
+"""Direct-to-S3 multipart uploads.
+
+The client declares a file, receives one presigned ``UploadPart`` URL per part
+and PUTs the parts to S3 itself, in parallel; the app only creates, completes
+or aborts the multipart upload, so no worker holds the body. Completion lists
+the parts from S3 rather than trusting the client, and checks that they add up
+to the declared size.
+
+Pending uploads that are never completed keep their parts (and their storage
+cost) in S3 until aborted: run ``manage.py abortuploads`` periodically.
+"""
+import mimetypes
+import posixpath
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousOperation
+from django.core.files.storage import storages
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from .models import Upload
+
+# S3 limits: every part but the last is at least 5 MiB, at most 10,000 parts.
+MIN_PART_SIZE = 5 * 1024 * 1024
+MAX_PARTS = 10_000
+
+
+class UploadError(Exception):
+    """The upload request is invalid, or S3 disagrees with the declared upload."""
+
+
+def _storage():
+    return storages['default']
+
+
+def _client(storage):
+    return storage.connection.meta.client
+
+
+def _part_size(size):
+    part_size = max(getattr(settings, 'UPLOAD_PART_SIZE', 8 * 1024 * 1024), MIN_PART_SIZE)
+    # Grow the parts for files that would need more than MAX_PARTS of them.
+    return max(part_size, -(-size // MAX_PARTS))
+
+
+def _s3_error(e):
+    error = e.response.get('Error', {})
+    return UploadError(f"S3 rejected the upload ({error.get('Code', 'unknown error')}): {error.get('Message', '')}")
+
+
+def _is_int(value):
+    # JSON true/false decode to bool, a subclass of int.
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def create_upload(owner, filename, size, content_type=None):
+    """Start a multipart upload of ``size`` bytes and return its ``Upload``."""
+    from botocore.exceptions import ClientError
+    if not _is_int(size) or size <= 0:
+        raise UploadError("size must be a positive integer")
+    max_size = getattr(settings, 'UPLOAD_MAX_SIZE', 5 * 1024 ** 3)
+    if size > max_size:
+        raise UploadError(f"size exceeds the {max_size} byte limit")
+    filename = get_valid_filename(posixpath.basename(str(filename or '')))
+    if not filename:
+        raise UploadError("filename is required")
+    content_type = content_type or mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    storage = _storage()
+    upload = Upload(owner=owner, filename=filename, content_type=content_type, size=size, part_size=_part_size(size))
+    prefix = getattr(settings, 'UPLOAD_STORAGE_PREFIX', 'uploads')
+    try:
+        upload.key = storage.object_key(f'{prefix}/{upload.id}/{filename}')
+    except SuspiciousOperation:
+        raise UploadError("invalid filename")
+    try:
+        response = _client(storage).create_multipart_upload(
+            Bucket=storage.bucket_name,
+            Key=upload.key,
+            ContentType=content_type,
+            **{k: v for k, v in storage.object_parameters.items() if k != 'ContentType'},
+        )
+    except ClientError as e:
+        raise _s3_error(e)
+    upload.upload_id = response['UploadId']
+    upload.save()
+    return upload
+
+
+def part_urls(upload, part_numbers=None):
+    """Return ``{part_number: presigned PUT URL}`` for ``upload``.
+
+    All parts by default; clients whose URLs expired ask again for the parts
+    still missing.
+    """
+    if upload.status != Upload.Status.PENDING:
+        raise UploadError(f"upload is {upload.status}")
+    count = upload.part_count
+    if part_numbers is None:
+        part_numbers = range(1, count + 1)
+    elif not isinstance(part_numbers, list) or not all(_is_int(n) and 1 <= n <= count for n in part_numbers):
+        raise UploadError(f"part numbers must be between 1 and {count}")
+
+    storage = _storage()
+    client = _client(storage)
+    expire = getattr(settings, 'UPLOAD_URL_EXPIRY', 3600)
+    # Presigning is a local computation, no request to S3.
+    return {
+        n: client.generate_presigned_url(
+            'upload_part',
+            Params={'Bucket': storage.bucket_name, 'Key': upload.key, 'UploadId': upload.upload_id, 'PartNumber': n},
+            ExpiresIn=expire,
+        )
+        for n in part_numbers
+    }
+
+
+def _list_parts(client, bucket, upload):
+    parts = []
+    params = {'Bucket': bucket, 'Key': upload.key, 'UploadId': upload.upload_id}
+    while True:
+        response = client.list_parts(**params)
+        parts.extend(response.get('Parts', []))
+        if not response.get('IsTruncated'):
+            return parts
+        params['PartNumberMarker'] = response['NextPartNumberMarker']
+
+
+def complete_upload(upload):
+    """Assemble the uploaded parts into the final object.
+
+    Callers should hold ``upload``'s row lock (``select_for_update()``), so
+    two concurrent completions cannot both reach S3.
+    """
+    if upload.status != Upload.Status.PENDING:
+        raise UploadError(f"upload is {upload.status}")
+    from botocore.exceptions import ClientError
+    storage = _storage()
+    client = _client(storage)
+    try:
+        parts = _list_parts(client, storage.bucket_name, upload)
+    except ClientError as e:
+        raise _s3_error(e)
+    numbers = [part['PartNumber'] for part in parts]
+    missing = sorted(set(range(1, upload.part_count + 1)) - set(numbers))
+    if missing:
+        raise UploadError(f"missing parts: {', '.join(map(str, missing))}")
+    received = sum(part['Size'] for part in parts)
+    if received != upload.size:
+        raise UploadError(f"received {received} bytes, expected {upload.size}")
+
+    try:
+        response = client.complete_multipart_upload(
+            Bucket=storage.bucket_name,
+            Key=upload.key,
+            UploadId=upload.upload_id,
+            MultipartUpload={'Parts': [{'PartNumber': p['PartNumber'], 'ETag': p['ETag']} for p in parts]},
+        )
+    except ClientError as e:
+        # EntityTooSmall (a part under 5 MiB), NoSuchUpload (aborted meanwhile)...
+        raise _s3_error(e)
+    upload.status = Upload.Status.COMPLETED
+    upload.etag = response.get('ETag', '')
+    upload.completed_at = timezone.now()
+    upload.save(update_fields=['status', 'etag', 'completed_at'])
+    return upload
+
+
+def abort_upload(upload):
+    """Abort ``upload`` and let S3 discard the parts uploaded so far."""
+    if upload.status != Upload.Status.PENDING:
+        raise UploadError(f"upload is {upload.status}")
+    from botocore.exceptions import ClientError
+    storage = _storage()
+    try:
+        _client(storage).abort_multipart_upload(
+            Bucket=storage.bucket_name, Key=upload.key, UploadId=upload.upload_id)
+    except ClientError as e:
+        # Already gone on the S3 side (e.g. a bucket lifecycle rule).
+        if e.response.get('Error', {}).get('Code') != 'NoSuchUpload':
+            raise
+    upload.status = Upload.Status.ABORTED
+    upload.save(update_fields=['status'])
+    return upload
+
+
+def stale_uploads(older_than=None):
+    """Pending uploads created more than ``older_than`` seconds ago (default ``UPLOAD_ABANDON_AFTER``)."""
+    if older_than is None:
+        older_than = getattr(settings, 'UPLOAD_ABANDON_AFTER', 24 * 3600)
+    cutoff = timezone.now() - timedelta(seconds=older_than)
+    return Upload.objects.filter(status=Upload.Status.PENDING, created_at__lt=cutoff)
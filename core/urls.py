@@ -1,9 +1,32 @@
+from django.conf import settings
 from django.urls import path
-from .views import health, db_health_check, home, hello_world
-
-urlpatterns = [
-    path('health/', health, name='health'),
-    path('health/db/', db_health_check, name='db_health_check'),
-    path('home/', home, name='home'),
-    path('hello/', hello_world, name='hello_world'),
-] 
\ No newline at end of file
+
+from . import views
+
+
+def patterns(mode):
+    """The core URL patterns, routed to the async views with ``mode='asgi'``."""
+    def view(name):
+        # Coroutine views under ASGI, plain ones under WSGI (see core.views).
+        return getattr(views, f'a{name}' if mode == 'asgi' else name)
+
+    return [
+        path('health/', view('health'), name='health'),
+        path('health/db/', view('db_health_check'), name='db_health_check'),
+        path('health/live/', view('liveness'), name='liveness'),
+        path('health/ready/', view('readiness'), name='readiness'),
+        path('home/', view('home'), name='home'),
+        path('hello/', view('hello_world'), name='hello_world'),
+        path('metrics/', view('metrics'), name='metrics'),
+        path('media/<path:name>', view('media'), name='media'),
+        path('images/<path:name>', view('image'), name='image'),
+        path('uploads/', views.upload_create, name='upload_create'),
+        path('uploads/<uuid:upload_id>/parts/', views.upload_parts, name='upload_parts'),
+        path('uploads/<uuid:upload_id>/complete/', views.upload_complete, name='upload_complete'),
+        path('uploads/<uuid:upload_id>/abort/', views.upload_abort, name='upload_abort'),
+        path('api/<slug:resource>/', view('api_list'), name='api_list'),
+        path('api/<slug:resource>/<str:pk>/', view('api_detail'), name='api_detail'),
+    ]
+
+
+urlpatterns = patterns(settings.SERVER_MODE)
@@ -1,22 +1,280 @@
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+import json
 import os
-from django.db import connection
-from django.shortcuts import render
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.db import connection, transaction
+from django.shortcuts import get_object_or_404, render
 from django.http import JsonResponse
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.views.decorators.http import require_POST, require_safe
 
+from . import api, db_router, images
+from .db_pool import pool_status
+from .health import get_prober
+from .media import aserve_media, media_name, serve_media
+from .metrics import registry
+from .models import Upload
+from .page_cache import cache_page_conditional
+from .uploads import UploadError, abort_upload, complete_upload, create_upload, part_urls
+
+# Each view comes as a plain function and an ``a``-prefixed coroutine;
+# core.urls routes to the kind the server runs (SERVER_MODE), so no request pays
+# for wrapping its view in async_to_sync or sync_to_async.
+
+@cache_page_conditional()
 def home(request):
     return render(request, 'core/home.html')
 
+@cache_page_conditional()
+async def ahome(request):
+    return render(request, 'core/home.html')
+
 def hello_world(request):
     return HttpResponse("Hello World")
 
+async def ahello_world(request):
+    return hello_world(request)
+
 def health(request):
     return JsonResponse({'status': 'ok', 'message': 'Health check successful'}, status=200)
 
+async def ahealth(request):
+    return health(request)
+
+def liveness(request):
+    # The process is up and serving; dependencies are readiness concerns.
+    return JsonResponse({'status': 'ok'}, status=200)
+
+async def aliveness(request):
+    return liveness(request)
+
+def readiness(request):
+    prober = get_prober()
+    prober.start()
+    report = prober.snapshot()
+    return JsonResponse(report, status=200 if report['status'] == 'ok' else 503)
+
+async def areadiness(request):
+    # Only reads the prober's last snapshot, the probes run in its own thread.
+    return readiness(request)
+
+def _ping_database():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+
+def _with_replicas(payload):
+    # Lag and errors as of each replica's last check; reads skip the failing ones.
+    if db_router.replicas():
+        payload['replicas'] = db_router.monitor.status()
+    return payload
+
+def _pool_health():
+    # With pooling enabled the pool already validates connections on checkout,
+    # so report its state instead of opening a cursor on every probe.
+    status = pool_status()
+    if status is None or not status['open']:
+        return None
+    if status['size'] > 0:
+        return JsonResponse(_with_replicas({'status': 'ok', 'message': 'Database connection successful', 'pool': status}), status=200)
+    return JsonResponse({'status': 'error', 'message': 'Database connection failed', 'pool': status}, status=500)
+
 def db_health_check(request):
+    response = _pool_health()
+    if response is not None:
+        return response
+    try:
+        _ping_database()
+        return JsonResponse(_with_replicas({'status': 'ok', 'message': 'Database connection successful'}), status=200)
+    except Exception as e:
+        return JsonResponse({'status': 'error', 'message': 'Database connection failed'}, status=500)
+
+async def adb_health_check(request):
+    response = _pool_health()
+    if response is not None:
+        return response
     try:
-        with connection.cursor() as cursor:
-            cursor.execute("SELECT 1")
-            return JsonResponse({'status': 'ok', 'message': 'Database connection successful'}, status=200)
+        # Django connections are thread-bound, run the query in the sync thread.
+        await sync_to_async(_ping_database)()
+        return JsonResponse(_with_replicas({'status': 'ok', 'message': 'Database connection successful'}), status=200)
     except Exception as e:
         return JsonResponse({'status': 'error', 'message': 'Database connection failed'}, status=500)
+
+def _metrics_response(body):
+    return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def _metrics_denied(request):
+    # Job and task names are exposed too: only public without a token under DEBUG.
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if not token:
+        return None if settings.DEBUG else HttpResponse(status=403)
+    if request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponse(status=401)
+    return None
+
+def metrics(request):
+    return _metrics_denied(request) or _metrics_response(registry.render())
+
+async def ametrics(request):
+    # Collectors may query the database.
+    return _metrics_denied(request) or _metrics_response(await sync_to_async(registry.render)())
+
+@require_safe
+def media(request, name):
+    # GET/HEAD only; streams from S3 or redirects to a signed URL (core.media).
+    return serve_media(request, name)
+
+@require_safe
+async def amedia(request, name):
+    return await aserve_media(request, name)
+
+def _image_redirect(request, variant):
+    url, permanent = images.variant_url(variant)
+    response = HttpResponseRedirect(url)
+    if permanent:
+        response['Cache-Control'] = f"public, max-age={getattr(settings, 'IMAGE_REDIRECT_MAX_AGE', 86400)}"
+    else:
+        expire = getattr(settings, 'MEDIA_URL_EXPIRY', 300)
+        response['Cache-Control'] = f'private, max-age={max(expire - 30, 0)}'
+    if not request.GET.get('fmt'):
+        response['Vary'] = 'Accept'
+    return response
+
+def _image_variant(request, name):
+    # Redirects to a resized/converted copy of a media image (core.images).
+    try:
+        width = int(request.GET['w']) if 'w' in request.GET else None
+    except ValueError:
+        return JsonResponse({'error': 'Invalid width'}, status=400)
+    try:
+        fmt = images.choose_format(request.GET.get('fmt'), request.headers.get('Accept'))
+        variant = images.get_variant(media_name(name), images.choose_width(width), fmt)
+    except images.SourceNotFound:
+        raise Http404("Image not found")
+    except images.ImageError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return _image_redirect(request, variant)
+
+@require_safe
+def image(request, name):
+    return _image_variant(request, name)
+
+@require_safe
+async def aimage(request, name):
+    # The whole lookup, render included, runs in the sync thread.
+    return await sync_to_async(_image_variant)(request, name)
+
+def _upload_json(upload, urls=None):
+    data = {
+        'id': str(upload.id),
+        'key': upload.key,
+        'filename': upload.filename,
+        'content_type': upload.content_type,
+        'size': upload.size,
+        'part_size': upload.part_size,
+        'part_count': upload.part_count,
+        'status': upload.status,
+    }
+    if urls is not None:
+        data['parts'] = [{'part_number': n, 'url': url} for n, url in urls.items()]
+    return data
+
+def _upload_view(view):
+    # JSON in and out; uploads belong to the logged-in user.
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Authentication required'}, status=401)
+        try:
+            body = json.loads(request.body or b'{}')
+        except ValueError:
+            return JsonResponse({'error': 'Invalid JSON'}, status=400)
+        if not isinstance(body, dict):
+            return JsonResponse({'error': 'Invalid JSON'}, status=400)
+        try:
+            return view(request, body, *args, **kwargs)
+        except UploadError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+    return require_POST(wrapper)
+
+@_upload_view
+def upload_create(request, body):
+    upload = create_upload(request.user, body.get('filename'), body.get('size'), body.get('content_type'))
+    return JsonResponse(_upload_json(upload, part_urls(upload)), status=201)
+
+@_upload_view
+def upload_parts(request, body, upload_id):
+    # New URLs for parts whose URLs expired before they were uploaded.
+    upload = get_object_or_404(Upload, pk=upload_id, owner=request.user)
+    return JsonResponse(_upload_json(upload, part_urls(upload, body.get('part_numbers'))))
+
+@_upload_view
+def upload_complete(request, body, upload_id):
+    # Locked, so a second concurrent complete waits and then finds it completed.
+    with transaction.atomic():
+        upload = get_object_or_404(Upload.objects.select_for_update(), pk=upload_id, owner=request.user)
+        return JsonResponse(_upload_json(complete_upload(upload)))
+
+@_upload_view
+def upload_abort(request, body, upload_id):
+    with transaction.atomic():
+        upload = get_object_or_404(Upload.objects.select_for_update(), pk=upload_id, owner=request.user)
+        return JsonResponse(_upload_json(abort_upload(upload)))
+
+def _api_view(view):
+    # Read-only JSON API for the logged-in user; errors as {"error": ...}.
+    if iscoroutinefunction(view):
+        async def wrapper(request, resource, *args, **kwargs):
+            user = await request.auser()
+            if not user.is_authenticated:
+                return JsonResponse({'error': 'Authentication required'}, status=401)
+            try:
+                resource, queryset = api.get_resource(resource, user)
+                return await view(request, resource, queryset, *args, **kwargs)
+            except api.ApiError as e:
+                return JsonResponse({'error': str(e)}, status=e.status)
+    else:
+        def wrapper(request, resource, *args, **kwargs):
+            if not request.user.is_authenticated:
+                return JsonResponse({'error': 'Authentication required'}, status=401)
+            try:
+                resource, queryset = api.get_resource(resource, request.user)
+                return view(request, resource, queryset, *args, **kwargs)
+            except api.ApiError as e:
+                return JsonResponse({'error': str(e)}, status=e.status)
+    return require_safe(wrapper)
+
+def _api_json(data):
+    return HttpResponse(api.dumps(data), content_type='application/json')
+
+def _api_page(request, listing):
+    results, cursor = listing.page()
+    next_url = None
+    if cursor:
+        params = request.GET.copy()
+        params['after'] = cursor
+        next_url = f'{request.path}?{params.urlencode()}'
+    return _api_json({'results': results, 'next': next_url})
+
+@_api_view
+def api_list(request, resource, queryset):
+    listing = api.Listing(resource, queryset, request.GET)
+    if api.wants_ndjson(request):
+        return StreamingHttpResponse(listing.stream(), content_type=api.NDJSON)
+    return _api_page(request, listing)
+
+@_api_view
+async def aapi_list(request, resource, queryset):
+    listing = api.Listing(resource, queryset, request.GET)
+    if api.wants_ndjson(request):
+        # Same as media: give the server the kind of iterator it consumes natively.
+        content = listing.astream() if isinstance(request, ASGIRequest) else listing.stream()
+        return StreamingHttpResponse(content, content_type=api.NDJSON)
+    return await sync_to_async(_api_page)(request, listing)
+
+@_api_view
+def api_detail(request, resource, queryset, pk):
+    return _api_json(api.get_object(resource, queryset, pk, request.GET))
+
+@_api_view
+async def aapi_detail(request, resource, queryset, pk):
+    return _api_json(await sync_to_async(api.get_object)(resource, queryset, pk, request.GET))
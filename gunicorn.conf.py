@@ -0,0 +1,56 @@
+"""Gunicorn configuration, loaded by ``gunicorn -c gunicorn.conf.py``.
+
+Worker count, class and threads come from ``project.server_config`` (CPU quota
+and memory limit of the instance); everything else is tunable through
+``GUNICORN_*`` environment variables.
+"""
+import os
+
+from project.server_config import compute_sizing
+
+sizing = compute_sizing()
+
+wsgi_app = 'project.asgi:application' if sizing.mode == 'asgi' else 'project.wsgi:application'
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+worker_class = sizing.worker_class
+workers = sizing.workers
+threads = sizing.threads
+
+# Load Django once in the master so workers share its pages copy-on-write.
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'True') == 'True'
+
+# Recycle workers periodically to bound memory growth; the jitter keeps them
+# from restarting all at once.
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '2000'))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', str(max_requests // 10)))
+
+# Longer than the App Runner load balancer idle timeout so it closes first.
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', '75'))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+
+# Heartbeat files in memory instead of the container's overlay filesystem.
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-') or None
+errorlog = '-'
+
+
+def when_ready(server):
+    server.log.info(
+        "Gunicorn sizing: %s (preload_app=%s, max_requests=%s±%s, keepalive=%ss)",
+        sizing.as_dict(), preload_app, max_requests, max_requests_jitter, keepalive,
+    )
+
+
+def post_fork(server, worker):
+    # Connections opened while preloading must not be shared across processes.
+    from django.db import connections
+    connections.close_all()
+
+
+def post_worker_init(worker):
+    # Start probing dependencies as soon as the worker can serve readiness.
+    from core.health import get_prober
+    get_prober().start()
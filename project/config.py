@@ -0,0 +1,139 @@
+"""Typed, lazily read environment configuration for ``project.settings``.
+
+Each ``EnvVar`` on ``Config`` reads, converts and caches its variable the first
+time it is accessed, so modules that only need a couple of values (gunicorn.conf,
+benchmarks, management commands run with ``--settings``) do not parse the rest,
+and a missing required variable fails with its name instead of a bare
+``KeyError``.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+REQUIRED = object()
+
+
+def boolean(value):
+    return value == 'True'
+
+
+def csv(value):
+    return [item for item in value.split(',') if item]
+
+
+def pem(value):
+    # Environment variables often carry PEM keys with escaped newlines.
+    return value.replace('\\n', '\n').encode()
+
+
+def json_object(value):
+    import json
+    return json.loads(value)
+
+
+class EnvVar:
+    """Descriptor for one environment variable, converted with ``cast``."""
+
+    def __init__(self, name, cast=str, default=REQUIRED):
+        self.name = name
+        self.cast = cast
+        self.default = default
+
+    def __set_name__(self, owner, attr):
+        self.attr = attr
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        raw = instance.environ.get(self.name)
+        if raw is None:
+            if self.default is REQUIRED:
+                raise ImproperlyConfigured(f"Environment variable {self.name} is required")
+            value = self.default
+        else:
+            try:
+                value = self.cast(raw)
+            except (TypeError, ValueError) as e:
+                raise ImproperlyConfigured(f"Environment variable {self.name}={raw!r} is invalid: {e}")
+        # Non-data descriptor: later reads hit the instance __dict__ directly.
+        instance.__dict__[self.attr] = value
+        return value
+
+
+class Config:
+    """Environment variables used by the project, grouped by concern."""
+
+    # Django core
+    secret_key = EnvVar('SECRET_KEY')
+    debug = EnvVar('DEBUG', boolean)
+    allowed_hosts = EnvVar('ALLOWED_HOSTS', csv)
+    server_mode = EnvVar('SERVER_MODE', default='wsgi')
+    middleware_mode = EnvVar('MIDDLEWARE_MODE', default='lean')
+    session_backend = EnvVar('SESSION_BACKEND', default='db')
+    query_audit_mode = EnvVar('QUERY_AUDIT_MODE', default=None)
+    admission_rate_cache = EnvVar('ADMISSION_RATE_CACHE', default=None)
+
+    # Database
+    db_name = EnvVar('DB_NAME')
+    db_username = EnvVar('DB_USERNAME')
+    db_password = EnvVar('DB_PASSWORD')
+    db_host = EnvVar('DB_HOST')
+    db_port = EnvVar('DB_PORT')
+    db_pool_enabled = EnvVar('DB_POOL_ENABLED', boolean, False)
+    db_pool_min_size = EnvVar('DB_POOL_MIN_SIZE', int, 2)
+    db_pool_max_size = EnvVar('DB_POOL_MAX_SIZE', int, 4)
+    db_pool_max_lifetime = EnvVar('DB_POOL_MAX_LIFETIME', float, 1800.0)
+    db_pool_max_idle = EnvVar('DB_POOL_MAX_IDLE', float, 300.0)
+    db_pool_timeout = EnvVar('DB_POOL_TIMEOUT', float, 10.0)
+    db_conn_max_age = EnvVar('DB_CONN_MAX_AGE', int, 60)
+    db_replica_hosts = EnvVar('DB_REPLICA_HOSTS', csv, [])
+    db_replica_max_lag = EnvVar('DB_REPLICA_MAX_LAG', float, 5.0)
+
+    # Cache
+    cache_backend = EnvVar('CACHE_BACKEND', default='locmem')
+    redis_url = EnvVar('REDIS_URL')
+    cache_timeout = EnvVar('CACHE_TIMEOUT', int, 300)
+    cache_max_entries = EnvVar('CACHE_MAX_ENTRIES', int, 1000)
+    page_cache_timeout = EnvVar('PAGE_CACHE_TIMEOUT', int, 60)
+
+    # S3
+    aws_storage_bucket_name = EnvVar('AWS_STORAGE_BUCKET_NAME')
+    aws_s3_region_name = EnvVar('AWS_S3_REGION_NAME')
+    aws_s3_custom_domain = EnvVar('AWS_S3_CUSTOM_DOMAIN', default=None)
+    aws_s3_endpoint_url = EnvVar('AWS_S3_ENDPOINT_URL', default=None)
+    aws_s3_object_parameters = EnvVar(
+        'AWS_S3_OBJECT_PARAMETERS', json_object, {'CacheControl': 'max-age=86400'})
+    aws_s3_max_pool_connections = EnvVar('AWS_S3_MAX_POOL_CONNECTIONS', int, 50)
+    aws_s3_max_attempts = EnvVar('AWS_S3_MAX_ATTEMPTS', int, 5)
+    aws_cloudfront_key_id = EnvVar('AWS_CLOUDFRONT_KEY_ID', default=None)
+    aws_cloudfront_key = EnvVar('AWS_CLOUDFRONT_KEY', pem, None)
+
+    # Background jobs
+    task_worker_concurrency = EnvVar('TASK_WORKER_CONCURRENCY', int, 4)
+
+    # Media delivery
+    media_delivery = EnvVar('MEDIA_DELIVERY', default='auto')
+    media_redirect_min_bytes = EnvVar('MEDIA_REDIRECT_MIN_BYTES', int, 8 * 1024 * 1024)
+
+    # Log shipping
+    log_shipping_enabled = EnvVar('LOG_SHIPPING_ENABLED', boolean, True)
+    log_queue_size = EnvVar('LOG_QUEUE_SIZE', int, 10000)
+    log_batch_bytes = EnvVar('LOG_BATCH_BYTES', int, 1024 * 1024)
+    log_flush_interval = EnvVar('LOG_FLUSH_INTERVAL', float, 5.0)
+    log_drop_policy = EnvVar('LOG_DROP_POLICY', default='drop_newest')
+
+    # Health, metrics and profiling
+    health_probe_interval = EnvVar('HEALTH_PROBE_INTERVAL', float, 10.0)
+    metrics_token = EnvVar('METRICS_TOKEN', default=None)
+    server_timing = EnvVar('SERVER_TIMING', boolean, None)
+    profile_sample_rate = EnvVar('PROFILE_SAMPLE_RATE', float, 0.0)
+    import_time_budget_ms = EnvVar('IMPORT_TIME_BUDGET_MS', float, 1000.0)
+
+    # Test gate
+    test_db_slot = EnvVar('TEST_DB_SLOT', default=None)
+
+    def __init__(self, environ=None):
+        self.environ = os.environ if environ is None else environ
+
+
+config = Config()
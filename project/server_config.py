@@ -0,0 +1,124 @@
+"""Gunicorn sizing derived from the resources of the instance.
+
+App Runner instances are containers, so ``os.cpu_count()`` reports the host
+CPUs rather than the vCPUs allotted to the service. The helpers below read the
+cgroup CPU quota and memory limit first and fall back to the process affinity
+mask and ``/proc/meminfo``. ``gunicorn.conf.py`` turns the result into the
+actual Gunicorn settings.
+"""
+import math
+import os
+from dataclasses import dataclass, asdict
+
+CGROUP_ROOT = '/sys/fs/cgroup'
+
+# cgroup v1 reports "no limit" as a huge page-aligned number.
+UNLIMITED_MEMORY = 1 << 60
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def available_cpus(cgroup_root=CGROUP_ROOT):
+    """Return the CPUs this process may use, honouring cgroup quotas."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    quota = None
+    cpu_max = _read(os.path.join(cgroup_root, 'cpu.max'))  # cgroup v2: "<quota> <period>"
+    if cpu_max:
+        value, _, period = cpu_max.partition(' ')
+        if value != 'max' and period:
+            quota = int(value) / int(period)
+    else:
+        value = _read(os.path.join(cgroup_root, 'cpu', 'cpu.cfs_quota_us'))
+        period = _read(os.path.join(cgroup_root, 'cpu', 'cpu.cfs_period_us'))
+        if value and period and int(value) > 0:
+            quota = int(value) / int(period)
+
+    if quota:
+        cpus = min(cpus, max(1, math.ceil(quota)))
+    return cpus
+
+
+def memory_limit_bytes(cgroup_root=CGROUP_ROOT):
+    """Return the memory available to the container in bytes, or ``None`` if unknown."""
+    for path in (
+        os.path.join(cgroup_root, 'memory.max'),
+        os.path.join(cgroup_root, 'memory', 'memory.limit_in_bytes'),
+    ):
+        value = _read(path)
+        if value and value != 'max' and int(value) < UNLIMITED_MEMORY:
+            return int(value)
+
+    meminfo = _read('/proc/meminfo')
+    if meminfo:
+        for line in meminfo.splitlines():
+            if line.startswith('MemTotal:'):
+                return int(line.split()[1]) * 1024
+    return None
+
+
+@dataclass
+class ServerSizing:
+    mode: str
+    worker_class: str
+    workers: int
+    threads: int
+    cpus: int
+    memory_limit_mb: int
+    worker_memory_mb: int
+
+    def as_dict(self):
+        return asdict(self)
+
+
+def compute_sizing(environ=os.environ, cpus=None, memory_limit=None):
+    """Pick worker class, worker count and threads for the current instance.
+
+    Sync (WSGI) mode uses ``gthread`` workers: ``2 * cpus + 1`` processes, each
+    with a few threads, since requests mostly wait on RDS and S3. ASGI mode
+    uses one uvicorn worker per CPU, as each worker multiplexes connections on
+    its event loop. Either way the worker count is capped so that
+    ``workers * GUNICORN_WORKER_MEMORY_MB`` fits in the memory limit minus a
+    headroom for the master and page cache. ``GUNICORN_WORKERS`` and
+    ``GUNICORN_THREADS`` override the computed values.
+    """
+    mode = environ.get('SERVER_MODE', 'wsgi')
+    cpus = cpus or available_cpus()
+    memory_limit = memory_limit if memory_limit is not None else memory_limit_bytes()
+    worker_memory_mb = int(environ.get('GUNICORN_WORKER_MEMORY_MB', '150'))
+    headroom = float(environ.get('GUNICORN_MEMORY_HEADROOM', '0.2'))
+
+    if mode == 'asgi':
+        worker_class = 'uvicorn_worker.UvicornWorker'
+        workers = cpus
+        threads = 1
+    else:
+        threads = int(environ.get('GUNICORN_THREADS', '4'))
+        worker_class = 'gthread' if threads > 1 else 'sync'
+        workers = 2 * cpus + 1
+
+    memory_limit_mb = memory_limit // (1024 * 1024) if memory_limit else 0
+    if memory_limit_mb:
+        workers = min(workers, max(1, int(memory_limit_mb * (1 - headroom)) // worker_memory_mb))
+
+    if environ.get('GUNICORN_WORKERS'):
+        workers = int(environ['GUNICORN_WORKERS'])
+
+    return ServerSizing(
+        mode=mode,
+        worker_class=worker_class,
+        workers=workers,
+        threads=threads,
+        cpus=cpus,
+        memory_limit_mb=memory_limit_mb,
+        worker_memory_mb=worker_memory_mb,
+    )
@@ -1,9 +1,22 @@
 from pathlib import Path
-import os
-import json
+import copy
 from loguru import logger
 import sys
-from datetime import datetime
+
+from project.config import config  # Variables de entorno tipadas, leídas al primer acceso
+from project.server_config import compute_sizing
+
+# Envío de logs a S3 en segundo plano: el sink solo encola, un worker sube lotes comprimidos.
+# El cliente boto3 y el hilo se crean con el primer registro, no al importar settings.
+LOG_SHIPPING = {
+    "bucket": config.aws_storage_bucket_name,
+    "prefix": "logs/app",
+    "region_name": config.aws_s3_region_name,
+    "max_queue_size": config.log_queue_size,  # Registros en memoria antes de aplicar la política
+    "batch_max_bytes": config.log_batch_bytes,  # Tamaño de lote sin comprimir
+    "flush_interval": config.log_flush_interval,  # Segundos máximos entre subidas
+    "drop_policy": config.log_drop_policy,  # drop_newest | drop_oldest | block
+}
 
 # Configuración de Loguru
 LOGURU_CONFIG = {
@@ -13,26 +26,31 @@ LOGURU_CONFIG = {
             "format": "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
             "level": "INFO",
         },
-        {
-            "sink": f"s3://{os.environ['AWS_STORAGE_BUCKET_NAME']}/logs/app_{datetime.now().strftime('%Y-%m-%d')}.log",
-            "format": "{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
-            "level": "DEBUG",
-            "rotation": "1 day",
-            "retention": "30 days",
-        }
     ]
 }
 
+if config.log_shipping_enabled:  # LOG_SHIPPING_ENABLED=False evita el sink S3 (p. ej. comandos locales)
+    from core.log_shipping import S3LogSink
+    LOG_SINK = S3LogSink(**LOG_SHIPPING)
+    LOGURU_CONFIG["handlers"].append({
+        # La retención se gestiona con una regla de ciclo de vida del bucket sobre logs/
+        "sink": LOG_SINK,
+        "format": "{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
+        "level": "DEBUG",
+    })
+else:
+    LOG_SINK = None
+
 # Configurar Loguru
 logger.configure(**LOGURU_CONFIG)
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-SECRET_KEY = os.environ['SECRET_KEY']
+SECRET_KEY = config.secret_key
 
-DEBUG = os.environ['DEBUG'] == 'True'
+DEBUG = config.debug
 
-ALLOWED_HOSTS = os.environ['ALLOWED_HOSTS'].split(',')
+ALLOWED_HOSTS = config.allowed_hosts
 
 CSRF_TRUSTED_ORIGINS = [  # Dominios permitidos para peticiones POST con CSRF token
     'https://*.amazonaws.com',
@@ -60,29 +78,147 @@ INSTALLED_APPS = [
     'core',
 ]
 
-MIDDLEWARE = [
-    'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
-    'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+# Servidor: 'wsgi' (gthread) o 'asgi' (uvicorn); core.urls enruta a vistas síncronas o asíncronas según el modo
+SERVER_MODE = config.server_mode
+
+# Modo de middleware: 'lean' omite sesión/CSRF/auth/mensajes en rutas sin estado, 'full' usa el stack estándar
+MIDDLEWARE_MODE = config.middleware_mode
+STATELESS_PATH_PREFIXES = (  # Rutas que nunca usan sesión ni usuario (health checks, hello, métricas)
+    '/core/health/',
+    '/core/hello/',
+    '/core/home/',  # Sin sesión no hay Vary: Cookie y CloudFront puede cachearla
+    '/core/metrics/',
+    '/core/media/',
+    '/core/images/',
+)
+
+if MIDDLEWARE_MODE == 'lean':
+    MIDDLEWARE = [
+        'core.middleware.timing.RequestTimingMiddleware',  # Primero: mide el stack completo
+        'core.middleware.admission.AdmissionMiddleware',  # Descarta pronto lo que el proceso no puede atender
+        'django.middleware.security.SecurityMiddleware',
+        'core.middleware.compression.CompressionMiddleware',  # Por encima de todo lo que lee o cambia el cuerpo
+        'core.middleware.cache_control.CacheControlMiddleware',  # ETag sobre el cuerpo sin comprimir
+        'core.middleware.stateless.LeanSessionMiddleware',
+        'django.middleware.common.CommonMiddleware',
+        'core.middleware.stateless.LeanCsrfViewMiddleware',
+        'core.middleware.stateless.LeanAuthenticationMiddleware',
+        'core.middleware.admission.RateLimitMiddleware',  # Tras la autenticación: límite por usuario o IP
+        'core.middleware.stateless.LeanMessageMiddleware',
+        'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    ]
+else:
+    MIDDLEWARE = [
+        'core.middleware.timing.RequestTimingMiddleware',  # Primero: mide el stack completo
+        'core.middleware.admission.AdmissionMiddleware',  # Descarta pronto lo que el proceso no puede atender
+        'django.middleware.security.SecurityMiddleware',
+        'core.middleware.compression.CompressionMiddleware',  # Por encima de todo lo que lee o cambia el cuerpo
+        'core.middleware.cache_control.CacheControlMiddleware',  # ETag sobre el cuerpo sin comprimir
+        'django.contrib.sessions.middleware.SessionMiddleware',
+        'django.middleware.common.CommonMiddleware',
+        'django.middleware.csrf.CsrfViewMiddleware',
+        'django.contrib.auth.middleware.AuthenticationMiddleware',
+        'core.middleware.admission.RateLimitMiddleware',  # Tras la autenticación: límite por usuario o IP
+        'django.contrib.messages.middleware.MessageMiddleware',
+        'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    ]
+
+# API JSON (core.api): paginación por cursor (keyset), proyección de columnas y orjson
+API_PAGE_SIZE = 100  # Filas por página si no se indica limit
+API_MAX_PAGE_SIZE = 1000
+API_STREAM_BATCH_SIZE = 1000  # Filas por consulta al transmitir NDJSON
+
+# Control de admisión (core.admission): concurrencia por ruta y token bucket por cliente; lo que sobra recibe 503/429 con Retry-After
+_sizing = compute_sizing()
+ADMISSION_PRIORITY_PATHS = ('/core/health/', '/core/metrics/')  # Sondas y métricas nunca se limitan
+# Peticiones simultáneas por proceso; en WSGI queda un hilo de Gunicorn libre para las sondas
+ADMISSION_MAX_CONCURRENCY = max(1, _sizing.threads - 1) if _sizing.mode == 'wsgi' else 64
+ADMISSION_CONCURRENCY_LIMITS = [  # (ruta, regex de path, máximo simultáneo por proceso); gana la primera que coincide
+    ('admin', r'^/admin/', 2),
+    ('uploads', r'^/core/uploads/', 2),
+]
+ADMISSION_QUEUE_TIMEOUT = 0.05  # Segundos que una petición espera un hueco antes del 503
+ADMISSION_MAX_QUEUE_SECONDS = 10.0  # Con X-Request-Start: 503 si ya esperó más en la cola del proxy
+ADMISSION_RETRY_AFTER = 1  # Retry-After (segundos) de los 503
+ADMISSION_RATE_LIMITS = [  # (ruta, regex de path, peticiones por segundo, ráfaga) por usuario autenticado o IP
+    ('uploads', r'^/core/uploads/', 5.0, 50),
+    ('pages', r'', 20.0, 100),
+]
+ADMISSION_RATE_CACHE = config.admission_rate_cache  # None: buckets por proceso; alias de CACHES para compartirlos
+ADMISSION_PROXY_HOPS = 1  # Proxies de confianza que añaden X-Forwarded-For (el balanceador de App Runner)
+
+# Optimización de respuestas: compresión (core.middleware.compression) y Cache-Control/ETag (core.middleware.cache_control)
+COMPRESSION_MIN_BYTES = 1024  # Cuerpos más pequeños se envían sin comprimir
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_GZIP_MAX_RANDOM_BYTES = 100  # Como GZipMiddleware de Django: bytes aleatorios en la cabecera gzip contra BREACH
+COMPRESSION_BROTLI_QUALITY = 4  # Brotli (paquete opcional brotli) rápido para contenido dinámico
+COMPRESSIBLE_CONTENT_TYPES = (  # Prefijos de Content-Type; imágenes, vídeo y archivos ya vienen comprimidos
+    'text/',
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'application/x-ndjson',
+    'image/svg+xml',
+)
+ETAG_MAX_BYTES = 1024 * 1024  # ETag fuerte (BLAKE2b del cuerpo) solo para respuestas de hasta 1 MiB
+CACHE_CONTROL_POLICIES = [  # Regex de ruta -> directivas de patch_cache_control; gana la primera que coincide
+    (r'^/core/health/', {'no_store': True}),  # Sondas: siempre contra la instancia
+    (r'^/core/metrics/', {'no_store': True}),
+    (r'^/core/uploads/', {'private': True, 'no_store': True}),
+    (r'^/admin/', {'private': True, 'no_store': True}),
+    (r'^/core/api/', {'private': True, 'no_cache': True}),  # Datos del usuario: revalidar siempre con el ETag
+    # Páginas públicas: s-maxage y stale-* los aplica CloudFront, el navegador usa max-age
+    (r'^/core/hello/$', {'public': True, 'max_age': 60, 's_maxage': 300}),
+    (r'^/core/home/$', {'public': True, 's_maxage': 300, 'stale_while_revalidate': 60, 'stale_if_error': 86400}),
 ]
 
+# Auditoría de consultas (core.query_audit): cuenta consultas por petición, detecta N+1 y aplica presupuestos por vista
+QUERY_AUDIT_MODE = config.query_audit_mode or 'off'  # off | log | raise; solo si se pide: apprunner.yaml aún tiene DEBUG=True (testgate usa raise)
+QUERY_AUDIT_REPEAT_THRESHOLD = 5  # Misma consulta (salvo parámetros) repetida 5 veces o más en una petición: posible N+1
+QUERY_BUDGET_DEFAULT = 50  # Máximo de consultas por petición para vistas sin presupuesto propio
+QUERY_BUDGETS = {  # Nombre de vista o patrón fnmatch -> máximo de consultas
+    'hello_world': 0,
+    'health': 0,
+    'liveness': 0,
+    'readiness': 0,
+    'db_health_check': 1,
+    'media': 0,
+    'image': 8,  # Generar una variante: índice y update_or_create (con savepoints); las ya indexadas salen de la caché (0)
+    'upload_*': 6,  # Sesión, usuario, fila bloqueada (select_for_update) y update, más savepoint y release en tests
+    'api_*': 3,  # Sesión, usuario y una sola consulta por página (el streaming NDJSON corre fuera de la vista)
+    'admin:*': 20,
+}
+if QUERY_AUDIT_MODE != 'off':
+    MIDDLEWARE.insert(1, 'core.middleware.query_audit.QueryAuditMiddleware')  # Tras la medición de tiempos
+
+# Backend de sesiones: db (por defecto), cache, cached_db o signed_cookies (sin consultas a la BD)
+SESSION_BACKEND = config.session_backend
+SESSION_ENGINE = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}[SESSION_BACKEND]
+
 ROOT_URLCONF = 'project.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [],
-        'APP_DIRS': True,
+        'BACKEND': 'core.instrumentation.InstrumentedDjangoTemplates',  # DjangoTemplates + tiempo de render
+        'DIRS': [BASE_DIR / 'templates'],  # Plantillas comunes (base.html, navbar.html)
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Plantillas compiladas una vez por proceso (el autoreload de desarrollo las invalida)
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
@@ -92,14 +228,99 @@ WSGI_APPLICATION = 'project.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
-        'NAME': os.environ['DB_NAME'],
-        'USER': os.environ['DB_USERNAME'],
-        'PASSWORD': os.environ['DB_PASSWORD'],
-        'HOST': os.environ['DB_HOST'],
-        'PORT': os.environ['DB_PORT'],
+        'NAME': config.db_name,
+        'USER': config.db_username,
+        'PASSWORD': config.db_password,
+        'HOST': config.db_host,
+        'PORT': config.db_port,
     }
 }
 
+# Pool de conexiones (psycopg_pool, uno por proceso de Gunicorn)
+DB_POOL_ENABLED = config.db_pool_enabled
+
+# Verifica cada conexión antes de usarla (al sacarla del pool o al reutilizarla)
+DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+if DB_POOL_ENABLED:
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': config.db_pool_min_size,  # Conexiones abiertas en reposo
+            'max_size': config.db_pool_max_size,  # Límite por proceso
+            'max_lifetime': config.db_pool_max_lifetime,  # Segundos antes de reciclar una conexión
+            'max_idle': config.db_pool_max_idle,  # Segundos ociosa antes de cerrarla
+            'timeout': config.db_pool_timeout,  # Espera máxima por una conexión libre
+        },
+    }
+else:
+    # Sin pool: conexiones persistentes entre peticiones
+    DATABASES['default']['CONN_MAX_AGE'] = config.db_conn_max_age
+
+# Réplicas de lectura (core.db_router): un alias replica<N> por host de DB_REPLICA_HOSTS, mismo usuario y base
+DATABASE_REPLICAS = []
+DB_REPLICA_CONNECT_TIMEOUT = 2  # Segundos: una réplica inalcanzable no retiene la petición que mide su retraso
+for index, host in enumerate(config.db_replica_hosts, start=1):
+    replica = {
+        **copy.deepcopy(DATABASES['default']),
+        'HOST': host,
+        'TEST': {'MIRROR': 'default'},  # En tests las réplicas apuntan a la base de test del primario
+    }
+    replica.setdefault('OPTIONS', {})['connect_timeout'] = DB_REPLICA_CONNECT_TIMEOUT
+    if 'pool' in replica['OPTIONS']:
+        replica['OPTIONS']['pool']['timeout'] = DB_REPLICA_CONNECT_TIMEOUT  # Espera por conexión del pool
+    DATABASES[f'replica{index}'] = replica
+    DATABASE_REPLICAS.append(f'replica{index}')
+if DATABASE_REPLICAS:
+    DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']  # Lecturas a réplicas, escrituras al primario
+    MIDDLEWARE.insert(  # Antes de sesión y auth: fija al primario las peticiones que escriben
+        MIDDLEWARE.index('core.middleware.cache_control.CacheControlMiddleware') + 1,
+        'core.middleware.replicas.ReplicaPinMiddleware',
+    )
+DB_REPLICA_MAX_LAG = config.db_replica_max_lag  # Segundos de retraso a partir de los que se lee del primario
+DB_REPLICA_CHECK_INTERVAL = 5.0  # Cada cuánto se mide el retraso de cada réplica
+DB_PRIMARY_MODELS = ('sessions.session',)  # Siempre se leen del primario
+DB_PIN_SECONDS = 5  # Tras una escritura, el mismo cliente lee del primario durante estos segundos
+DB_PIN_COOKIE = 'db_pin'
+
+# Caché: memoria local (LRU por proceso) o Redis compartido entre instancias
+CACHE_BACKEND = config.cache_backend
+
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': config.redis_url,
+            'TIMEOUT': config.cache_timeout,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'TIMEOUT': config.cache_timeout,
+            'OPTIONS': {
+                'MAX_ENTRIES': config.cache_max_entries,  # Expulsa las menos usadas (LRU)
+                'CULL_FREQUENCY': 10,  # Expulsa 1/10 de las entradas al llenarse
+            },
+        }
+    }
+
+PAGE_CACHE_TIMEOUT = config.page_cache_timeout  # Segundos que se sirve una página cacheada
+
+# Importación y exportación masiva (manage.py bulkimport / bulkexport, core.bulk)
+BULK_BATCH_SIZE = 10000  # Filas por transacción al importar (y por lote leído al exportar sin COPY)
+BULK_S3_PART_SIZE = 8 * 1024 * 1024  # Tamaño de parte al escribir en S3 (mínimo 5 MiB)
+
+# Caché en dos niveles (core.tiered_cache): LRU por proceso sobre la caché compartida, con cálculo único por clave
+TIERED_CACHE_ALIAS = 'default'  # Caché compartida (Redis en producción)
+TIERED_CACHE_TIMEOUT = 300  # Segundos que un valor se considera fresco
+TIERED_CACHE_STALE = 60  # Segundos extra que se sirve caducado mientras se recalcula en segundo plano
+TIERED_CACHE_BETA = 1.0  # Refresco anticipado probabilístico (XFetch); 0 lo desactiva
+TIERED_CACHE_LOCAL_MAX_ENTRIES = 1000
+TIERED_CACHE_LOCAL_TIMEOUT = 5.0  # Segundos que el nivel local confía en su copia (límite de desfase entre instancias)
+TIERED_CACHE_LOCK_TIMEOUT = 10.0  # Espera máxima por el cálculo de otro proceso
+TIERED_CACHE_REFRESH_THREADS = 2  # Hilos por proceso para los refrescos en segundo plano
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -128,18 +349,27 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # S3 Configuration
-AWS_STORAGE_BUCKET_NAME = os.environ['AWS_STORAGE_BUCKET_NAME']
-AWS_S3_REGION_NAME = os.environ['AWS_S3_REGION_NAME']
+AWS_STORAGE_BUCKET_NAME = config.aws_storage_bucket_name
+AWS_S3_REGION_NAME = config.aws_s3_region_name
 AWS_S3_FILE_OVERWRITE = False
 AWS_DEFAULT_ACL = None
-AWS_S3_CUSTOM_DOMAIN = os.environ.get('AWS_S3_CUSTOM_DOMAIN')
-AWS_S3_OBJECT_PARAMETERS = json.loads(os.environ.get('AWS_S3_OBJECT_PARAMETERS', '{"CacheControl": "max-age=86400"}'))
+AWS_S3_CUSTOM_DOMAIN = config.aws_s3_custom_domain
+AWS_S3_OBJECT_PARAMETERS = config.aws_s3_object_parameters
 AWS_S3_SIGNATURE_VERSION = 's3v4'
 AWS_S3_VERIFY = True
+AWS_S3_ENDPOINT_URL = config.aws_s3_endpoint_url  # Solo para un S3 local (MinIO, moto server); vacío en AWS
+
+# Cliente S3 compartido por proceso (core.s3): pool de conexiones, keep-alive y reintentos adaptativos
+AWS_S3_MAX_POOL_CONNECTIONS = config.aws_s3_max_pool_connections  # Conexiones HTTP por cliente (hilos + subidas en paralelo)
+AWS_S3_MAX_ATTEMPTS = config.aws_s3_max_attempts  # Intentos totales por llamada (incluye el primero)
+AWS_S3_RETRY_MODE = 'adaptive'  # Reintentos con backoff y limitación de tasa en el cliente ante throttling
+AWS_S3_CONNECT_TIMEOUT = 5
+AWS_S3_READ_TIMEOUT = 60
+AWS_S3_TCP_KEEPALIVE = True
 
 STORAGES = {
     "default": {
-        "BACKEND": "storages.backends.s3.S3Storage",
+        "BACKEND": "core.storage.SharedS3Storage",  # S3Storage sobre el cliente compartido de core.s3
         "OPTIONS": {
             "bucket_name": AWS_STORAGE_BUCKET_NAME,
             "region_name": AWS_S3_REGION_NAME,
@@ -148,7 +378,8 @@ STORAGES = {
         },
     },
     "staticfiles": {
-        "BACKEND": "storages.backends.s3.S3Storage",
+        # Nombres con hash de contenido (staticfiles.json), publicados con `manage.py publishstatic`
+        "BACKEND": "core.storage.ManifestS3StaticStorage",
         "OPTIONS": {
             "bucket_name": AWS_STORAGE_BUCKET_NAME,
             "location": "static",
@@ -161,5 +392,106 @@ STORAGES = {
 STATIC_URL = f'https://{AWS_S3_CUSTOM_DOMAIN}/static/'
 MEDIA_URL = f'https://{AWS_S3_CUSTOM_DOMAIN}/media/'
 
+# Entrega de media en /core/media/<ruta>: stream por trozos desde S3 (con Range) o redirección firmada
+MEDIA_STORAGE_PREFIX = 'media'  # Solo se sirven objetos bajo media/ del storage por defecto
+MEDIA_DELIVERY = config.media_delivery  # stream | redirect | auto (redirige a partir de MEDIA_REDIRECT_MIN_BYTES)
+MEDIA_REDIRECT_MIN_BYTES = config.media_redirect_min_bytes
+MEDIA_STREAM_CHUNK_SIZE = 256 * 1024  # Bytes por trozo; la memoria por descarga no depende del tamaño del fichero
+MEDIA_URL_EXPIRY = 300  # Segundos de validez de las URLs firmadas
+# Con un par de claves de CloudFront las redirecciones se firman para AWS_S3_CUSTOM_DOMAIN (si no, URL prefirmada de S3)
+AWS_CLOUDFRONT_KEY_ID = config.aws_cloudfront_key_id
+AWS_CLOUDFRONT_KEY = config.aws_cloudfront_key
+
+# Variantes de imagen en /core/images/<ruta>?w=&fmt= (core.images): redimensionado y conversión en un pool de procesos
+IMAGE_WIDTHS = (320, 640, 960, 1280, 1920)  # El ancho pedido se redondea al siguiente de la lista
+IMAGE_FORMATS = ('avif', 'webp', 'jpeg')  # Orden de preferencia si el cliente no indica fmt (según Accept)
+IMAGE_QUALITY = {'avif': 60, 'webp': 80, 'jpeg': 82}
+IMAGE_PRECOMPUTE_WIDTHS = (320, 960)  # Variantes que genera de antemano la tarea precompute_image_variants
+IMAGE_VARIANT_PREFIX = 'variants'  # Nombres deterministas e inmutables; CloudFront los sirve sin firmar
+IMAGE_PROCESS_WORKERS = 1  # Procesos de redimensionado por worker de Gunicorn
+IMAGE_RENDER_TIMEOUT = 30  # Segundos
+IMAGE_MAX_SOURCE_BYTES = 25 * 1024 * 1024
+IMAGE_MAX_PIXELS = 50_000_000  # Protección contra "bombas de descompresión"
+IMAGE_INDEX_CACHE_TIMEOUT = 3600  # Búsquedas en el índice (ImageVariant) en la caché de dos niveles
+IMAGE_REDIRECT_MAX_AGE = 86400  # La redirección cambia si se reemplaza el original; la variante en sí es inmutable
+# Quien espera una variante que otro está generando no debe rendirse antes que el render (descarga y subida incluidas)
+TIERED_CACHE_OPTIONS = {'images': {'lock_timeout': IMAGE_RENDER_TIMEOUT + 30}}
+
+# Subidas multipart directas a S3 (/core/uploads/): el cliente sube cada parte a una URL prefirmada
+UPLOAD_STORAGE_PREFIX = 'uploads'
+UPLOAD_PART_SIZE = 8 * 1024 * 1024  # Mínimo de S3: 5 MiB; crece si el fichero necesitaría más de 10.000 partes
+UPLOAD_MAX_SIZE = 5 * 1024 ** 3  # Límite de la aplicación (S3 admite hasta 5 TiB en multipart)
+UPLOAD_URL_EXPIRY = 3600  # Segundos de validez de las URLs de cada parte
+UPLOAD_ABANDON_AFTER = 24 * 3600  # `manage.py abortuploads` aborta las subidas pendientes más antiguas
+
+# Cola de tareas en segundo plano (core.jobs): tabla core_job en PostgreSQL, ejecutada por `manage.py worker`
+TASK_WORKER_CONCURRENCY = config.task_worker_concurrency  # Hilos por proceso worker (un trabajo por hilo)
+TASK_POLL_INTERVAL = 1.0  # Segundos de espera cuando la cola está vacía
+TASK_WORKER_MAX_BACKOFF = 60  # Tras un error de base de datos el hilo reintenta con backoff exponencial hasta este máximo
+TASK_RETRY_BASE_DELAY = 5  # Reintentos con backoff exponencial: 5s, 10s, 20s... (con jitter)
+TASK_RETRY_MAX_DELAY = 3600
+TASK_VISIBILITY_TIMEOUT = 30 * 60  # Un trabajo en ejecución más tiempo se considera abandonado y se reencola
+TASK_QUEUE_METRICS = True  # /core/metrics/ incluye la profundidad de la cola (una consulta por scrape)
+
+# Health checks: un hilo por proceso ejecuta las verificaciones y /core/health/ready/ devuelve el último resultado
+HEALTH_PROBE_INTERVAL = config.health_probe_interval  # Segundos entre rondas de verificación
+HEALTH_CHECKS = {
+    'database': 'core.health.check_database',
+    's3': 'core.health.check_s3',
+    'cache': 'core.health.check_cache',
+}
+
+# Métricas y perfilado
+METRICS_TOKEN = config.metrics_token  # /core/metrics/ exige "Authorization: Bearer <token>"; sin token solo responde con DEBUG (403 si no)
+SERVER_TIMING = DEBUG if config.server_timing is None else config.server_timing  # Cabecera Server-Timing (consultas, tiempos de BD y S3): revela detalles internos, apagada en producción
+PROFILE_SAMPLE_RATE = config.profile_sample_rate  # Fracción de peticiones perfiladas con cProfile (solo WSGI)
+PROFILE_STORAGE = 'default'  # Los perfiles (.prof) se guardan en S3 bajo profiles/
+PROFILE_STORAGE_PREFIX = 'profiles'
+
+# Coste de arranque: `manage.py importtime` falla si el import de django.setup() supera el presupuesto
+IMPORT_TIME_BUDGET_MS = config.import_time_budget_ms
+IMPORT_TIME_FORBIDDEN = ['boto3', 'botocore']  # Se importan al primer uso de S3, nunca al arrancar
+
 # Test Runner Configuration
 TEST_RUNNER = 'django.test.runner.DiscoverRunner'
+
+# `manage.py testgate`: cada proceso paralelo usa su propia BD de test (test_<DB_NAME>_<slot>), reutilizada con --keepdb
+if config.test_db_slot:
+    DATABASES['default']['TEST'] = {'NAME': f"test_{config.db_name}_{config.test_db_slot}"}
+
+# Etapas del test gate, en orden; las suites de una misma etapa se ejecutan en paralelo
+TEST_GATE_STAGES = [
+    ('config', [
+        'tests.test_config',
+        'tests.test_server_config',
+        'tests.test_env_config',
+        'tests.test_benchmarks',
+    ]),
+    ('startup', ['tests.test_startup']),
+    ('integration', ['tests.test_integration']),
+    ('application', [
+        'core.tests.test_views',
+        'core.tests.test_models',
+        'core.tests.test_log_shipping',
+        'core.tests.test_release',
+        'core.tests.test_publishstatic',
+        'core.tests.test_health',
+        'core.tests.test_page_cache',
+        'core.tests.test_instrumentation',
+        'core.tests.test_stateless_middleware',
+        'core.tests.test_importtime',
+        'core.tests.test_s3',
+        'core.tests.test_testgate',
+        'core.tests.test_media',
+        'core.tests.test_uploads',
+        'core.tests.test_jobs',
+        'core.tests.test_query_audit',
+        'core.tests.test_compression',
+        'core.tests.test_db_router',
+        'core.tests.test_tiered_cache',
+        'core.tests.test_bulk',
+        'core.tests.test_admission',
+        'core.tests.test_api',
+        'core.tests.test_images',
+    ]),
+]
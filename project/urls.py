@@ -9,3 +9,9 @@ urlpatterns = [
     path('core/', include('core.urls')),
     path('admin/', admin.site.urls),
 ]
+
+# Los handlers por defecto leen el token CSRF de la sesión, que no existe en rutas sin estado
+handler400 = 'core.middleware.stateless.bad_request'
+handler403 = 'core.middleware.stateless.permission_denied'
+handler404 = 'core.middleware.stateless.page_not_found'
+handler500 = 'core.middleware.stateless.server_error'
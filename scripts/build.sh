@@ -0,0 +1,13 @@
+#!/bin/bash
+# Build-time steps, run once per deployment by App Runner (see apprunner.yaml).
+# Runtime secrets are not available here, so nothing in this script may import
+# project.settings or reach RDS/S3.
+
+set -e  # Stop script if any error occurs
+
+pip3 install uv
+uv venv .venv
+uv pip install -r requirements.txt
+
+echo "Precompiling bytecode..."
+.venv/bin/python -m compileall -q core project
@@ -1,70 +1,45 @@
 #!/bin/bash
+# Startup pipeline for each App Runner instance:
+#   1. release: idempotent migrate/collectstatic/superuser under an advisory lock
+#      (concurrent instances wait for the first one and then find nothing to do)
+#   2. tests:   optional deploy test gate (RUN_TEST_GATE=True), see scripts/test.sh
+#   3. serve:   exec Gunicorn, or the background job worker with PROCESS_TYPE=worker
+# Build-time steps (dependencies, bytecode) live in scripts/build.sh.
 
 set -e  # Stop script if any error occurs
 
-# --- Eliminar base de datos de test si existe ---
-echo "Checking and dropping test database if exists..."
-export PGPASSWORD="$DB_PASSWORD"
-psql -h "$DB_HOST" -U "$DB_USERNAME" -p "$DB_PORT" -d postgres -c "DROP DATABASE IF EXISTS test_$DB_NAME;" || true
-unset PGPASSWORD
+now_ms() { date +%s%3N; }
+STARTUP_BEGIN=$(now_ms)
+PHASES=""
 
-echo "Running Django migrations..."
-.venv/bin/python manage.py makemigrations
-.venv/bin/python manage.py migrate
+record_phase() {
+    PHASES="$PHASES $1=$(( $(now_ms) - $2 ))ms"
+}
 
-echo "Collecting static files..."
-.venv/bin/python manage.py collectstatic --noinput
-
-echo "Checking superuser existence..."
-if ! .venv/bin/python manage.py shell -c "from django.contrib.auth import get_user_model; User = get_user_model(); print(User.objects.filter(is_superuser=True).exists())" | grep -q "True"; then
-    echo "Creating superuser..."
-    .venv/bin/python manage.py createsuperuser --noinput
-else
-    echo "Superuser already exists, skipping creation."
-fi
-
-echo "Running tests in order..."
-
-echo "1. Running configuration tests..."
-.venv/bin/python manage.py test tests.test_config --verbosity 2
-if [ $? -ne 0 ]; then
-    echo "Configuration tests failed. Aborting deployment."
-    exit 1
+if [ "${SKIP_RELEASE:-False}" != "True" ]; then
+    echo "Running release steps..."
+    PHASE_BEGIN=$(now_ms)
+    .venv/bin/python manage.py release
+    record_phase release "$PHASE_BEGIN"
 fi
-echo "Configuration tests passed."
 
-echo "2. Running startup tests..."
-.venv/bin/python manage.py test tests.test_startup --verbosity 2
-if [ $? -ne 0 ]; then
-    echo "Startup tests failed. Aborting deployment."
-    exit 1
+if [ "${RUN_TEST_GATE:-False}" = "True" ]; then
+    echo "Running deploy test gate..."
+    PHASE_BEGIN=$(now_ms)
+    bash scripts/test.sh
+    record_phase tests "$PHASE_BEGIN"
 fi
-echo "Startup tests passed."
 
-echo "3. Running integration tests..."
-.venv/bin/python manage.py test tests.test_integration --verbosity 2
-if [ $? -ne 0 ]; then
-    echo "Integration tests failed. Aborting deployment."
-    exit 1
-fi
-echo "Integration tests passed."
-
-echo "4. Running application tests..."
-echo "4.1. Running core.views tests..."
-.venv/bin/python manage.py test core.tests.test_views --verbosity 2
-if [ $? -ne 0 ]; then
-    echo "core.views tests failed. Aborting deployment."
-    exit 1
-fi
+record_phase total "$STARTUP_BEGIN"
+echo "Startup phases:$PHASES"
 
-echo "4.2. Running core.models tests..."
-.venv/bin/python manage.py test core.tests.test_models --verbosity 2
-if [ $? -ne 0 ]; then
-    echo "core.models tests failed. Aborting deployment."
-    exit 1
+if [ "${PROCESS_TYPE:-web}" = "worker" ]; then
+    # Misma imagen como servicio aparte: los workers escalan sin tocar el servicio web
+    echo "Starting background job worker..."
+    exec .venv/bin/python manage.py worker
 fi
 
-echo "All application tests passed successfully."
-
-echo "Starting Gunicorn server..."
-exec .venv/bin/gunicorn -b 0.0.0.0:8080 project.wsgi --log-level info --access-logfile - --error-logfile - 
\ No newline at end of file
+# Workers, threads y clase de worker se calculan en gunicorn.conf.py (CPU/memoria de la instancia)
+# SERVER_MODE=asgi usa workers de uvicorn (vistas async, I/O concurrente); wsgi usa gthread
+echo "Starting Gunicorn server (${SERVER_MODE:-wsgi})..."
+exec .venv/bin/gunicorn -c gunicorn.conf.py
@@ -0,0 +1,31 @@
+#!/bin/bash
+# Deploy test gate. Runs against the real RDS/S3 services, so it is kept out of
+# the serving path: start.sh only calls it when RUN_TEST_GATE=True.
+
+set -e  # Stop script if any error occurs
+
+echo "Checking for model changes without migrations..."
+.venv/bin/python manage.py makemigrations --check --dry-run
+
+# Etapas y suites en TEST_GATE_STAGES (settings): config -> startup -> integration -> application.
+# Las suites de cada etapa corren en procesos paralelos, cada uno con su BD test_<DB_NAME>_gate<N>
+# reutilizada entre despliegues (--keepdb); TEST_GATE_FRESH=True las recrea.
+echo "Running test gate..."
+GATE_ARGS=""
+if [ "${TEST_GATE_FRESH:-False}" = "True" ]; then
+    GATE_ARGS="--fresh"
+fi
+.venv/bin/python manage.py testgate $GATE_ARGS
+if [ $? -ne 0 ]; then
+    echo "Test gate failed. Aborting deployment."
+    exit 1
+fi
+
+echo "Checking startup import budget..."
+.venv/bin/python manage.py importtime --module project.wsgi --module project.asgi
+if [ $? -ne 0 ]; then
+    echo "Startup import budget exceeded. Aborting deployment."
+    exit 1
+fi
+
+echo "All application tests passed successfully."
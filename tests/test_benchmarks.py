@@ -0,0 +1,63 @@
+from django.test import SimpleTestCase
+from loguru import logger
+import json
+import sys
+
+from benchmarks.run import LOAD_BASELINE, LOAD_PATHS, compare_load
+
+logger.remove()
+logger.add(
+    sys.stdout,
+    format="[{level: <8}] {name}:{function}:{line} - {message}",
+    level="INFO"
+)
+
+
+def stats(rps=100.0, p95=20.0, p99=30.0, errors=0):
+    return {'requests': 1000, 'errors': errors, 'rps': rps, 'p50_ms': 10.0, 'p95_ms': p95, 'p99_ms': p99}
+
+
+class BenchmarkBaselineTests(SimpleTestCase):
+    """Test suite for the benchmark regression check.
+
+    These tests verify which load test results are flagged against a baseline,
+    and that the stored baseline covers the benchmarked endpoints.
+    """
+
+    def setUp(self):
+        """Set up test environment for each test."""
+        super().setUp()
+        logger.info(f"Starting test: {self._testMethodName}")
+
+    def test_within_tolerance(self):
+        """Verify that small differences are not reported."""
+        logger.info("Testing results within tolerance")
+        baseline = {'results': {'/a/': stats()}}
+        self.assertEqual(compare_load({'/a/': stats(rps=90.0, p95=24.0, p99=36.0)}, baseline, 0.25), [])
+        logger.info("Results within tolerance verified")
+
+    def test_regressions(self):
+        """Verify that lower throughput, higher tail latency and errors are reported."""
+        logger.info("Testing regressions")
+        baseline = {'results': {'/a/': stats(), '/b/': stats()}}
+        report = {'/a/': stats(rps=50.0, p99=60.0), '/b/': stats(errors=3), '/new/': stats()}
+        regressions = compare_load(report, baseline, 0.25)
+        self.assertEqual(len(regressions), 3)
+        self.assertTrue(regressions[0].startswith('/a/: rps'))
+        self.assertTrue(regressions[1].startswith('/a/: p99_ms'))
+        self.assertEqual(regressions[2], '/b/: 3 failed requests')
+        logger.info("Regressions verified")
+
+    def test_stored_baseline(self):
+        """Verify that the load baseline in the repository covers every benchmarked path."""
+        logger.info("Testing stored baseline")
+        baseline = json.loads(LOAD_BASELINE.read_text())
+        self.assertEqual(sorted(baseline['results']), sorted(LOAD_PATHS))
+        for path in LOAD_PATHS:
+            self.assertEqual(baseline['results'][path]['errors'], 0)
+        logger.info("Stored baseline verified")
+
+    def tearDown(self):
+        """Clean up after each test."""
+        super().tearDown()
+        logger.info(f"Finishing test: {self._testMethodName}")
@@ -1,5 +1,6 @@
 from django.test import TestCase
 from django.conf import settings
+from django.utils.module_loading import import_string
 from loguru import logger
 import sys
 import os
@@ -116,8 +117,14 @@ class ConfigTests(TestCase):
             'django.contrib.messages.middleware.MessageMiddleware',
         ]
         
+        # The lean profile uses subclasses that skip stateless routes.
+        configured = [import_string(path) for path in settings.MIDDLEWARE]
         for middleware in required_middleware:
-            self.assertIn(middleware, settings.MIDDLEWARE)
+            required_class = import_string(middleware)
+            self.assertTrue(
+                any(issubclass(cls, required_class) for cls in configured),
+                f"{middleware} (or a subclass) not found in MIDDLEWARE"
+            )
         logger.info("Middleware configuration verified")
 
     def tearDown(self):
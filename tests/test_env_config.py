@@ -0,0 +1,79 @@
+from django.test import SimpleTestCase
+from django.core.exceptions import ImproperlyConfigured
+from loguru import logger
+import sys
+
+from project.config import Config
+
+logger.remove()
+logger.add(
+    sys.stdout,
+    format="[{level: <8}] {name}:{function}:{line} - {message}",
+    level="INFO"
+)
+
+
+class EnvConfigTests(SimpleTestCase):
+    """Test suite for the typed environment configuration.
+
+    These tests verify that variables are converted to their types, read only
+    when accessed, and reported by name when missing or invalid.
+    """
+
+    def setUp(self):
+        """Set up logging for each test."""
+        super().setUp()
+        logger.info(f"Starting test: {self._testMethodName}")
+
+    def test_typed_values(self):
+        """Verify conversion of booleans, numbers, lists and JSON."""
+        logger.info("Testing typed values")
+        config = Config({
+            'DEBUG': 'True',
+            'ALLOWED_HOSTS': 'a.example.com,b.example.com',
+            'DB_POOL_MAX_SIZE': '8',
+            'LOG_FLUSH_INTERVAL': '2.5',
+            'AWS_S3_OBJECT_PARAMETERS': '{"CacheControl": "no-cache"}',
+        })
+        self.assertIs(config.debug, True)
+        self.assertEqual(config.allowed_hosts, ['a.example.com', 'b.example.com'])
+        self.assertEqual(config.db_pool_max_size, 8)
+        self.assertEqual(config.log_flush_interval, 2.5)
+        self.assertEqual(config.aws_s3_object_parameters, {'CacheControl': 'no-cache'})
+        logger.info("Typed values verified")
+
+    def test_defaults(self):
+        """Verify defaults for optional variables."""
+        logger.info("Testing defaults")
+        config = Config({})
+        self.assertIs(config.db_pool_enabled, False)
+        self.assertEqual(config.cache_backend, 'locmem')
+        self.assertIsNone(config.metrics_token)
+        self.assertEqual(config.aws_s3_object_parameters, {'CacheControl': 'max-age=86400'})
+        logger.info("Defaults verified")
+
+    def test_values_are_read_lazily_and_cached(self):
+        """Verify that a variable is read on first access only."""
+        logger.info("Testing lazy reads")
+        environ = {}
+        config = Config(environ)
+        environ['SECRET_KEY'] = 'first'
+        self.assertEqual(config.secret_key, 'first')
+        environ['SECRET_KEY'] = 'second'
+        self.assertEqual(config.secret_key, 'first')
+        logger.info("Lazy reads verified")
+
+    def test_missing_and_invalid_values(self):
+        """Verify that errors name the offending variable."""
+        logger.info("Testing configuration errors")
+        config = Config({'DB_POOL_MAX_SIZE': 'many'})
+        with self.assertRaisesMessage(ImproperlyConfigured, 'DB_HOST is required'):
+            config.db_host
+        with self.assertRaisesMessage(ImproperlyConfigured, "DB_POOL_MAX_SIZE='many' is invalid"):
+            config.db_pool_max_size
+        logger.info("Configuration errors verified")
+
+    def tearDown(self):
+        """Clean up after each test."""
+        super().tearDown()
+        logger.info(f"Finishing test: {self._testMethodName}")
@@ -3,8 +3,6 @@ from django.conf import settings
 from loguru import logger
 import sys
 from datetime import datetime
-import boto3
-from botocore.exceptions import ClientError
 from django.core.files.base import ContentFile
 
 logger.remove()
@@ -31,11 +29,11 @@ class IntegrationTests(TestCase):
     def test_s3_connectivity(self):
         """Verifies actual connectivity to AWS S3 by attempting to list objects in the bucket."""
         logger.info("Testing S3 connectivity")
+        # Imported here so loading the test modules does not pay for boto3.
+        from botocore.exceptions import ClientError
+        from core.s3 import get_s3_client
         try:
-            s3_client = boto3.client(
-                's3',
-                region_name=settings.AWS_S3_REGION_NAME
-            )
+            s3_client = get_s3_client()
             # Try to list objects in the bucket
             response = s3_client.list_objects_v2(
                 Bucket=settings.AWS_STORAGE_BUCKET_NAME,
@@ -62,9 +60,8 @@ class IntegrationTests(TestCase):
     def test_static_files_storage(self):
         """Verifies S3 static file storage by saving and retrieving a test file."""
         logger.info("Testing static files storage")
-        # from django.core.files.storage import get_storage_class
-        from storages.backends.s3boto3 import S3Boto3Storage
-        storage = S3Boto3Storage()
+        from django.core.files.storage import storages
+        storage = storages['default']
         test_content = b"Test content for static file storage"
         content_file = ContentFile(test_content)
         test_filename = "test_static_file.txt"
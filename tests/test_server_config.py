@@ -0,0 +1,99 @@
+from django.test import SimpleTestCase
+from loguru import logger
+import sys
+import os
+import tempfile
+
+from project.server_config import available_cpus, compute_sizing, memory_limit_bytes
+
+logger.remove()
+logger.add(
+    sys.stdout,
+    format="[{level: <8}] {name}:{function}:{line} - {message}",
+    level="INFO"
+)
+
+MB = 1024 * 1024
+
+
+class ServerConfigTests(SimpleTestCase):
+    """Test suite for the Gunicorn sizing helpers.
+
+    These tests verify that worker counts follow the CPU quota and memory
+    limit of the instance, and that explicit overrides win.
+    """
+
+    def setUp(self):
+        """Set up test environment for each test."""
+        super().setUp()
+        logger.info(f"Starting test: {self._testMethodName}")
+
+    def make_cgroup(self, files):
+        root = tempfile.mkdtemp()
+        for name, content in files.items():
+            path = os.path.join(root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                f.write(content)
+        return root
+
+    def test_cgroup_v2_limits(self):
+        """Verify that cgroup v2 CPU quota and memory limit are honoured."""
+        logger.info("Testing cgroup v2 limits")
+        root = self.make_cgroup({'cpu.max': '100000 100000\n', 'memory.max': f'{2048 * MB}\n'})
+        self.assertEqual(available_cpus(root), 1)
+        self.assertEqual(memory_limit_bytes(root), 2048 * MB)
+        logger.info("cgroup v2 limits verified")
+
+    def test_cgroup_v1_limits(self):
+        """Verify that cgroup v1 CPU quota and memory limit are honoured."""
+        logger.info("Testing cgroup v1 limits")
+        root = self.make_cgroup({
+            'cpu/cpu.cfs_quota_us': '150000\n',
+            'cpu/cpu.cfs_period_us': '100000\n',
+            'memory/memory.limit_in_bytes': f'{1024 * MB}\n',
+        })
+        self.assertEqual(available_cpus(root), min(2, len(os.sched_getaffinity(0))))
+        self.assertEqual(memory_limit_bytes(root), 1024 * MB)
+        logger.info("cgroup v1 limits verified")
+
+    def test_wsgi_sizing(self):
+        """Verify that WSGI mode uses threaded workers sized from the CPU count."""
+        logger.info("Testing WSGI sizing")
+        sizing = compute_sizing({'SERVER_MODE': 'wsgi'}, cpus=2, memory_limit=4096 * MB)
+        self.assertEqual(sizing.worker_class, 'gthread')
+        self.assertEqual(sizing.workers, 5)
+        self.assertEqual(sizing.threads, 4)
+        logger.info("WSGI sizing verified")
+
+    def test_asgi_sizing(self):
+        """Verify that ASGI mode runs one uvicorn worker per CPU."""
+        logger.info("Testing ASGI sizing")
+        sizing = compute_sizing({'SERVER_MODE': 'asgi'}, cpus=4, memory_limit=4096 * MB)
+        self.assertEqual(sizing.worker_class, 'uvicorn_worker.UvicornWorker')
+        self.assertEqual(sizing.workers, 4)
+        self.assertEqual(sizing.threads, 1)
+        logger.info("ASGI sizing verified")
+
+    def test_memory_limit_caps_workers(self):
+        """Verify that the worker count never exceeds what fits in memory."""
+        logger.info("Testing memory cap")
+        sizing = compute_sizing({'GUNICORN_WORKER_MEMORY_MB': '200'}, cpus=4, memory_limit=1024 * MB)
+        # 1024 MB minus 20% headroom fits four 200 MB workers.
+        self.assertEqual(sizing.workers, 4)
+        sizing = compute_sizing({'GUNICORN_WORKER_MEMORY_MB': '2000'}, cpus=4, memory_limit=1024 * MB)
+        self.assertEqual(sizing.workers, 1)
+        logger.info("Memory cap verified")
+
+    def test_explicit_overrides(self):
+        """Verify that GUNICORN_WORKERS and GUNICORN_THREADS take precedence."""
+        logger.info("Testing explicit overrides")
+        sizing = compute_sizing({'GUNICORN_WORKERS': '3', 'GUNICORN_THREADS': '1'}, cpus=8, memory_limit=None)
+        self.assertEqual(sizing.workers, 3)
+        self.assertEqual(sizing.worker_class, 'sync')
+        logger.info("Explicit overrides verified")
+
+    def tearDown(self):
+        """Clean up after each test."""
+        super().tearDown()
+        logger.info(f"Finishing test: {self._testMethodName}")
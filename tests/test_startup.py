@@ -2,9 +2,7 @@ from django.test import TestCase
 from django.conf import settings
 from loguru import logger
 import sys
-from datetime import datetime
-import boto3
-from botocore.exceptions import ClientError
+from core.log_shipping import S3LogSink
 
 logger.remove()
 logger.add(
@@ -13,12 +11,13 @@ logger.add(
     level="INFO"
 )
 logger.add(
-    f"s3://{settings.AWS_STORAGE_BUCKET_NAME}/logs/tests_{datetime.now().strftime('%Y-%m-%d')}.log",
+    S3LogSink(
+        bucket=settings.AWS_STORAGE_BUCKET_NAME,
+        prefix="logs/tests",
+        region_name=settings.AWS_S3_REGION_NAME,
+    ),
     format="[{level: <8}] {name}:{function}:{line} - {message}",
     level="DEBUG",
-    rotation="1 day",
-    retention="30 days",
-    compression="zip"
 )
 
 class IntegrationTests(TestCase):